@@ -1,14 +1,36 @@
 """Admin API endpoints"""
 
-from datetime import datetime, timedelta
+import asyncio
+import io
+from datetime import datetime, timedelta, date as date_type
+from pathlib import Path
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, UploadFile, File
 from sqlmodel import Session, select, func
 
 from app.core.database import get_session, get_db_stats
-from app.core.models import Patient, Appointment, Payment, Certificate, DeviceLog
-from app.core.config import get_settings
-from app.core.scheduler import scheduler
+from app.core.models import (
+    Patient, Appointment, AppointmentResponse, Payment, Certificate, CertificateType,
+    DeviceLog, Department, DoctorScheduleCreate, AppointmentSlot
+)
+from app.core.config import get_settings, DEPARTMENT_LOCATIONS
+from app.core.scheduler import scheduler, deadline_dispatcher
+from app.services.outbox import outbox_dispatcher
+from app.services.patient_cache import patient_cache
+from app.services.settlement import SettlementService, previous_day
+from app.services.admin_search import AdminSearchService
+from app.services.queue_load import queue_load
+from app.services.wait_time import wait_time_estimator
+from app.services.reception import ReceptionService
+from app.services.booking import BookingService
+from app.services.backup import BackupService
+from app.services.wal_archive import wal_archiver
+from app.services.retention import RetentionService
+from app.services.emr_sync import emr_sync
+from app.services.emr_push import emr_pusher
+from app.services.bulk_import import BulkImporter, detect_format
+from app.integrations.emr_client import EmrError
+from app.api.endpoints.websocket import notify_appointment_called
 from app.i18n import i18n
 
 router = APIRouter()
@@ -67,7 +89,8 @@ async def get_statistics(
         "system": {
             "uptime_hours": 24,  # Would calculate actual uptime
             "active_sessions": 0,  # Would get from session manager
-            "scheduler_jobs": len(scheduler.list_jobs())
+            "scheduler_jobs": len(scheduler.list_jobs()),
+            "patient_cache": patient_cache.stats()
         }
     }
 
@@ -189,42 +212,190 @@ async def get_appointments_summary(
 @router.post("/maintenance/cleanup")
 async def cleanup_old_data(
     admin: bool = Depends(verify_admin),
-    days: int = 90,
-    session: Session = Depends(get_session)
+    days: int = 90
 ):
-    """Cleanup old data"""
-    cutoff_date = datetime.now() - timedelta(days=days)
-    
-    # Count records to be deleted
-    old_logs = session.exec(
-        select(func.count(DeviceLog.id)).where(
-            DeviceLog.created_at < cutoff_date
-        )
-    ).one()
-    
-    # Delete old logs
-    session.exec(
-        select(DeviceLog).where(DeviceLog.created_at < cutoff_date)
-    ).delete()
-    
-    session.commit()
-    
+    """Purge expired data in bounded chunks"""
+    summary = await asyncio.to_thread(RetentionService().run, days)
     return {
         "status": "completed",
-        "deleted": {
-            "device_logs": old_logs
-        }
+        "deleted": summary
     }
 
 
+@router.post("/schedules")
+async def create_doctor_schedule(
+    data: DoctorScheduleCreate,
+    admin: bool = Depends(verify_admin),
+    session: Session = Depends(get_session)
+):
+    """Create doctor schedule and its bookable slots"""
+    try:
+        schedule = BookingService(session).create_schedule(data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    slots = session.exec(
+        select(func.count(AppointmentSlot.id)).where(AppointmentSlot.schedule_id == schedule.id)
+    ).one()
+    return {"schedule_id": schedule.id, "slots": slots}
+
+
 @router.get("/scheduler/jobs")
 async def get_scheduler_jobs(admin: bool = Depends(verify_admin)):
     """Get scheduler job status"""
     return {
-        "jobs": scheduler.list_jobs()
+        "jobs": scheduler.list_jobs(),
+        "leader": scheduler.leader.status() if scheduler.leader else None,
+        "deadlines": deadline_dispatcher.snapshot()
     }
 
 
+@router.post("/settlement/run")
+async def run_settlement(
+    admin: bool = Depends(verify_admin),
+    date: Optional[date_type] = None,
+    session: Session = Depends(get_session)
+):
+    """Run settlement and gateway reconciliation for a day (default: yesterday)"""
+    day = date or previous_day()
+    return await SettlementService(session).reconcile(day)
+
+
+@router.post("/backup/run")
+async def run_backup(admin: bool = Depends(verify_admin)):
+    """Take an online backup now"""
+    try:
+        service = BackupService()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await asyncio.to_thread(service.create_backup)
+
+
+@router.get("/backups")
+async def list_backups(admin: bool = Depends(verify_admin)):
+    """List backup archives, newest first"""
+    try:
+        service = BackupService()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "backups": service.list_backups(),
+        "wal_archive": wal_archiver.status() if settings.wal_archive_enabled else None
+    }
+
+
+@router.post("/emr/sync")
+async def run_emr_sync(admin: bool = Depends(verify_admin)):
+    """Pull EMR changes since the last watermark now"""
+    try:
+        return await emr_sync.sync()
+    except EmrError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+
+@router.get("/emr/sync")
+async def get_emr_sync_status(admin: bool = Depends(verify_admin)):
+    """Get EMR sync watermarks and last result"""
+    return await asyncio.to_thread(emr_sync.status)
+
+
+@router.post("/import")
+async def bulk_import(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    resource: Optional[str] = Query(None, pattern="^(patients|appointments)$"),
+    admin: bool = Depends(verify_admin)
+):
+    """Bulk import patients/appointments from NDJSON (FHIR Bulk Data) or CSV"""
+    try:
+        fmt = format or detect_format(Path(file.filename or ""))
+        stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+        return await asyncio.to_thread(BulkImporter().import_stream, stream, fmt, resource)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/outbox")
+async def get_outbox_status(admin: bool = Depends(verify_admin)):
+    """Get outbox delivery status by topic"""
+    return {
+        **outbox_dispatcher.get_stats(),
+        "emr_push": emr_pusher.snapshot() if settings.emr_push_enabled else None
+    }
+
+
+@router.post("/queue/{department}/call-next", response_model=AppointmentResponse)
+async def call_next_patient(
+    department: Department,
+    admin: bool = Depends(verify_admin),
+    session: Session = Depends(get_session)
+):
+    """Call the next patient of a department (priority classes with aging)"""
+    appointment = ReceptionService(session).call_next(department)
+    if not appointment:
+        raise HTTPException(status_code=404, detail="No patients waiting")
+    
+    patient = patient_cache.get(session, appointment.patient_id)
+    await notify_appointment_called(
+        patient.name if patient else "",
+        appointment.queue_number,
+        DEPARTMENT_LOCATIONS.get(department.value, department.value)
+    )
+    return appointment
+
+
+@router.post("/appointments/{appointment_id}/complete", response_model=AppointmentResponse)
+async def complete_appointment(
+    appointment_id: int,
+    admin: bool = Depends(verify_admin),
+    session: Session = Depends(get_session)
+):
+    """Mark a called patient's consultation as finished (feeds wait-time estimates)"""
+    try:
+        return ReceptionService(session).complete_appointment(appointment_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/queue/statistics")
+async def get_queue_statistics(admin: bool = Depends(verify_admin)):
+    """Get cached queue load and service-time statistics"""
+    return {
+        "load": queue_load.snapshot(),
+        "service": wait_time_estimator.snapshot()
+    }
+
+
+@router.get("/search")
+async def search_records(
+    q: str,
+    scope: str = Query("certificates", pattern="^(certificates|patients)$"),
+    type: Optional[CertificateType] = None,
+    issued_from: Optional[datetime] = None,
+    issued_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    admin: bool = Depends(verify_admin),
+    session: Session = Depends(get_session)
+):
+    """Full-text search over certificates or patients (bm25 ranked, keyset paginated)"""
+    try:
+        service = AdminSearchService(session)
+        await asyncio.to_thread(service.refresh)
+        if scope == "patients":
+            return service.search_patients(q, cursor=cursor, limit=limit)
+        return service.search_certificates(
+            q,
+            certificate_type=type,
+            issued_from=issued_from,
+            issued_to=issued_to,
+            cursor=cursor,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("/test/announcement")
 async def test_announcement(
     message: str,
@@ -1,5 +1,6 @@
 """Certificate API endpoints"""
 
+import os
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from fastapi.responses import FileResponse
@@ -33,7 +34,7 @@ async def issue_certificate(
         }
     
     try:
-        cert = service.issue_certificate(certificate, payment_info)
+        cert = await service.issue_certificate(certificate, payment_info)
         return cert
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -98,8 +99,14 @@ async def download_certificate(
     if not certificate:
         raise HTTPException(status_code=404, detail="Certificate not found")
     
-    if not certificate.file_path:
-        raise HTTPException(status_code=404, detail="Certificate file not found")
+    if not certificate.file_path or not os.path.exists(certificate.file_path):
+        # Expired by the retention job; rebuild from the record
+        try:
+            certificate.file_path = service.reprint_certificate(certificate_id)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        session.add(certificate)
+        session.commit()
     
     return FileResponse(
         certificate.file_path,
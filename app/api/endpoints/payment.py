@@ -1,13 +1,17 @@
 """Payment API endpoints"""
 
-from typing import List, Dict
+from typing import List, Dict, Optional
 from decimal import Decimal
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi.responses import Response
 from sqlmodel import Session
 
 from app.core.database import get_session
 from app.core.models import PaymentCreate, PaymentResponse, PaymentMethod
 from app.services.payment import PaymentService
+from app.hardware.escpos import ticket_renderer
+from app.integrations.payment_gateway import PaymentGatewayError
+from app.services.idempotency import IdempotencyConflictError, IdempotencyKeyReuseError
 
 router = APIRouter()
 
@@ -18,21 +22,33 @@ async def process_payment(
     amount: float,
     method: PaymentMethod,
     transaction_data: Dict = None,
+    idempotency_key: Optional[str] = Header(None),
     session: Session = Depends(get_session)
 ):
-    """Process payment transaction"""
+    """Process payment transaction
+    
+    Retries carrying the same ``Idempotency-Key`` header return the original
+    payment instead of charging again.
+    """
     service = PaymentService(session)
     
     try:
-        payment = service.process_payment(
+        payment = await service.process_payment(
             patient_id=patient_id,
             amount=Decimal(str(amount)),
             method=method,
-            transaction_data=transaction_data
+            transaction_data=transaction_data,
+            idempotency_key=idempotency_key
         )
         return payment
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except IdempotencyKeyReuseError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except PaymentGatewayError as e:
+        raise HTTPException(status_code=502, detail="Payment gateway unavailable")
     except Exception as e:
         raise HTTPException(status_code=500, detail="Payment processing failed")
 
@@ -76,16 +92,23 @@ async def get_payment_history(
 async def refund_payment(
     payment_id: int,
     reason: str,
+    idempotency_key: Optional[str] = Header(None),
     session: Session = Depends(get_session)
 ):
     """Process payment refund"""
     service = PaymentService(session)
     
     try:
-        refund = service.refund_payment(payment_id, reason)
+        refund = await service.refund_payment(payment_id, reason, idempotency_key)
         return refund
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except IdempotencyKeyReuseError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except PaymentGatewayError as e:
+        raise HTTPException(status_code=502, detail="Payment gateway unavailable")
     except Exception as e:
         raise HTTPException(status_code=500, detail="Refund processing failed")
 
@@ -107,6 +130,26 @@ async def get_receipt(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/receipt/{payment_id}/escpos")
+async def get_receipt_escpos(
+    payment_id: int,
+    locale: Optional[str] = None,
+    session: Session = Depends(get_session)
+):
+    """Get payment receipt as ESC/POS printer bytes"""
+    service = PaymentService(session)
+    
+    try:
+        receipt = service.generate_receipt(payment_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    return Response(
+        content=ticket_renderer.render_receipt(receipt, locale),
+        media_type="application/octet-stream"
+    )
+
+
 @router.get("/methods")
 async def get_payment_methods():
     """Get available payment methods"""
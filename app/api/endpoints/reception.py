@@ -1,17 +1,23 @@
 """Reception API endpoints"""
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session, select
 
 from app.core.database import get_session
 from app.core.models import (
-    Patient, Appointment, AppointmentCreate, AppointmentResponse,
-    PatientCreate, PatientResponse, QueueTicket, AppointmentStatus, Department
+    Patient, Appointment, AppointmentResponse,
+    PatientCreate, PatientResponse, QueueTicket, AppointmentStatus, Department,
+    BatchCheckInRequest, SlotResponse
 )
 from app.core.config import DEPARTMENT_LOCATIONS, SYMPTOM_DEPARTMENT_MAP
+from app.integrations.emr_client import EmrError, emr_client
 from app.services.reception import ReceptionService
+from app.services.booking import BookingService
+from app.services.patient_cache import patient_cache
+from app.services.patient_search import patient_search_index
+from app.services.symptom_engine import symptom_engine
 
 router = APIRouter()
 
@@ -20,6 +26,7 @@ router = APIRouter()
 async def check_in(
     patient_id: int,
     appointment_id: Optional[int] = None,
+    needs_assistance: bool = False,
     session: Session = Depends(get_session)
 ):
     """Check in for appointment and get queue ticket"""
@@ -28,7 +35,7 @@ async def check_in(
     try:
         if appointment_id:
             # Check in with existing appointment
-            ticket = service.check_in_appointment(patient_id, appointment_id)
+            ticket = service.check_in_appointment(patient_id, appointment_id, needs_assistance)
         else:
             # Walk-in without appointment
             raise HTTPException(
@@ -41,35 +48,67 @@ async def check_in(
         raise HTTPException(status_code=404, detail=str(e))
 
 
+@router.post("/check-in/batch", response_model=List[QueueTicket])
+async def check_in_batch(
+    request: BatchCheckInRequest,
+    session: Session = Depends(get_session)
+):
+    """Check in a family or group at once (tickets in entry order, printed as one job)"""
+    service = ReceptionService(session)
+    
+    try:
+        return service.check_in_batch(request.entries)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("/walk-in", response_model=AppointmentResponse)
 async def create_walk_in(
     patient_id: int,
     symptoms: List[str],
     department: Optional[Department] = None,
+    needs_assistance: bool = False,
     session: Session = Depends(get_session)
 ):
-    """Create walk-in appointment"""
+    """Create walk-in appointment and check it in"""
     service = ReceptionService(session)
     
     try:
-        # Auto-select department if not provided
-        if not department:
-            department = service.recommend_department(symptoms)
-        
-        # Create appointment for walk-in
-        appointment_data = AppointmentCreate(
-            patient_id=patient_id,
-            department=department,
-            appointment_time=datetime.now(),
-            symptoms=", ".join(symptoms)
-        )
-        
-        appointment = service.create_appointment(appointment_data)
-        return appointment
+        return service.create_walk_in_appointment(patient_id, symptoms, department, needs_assistance)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get("/slots", response_model=List[SlotResponse])
+async def get_available_slots(
+    department: Department,
+    doctor_name: Optional[str] = None,
+    after: Optional[datetime] = None,
+    limit: int = Query(5, ge=1, le=20),
+    session: Session = Depends(get_session)
+):
+    """Next available appointment slots"""
+    service = BookingService(session)
+    slots = service.available_slots(department, after, doctor_name, limit)
+    return [SlotResponse(**vars(slot)) for slot in slots]
+
+
+@router.post("/slots/{slot_id}/book", response_model=AppointmentResponse)
+async def book_slot(
+    slot_id: int,
+    patient_id: int,
+    symptoms: Optional[str] = None,
+    session: Session = Depends(get_session)
+):
+    """Book an appointment in a free slot"""
+    service = BookingService(session)
+    
+    try:
+        return service.book_slot(slot_id, patient_id, symptoms)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
 @router.get("/appointments/{patient_id}", response_model=List[AppointmentResponse])
 async def get_patient_appointments(
     patient_id: int,
@@ -91,6 +130,21 @@ async def get_patient_appointments(
     return appointments
 
 
+@router.get("/appointments/{patient_id}/emr")
+async def get_emr_appointments(
+    patient_id: int,
+    session: Session = Depends(get_session)
+):
+    """Get patient appointments from the EMR (last known list while it is unavailable)"""
+    patient = session.get(Patient, patient_id)
+    if not patient or not patient.emr_id:
+        raise HTTPException(status_code=404, detail="Patient not linked to EMR")
+    try:
+        return await emr_client.patient_appointments(patient.emr_id)
+    except EmrError:
+        raise HTTPException(status_code=503, detail="EMR unavailable")
+
+
 @router.get("/queue-status/{department}")
 async def get_queue_status(
     department: Department,
@@ -147,14 +201,10 @@ async def search_patient(
             detail="Provide either phone number or card UID"
         )
     
-    query = select(Patient)
-    
     if phone:
-        query = query.where(Patient.phone == phone)
-    elif card_uid:
-        query = query.where(Patient.card_uid == card_uid)
-    
-    patient = session.exec(query).first()
+        patient = patient_cache.find_by_phone(session, phone)
+    else:
+        patient = patient_cache.find_by_card_uid(session, card_uid)
     
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
@@ -162,6 +212,35 @@ async def search_patient(
     return PatientResponse.from_orm(patient)
 
 
+@router.get("/patient/find", response_model=List[PatientResponse])
+async def find_patients(
+    q: Optional[str] = None,
+    phone_last4: Optional[str] = Query(None, min_length=4, max_length=4, pattern=r"^\d{4}$"),
+    birthdate: Optional[date] = None,
+    limit: int = Query(10, ge=1, le=50),
+    session: Session = Depends(get_session)
+):
+    """Find patients by name prefix or initial consonants, phone last 4 digits and birthdate"""
+    if not q and not phone_last4 and not birthdate:
+        raise HTTPException(
+            status_code=400,
+            detail="Provide a name, phone last 4 digits or birthdate"
+        )
+
+    patient_ids = patient_search_index.search(q, phone_last4, birthdate, limit)
+    if not patient_ids:
+        return []
+
+    patients = {
+        patient.id: patient
+        for patient in session.exec(select(Patient).where(Patient.id.in_(patient_ids))).all()
+    }
+    return [
+        PatientResponse.from_orm(patients[patient_id])
+        for patient_id in patient_ids if patient_id in patients
+    ]
+
+
 @router.get("/departments")
 async def get_departments():
     """Get list of all departments with locations"""
@@ -178,4 +257,20 @@ async def get_departments():
 @router.get("/symptoms")
 async def get_symptoms():
     """Get list of symptoms with recommended departments"""
-    return SYMPTOM_DEPARTMENT_MAP
\ No newline at end of file
+    return SYMPTOM_DEPARTMENT_MAP
+
+
+@router.get("/symptoms/recommend")
+async def recommend_from_text(text: str):
+    """Match free-text symptoms (any supported language) and rank departments"""
+    return {
+        "symptoms": symptom_engine.match(text),
+        "departments": [
+            {
+                "department": department.value,
+                "score": score,
+                "location": DEPARTMENT_LOCATIONS.get(department.value, "Unknown")
+            }
+            for department, score in symptom_engine.score(text)
+        ]
+    }
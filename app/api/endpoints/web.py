@@ -9,6 +9,8 @@ from pathlib import Path
 from pydantic import BaseModel # Added for request body model
 
 from app.core.config import get_settings
+from app.core.resilience import Dependency, DependencyUnavailable, register_dependency
+from app.services.symptom_engine import symptom_engine
 
 router = APIRouter()
 settings = get_settings()
@@ -21,6 +23,11 @@ templates = Jinja2Templates(directory="templates")
 # WARNING: Not suitable for production. Use secure storage in a real app.
 api_key_storage = {}
 
+# Breaker, bulkhead and timeout for Gemini calls
+gemini = register_dependency(Dependency(
+    "gemini", timeout_seconds=settings.gemini_timeout_seconds, max_concurrent=settings.gemini_bulkhead
+))
+
 
 class VoiceCommandPayload(BaseModel): # Pydantic model for request body
     text: str
@@ -85,16 +92,30 @@ async def voice_command(payload: VoiceCommandPayload): # Use Pydantic model for
 
         logger.info(f"Sending to Gemini: '{user_text}'")
         # Note: Using generate_content_async for FastAPI's async context
-        response = await model.generate_content_async(user_text)
+        response = await gemini.call(lambda: model.generate_content_async(user_text))
 
         ai_response_text = response.text
         logger.info(f"Received from Gemini: '{ai_response_text}'")
 
         return JSONResponse(content={
             "user_text": user_text,
-            "ai_response": ai_response_text
+            "ai_response": ai_response_text,
+            "recommended_departments": [
+                department.value for department, _ in symptom_engine.score(user_text)
+            ]
         })
 
+    except DependencyUnavailable as e:
+        # Answer at once; local symptom matching still works without Gemini
+        logger.warning(f"Voice assistant unavailable: {e}")
+        return JSONResponse(content={
+            "user_text": user_text,
+            "error": "voice assistant unavailable",
+            "recommended_departments": [
+                department.value for department, _ in symptom_engine.score(user_text)
+            ]
+        }, status_code=503)
+
     except Exception as e:
         logger.error(f"Error communicating with Gemini API: {e}", exc_info=True)
         # It's good practice to not expose raw error messages from external services to the client.
@@ -4,13 +4,17 @@ from .config import get_settings, Settings
 from .database import init_db, get_session, get_db_stats
 from .models import (
     Patient, Appointment, Payment, Certificate, DeviceLog,
+    IdempotencyRecord, OutboxEvent, QueueStatistics, Deadline,
+    SchedulerLease, DoctorSchedule, AppointmentSlot, SyncWatermark,
     PatientCreate, PatientResponse,
     AppointmentCreate, AppointmentResponse, AppointmentStatus,
     PaymentCreate, PaymentResponse, PaymentMethod,
     CertificateCreate, CertificateResponse, CertificateType,
-    Department, QueueTicket
+    Department, QueuePriority, QueueTicket,
+    BatchCheckInEntry, BatchCheckInRequest,
+    DoctorScheduleCreate, SlotResponse
 )
-from .scheduler import scheduler
+from .scheduler import scheduler, deadline_dispatcher
 
 __all__ = [
     # Settings
@@ -21,12 +25,16 @@ __all__ = [
     
     # Models
     "Patient", "Appointment", "Payment", "Certificate", "DeviceLog",
+    "IdempotencyRecord", "OutboxEvent", "QueueStatistics", "Deadline",
+    "SchedulerLease", "DoctorSchedule", "AppointmentSlot", "SyncWatermark",
     "PatientCreate", "PatientResponse",
     "AppointmentCreate", "AppointmentResponse", "AppointmentStatus",
     "PaymentCreate", "PaymentResponse", "PaymentMethod", 
     "CertificateCreate", "CertificateResponse", "CertificateType",
-    "Department", "QueueTicket",
+    "Department", "QueuePriority", "QueueTicket",
+    "BatchCheckInEntry", "BatchCheckInRequest",
+    "DoctorScheduleCreate", "SlotResponse",
     
     # Scheduler
-    "scheduler"
+    "scheduler", "deadline_dispatcher"
 ]
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""Cross-process change log of patient rows
+
+Worker-local copies of patient data (the patient cache and the patient
+search index) follow their own worker's writes through ORM events. Writes
+made by other workers or other processes reach them through
+``patient_changes``: SQLite triggers append the id of every inserted,
+updated or deleted patient, whoever wrote it, and each consumer reads the
+entries after the last id it has seen.
+
+The retention job prunes old entries. A consumer that has fallen behind
+the pruned range gets ``None`` and starts over from the table itself. On
+databases other than SQLite the log stays empty and the consumers rely on
+their own expiry.
+"""
+
+import logging
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from app.core.models import PatientChange
+
+logger = logging.getLogger(__name__)
+
+
+def _trigger_statements() -> List[str]:
+    log = "INSERT INTO patient_changes(patient_id, changed_at) VALUES({row}.id, CURRENT_TIMESTAMP);"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS patients_change_ai AFTER INSERT ON patients "
+        f"BEGIN {log.format(row='new')} END",
+        f"CREATE TRIGGER IF NOT EXISTS patients_change_au AFTER UPDATE ON patients "
+        f"BEGIN {log.format(row='new')} END",
+        f"CREATE TRIGGER IF NOT EXISTS patients_change_ad AFTER DELETE ON patients "
+        f"BEGIN {log.format(row='old')} END",
+    ]
+
+
+def init_change_log(engine: Engine) -> bool:
+    """Create the triggers filling ``patient_changes`` (SQLite only)"""
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.begin() as conn:
+        for statement in _trigger_statements():
+            conn.execute(text(statement))
+    return True
+
+
+def latest_change_id(session: Session) -> int:
+    return session.exec(select(func.max(PatientChange.id))).one() or 0
+
+
+def changes_since(session: Session, after_id: int) -> Tuple[Optional[List[int]], int]:
+    """Patient ids changed after entry ``after_id`` and the new position
+
+    Entry ids are never reused and have no gaps (AUTOINCREMENT, and a rolled
+    back insert returns its id), so a jump past ``after_id + 1`` means the
+    entries in between were pruned; the ids are ``None`` then.
+    """
+    rows = session.exec(
+        select(PatientChange.id, PatientChange.patient_id)
+        .where(PatientChange.id > after_id)
+        .order_by(PatientChange.id)
+    ).all()
+    if not rows:
+        return [], after_id
+    if rows[0][0] > after_id + 1:
+        return None, rows[-1][0]
+    return list(dict.fromkeys(patient_id for _, patient_id in rows)), rows[-1][0]
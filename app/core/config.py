@@ -19,6 +19,9 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str = "sqlite:///./kiosk.db"
+    patient_cache_size: int = 5000
+    patient_cache_ttl_seconds: int = 300
+    patient_change_poll_seconds: float = 2  # other workers' patient writes (patient_changes)
     
     # Security
     secret_key: str = "your-secret-key-here-change-in-production"
@@ -30,11 +33,25 @@ class Settings(BaseSettings):
     session_timeout_seconds: int = 120
     idle_timeout_seconds: int = 120
     
+    # Terminal identity (used in settlement files and gateway requests)
+    kiosk_terminal_id: str = "KIOSK-01"
+    
     # Hardware Devices
     printer_port: str = "/dev/ttyUSB0"
     card_reader_port: str = "/dev/ttyUSB1"
     cash_acceptor_port: str = "/dev/ttyUSB2"
     enable_hardware: bool = False
+    printer_line_width: int = 42
+    printer_logo_path: Optional[str] = None
+    
+    # Queue load balancing
+    default_service_minutes: float = 15
+    queue_load_refresh_seconds: int = 15
+    recommendation_score_tolerance: float = 0.2
+    wait_estimator_alpha: float = 0.2
+    wait_stats_persist_seconds: int = 60
+    slot_index_refresh_seconds: int = 30
+    elderly_age: int = 65
     
     # Language Settings
     default_language: str = "ko"
@@ -49,11 +66,45 @@ class Settings(BaseSettings):
     payment_gateway_url: str = "https://api.payment.example.com"
     payment_api_key: str = "your-payment-api-key"
     payment_merchant_id: str = "your-merchant-id"
+    enable_payment_gateway: bool = False
+    payment_gateway_timeout_seconds: float = 10.0
+    payment_gateway_max_connections: int = 20
+    payment_gateway_max_concurrency: int = 10
+    idempotency_ttl_hours: int = 24
+    idempotency_lease_seconds: int = 120  # in-progress key of a crashed worker can be re-claimed after this
+    idempotency_cache_size: int = 10000
     
     # EMR Integration
     emr_api_url: str = "https://emr.hospital.example.com/api"
     emr_api_key: str = "your-emr-api-key"
     emr_sync_interval_minutes: int = 5
+    enable_emr_sync: bool = False
+    emr_timeout_seconds: float = 10.0
+    emr_max_connections: int = 10
+    emr_sync_max_concurrency: int = 4
+    emr_sync_page_size: int = 500
+    emr_push_enabled: bool = False
+    emr_push_interval_seconds: int = 2
+    emr_push_batch_size: int = 200
+    
+    # Settlement
+    settlement_path: str = "./settlements"
+    settlement_hour: int = 0
+    settlement_minute: int = 30
+    settlement_chunk_size: int = 1000
+    
+    # Outbox (asynchronous side effects)
+    outbox_dispatch_interval_seconds: int = 2
+    outbox_batch_size: int = 100
+    outbox_max_attempts: int = 10
+    outbox_max_backoff_seconds: int = 300
+    
+    # Scheduler leader election (singleton jobs run on one worker)
+    scheduler_leader_election: bool = True
+    scheduler_lease_seconds: int = 30
+    
+    # Deadline dispatcher (reminders, hold expiry)
+    deadline_dispatch_interval_seconds: int = 1
     
     # Admin Settings
     admin_password: str = "admin123"
@@ -66,6 +117,44 @@ class Settings(BaseSettings):
     # Backup
     backup_path: str = "/var/backups/kiosk"
     backup_retention_days: int = 30
+    backup_enabled: bool = True
+    backup_hour: int = 3
+    backup_minute: int = 0
+    backup_pages_per_step: int = 1024  # rollback-journal mode only
+    backup_step_sleep_ms: int = 20
+    backup_max_restarts: int = 3
+    backup_compress_level: int = 6
+    # WAL archiving (SQLite in WAL mode; disables automatic checkpoints)
+    wal_archive_enabled: bool = False
+    wal_archive_interval_seconds: int = 10
+    wal_archive_base_interval_hours: int = 24
+    wal_archive_max_failure_seconds: int = 600  # then checkpoint without archiving
+    
+    # Data retention (chunked cleanup)
+    cleanup_interval_hours: int = 6
+    retention_chunk_size: int = 1000
+    retention_chunk_pause_ms: int = 50
+    device_log_retention_days: int = 90
+    device_log_archive: bool = False  # NDJSON.gz under backup_path/archive before delete
+    outbox_retention_days: int = 14
+    certificate_file_retention_days: int = 30
+    patient_change_retention_days: int = 1
+    vacuum_pages_per_step: int = 1000
+    
+    # Resilience (circuit breakers, bulkheads, request deadlines)
+    request_deadline_seconds: float = 30.0
+    request_deadline_min_seconds: float = 0.1  # floor for X-Request-Timeout
+    breaker_failure_threshold: int = 5
+    breaker_reset_seconds: float = 30.0
+    payment_gateway_bulkhead: int = 20
+    emr_bulkhead: int = 16
+    emr_appointments_cache_size: int = 1000
+    gemini_timeout_seconds: float = 8.0
+    gemini_bulkhead: int = 4
+    
+    # Bulk import (initial patient / appointment load)
+    import_batch_size: int = 5000
+    import_commit_rows: int = 50000
     
     # UI Settings
     ui_font_size_min: int = 12
@@ -111,6 +200,39 @@ SYMPTOM_DEPARTMENT_MAP = {
     "호흡곤란": ["emergency", "internal_medicine"]
 }
 
+# Free-text synonyms per symptom (all supported locales, colloquial forms).
+# The symptom key and its UI code (e.g. "joint_pain") are always matched too.
+SYMPTOM_SYNONYMS = {
+    "발열": ["fever", "feverish", "high temperature", "열이 나", "열이 있", "열나", "고열", "미열",
+           "몸이 뜨거", "发烧", "发热", "sốt"],
+    "기침": ["cough", "coughing", "콜록", "咳嗽", "bị ho", "ho khan"],
+    "두통": ["headache", "head hurts", "머리가 아파", "머리가 아프", "머리 아파", "머리아픔", "편두통",
+           "头痛", "头疼", "đau đầu"],
+    "복통": ["stomachache", "stomach ache", "stomach pain", "abdominal pain", "배가 아파", "배가 아프",
+           "배 아파", "배앓이", "腹痛", "肚子疼", "đau bụng"],
+    "관절통": ["joint pain", "관절", "무릎이 아파", "무릎이 아프", "关节痛", "đau khớp"],
+    "피부발진": ["skin rash", "rash", "발진", "두드러기", "皮疹", "phát ban"],
+    "우울감": ["depression", "depressed", "우울", "抑郁", "trầm cảm"],
+    "임신": ["pregnancy", "pregnant", "입덧", "怀孕", "mang thai", "có thai"],
+    "골절": ["fracture", "broken bone", "뼈가 부러", "부러졌", "骨折", "gãy xương"],
+    "호흡곤란": ["breathing difficulty", "shortness of breath", "can't breathe", "숨이 차", "숨쉬기 힘들",
+             "숨을 못", "呼吸困难", "khó thở"]
+}
+
+# UI symptom codes (locale keys) for each symptom
+SYMPTOM_CODES = {
+    "발열": "fever",
+    "기침": "cough",
+    "두통": "headache",
+    "복통": "stomachache",
+    "관절통": "joint_pain",
+    "피부발진": "skin_rash",
+    "우울감": "depression",
+    "임신": "pregnancy",
+    "골절": "fracture",
+    "호흡곤란": "breathing_difficulty"
+}
+
 # Certificate templates
 CERTIFICATE_TEMPLATES = {
     "diagnosis": """
@@ -1,24 +1,56 @@
 """Database configuration and session management"""
 
+import logging
 import os
-from typing import Generator
+from typing import Generator, List, Tuple
 from sqlmodel import create_engine, SQLModel, Session
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Engine
 from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import CreateColumn, CreateIndex
+from app.core.config import get_settings
 from app.core.models import *
+from app.core.fulltext import init_fulltext
+from app.core.change_log import init_change_log
 
+logger = logging.getLogger(__name__)
 
 # Get database URL from environment
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./kiosk.db")
 
 # Create engine with appropriate settings
-if DATABASE_URL.startswith("sqlite"):
-    # SQLite specific settings
+if DATABASE_URL.startswith("sqlite") and ":memory:" in DATABASE_URL:
+    # In-memory database must share its single connection
     engine = create_engine(
         DATABASE_URL,
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
         echo=False
     )
+elif DATABASE_URL.startswith("sqlite"):
+    # One connection per request so concurrent kiosks do not share a transaction;
+    # writers wait on the database lock instead of failing immediately
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False, "timeout": 30},
+        echo=False
+    )
+    
+    @event.listens_for(engine, "connect")
+    def _enable_incremental_vacuum(dbapi_connection, connection_record):
+        # Only takes effect on a new database file; see app.services.retention
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        cursor.close()
+    
+    if get_settings().wal_archive_enabled:
+        @event.listens_for(engine, "connect")
+        def _leave_checkpoints_to_wal_archiver(dbapi_connection, connection_record):
+            # Automatic checkpoints could recycle frames before they are archived
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA wal_autocheckpoint=0")
+            cursor.close()
 else:
     # PostgreSQL or other databases
     engine = create_engine(
@@ -28,9 +60,67 @@ else:
     )
 
 
+# Columns added to existing tables after the first release, in release
+# order; upgrade_schema adds the ones an older database is missing
+ADDED_COLUMNS: List[Tuple[str, str]] = [
+    # Service-time statistics for the wait-time estimator
+    ("appointments", "checked_in_at"),
+    ("appointments", "started_at"),
+    ("appointments", "completed_at"),
+    # Priority classes of the call-next queue
+    ("appointments", "priority"),
+    # Booked slot of a self-service appointment
+    ("appointments", "slot_id"),
+    # EMR identifiers matched by the delta sync
+    ("patients", "emr_id"),
+    ("appointments", "emr_id"),
+    # Terminal that took the payment, for settlement
+    ("payments", "terminal_id"),
+]
+
+
+def upgrade_schema(bind: Engine) -> List[str]:
+    """Add ``ADDED_COLUMNS`` and model indexes missing from existing tables
+
+    create_all only creates whole tables, so a database from an older
+    release keeps its old columns. Listed columns must be nullable (or
+    have a server default); returns the ones added as ``table.column``.
+    """
+    added = []
+    tables = SQLModel.metadata.tables
+    with bind.begin() as conn:
+        existing_tables = set(inspect(conn).get_table_names())
+        for table_name, column_name in ADDED_COLUMNS:
+            if table_name not in existing_tables:
+                continue
+            if column_name in {column["name"] for column in inspect(conn).get_columns(table_name)}:
+                continue
+            ddl = CreateColumn(tables[table_name].c[column_name]).compile(dialect=bind.dialect)
+            conn.exec_driver_sql(f"ALTER TABLE {table_name} ADD COLUMN {ddl}")
+            added.append(f"{table_name}.{column_name}")
+
+        for table in SQLModel.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {column["name"] for column in inspect(conn).get_columns(table.name)}
+            missing = [column.name for column in table.columns if column.name not in present]
+            if missing:
+                logger.warning(f"{table.name} is missing {', '.join(missing)}; add them to ADDED_COLUMNS")
+                continue
+            # SQLite reflection cannot see expression indexes, so checkfirst is no help
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+    if added:
+        logger.info(f"Added columns: {', '.join(added)}")
+    return added
+
+
 def init_db() -> None:
     """Initialize database and create all tables"""
     SQLModel.metadata.create_all(engine)
+    upgrade_schema(engine)
+    init_fulltext(engine)
+    init_change_log(engine)
 
 
 def get_session() -> Generator[Session, None, None]:
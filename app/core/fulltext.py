@@ -0,0 +1,167 @@
+"""SQLite FTS5 full-text index over patients and certificates
+
+Korean words are often two syllables, below the minimum of the built-in
+trigram tokenizer, so text is indexed as character bigrams: each word is
+expanded to its bigrams ("예방접종" -> "예방 방접 접종")
+and the FTS5 ``unicode61`` tokenizer indexes the bigrams. A query word
+becomes a phrase of its bigrams, which matches the word as a substring.
+
+The FTS tables are keyed by the source row id. Triggers on ``patients``
+and ``certificates`` only queue changed ids in ``fts_pending``; they use no
+application functions, so any writer (other processes, bulk imports, the
+sqlite3 shell) can change those tables. ``refresh_fulltext`` re-indexes
+the queued rows in Python before each admin search.
+"""
+
+import logging
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+CHUNK_SIZE = 500
+
+FTS_SCHEMA = {
+    "patients_fts": {
+        "source": "patients",
+        "columns": ["name", "phone"],
+    },
+    "certificates_fts": {
+        "source": "certificates",
+        "columns": ["content", "doctor_name"],
+    },
+}
+
+
+def bigrams(value) -> str:
+    """Expand words to space-separated character bigrams"""
+    if value is None:
+        return ""
+    grams: List[str] = []
+    for word in _WORD.findall(str(value).lower()):
+        if len(word) == 1:
+            grams.append(word)
+        else:
+            grams.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return " ".join(grams)
+
+
+def build_match_query(query: str) -> str:
+    """Translate user input to an FTS5 MATCH expression (all words must match)"""
+    terms = []
+    for word in _WORD.findall(query.lower()):
+        if len(word) == 1:
+            terms.append(f'"{word}"*')
+        else:
+            terms.append('"' + bigrams(word) + '"')
+    return " AND ".join(terms)
+
+
+def _trigger_statements(source: str, columns: List[str]) -> List[str]:
+    queue = "INSERT INTO fts_pending(source, row_id) VALUES('{source}', {row}.id);"
+    changed = " OR ".join(f"old.{column} IS NOT new.{column}" for column in columns)
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {source}_fts_queue_ai AFTER INSERT ON {source} "
+        f"BEGIN {queue.format(source=source, row='new')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {source}_fts_queue_ad AFTER DELETE ON {source} "
+        f"BEGIN {queue.format(source=source, row='old')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {source}_fts_queue_au AFTER UPDATE ON {source} "
+        f"WHEN {changed} BEGIN {queue.format(source=source, row='new')} END",
+    ]
+
+
+def _index_rows(conn: Connection, table: str, spec: Dict, row_ids: Optional[List[int]] = None) -> int:
+    """Write bigrams of source rows (all rows, or ``row_ids``) to an FTS table"""
+    columns = spec["columns"]
+    select_sql = f"SELECT id, {', '.join(columns)} FROM {spec['source']}"
+    insert_sql = text(
+        f"INSERT INTO {table}(rowid, {', '.join(columns)}) "
+        f"VALUES(:id, {', '.join(':' + column for column in columns)})"
+    )
+    if row_ids is None:
+        batches = [conn.execute(text(select_sql)).all()]
+    else:
+        batches = []
+        for start in range(0, len(row_ids), CHUNK_SIZE):
+            chunk = row_ids[start:start + CHUNK_SIZE]
+            conn.execute(
+                text(f"DELETE FROM {table} WHERE rowid IN ({', '.join(str(i) for i in chunk)})")
+            )
+            batches.append(conn.execute(
+                text(f"{select_sql} WHERE id IN ({', '.join(str(i) for i in chunk)})")
+            ).all())
+
+    indexed = 0
+    for rows in batches:
+        values = [
+            {"id": row[0], **{column: bigrams(value) for column, value in zip(columns, row[1:])}}
+            for row in rows
+        ]
+        if values:
+            conn.execute(insert_sql, values)
+            indexed += len(values)
+    return indexed
+
+
+def refresh_fulltext(conn: Connection) -> int:
+    """Re-index rows queued by the triggers; returns rows processed"""
+    if not conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'fts_pending'"
+    )).first():
+        return 0
+    # Claiming the queue with one DELETE takes the write lock first, so
+    # concurrent refreshes never index the same entries twice
+    pending = conn.execute(text("DELETE FROM fts_pending RETURNING source, row_id")).all()
+    by_source: Dict[str, Set[int]] = defaultdict(set)
+    for source, row_id in pending:
+        by_source[source].add(row_id)
+    for table, spec in FTS_SCHEMA.items():
+        if by_source.get(spec["source"]):
+            _index_rows(conn, table, spec, sorted(by_source[spec["source"]]))
+    return len(pending)
+
+
+def is_fulltext_supported(engine: Engine) -> bool:
+    return engine.dialect.name == "sqlite"
+
+
+def init_fulltext(engine: Engine) -> bool:
+    """Create FTS tables and triggers, backfilling tables created for the first time"""
+    if not is_fulltext_supported(engine):
+        logger.info("Full-text search is only available on SQLite")
+        return False
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS fts_pending "
+            "(id INTEGER PRIMARY KEY, source TEXT NOT NULL, row_id INTEGER NOT NULL)"
+        ))
+        for table, spec in FTS_SCHEMA.items():
+            source, columns = spec["source"], spec["columns"]
+            # Earlier versions indexed through triggers calling a Python function
+            for suffix in ("ai", "ad", "au"):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {source}_fts_{suffix}"))
+            existing = conn.execute(
+                text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": table}
+            ).scalar()
+            if existing and "content=''" in existing:
+                conn.execute(text(f"DROP TABLE {table}"))
+                existing = None
+            if not existing:
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE {table} USING fts5("
+                    f"{', '.join(columns)}, tokenize='unicode61')"
+                ))
+                conn.execute(text("DELETE FROM fts_pending WHERE source = :source"), {"source": source})
+                _index_rows(conn, table, spec)
+                logger.info(f"Created full-text index {table}")
+            for statement in _trigger_statements(source, columns):
+                conn.execute(text(statement))
+        refresh_fulltext(conn)
+    return True
@@ -4,8 +4,9 @@ from datetime import datetime
 from decimal import Decimal
 from enum import Enum
 from typing import Optional, List
+from sqlalchemy import Index, func, literal_column
 from sqlmodel import Field, SQLModel, Relationship
-from pydantic import BaseModel, EmailStr, validator
+from pydantic import BaseModel, EmailStr, validator, Field as PydanticField
 
 
 class PaymentMethod(str, Enum):
@@ -22,6 +23,13 @@ class AppointmentStatus(str, Enum):
     CANCELLED = "cancelled"
 
 
+class QueuePriority(str, Enum):
+    EMERGENCY = "emergency"
+    PRIORITY = "priority"  # elderly, disabled, pregnant
+    RESERVED = "reserved"
+    WALK_IN = "walk_in"
+
+
 class CertificateType(str, Enum):
     DIAGNOSIS = "diagnosis"
     TREATMENT = "treatment"
@@ -49,6 +57,7 @@ class Patient(SQLModel, table=True):
     phone: str = Field(index=True)
     email: Optional[str] = None
     card_uid: Optional[str] = Field(default=None, index=True)
+    emr_id: Optional[str] = Field(default=None, unique=True, index=True)  # hospital EMR identifier
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
@@ -58,6 +67,34 @@ class Patient(SQLModel, table=True):
     certificates: List["Certificate"] = Relationship(back_populates="patient")
 
 
+def phone_digits(column):
+    """SQL expression of a phone column without separators
+
+    Literal arguments (not bound parameters) so queries match the
+    ``ix_patients_phone_digits`` expression index exactly.
+    """
+    for separator in ("-", " ", ".", "(", ")"):
+        column = func.replace(column, literal_column(f"'{separator}'"), literal_column("''"))
+    return column
+
+
+# Nested functions hide the table from Index, so attach it explicitly
+Patient.__table__.append_constraint(
+    Index("ix_patients_phone_digits", phone_digits(Patient.__table__.c.phone))
+)
+
+
+class PatientChange(SQLModel, table=True):
+    """Patient row written by any process; filled by triggers (app.core.change_log)"""
+    __tablename__ = "patient_changes"
+    # Ids must never be reused, or readers would skip new entries
+    __table_args__ = {"sqlite_autoincrement": True}
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    patient_id: int
+    changed_at: datetime
+
+
 class Appointment(SQLModel, table=True):
     __tablename__ = "appointments"
     
@@ -68,13 +105,36 @@ class Appointment(SQLModel, table=True):
     appointment_time: datetime
     status: AppointmentStatus = Field(default=AppointmentStatus.SCHEDULED)
     queue_number: Optional[int] = None
+    priority: Optional[QueuePriority] = None
     symptoms: Optional[str] = None
+    slot_id: Optional[int] = Field(default=None, foreign_key="appointment_slots.id")
+    emr_id: Optional[str] = Field(default=None, unique=True, index=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    checked_in_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
     
     # Relationships
     patient: Patient = Relationship(back_populates="appointments")
 
 
+def waiting_since():
+    """When a checked-in appointment joined the queue; imported rows have no check-in time"""
+    table = Appointment.__table__
+    return func.coalesce(table.c.checked_in_at, table.c.appointment_time)
+
+
+# Call-next order within one priority class (app.services.call_queue)
+Appointment.__table__.append_constraint(Index(
+    "ix_appointments_call_queue",
+    Appointment.__table__.c.department,
+    Appointment.__table__.c.status,
+    Appointment.__table__.c.priority,
+    waiting_since(),
+    Appointment.__table__.c.queue_number
+))
+
+
 class Payment(SQLModel, table=True):
     __tablename__ = "payments"
     
@@ -82,8 +142,9 @@ class Payment(SQLModel, table=True):
     patient_id: int = Field(foreign_key="patients.id")
     amount: Decimal = Field(decimal_places=2)
     method: PaymentMethod
-    transaction_id: Optional[str] = None
-    approved_at: Optional[datetime] = None
+    transaction_id: Optional[str] = Field(default=None, index=True)
+    terminal_id: Optional[str] = None
+    approved_at: Optional[datetime] = Field(default=None, index=True)
     receipt_number: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
@@ -117,6 +178,104 @@ class DeviceLog(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class IdempotencyRecord(SQLModel, table=True):
+    __tablename__ = "idempotency_keys"
+    
+    key: str = Field(primary_key=True, max_length=255)
+    scope: str
+    request_hash: str
+    status: str = Field(default="in_progress")
+    payment_id: Optional[int] = Field(default=None, foreign_key="payments.id")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime = Field(index=True)
+
+
+class OutboxEvent(SQLModel, table=True):
+    __tablename__ = "outbox_events"
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    topic: str = Field(index=True)
+    aggregate_type: Optional[str] = None
+    aggregate_id: Optional[int] = None
+    payload: str  # JSON encoded
+    status: str = Field(default="pending", index=True)
+    attempts: int = Field(default=0)
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    claim_token: Optional[str] = Field(default=None, index=True)
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    dispatched_at: Optional[datetime] = None
+
+
+class QueueStatistics(SQLModel, table=True):
+    """Persisted wait-time estimator state per department"""
+    __tablename__ = "queue_statistics"
+    
+    department: Department = Field(primary_key=True)
+    service_mean_minutes: float
+    service_variance: float = Field(default=0.0)
+    service_samples: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class Deadline(SQLModel, table=True):
+    """Pending timer fired by the deadline dispatcher"""
+    __tablename__ = "deadlines"
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    kind: str = Field(max_length=50)
+    due_at: datetime = Field(index=True)
+    payload: str  # JSON encoded
+
+
+class SchedulerLease(SQLModel, table=True):
+    """Leader lease for running singleton scheduler jobs"""
+    __tablename__ = "scheduler_leases"
+    
+    name: str = Field(primary_key=True, max_length=100)
+    holder: str
+    expires_at: datetime
+    renewed_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class DoctorSchedule(SQLModel, table=True):
+    """Consultation hours of a doctor, split into bookable slots"""
+    __tablename__ = "doctor_schedules"
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    department: Department = Field(index=True)
+    doctor_name: str
+    start_time: datetime
+    end_time: datetime
+    slot_minutes: int = Field(default=10)
+    capacity: int = Field(default=1)  # patients per slot
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class AppointmentSlot(SQLModel, table=True):
+    """Bookable slot with its own booking counter"""
+    __tablename__ = "appointment_slots"
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    schedule_id: int = Field(foreign_key="doctor_schedules.id", index=True)
+    department: Department = Field(index=True)
+    doctor_name: str
+    start_time: datetime = Field(index=True)
+    end_time: datetime
+    capacity: int = Field(default=1)
+    booked: int = Field(default=0)
+
+
+class SyncWatermark(SQLModel, table=True):
+    """EMR change-feed position per resource (EMR server clock)"""
+    __tablename__ = "sync_watermarks"
+    
+    resource: str = Field(primary_key=True, max_length=50)
+    watermark: datetime
+    last_count: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 # Pydantic Schemas for API
 class PatientCreate(BaseModel):
     name: str
@@ -153,7 +312,9 @@ class AppointmentResponse(BaseModel):
     appointment_time: datetime
     status: AppointmentStatus
     queue_number: Optional[int]
+    priority: Optional[QueuePriority] = None
     symptoms: Optional[str]
+    slot_id: Optional[int] = None
     
     class Config:
         from_attributes = True
@@ -198,10 +359,43 @@ class CertificateResponse(BaseModel):
         from_attributes = True
 
 
+class BatchCheckInEntry(BaseModel):
+    """One family member: an existing appointment or walk-in symptoms"""
+    patient_id: int
+    appointment_id: Optional[int] = None
+    symptoms: List[str] = []
+    department: Optional[Department] = None
+    needs_assistance: bool = False
+
+
+class BatchCheckInRequest(BaseModel):
+    entries: List[BatchCheckInEntry] = PydanticField(min_length=1, max_length=10)
+
+
+class DoctorScheduleCreate(BaseModel):
+    department: Department
+    doctor_name: str
+    start_time: datetime
+    end_time: datetime
+    slot_minutes: int = PydanticField(default=10, ge=5, le=240)
+    capacity: int = PydanticField(default=1, ge=1, le=20)
+
+
+class SlotResponse(BaseModel):
+    """Available appointment slot"""
+    id: int
+    department: Department
+    doctor_name: str
+    start_time: datetime
+    end_time: datetime
+    remaining: int
+
+
 class QueueTicket(BaseModel):
     """Queue ticket response model"""
     queue_number: int
     department: str
-    estimated_wait_time: int  # in minutes
+    estimated_wait_time: int  # in minutes (median estimate)
+    estimated_wait_p90: Optional[int] = None  # 90th percentile, in minutes
     current_number: int
     location: str
\ No newline at end of file
@@ -0,0 +1,242 @@
+"""Circuit breakers, bulkheads and deadlines for external dependencies
+
+Every call to an external service goes through that service's
+``Dependency``:
+
+* a circuit breaker opens after ``breaker_failure_threshold`` consecutive
+  failures and rejects calls at once for ``breaker_reset_seconds``; then a
+  single trial call decides whether it closes again,
+* a bulkhead caps the number of callers tied up in the dependency, so a
+  hanging upstream cannot absorb every request worker,
+* the call timeout is the dependency's own timeout, cut down to whatever
+  is left of the incoming request's deadline (``deadline_scope``).
+
+Rejections raise ``DependencyUnavailable`` subclasses without touching
+the network; callers turn them into their own error types or a cached
+fallback. Only the process-wide clients are registered, and their state
+is reported on ``/health``.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+T = TypeVar("T")
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Absolute time.monotonic() by which the current request must finish
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DependencyUnavailable(Exception):
+    """Call rejected without reaching the dependency, or cut off by the deadline"""
+
+    def __init__(self, dependency: str, message: str):
+        super().__init__(f"{dependency}: {message}")
+        self.dependency = dependency
+
+
+class CircuitOpenError(DependencyUnavailable):
+    pass
+
+
+class BulkheadFullError(DependencyUnavailable):
+    pass
+
+
+class DeadlineExceededError(DependencyUnavailable):
+    pass
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """Limit external calls made inside the block to ``seconds`` from now"""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left of the current request's deadline (None outside requests)"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a single half-open trial call"""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return STATE_CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return STATE_HALF_OPEN
+        return STATE_OPEN
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == STATE_CLOSED:
+            return True
+        if state == STATE_HALF_OPEN and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info("Circuit closed after successful trial call")
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial = False
+
+    def release_trial(self):
+        """Trial call ended without a verdict (cancelled)"""
+        self._trial = False
+
+
+class Dependency:
+    """Breaker, bulkhead and deadline-bounded timeout for one external service"""
+
+    def __init__(
+        self,
+        name: str,
+        timeout_seconds: float,
+        max_concurrent: int,
+        failure_threshold: Optional[int] = None,
+        reset_seconds: Optional[float] = None,
+        is_failure: Optional[Callable[[Exception], bool]] = None
+    ):
+        self.name = name
+        self.timeout_seconds = timeout_seconds
+        self.max_concurrent = max_concurrent
+        self.breaker = CircuitBreaker(
+            failure_threshold or settings.breaker_failure_threshold,
+            reset_seconds or settings.breaker_reset_seconds
+        )
+        # Errors that say nothing about the upstream's health (e.g. a card decline)
+        self.is_failure = is_failure or (lambda error: True)
+        self.in_flight = 0
+        self.counters = {"calls": 0, "failures": 0, "timeouts": 0, "short_circuited": 0, "rejected": 0}
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run ``fn()`` under the breaker, bulkhead and deadline"""
+        timeout = self.timeout_seconds
+        remaining = remaining_time()
+        if remaining is not None:
+            if remaining <= 0:
+                raise DeadlineExceededError(self.name, "request deadline already passed")
+            timeout = min(timeout, remaining)
+
+        if self.in_flight >= self.max_concurrent:
+            self.counters["rejected"] += 1
+            raise BulkheadFullError(self.name, f"{self.in_flight} calls already in flight")
+        if not self.breaker.allow():
+            self.counters["short_circuited"] += 1
+            raise CircuitOpenError(self.name, "circuit open")
+
+        self.in_flight += 1
+        self.counters["calls"] += 1
+        try:
+            result = await asyncio.wait_for(fn(), timeout)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            if timeout < self.timeout_seconds:
+                # Cut short by the caller's deadline, not the upstream's fault
+                self.breaker.release_trial()
+                raise DeadlineExceededError(self.name, f"no response within the request deadline ({timeout:.1f}s)")
+            self._failed()
+            raise DeadlineExceededError(self.name, f"no response within {timeout:.1f}s")
+        except Exception as e:
+            if self.is_failure(e):
+                self._failed()
+            else:
+                self.breaker.record_success()
+            raise
+        except BaseException:
+            self.breaker.release_trial()
+            raise
+        else:
+            self.breaker.record_success()
+            return result
+        finally:
+            self.in_flight -= 1
+
+    def _failed(self):
+        self.counters["failures"] += 1
+        was_closed = self.breaker.state == STATE_CLOSED
+        self.breaker.record_failure()
+        if was_closed and self.breaker.state == STATE_OPEN:
+            logger.warning(f"Circuit for {self.name} opened after {self.breaker.failures} consecutive failures")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "in_flight": self.in_flight,
+            "max_concurrent": self.max_concurrent,
+            **self.counters
+        }
+
+
+class LastKnownCache(Generic[T]):
+    """Bounded LRU of the last successful result per key, for fallbacks"""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[T, datetime]]" = OrderedDict()
+
+    def put(self, key: str, value: T):
+        self._entries[key] = (value, datetime.utcnow())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Tuple[T, datetime]]:
+        """Value and the time it was stored"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+
+_registry: Dict[str, Dependency] = {}
+
+
+def register_dependency(dependency: Dependency) -> Dependency:
+    """Report this dependency on /health"""
+    _registry[dependency.name] = dependency
+    return dependency
+
+
+def dependency_status() -> Dict[str, Dict[str, Any]]:
+    return {name: dependency.status() for name, dependency in _registry.items()}
@@ -1,46 +1,382 @@
 """Task scheduler configuration using APScheduler"""
 
+import asyncio
+import inspect
+import json
 import logging
-from datetime import datetime
-from typing import Optional, Callable
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Callable, Tuple
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.executors.asyncio import AsyncIOExecutor
+from apscheduler.executors.pool import ThreadPoolExecutor, ProcessPoolExecutor
+from apscheduler.events import (
+    EVENT_JOB_EXECUTED, EVENT_JOB_ERROR, EVENT_JOB_MISSED, EVENT_JOB_MAX_INSTANCES
+)
+from apscheduler.triggers.base import BaseTrigger
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.util import iscoroutinefunction_partial, obj_to_ref
 from apscheduler.job import Job
 
 logger = logging.getLogger(__name__)
 
+TIMEZONE = 'Asia/Seoul'
+PERSISTENT_JOBSTORE = 'persistent'
+
+# Executor aliases: coroutines on the event loop, blocking I/O on a dedicated
+# thread pool, CPU-heavy work (backup compression, reports) in processes
+EXECUTOR_ASYNCIO = 'default'
+EXECUTOR_THREADS = 'threads'
+EXECUTOR_PROCESSES = 'processes'
+
+
+@dataclass
+class JobMetrics:
+    runs: int = 0
+    failures: int = 0
+    misfires: int = 0
+    skipped: int = 0  # previous run still active
+    last_run_at: Optional[datetime] = None
+    last_runtime_seconds: Optional[float] = None
+    max_runtime_seconds: float = 0.0
+    total_runtime_seconds: float = 0.0
+    last_start_delay_seconds: Optional[float] = None
+    last_error: Optional[str] = None
+
+
+class TimedExecutorMixin:
+    """Report submission before the job can finish
+    
+    APScheduler dispatches EVENT_JOB_SUBMITTED after handing the job to the
+    executor, so a fast job may complete first; runtimes are measured from
+    this hook instead.
+    """
+    
+    def __init__(self, on_submit: Callable, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._on_submit = on_submit
+    
+    def _do_submit_job(self, job, run_times):
+        self._on_submit(job.id, run_times)
+        super()._do_submit_job(job, run_times)
+
+
+class TimedAsyncIOExecutor(TimedExecutorMixin, AsyncIOExecutor):
+    pass
+
+
+class TimedThreadPoolExecutor(TimedExecutorMixin, ThreadPoolExecutor):
+    pass
+
+
+class TimedProcessPoolExecutor(TimedExecutorMixin, ProcessPoolExecutor):
+    pass
+
+
+class SharedEngineJobStore(SQLAlchemyJobStore):
+    """SQLAlchemy job store on the application engine
+    
+    The engine belongs to the application, so detaching the store must not
+    dispose it.
+    """
+    
+    def shutdown(self):
+        pass
+
+
+class LeaderElection:
+    """Lease row in ``scheduler_leases``; the holder runs singleton jobs
+    
+    A worker becomes leader by inserting the lease or taking it over once
+    it has expired, and stays leader by renewing it before ``lease_seconds``
+    pass. Both are one conditional UPDATE, so at most one worker holds an
+    unexpired lease.
+    """
+    
+    def __init__(
+        self,
+        engine=None,
+        name: str = 'kiosk-scheduler',
+        lease_seconds: int = 30,
+        worker_id: Optional[str] = None
+    ):
+        self._engine = engine
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.is_leader = False
+        self.expires_at: Optional[datetime] = None
+    
+    @property
+    def engine(self):
+        if self._engine is None:
+            from app.core.database import engine
+            self._engine = engine
+        return self._engine
+    
+    def try_acquire(self) -> bool:
+        """Take or renew the lease"""
+        from sqlalchemy import or_
+        from sqlalchemy.exc import IntegrityError
+        from sqlmodel import Session, update
+        from app.core.models import SchedulerLease
+        
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+        with Session(self.engine) as session:
+            result = session.exec(
+                update(SchedulerLease)
+                .where(
+                    SchedulerLease.name == self.name,
+                    or_(SchedulerLease.holder == self.worker_id, SchedulerLease.expires_at < now)
+                )
+                .values(holder=self.worker_id, expires_at=expires_at, renewed_at=now)
+            )
+            acquired = result.rowcount == 1
+            if not acquired and session.get(SchedulerLease, self.name) is None:
+                session.add(SchedulerLease(
+                    name=self.name, holder=self.worker_id, expires_at=expires_at, renewed_at=now
+                ))
+                acquired = True
+            try:
+                session.commit()
+            except IntegrityError:
+                # Another worker inserted the lease first
+                session.rollback()
+                acquired = False
+        
+        if acquired != self.is_leader:
+            logger.info(f"Worker {self.worker_id} {'acquired' if acquired else 'lost'} scheduler leadership")
+        self.is_leader = acquired
+        self.expires_at = expires_at if acquired else None
+        return acquired
+    
+    def release(self):
+        """Give up the lease so a standby takes over without waiting"""
+        from sqlmodel import Session, update
+        from app.core.models import SchedulerLease
+        
+        if not self.is_leader:
+            return
+        with Session(self.engine) as session:
+            session.exec(
+                update(SchedulerLease)
+                .where(SchedulerLease.name == self.name, SchedulerLease.holder == self.worker_id)
+                .values(expires_at=datetime.utcnow())
+            )
+            session.commit()
+        self.is_leader = False
+        self.expires_at = None
+        logger.info(f"Worker {self.worker_id} released scheduler leadership")
+    
+    def status(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "is_leader": self.is_leader,
+            "lease_expires_at": self.expires_at
+        }
+
 
 class KioskScheduler:
     """Centralized scheduler for kiosk tasks"""
     
-    def __init__(self):
+    def __init__(self, thread_workers: int = 4, process_workers: int = 2):
         self.scheduler = AsyncIOScheduler(
             jobstores={
                 'default': MemoryJobStore()
             },
             executors={
-                'default': AsyncIOExecutor()
+                EXECUTOR_ASYNCIO: TimedAsyncIOExecutor(self._on_job_submitted),
+                EXECUTOR_THREADS: TimedThreadPoolExecutor(self._on_job_submitted, thread_workers),
+                # Fresh interpreters: forked children would share the parent's DB connections
+                EXECUTOR_PROCESSES: TimedProcessPoolExecutor(
+                    self._on_job_submitted,
+                    process_workers,
+                    pool_kwargs={'mp_context': multiprocessing.get_context('spawn')}
+                )
             },
             job_defaults={
                 'coalesce': False,
                 'max_instances': 1
             },
-            timezone='Asia/Seoul'
+            timezone=TIMEZONE
         )
         self._session_timers = {}
+        self._singleton_jobs: Dict[str, Tuple[Callable, BaseTrigger, str]] = {}
+        self.leader: Optional[LeaderElection] = None
+        self._jobstore_engine = None
+        self._singletons_attached = False
+        self._metrics: Dict[str, JobMetrics] = {}
+        self._submitted: Dict[Tuple[str, datetime], float] = {}
+        self._metrics_lock = threading.Lock()
+        self.scheduler.add_listener(
+            self._on_job_event,
+            EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES
+        )
+    
+    def _on_job_submitted(self, job_id: str, run_times: List[datetime]):
+        started = time.monotonic()
+        with self._metrics_lock:
+            metrics = self._metrics.setdefault(job_id, JobMetrics())
+            now = datetime.now(run_times[-1].tzinfo)
+            metrics.last_start_delay_seconds = (now - run_times[-1]).total_seconds()
+            for run_time in run_times:
+                self._submitted[(job_id, run_time)] = started
+    
+    def _on_job_event(self, event):
+        """Collect runtime, failure and misfire counts per job"""
+        with self._metrics_lock:
+            metrics = self._metrics.setdefault(event.job_id, JobMetrics())
+            if event.code == EVENT_JOB_MAX_INSTANCES:
+                metrics.skipped += 1
+            elif event.code == EVENT_JOB_MISSED:
+                metrics.misfires += 1
+            else:
+                started = self._submitted.pop((event.job_id, event.scheduled_run_time), None)
+                metrics.runs += 1
+                metrics.last_run_at = datetime.utcnow()
+                if started is not None:
+                    runtime = time.monotonic() - started
+                    metrics.last_runtime_seconds = runtime
+                    metrics.total_runtime_seconds += runtime
+                    metrics.max_runtime_seconds = max(metrics.max_runtime_seconds, runtime)
+                if event.code == EVENT_JOB_ERROR:
+                    metrics.failures += 1
+                    metrics.last_error = repr(event.exception)
+    
+    def job_metrics(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._metrics_lock:
+            metrics = self._metrics.get(job_id)
+            if metrics is None:
+                return None
+            result = asdict(metrics)
+        result["avg_runtime_seconds"] = (
+            metrics.total_runtime_seconds / metrics.runs if metrics.runs else None
+        )
+        return result
+    
+    @staticmethod
+    def _resolve_executor(func: Callable, executor: str) -> str:
+        """Coroutine functions always run on the event loop"""
+        if iscoroutinefunction_partial(func):
+            if executor not in (EXECUTOR_ASYNCIO, None):
+                logger.warning(f"{obj_to_ref(func)} is a coroutine function; running it on the event loop")
+            return EXECUTOR_ASYNCIO
+        return executor
     
     def start(self):
         """Start the scheduler"""
         if not self.scheduler.running:
             self.scheduler.start()
             logger.info("Scheduler started")
+            if self.leader:
+                self._check_leadership()
     
     def shutdown(self):
         """Shutdown the scheduler"""
         if self.scheduler.running:
             self.scheduler.shutdown()
             logger.info("Scheduler shutdown")
+        if self.leader:
+            self.leader.release()
+    
+    def enable_leader_election(
+        self,
+        engine=None,
+        lease_seconds: int = 30,
+        worker_id: Optional[str] = None
+    ) -> Job:
+        """Run singleton jobs only on the worker holding the lease
+        
+        The leader keeps singleton jobs in an SQLAlchemy job store, so their
+        next run times survive restarts and failover; standbys do not attach
+        the store. Leadership is checked every third of the lease.
+        """
+        self.leader = LeaderElection(engine, lease_seconds=lease_seconds, worker_id=worker_id)
+        self._jobstore_engine = engine
+        return self.scheduler.add_job(
+            self._check_leadership,
+            'interval',
+            seconds=max(1, lease_seconds // 3),
+            id='leader_election',
+            executor=EXECUTOR_THREADS,
+            coalesce=True,
+            replace_existing=True
+        )
+    
+    def _check_leadership(self):
+        try:
+            is_leader = self.leader.try_acquire()
+        except Exception as e:
+            logger.error(f"Leader election failed: {e}")
+            is_leader = False
+        
+        if is_leader and not self._singletons_attached:
+            self._attach_singleton_jobs()
+        elif not is_leader and self._singletons_attached:
+            self.scheduler.remove_jobstore(PERSISTENT_JOBSTORE)
+            self._singletons_attached = False
+            logger.info("Singleton jobs detached (standby)")
+    
+    def _attach_singleton_jobs(self):
+        engine = self._jobstore_engine or self.leader.engine
+        self.scheduler.add_jobstore(
+            SharedEngineJobStore(engine=engine, tablename='scheduler_jobs'),
+            PERSISTENT_JOBSTORE
+        )
+        self._singletons_attached = True
+        for job_id in self._singleton_jobs:
+            self._register_singleton(job_id)
+        logger.info(f"Singleton jobs attached: {sorted(self._singleton_jobs)}")
+    
+    def _register_singleton(self, job_id: str) -> Job:
+        func, trigger, executor = self._singleton_jobs[job_id]
+        existing = self.scheduler.get_job(job_id, jobstore=PERSISTENT_JOBSTORE)
+        if (
+            existing
+            and str(existing.trigger) == str(trigger)
+            and existing.func_ref == obj_to_ref(func)
+            and existing.executor == executor
+        ):
+            # Keep the persisted next run time across restarts and failover
+            return existing
+        return self.scheduler.add_job(
+            func,
+            trigger,
+            id=job_id,
+            jobstore=PERSISTENT_JOBSTORE,
+            executor=executor,
+            coalesce=True,
+            misfire_grace_time=self.leader.lease_seconds * 2,
+            replace_existing=True
+        )
+    
+    def _add_singleton_job(
+        self,
+        job_id: str,
+        func: Callable,
+        trigger: BaseTrigger,
+        executor: str
+    ) -> Optional[Job]:
+        """Add a job that must run on one worker only (None on standbys)"""
+        executor = self._resolve_executor(func, executor)
+        if executor == EXECUTOR_PROCESSES or self.leader is not None:
+            # Process pools and persisted jobs reference the function by import path
+            obj_to_ref(func)
+        if self.leader is None:
+            return self.scheduler.add_job(func, trigger, id=job_id, executor=executor, replace_existing=True)
+        self._singleton_jobs[job_id] = (func, trigger, executor)
+        if self._singletons_attached:
+            return self._register_singleton(job_id)
+        return None
     
     def add_session_timeout(
         self,
@@ -85,49 +421,188 @@ class KioskScheduler:
             job = self._session_timers[session_id]
             self.scheduler.remove_job(job.id)
             del self._session_timers[session_id]
+            with self._metrics_lock:
+                self._metrics.pop(job.id, None)
             logger.info(f"Session timeout cancelled for {session_id}")
     
     def add_emr_sync_job(
         self,
         interval_minutes: int,
-        sync_function: Callable
-    ) -> Job:
-        """Add EMR synchronization job"""
-        return self.scheduler.add_job(
+        sync_function: Callable,
+        executor: str = EXECUTOR_THREADS
+    ) -> Optional[Job]:
+        """Add EMR synchronization job (singleton)"""
+        return self._add_singleton_job(
+            'emr_sync',
             sync_function,
-            'interval',
-            minutes=interval_minutes,
-            id='emr_sync',
-            replace_existing=True
+            IntervalTrigger(minutes=interval_minutes, timezone=TIMEZONE),
+            executor
         )
     
     def add_backup_job(
         self,
         hour: int,
         minute: int,
-        backup_function: Callable
-    ) -> Job:
-        """Add daily backup job"""
-        return self.scheduler.add_job(
+        backup_function: Callable,
+        executor: str = EXECUTOR_PROCESSES
+    ) -> Optional[Job]:
+        """Add daily backup job (singleton)"""
+        return self._add_singleton_job(
+            'daily_backup',
             backup_function,
-            'cron',
-            hour=hour,
-            minute=minute,
-            id='daily_backup',
-            replace_existing=True
+            CronTrigger(hour=hour, minute=minute, timezone=TIMEZONE),
+            executor
+        )
+    
+    def add_wal_archive_job(
+        self,
+        interval_seconds: int,
+        archive_function: Callable,
+        executor: str = EXECUTOR_THREADS
+    ) -> Optional[Job]:
+        """Add WAL archiving job (singleton)"""
+        return self._add_singleton_job(
+            'wal_archive',
+            archive_function,
+            IntervalTrigger(seconds=interval_seconds, timezone=TIMEZONE),
+            executor
         )
     
     def add_cleanup_job(
         self,
         interval_hours: int,
-        cleanup_function: Callable
+        cleanup_function: Callable,
+        executor: str = EXECUTOR_THREADS
+    ) -> Optional[Job]:
+        """Add periodic cleanup job (singleton)"""
+        return self._add_singleton_job(
+            'periodic_cleanup',
+            cleanup_function,
+            IntervalTrigger(hours=interval_hours, timezone=TIMEZONE),
+            executor
+        )
+    
+    def add_settlement_job(
+        self,
+        hour: int,
+        minute: int,
+        settlement_function: Callable,
+        executor: str = EXECUTOR_PROCESSES
+    ) -> Optional[Job]:
+        """Add daily settlement/reconciliation job (singleton)"""
+        return self._add_singleton_job(
+            'daily_settlement',
+            settlement_function,
+            CronTrigger(hour=hour, minute=minute, timezone=TIMEZONE),
+            executor
+        )
+    
+    def add_outbox_job(
+        self,
+        interval_seconds: int,
+        dispatch_function: Callable
     ) -> Job:
-        """Add periodic cleanup job"""
+        """Add outbox dispatch job"""
         return self.scheduler.add_job(
-            cleanup_function,
+            dispatch_function,
+            'interval',
+            seconds=interval_seconds,
+            id='outbox_dispatch',
+            coalesce=True,
+            replace_existing=True
+        )
+    
+    def add_emr_push_job(
+        self,
+        interval_seconds: int,
+        dispatch_function: Callable
+    ) -> Job:
+        """Add EMR event push job (separate from the main outbox job)"""
+        return self.scheduler.add_job(
+            dispatch_function,
+            'interval',
+            seconds=interval_seconds,
+            id='emr_push',
+            coalesce=True,
+            replace_existing=True
+        )
+    
+    def add_queue_load_job(
+        self,
+        interval_seconds: int,
+        refresh_function: Callable
+    ) -> Job:
+        """Add queue load refresh job"""
+        return self.scheduler.add_job(
+            refresh_function,
+            'interval',
+            seconds=interval_seconds,
+            id='queue_load_refresh',
+            executor=EXECUTOR_THREADS,
+            coalesce=True,
+            replace_existing=True
+        )
+    
+    def add_slot_index_job(
+        self,
+        interval_seconds: int,
+        refresh_function: Callable
+    ) -> Job:
+        """Add free slot index reload job"""
+        return self.scheduler.add_job(
+            refresh_function,
+            'interval',
+            seconds=interval_seconds,
+            id='slot_index_refresh',
+            executor=EXECUTOR_THREADS,
+            coalesce=True,
+            replace_existing=True
+        )
+    
+    def add_patient_search_job(
+        self,
+        interval_seconds: float,
+        refresh_function: Callable
+    ) -> Job:
+        """Add patient search index refresh job"""
+        return self.scheduler.add_job(
+            refresh_function,
+            'interval',
+            seconds=interval_seconds,
+            id='patient_search_refresh',
+            executor=EXECUTOR_THREADS,
+            coalesce=True,
+            replace_existing=True
+        )
+    
+    def add_wait_stats_job(
+        self,
+        interval_seconds: int,
+        persist_function: Callable
+    ) -> Job:
+        """Add wait-time statistics persistence job"""
+        return self.scheduler.add_job(
+            persist_function,
+            'interval',
+            seconds=interval_seconds,
+            id='wait_stats_persist',
+            executor=EXECUTOR_THREADS,
+            coalesce=True,
+            replace_existing=True
+        )
+    
+    def add_deadline_job(
+        self,
+        interval_seconds: int,
+        dispatch_function: Callable
+    ) -> Job:
+        """Add deadline dispatcher job"""
+        return self.scheduler.add_job(
+            dispatch_function,
             'interval',
-            hours=interval_hours,
-            id='periodic_cleanup',
+            seconds=interval_seconds,
+            id='deadline_dispatch',
+            coalesce=True,
             replace_existing=True
         )
     
@@ -139,7 +614,9 @@ class KioskScheduler:
                 'id': job.id,
                 'name': job.name,
                 'next_run_time': job.next_run_time,
-                'pending': job.pending
+                'pending': job.pending,
+                'executor': job.executor,
+                'metrics': self.job_metrics(job.id)
             }
         return None
     
@@ -151,10 +628,164 @@ class KioskScheduler:
                 'id': job.id,
                 'name': job.name,
                 'next_run_time': job.next_run_time,
-                'trigger': str(job.trigger)
+                'trigger': str(job.trigger),
+                'jobstore': job._jobstore_alias,
+                'executor': job.executor,
+                'metrics': self.job_metrics(job.id)
             })
         return jobs
 
 
+class DeadlineDispatcher:
+    """Persisted deadlines fired by one scheduler job on every worker
+    
+    Each deadline is a row in ``deadlines``, so scheduling costs one INSERT
+    instead of an APScheduler job, and the ``due_at`` index turns finding
+    due rows into a range seek. Any worker may schedule or cancel a
+    deadline. Every worker runs the dispatch job: it claims a batch of due
+    rows with one UPDATE that moves their ``due_at`` ``retry_seconds``
+    ahead, so other workers no longer see them as due. Due entries are
+    handed to the handler of their kind in batches; fired rows are deleted
+    and failed ones (or those of a worker that died mid-batch) fire again
+    when that lease runs out.
+    """
+    
+    def __init__(
+        self,
+        engine=None,
+        batch_size: int = 500,
+        retry_seconds: int = 60
+    ):
+        self._engine = engine
+        self.batch_size = batch_size
+        self.retry_seconds = retry_seconds
+        self._handlers: Dict[str, Callable] = {}
+    
+    @property
+    def engine(self):
+        if self._engine is None:
+            from app.core.database import engine
+            self._engine = engine
+        return self._engine
+    
+    def handler(self, kind: str):
+        """Register a handler receiving a list of payloads (may be async)"""
+        def decorator(func: Callable) -> Callable:
+            self._handlers[kind] = func
+            return func
+        return decorator
+    
+    def schedule(self, kind: str, due_at: datetime, payload: Optional[Dict[str, Any]] = None) -> int:
+        """Persist one deadline (``due_at`` in UTC)"""
+        return self.schedule_many([(kind, due_at, payload)])[0]
+    
+    def schedule_many(self, items: Iterable[Tuple[str, datetime, Optional[Dict[str, Any]]]]) -> List[int]:
+        """Persist several deadlines with one INSERT"""
+        from sqlalchemy import insert
+        from sqlmodel import Session
+        from app.core.models import Deadline
+        
+        rows = [
+            {"kind": kind, "due_at": due_at, "payload": json.dumps(payload or {}, ensure_ascii=False, default=str)}
+            for kind, due_at, payload in items
+        ]
+        if not rows:
+            return []
+        with Session(self.engine) as session:
+            ids = session.execute(
+                insert(Deadline).returning(Deadline.id, sort_by_parameter_order=True),
+                rows
+            ).scalars().all()
+            session.commit()
+        return ids
+    
+    def cancel(self, deadline_id: int) -> bool:
+        """Drop a pending deadline, whichever worker scheduled it"""
+        from sqlmodel import Session, delete
+        from app.core.models import Deadline
+        
+        with Session(self.engine) as session:
+            result = session.exec(delete(Deadline).where(Deadline.id == deadline_id))
+            session.commit()
+        return result.rowcount == 1
+    
+    def _claim_due(self, now: datetime) -> List[Tuple[datetime, int, str, Dict[str, Any]]]:
+        """Claim up to ``batch_size`` due deadlines, earliest first"""
+        from sqlmodel import Session, select, update
+        from app.core.models import Deadline
+        
+        with Session(self.engine) as session:
+            candidates = session.exec(
+                select(Deadline.due_at, Deadline.id, Deadline.kind, Deadline.payload)
+                .where(Deadline.due_at <= now)
+                .order_by(Deadline.due_at, Deadline.id)
+                .limit(self.batch_size)
+            ).all()
+            if not candidates:
+                return []
+            # Still due only if no other worker claimed it since the SELECT
+            claimed = set(session.execute(
+                update(Deadline)
+                .where(Deadline.id.in_([row[1] for row in candidates]), Deadline.due_at <= now)
+                .values(due_at=now + timedelta(seconds=self.retry_seconds))
+                .returning(Deadline.id)
+            ).scalars().all())
+            session.commit()
+        return [
+            (due_at, deadline_id, kind, json.loads(payload))
+            for due_at, deadline_id, kind, payload in candidates if deadline_id in claimed
+        ]
+    
+    async def dispatch(self) -> int:
+        """Fire all due deadlines, one handler call per kind and batch"""
+        fired_total = 0
+        now = datetime.utcnow()
+        while True:
+            due = await asyncio.to_thread(self._claim_due, now)
+            if not due:
+                return fired_total
+            
+            by_kind: Dict[str, List[Tuple[datetime, int, str, Dict[str, Any]]]] = {}
+            for entry in due:
+                by_kind.setdefault(entry[2], []).append(entry)
+            
+            fired = []
+            for kind, entries in by_kind.items():
+                handler = self._handlers.get(kind)
+                try:
+                    if handler is None:
+                        raise LookupError(f"No handler for deadline kind '{kind}'")
+                    result = handler([entry[3] for entry in entries])
+                    if inspect.isawaitable(result):
+                        await result
+                    fired.extend(entry[1] for entry in entries)
+                except Exception as e:
+                    # The claim already moved these rows to the retry time
+                    logger.error(f"Deadline handler for {kind} failed ({len(entries)} items): {e}")
+            
+            await asyncio.to_thread(self._delete, fired)
+            fired_total += len(fired)
+    
+    def _delete(self, deadline_ids: List[int]):
+        from sqlmodel import Session, delete
+        from app.core.models import Deadline
+        
+        with Session(self.engine) as session:
+            for start in range(0, len(deadline_ids), 500):
+                session.exec(delete(Deadline).where(Deadline.id.in_(deadline_ids[start:start + 500])))
+            session.commit()
+    
+    def snapshot(self) -> Dict[str, Any]:
+        from sqlmodel import Session, func, select
+        from app.core.models import Deadline
+        
+        with Session(self.engine) as session:
+            pending, next_due = session.exec(select(func.count(Deadline.id), func.min(Deadline.due_at))).one()
+        return {"pending": pending, "next_due_at": next_due}
+
+
 # Global scheduler instance
 scheduler = KioskScheduler()
+
+# Global deadline dispatcher instance
+deadline_dispatcher = DeadlineDispatcher()
@@ -1,12 +1,17 @@
 """Hardware interface modules"""
 
+from .printer import Printer, printer
+from .escpos import TicketRenderer, ticket_renderer
+
 # Hardware modules would be imported here when implemented
 # from .card_reader import CardReader
 # from .cash_acceptor import CashAcceptor  
-# from .printer import Printer
 # from .sensors.thermometer import Thermometer
 # from .sensors.blood_pressure import BloodPressureMonitor
 
 __all__ = [
-    # Will be populated when hardware modules are implemented
-]
\ No newline at end of file
+    "Printer",
+    "printer",
+    "TicketRenderer",
+    "ticket_renderer"
+]
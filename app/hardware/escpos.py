@@ -0,0 +1,330 @@
+"""ESC/POS receipt and queue-ticket rendering
+
+Layouts are compiled once per (layout, locale) into a byte template: the
+static text is translated, encoded for the printer code page and joined
+with the control codes, while every ``{field:width}`` placeholder becomes a
+fixed-width slot pre-filled with spaces. Rendering copies the template and
+overwrites the slots in place. The shared header (init, code page, logo
+raster, hospital name) and footer are cached as plain bytes.
+
+Layout line syntax: ``(style, text)`` where ``text`` may contain
+``{t:key}`` (translated at compile time) and ``{field:width}`` /
+``{field:>width}`` / ``{field:^width}`` slots filled at render time.
+"""
+
+import logging
+import re
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import get_settings
+from app.i18n import i18n
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+ESC = b"\x1b"
+GS = b"\x1d"
+FS = b"\x1c"
+
+INIT = ESC + b"@"
+ALIGN_LEFT = ESC + b"a\x00"
+ALIGN_CENTER = ESC + b"a\x01"
+ALIGN_RIGHT = ESC + b"a\x02"
+BOLD_ON = ESC + b"E\x01"
+BOLD_OFF = ESC + b"E\x00"
+SIZE_NORMAL = GS + b"!\x00"
+SIZE_DOUBLE = GS + b"!\x11"
+SIZE_QUAD = GS + b"!\x33"
+FEED_AND_CUT = ESC + b"d\x04" + GS + b"V\x01"
+
+# Encoding and code page selection per locale
+LOCALE_CODEPAGES: Dict[str, Tuple[str, bytes]] = {
+    "ko": ("cp949", ESC + b"R\x0d" + FS + b"&"),     # Korea charset, double-byte mode
+    "zh": ("gb18030", FS + b"&"),                    # Simplified Chinese double-byte mode
+    "en": ("cp437", FS + b"." + ESC + b"t\x00"),     # PC437
+    "vi": ("cp1258", FS + b"." + ESC + b"t\x5e"),    # WPC1258
+}
+
+# Code pages that spell Vietnamese tone marks as combining characters after
+# the base letter instead of carrying the precomposed letters
+COMBINING_CODEPAGES = {"cp1258"}
+
+STYLES: Dict[str, Tuple[bytes, bytes]] = {
+    "normal": (ALIGN_LEFT, b""),
+    "center": (ALIGN_CENTER, b""),
+    "right": (ALIGN_RIGHT, b""),
+    "bold": (ALIGN_LEFT + BOLD_ON, BOLD_OFF),
+    "title": (ALIGN_CENTER + BOLD_ON + SIZE_DOUBLE, SIZE_NORMAL + BOLD_OFF),
+    "huge": (ALIGN_CENTER + BOLD_ON + SIZE_QUAD, SIZE_NORMAL + BOLD_OFF),
+}
+
+Layout = Sequence[Tuple[str, str]]
+
+RECEIPT_LAYOUT: Layout = [
+    ("title", "{t:receipt}"),
+    ("normal", "{rule}"),
+    ("normal", "{t:receipt_number}: {receipt_number:24}"),
+    ("normal", "{t:date}: {date:19}"),
+    ("normal", "{t:name}: {patient_name:16}"),
+    ("normal", "{rule}"),
+    ("bold", "{t:payment_amount}: {amount:>14}"),
+    ("normal", "{t:payment_method}: {method:10}"),
+    ("normal", "{t:transaction_id}: {transaction_id:28}"),
+    ("normal", "{rule}"),
+]
+
+RECEIPT_ITEM_LAYOUT: Layout = [
+    ("normal", "{description:28}{amount:>14}"),
+]
+
+QUEUE_TICKET_LAYOUT: Layout = [
+    ("title", "{t:queue_ticket}"),
+    ("normal", "{rule}"),
+    ("center", "{t:queue_number}"),
+    ("huge", "{queue_number:^6}"),
+    ("normal", ""),
+    ("bold", "{t:department}: {department:20}"),
+    ("normal", "{t:location}: {location:20}"),
+    ("normal", "{t:estimated_wait}: {wait_minutes:>4}{t:minutes}"),
+    ("normal", "{t:date}: {date:19}"),
+    ("normal", "{rule}"),
+]
+
+LAYOUTS: Dict[str, Layout] = {
+    "receipt": RECEIPT_LAYOUT,
+    "receipt_item": RECEIPT_ITEM_LAYOUT,
+    "queue_ticket": QUEUE_TICKET_LAYOUT,
+}
+
+_TOKEN = re.compile(r"\{(t:)?(\w+)(?::([<>^]?)(\d+))?\}")
+
+
+def _letters(text: str, encoding: str) -> List[str]:
+    """Split text into letters as the code page spells them
+
+    For combining code pages each letter is decomposed (NFD) and its base is
+    recomposed with whichever marks the code page has precomposed (ê, ơ, ư);
+    the remaining marks stay attached to the letter as combining characters.
+    """
+    if encoding not in COMBINING_CODEPAGES:
+        return list(text)
+    clusters: List[List[str]] = []
+    for char in unicodedata.normalize("NFD", text):
+        if clusters and unicodedata.combining(char):
+            clusters[-1].append(char)
+        else:
+            clusters.append([char])
+
+    letters = []
+    for base, *marks in clusters:
+        rest = []
+        for mark in marks:
+            composed = unicodedata.normalize("NFC", base + mark)
+            try:
+                if len(composed) != 1:
+                    raise UnicodeError
+                composed.encode(encoding)
+                base = composed
+            except UnicodeError:
+                rest.append(mark)
+        letters.append(base + "".join(rest))
+    return letters
+
+
+def encode_text(text: str, encoding: str) -> bytes:
+    """Encode text for the printer code page"""
+    if encoding in COMBINING_CODEPAGES:
+        text = "".join(_letters(text, encoding))
+    return text.encode(encoding, errors="replace")
+
+
+def fit(value, width: int, encoding: str, align: str = "<") -> bytes:
+    """Encode value into exactly ``width`` bytes without splitting a character"""
+    text = "" if value is None else str(value)
+    encoded = encode_text(text, encoding)
+    if len(encoded) > width:
+        out = bytearray()
+        for char in _letters(text, encoding):
+            char_bytes = char.encode(encoding, errors="replace")
+            if len(out) + len(char_bytes) > width:
+                break
+            out += char_bytes
+        encoded = bytes(out)
+
+    padding = width - len(encoded)
+    if align == ">":
+        return b" " * padding + encoded
+    if align == "^":
+        left = padding // 2
+        return b" " * left + encoded + b" " * (padding - left)
+    return encoded + b" " * padding
+
+
+class CompiledTemplate:
+    """Pre-encoded byte template with fixed-width field slots"""
+
+    __slots__ = ("data", "slots", "encoding")
+
+    def __init__(self, data: bytes, slots: List[Tuple[str, int, int, str]], encoding: str):
+        self.data = data
+        self.slots = slots
+        self.encoding = encoding
+
+    def render(self, fields: Dict) -> bytes:
+        if not self.slots:
+            return self.data
+        buffer = bytearray(self.data)
+        for name, offset, width, align in self.slots:
+            buffer[offset:offset + width] = fit(fields.get(name), width, self.encoding, align)
+        return bytes(buffer)
+
+
+class TicketRenderer:
+    """Compile layouts per locale and render receipts / queue tickets"""
+
+    def __init__(
+        self,
+        line_width: Optional[int] = None,
+        logo_path: Optional[str] = None,
+        hospital_name: Optional[str] = None
+    ):
+        self.line_width = line_width or settings.printer_line_width
+        self.logo_path = logo_path if logo_path is not None else settings.printer_logo_path
+        self.hospital_name = hospital_name or settings.app_name
+        self._templates: Dict[Tuple[str, str], CompiledTemplate] = {}
+        self._headers: Dict[str, bytes] = {}
+        self._footers: Dict[str, bytes] = {}
+        self._logo: Optional[bytes] = None
+        self._lock = threading.Lock()
+
+    def _codepage(self, locale: str) -> Tuple[str, bytes]:
+        return LOCALE_CODEPAGES.get(locale, LOCALE_CODEPAGES["ko"])
+
+    def compile(self, layout_name: str, locale: str) -> CompiledTemplate:
+        """Return cached template, compiling it on first use"""
+        key = (layout_name, locale)
+        template = self._templates.get(key)
+        if template is None:
+            with self._lock:
+                template = self._templates.get(key)
+                if template is None:
+                    template = self._compile(LAYOUTS[layout_name], locale)
+                    self._templates[key] = template
+        return template
+
+    def _compile(self, layout: Layout, locale: str) -> CompiledTemplate:
+        encoding, _ = self._codepage(locale)
+        data = bytearray()
+        slots: List[Tuple[str, int, int, str]] = []
+
+        for style, text in layout:
+            prefix, suffix = STYLES[style]
+            data += prefix
+            position = 0
+            for match in _TOKEN.finditer(text):
+                data += encode_text(text[position:match.start()], encoding)
+                is_label, name, align, width = match.groups()
+                if is_label:
+                    data += encode_text(i18n.get(name, locale), encoding)
+                elif name == "rule":
+                    data += b"-" * self.line_width
+                else:
+                    width = int(width or 10)
+                    slots.append((name, len(data), width, align or "<"))
+                    data += b" " * width
+                position = match.end()
+            data += encode_text(text[position:], encoding)
+            data += suffix + b"\n"
+
+        return CompiledTemplate(bytes(data), slots, encoding)
+
+    def header(self, locale: str) -> bytes:
+        """Init, code page, logo and hospital name (cached per locale)"""
+        cached = self._headers.get(locale)
+        if cached is None:
+            encoding, codepage = self._codepage(locale)
+            cached = (
+                INIT + codepage + ALIGN_CENTER + self.logo()
+                + BOLD_ON + encode_text(self.hospital_name, encoding) + BOLD_OFF
+                + b"\n" + ALIGN_LEFT
+            )
+            self._headers[locale] = cached
+        return cached
+
+    def footer(self, locale: str) -> bytes:
+        """Closing message and paper cut (cached per locale)"""
+        cached = self._footers.get(locale)
+        if cached is None:
+            encoding, _ = self._codepage(locale)
+            cached = (
+                ALIGN_CENTER
+                + encode_text(i18n.get("thank_you", locale), encoding) + b"\n"
+                + encode_text(i18n.get("keep_receipt", locale), encoding) + b"\n"
+                + ALIGN_LEFT + FEED_AND_CUT
+            )
+            self._footers[locale] = cached
+        return cached
+
+    def logo(self) -> bytes:
+        """Logo as GS v 0 raster command, converted once"""
+        if self._logo is None:
+            self._logo = self._load_logo_raster() or b""
+        return self._logo
+
+    def _load_logo_raster(self) -> Optional[bytes]:
+        if not self.logo_path or not Path(self.logo_path).exists():
+            return None
+        try:
+            from PIL import Image, ImageOps
+        except ImportError:
+            logger.warning("Pillow not installed, printing without logo")
+            return None
+
+        max_width = self.line_width * 12  # 12 dots per character column
+        image = Image.open(self.logo_path).convert("L")
+        if image.width > max_width:
+            image = image.resize((max_width, int(image.height * max_width / image.width)))
+        # Printer bit 1 = black dot, so invert before packing to 1-bit
+        bitmap = ImageOps.invert(image).convert("1")
+        width_bytes = (bitmap.width + 7) // 8
+        return (
+            GS + b"v0\x00"
+            + bytes([width_bytes & 0xFF, width_bytes >> 8, bitmap.height & 0xFF, bitmap.height >> 8])
+            + bitmap.tobytes() + b"\n"
+        )
+
+    def render_receipt(self, receipt: Dict, locale: Optional[str] = None) -> bytes:
+        """Render ``PaymentService.generate_receipt`` output"""
+        locale = locale or settings.default_language
+        fields = dict(receipt)
+        fields["amount"] = f"{receipt.get('amount', 0):,.0f}"
+        fields["method"] = i18n.get(receipt.get("method", ""), locale)
+
+        parts = [self.header(locale), self.compile("receipt", locale).render(fields)]
+        item_template = self.compile("receipt_item", locale)
+        for item in receipt.get("items") or []:
+            parts.append(item_template.render({
+                "description": item.get("description", ""),
+                "amount": f"{item.get('amount', 0):,.0f}"
+            }))
+        parts.append(self.footer(locale))
+        return b"".join(parts)
+
+    def render_queue_ticket(self, ticket: Dict, locale: Optional[str] = None) -> bytes:
+        """Render queue ticket (``QueueTicket`` fields plus ``date``)"""
+        locale = locale or settings.default_language
+        fields = dict(ticket)
+        fields["department"] = i18n.get(ticket.get("department", ""), locale)
+        fields["wait_minutes"] = ticket.get("estimated_wait_time", 0)
+        return b"".join((
+            self.header(locale),
+            self.compile("queue_ticket", locale).render(fields),
+            self.footer(locale)
+        ))
+
+
+# Global renderer instance
+ticket_renderer = TicketRenderer()
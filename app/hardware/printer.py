@@ -0,0 +1,62 @@
+"""Thermal receipt printer"""
+
+import logging
+import threading
+from typing import Optional
+
+from app.core.config import get_settings
+
+try:
+    import serial  # pyserial is optional
+except ImportError:
+    serial = None
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class Printer:
+    """Write ESC/POS jobs to the thermal printer on ``settings.printer_port``"""
+
+    def __init__(self, port: Optional[str] = None, baudrate: int = 19200):
+        self.port = port or settings.printer_port
+        self.baudrate = baudrate
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._connection is None or not self._connection.is_open:
+            if serial is None:
+                raise RuntimeError("pyserial is not installed")
+            self._connection = serial.Serial(self.port, self.baudrate, timeout=5)
+            logger.info(f"Printer connected on {self.port}")
+        return self._connection
+
+    def print_job(self, data: bytes) -> bool:
+        """Send one complete job; returns False when printing is disabled"""
+        if not settings.enable_hardware:
+            logger.debug(f"Hardware disabled, skipping print job ({len(data)} bytes)")
+            return False
+
+        with self._lock:
+            connection = self._connect()
+            try:
+                connection.write(data)
+                connection.flush()
+            except Exception:
+                connection.close()
+                self._connection = None
+                raise
+
+        logger.info(f"Printed job ({len(data)} bytes) on {self.port}")
+        return True
+
+    def close(self):
+        """Close serial connection"""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+# Global printer instance
+printer = Printer()
@@ -0,0 +1,17 @@
+"""External system integrations"""
+
+from .payment_gateway import (
+    PaymentGatewayClient, PaymentGatewayError, PaymentDeclinedError,
+    payment_gateway
+)
+from .emr_client import EmrClient, EmrError, emr_client
+
+__all__ = [
+    "PaymentGatewayClient",
+    "PaymentGatewayError",
+    "PaymentDeclinedError",
+    "payment_gateway",
+    "EmrClient",
+    "EmrError",
+    "emr_client"
+]
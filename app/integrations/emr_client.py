@@ -0,0 +1,173 @@
+"""Hospital EMR API client
+
+Like the payment gateway client, one pooled ``httpx.AsyncClient`` is shared
+by every call and a semaphore bounds the number of in-flight requests, so
+a sync cycle fetching pages in parallel cannot flood the EMR.
+
+Change feeds are page-numbered and bounded by the EMR clock: the first
+page of a pull returns ``as_of`` and the remaining pages are requested with
+``updated_until=as_of``, so concurrent page fetches see the same result set
+even while the EMR keeps changing.
+
+Kiosk events go the other way in batches through ``push_events``; the EMR
+answers per event key, so one bad event does not fail its whole batch.
+
+Every request runs under the ``emr`` dependency guard (circuit breaker,
+bulkhead, request deadline). ``patient_appointments`` keeps the last list
+it received per patient and serves it, marked stale, while the EMR is
+unreachable.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+
+from app.core.config import get_settings
+from app.core.resilience import Dependency, DependencyUnavailable, LastKnownCache, register_dependency
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class EmrError(Exception):
+    """EMR unreachable, timed out or returned an unexpected response"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def is_emr_failure(error: Exception) -> bool:
+    """Whether an error counts against the EMR's circuit breaker
+
+    4xx answers (an unknown record, a bad request) come from a healthy EMR;
+    only timeouts and rate limiting among them say it is struggling.
+    """
+    if isinstance(error, EmrError) and error.status_code is not None:
+        return not 400 <= error.status_code < 500 or error.status_code in (408, 429)
+    return True
+
+
+class EmrClient:
+    """Async client for the hospital EMR"""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        timeout_seconds: Optional[float] = None,
+        max_connections: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.base_url = (base_url or settings.emr_api_url).rstrip("/")
+        self.api_key = api_key or settings.emr_api_key
+        self.timeout_seconds = timeout_seconds or settings.emr_timeout_seconds
+        self.max_connections = max_connections or settings.emr_max_connections
+        self.max_concurrency = max_concurrency or settings.emr_sync_max_concurrency
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.dependency = Dependency(
+            "emr", timeout_seconds=self.timeout_seconds, max_concurrent=settings.emr_bulkhead,
+            is_failure=is_emr_failure
+        )
+        self._appointments: LastKnownCache[List[Dict]] = LastKnownCache(settings.emr_appointments_cache_size)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Create the shared client on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "X-Terminal-Id": settings.kiosk_terminal_id
+                },
+                timeout=httpx.Timeout(self.timeout_seconds, connect=min(3.0, self.timeout_seconds)),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60.0
+                ),
+                transport=self._transport
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            logger.info(f"EMR client opened for {self.base_url}")
+        return self._client
+
+    async def _request(self, method: str, path: str, **kwargs) -> Dict:
+        try:
+            return await self.dependency.call(lambda: self._send(method, path, **kwargs))
+        except DependencyUnavailable as e:
+            raise EmrError(str(e)) from e
+
+    async def _send(self, method: str, path: str, **kwargs) -> Dict:
+        client = self._get_client()
+        async with self._semaphore:
+            try:
+                response = await client.request(method, path, **kwargs)
+            except httpx.TimeoutException as e:
+                raise EmrError(f"EMR timeout on {path}") from e
+            except httpx.TransportError as e:
+                raise EmrError(f"EMR unreachable: {e}") from e
+
+        if not response.is_success:
+            raise EmrError(f"EMR error {response.status_code} on {path}", response.status_code)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise EmrError(f"Invalid EMR response on {path}") from e
+
+    async def fetch_changes(
+        self,
+        resource: str,
+        since: Optional[datetime],
+        until: Optional[datetime] = None,
+        page: int = 1,
+        page_size: int = 500
+    ) -> Dict:
+        """One page of records changed in (since, until]; returns items, total and as_of"""
+        params = {"page": page, "page_size": page_size}
+        if since:
+            params["updated_since"] = since.isoformat()
+        if until:
+            params["updated_until"] = until.isoformat()
+        return await self._request("GET", f"/v1/{resource}", params=params)
+
+    async def fetch_one(self, resource: str, emr_id: str) -> Dict:
+        return await self._request("GET", f"/v1/{resource}/{emr_id}")
+
+    async def patient_appointments(self, emr_id: str) -> Dict:
+        """Appointments of one patient; the last known list if the EMR is unavailable"""
+        try:
+            response = await self._request("GET", f"/v1/patients/{emr_id}/appointments")
+        except EmrError:
+            cached = self._appointments.get(emr_id)
+            if cached is None:
+                raise
+            items, fetched_at = cached
+            return {"items": items, "stale": True, "fetched_at": fetched_at.isoformat()}
+
+        items = response.get("items", [])
+        self._appointments.put(emr_id, items)
+        return {"items": items, "stale": False, "fetched_at": datetime.utcnow().isoformat()}
+
+    async def push_events(self, events: List[Dict]) -> List[Dict]:
+        """Send one batch of kiosk events; returns the EMR's result per event key"""
+        response = await self._request("POST", "/v1/events", json={"events": events})
+        return response.get("results", [])
+
+    async def close(self):
+        """Close pooled connections"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("EMR client closed")
+        self._client = None
+
+
+# Global EMR client instance
+emr_client = EmrClient()
+register_dependency(emr_client.dependency)
@@ -0,0 +1,233 @@
+"""Local mock hospital EMR
+
+Serves the change feeds used by ``EmrClient`` so the delta sync can be
+developed, tested and benchmarked offline. Records live in memory with an
+``updated_at`` stamp from a strictly increasing clock; ``state.upsert``
+changes a record the way the hospital would, and ``state.items_served``
+counts records sent so tests can check that only deltas are transferred.
+Kiosk events pushed to ``POST /v1/events`` are kept in ``state.events`` by
+key, so redelivered events are reported as duplicates.
+
+Usage:
+    python -m app.integrations.mock_emr --port 8091 --patients 20000 --latency-ms 30
+"""
+
+import argparse
+import asyncio
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from fastapi import Body, FastAPI, Header, Query
+from fastapi.responses import JSONResponse
+
+from app.core.models import AppointmentStatus, Department
+
+RESOURCES = ("patients", "appointments")
+EVENT_TYPES = (
+    "appointment.booked", "appointment.checked_in",
+    "payment.completed", "payment.refunded", "certificate.issued"
+)
+SURNAMES = "김이박최정강조윤장임한오서신권황안송류홍"
+GIVEN = "민서지현수영준호예은하윤도연성우채원시아진"
+
+
+class MockEmrState:
+    """In-memory EMR records with change timestamps"""
+
+    def __init__(self):
+        self.records: Dict[str, Dict[str, Dict]] = {resource: {} for resource in RESOURCES}
+        self.items_served = 0
+        self.request_count = 0
+        self.failure_rate = 0.0
+        self.events: Dict[str, Dict] = {}
+        self.event_batches = 0
+        self._clock = datetime.utcnow()
+
+    def now(self) -> datetime:
+        # Strictly increasing, so (since, until] windows never split a tie
+        self._clock = max(datetime.utcnow(), self._clock + timedelta(microseconds=1))
+        return self._clock
+
+    def upsert(self, resource: str, record: Dict) -> Dict:
+        stored = {**self.records[resource].get(record["id"], {}), **record, "updated_at": self.now().isoformat()}
+        self.records[resource][record["id"]] = stored
+        return stored
+
+    def seed(self, patients: int, appointments_per_patient: int = 1, seed: Optional[int] = None):
+        rng = random.Random(seed)
+        departments = list(Department)
+        start = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        for n in range(patients):
+            patient_id = f"P{n:07d}"
+            self.upsert("patients", {
+                "id": patient_id,
+                "name": rng.choice(SURNAMES) + rng.choice(GIVEN) + rng.choice(GIVEN),
+                "birthdate": f"{rng.randint(1940, 2020)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "phone": f"010-{rng.randint(0, 9999):04d}-{n % 10000:04d}",
+                "email": None
+            })
+            for a in range(appointments_per_patient):
+                self.upsert("appointments", {
+                    "id": f"A{n:07d}{a:02d}",
+                    "patient_id": patient_id,
+                    "department": rng.choice(departments).name,
+                    "doctor_name": f"{rng.choice(SURNAMES)}의사",
+                    "appointment_time": (start + timedelta(days=rng.randint(0, 13), minutes=10 * rng.randint(0, 47))).isoformat(),
+                    "status": AppointmentStatus.SCHEDULED.name
+                })
+
+
+def create_mock_emr(
+    patients: int = 0,
+    appointments_per_patient: int = 1,
+    latency_ms: float = 0.0,
+    failure_rate: float = 0.0,
+    seed: Optional[int] = None
+) -> FastAPI:
+    """Create mock EMR application"""
+    app = FastAPI(title="Mock EMR")
+    rng = random.Random(seed)
+    app.state.emr = state = MockEmrState()
+    state.failure_rate = failure_rate
+    state.seed(patients, appointments_per_patient, seed)
+
+    async def simulate_network() -> Optional[JSONResponse]:
+        state.request_count += 1
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if state.failure_rate and rng.random() < state.failure_rate:
+            return JSONResponse(status_code=503, content={"message": "Simulated EMR failure"})
+        return None
+
+    @app.get("/v1/{resource}")
+    async def changes(
+        resource: str,
+        updated_since: Optional[datetime] = None,
+        updated_until: Optional[datetime] = None,
+        page: int = Query(1, ge=1),
+        page_size: int = Query(500, ge=1, le=5000),
+        authorization: Optional[str] = Header(None)
+    ):
+        if not authorization:
+            return JSONResponse(status_code=401, content={"message": "Missing API key"})
+        if resource not in RESOURCES:
+            return JSONResponse(status_code=404, content={"message": "Unknown resource"})
+        failure = await simulate_network()
+        if failure:
+            return failure
+
+        as_of = updated_until or state.now()
+        matching = sorted(
+            (
+                record for record in state.records[resource].values()
+                if (updated_since is None or datetime.fromisoformat(record["updated_at"]) > updated_since)
+                and datetime.fromisoformat(record["updated_at"]) <= as_of
+            ),
+            key=lambda record: (record["updated_at"], record["id"])
+        )
+        items = matching[(page - 1) * page_size:page * page_size]
+        state.items_served += len(items)
+        return {
+            "items": items,
+            "total": len(matching),
+            "page": page,
+            "page_size": page_size,
+            "as_of": as_of.isoformat()
+        }
+
+    @app.get("/v1/{resource}/{record_id}")
+    async def record(resource: str, record_id: str, authorization: Optional[str] = Header(None)):
+        if not authorization:
+            return JSONResponse(status_code=401, content={"message": "Missing API key"})
+        failure = await simulate_network()
+        if failure:
+            return failure
+        found = state.records.get(resource, {}).get(record_id)
+        if not found:
+            return JSONResponse(status_code=404, content={"message": "Not found"})
+        state.items_served += 1
+        return found
+
+    @app.get("/v1/patients/{patient_id}/appointments")
+    async def patient_appointments(patient_id: str, authorization: Optional[str] = Header(None)):
+        if not authorization:
+            return JSONResponse(status_code=401, content={"message": "Missing API key"})
+        failure = await simulate_network()
+        if failure:
+            return failure
+        if patient_id not in state.records["patients"]:
+            return JSONResponse(status_code=404, content={"message": "Not found"})
+        items = sorted(
+            (record for record in state.records["appointments"].values() if record["patient_id"] == patient_id),
+            key=lambda record: record["appointment_time"]
+        )
+        state.items_served += len(items)
+        return {"items": items}
+
+    @app.post("/v1/events")
+    async def receive_events(payload: Dict = Body(...), authorization: Optional[str] = Header(None)):
+        if not authorization:
+            return JSONResponse(status_code=401, content={"message": "Missing API key"})
+        failure = await simulate_network()
+        if failure:
+            return failure
+
+        state.event_batches += 1
+        results = []
+        for event in payload.get("events", []):
+            key = event.get("key")
+            if not key or event.get("event") not in EVENT_TYPES:
+                results.append({"key": key, "status": "rejected", "error": "Unknown event type"})
+            elif key in state.events:
+                results.append({"key": key, "status": "duplicate"})
+            else:
+                state.events[key] = {**event, "received_at": state.now().isoformat()}
+                results.append({"key": key, "status": "accepted"})
+        return {"results": results}
+
+    @app.get("/health")
+    async def health():
+        return {
+            "status": "ok",
+            "requests": state.request_count,
+            "events": len(state.events),
+            "records": {resource: len(records) for resource, records in state.records.items()}
+        }
+
+    return app
+
+
+# Default instance configured from environment (for uvicorn app.integrations.mock_emr:app)
+app = create_mock_emr(
+    patients=int(os.getenv("MOCK_EMR_PATIENTS", "1000")),
+    latency_ms=float(os.getenv("MOCK_EMR_LATENCY_MS", "30"))
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run local mock EMR")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--patients", type=int, default=1000)
+    parser.add_argument("--appointments-per-patient", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_mock_emr(
+            patients=args.patients,
+            appointments_per_patient=args.appointments_per_patient,
+            latency_ms=args.latency_ms,
+            failure_rate=args.failure_rate,
+            seed=args.seed
+        ),
+        host=args.host,
+        port=args.port,
+        log_level="warning"
+    )
@@ -0,0 +1,232 @@
+"""Payment gateway client
+
+All card/QR approvals and refunds share one pooled ``httpx.AsyncClient`` so
+consecutive transactions reuse keep-alive connections instead of paying a
+TCP/TLS handshake per approval. A semaphore bounds the number of in-flight
+gateway calls independently of the connection pool size.
+
+Approvals and cancels run under the ``payment_gateway`` dependency guard
+(circuit breaker, bulkhead, request deadline). Declines do not count as
+failures; rejected calls surface as ``PaymentGatewayError``.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, Optional
+
+import httpx
+
+from app.core.config import get_settings
+from app.core.resilience import Dependency, DependencyUnavailable, register_dependency
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class PaymentGatewayError(Exception):
+    """Gateway unreachable, timed out or returned an unexpected response"""
+
+
+class PaymentDeclinedError(PaymentGatewayError):
+    """Gateway processed the request but refused the transaction"""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.message = message
+
+
+class PaymentGatewayClient:
+    """Async client for the external payment gateway"""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        merchant_id: Optional[str] = None,
+        timeout_seconds: Optional[float] = None,
+        max_connections: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.base_url = (base_url or settings.payment_gateway_url).rstrip("/")
+        self.api_key = api_key or settings.payment_api_key
+        self.merchant_id = merchant_id or settings.payment_merchant_id
+        self.timeout_seconds = timeout_seconds or settings.payment_gateway_timeout_seconds
+        self.max_connections = max_connections or settings.payment_gateway_max_connections
+        self.max_concurrency = max_concurrency or settings.payment_gateway_max_concurrency
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.dependency = Dependency(
+            "payment_gateway",
+            timeout_seconds=self.timeout_seconds,
+            max_concurrent=settings.payment_gateway_bulkhead,
+            is_failure=lambda error: not isinstance(error, PaymentDeclinedError)
+        )
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Create the shared client on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "X-Merchant-Id": self.merchant_id,
+                    "X-Terminal-Id": settings.kiosk_terminal_id
+                },
+                timeout=httpx.Timeout(
+                    self.timeout_seconds,
+                    connect=min(3.0, self.timeout_seconds)
+                ),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60.0
+                ),
+                transport=self._transport
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            logger.info(f"Payment gateway client opened for {self.base_url}")
+        return self._client
+
+    async def _post(
+        self,
+        path: str,
+        payload: Dict,
+        idempotency_key: Optional[str] = None
+    ) -> Dict:
+        """Send request to gateway and return the approval payload"""
+        try:
+            return await self.dependency.call(lambda: self._send(path, payload, idempotency_key))
+        except DependencyUnavailable as e:
+            raise PaymentGatewayError(str(e)) from e
+
+    async def _send(
+        self,
+        path: str,
+        payload: Dict,
+        idempotency_key: Optional[str] = None
+    ) -> Dict:
+        client = self._get_client()
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+
+        async with self._semaphore:
+            try:
+                response = await client.post(path, json=payload, headers=headers)
+            except httpx.TimeoutException as e:
+                raise PaymentGatewayError(f"Gateway timeout on {path}") from e
+            except httpx.TransportError as e:
+                raise PaymentGatewayError(f"Gateway unreachable: {e}") from e
+
+        if response.status_code >= 500:
+            raise PaymentGatewayError(f"Gateway error {response.status_code} on {path}")
+
+        try:
+            data = response.json()
+        except ValueError as e:
+            raise PaymentGatewayError(f"Invalid gateway response on {path}") from e
+
+        if response.status_code == 402 or (response.is_success and not data.get("approved")):
+            raise PaymentDeclinedError(
+                data.get("code", "DECLINED"),
+                data.get("message", "Transaction declined")
+            )
+
+        if not response.is_success:
+            raise PaymentGatewayError(
+                f"Gateway rejected request ({response.status_code}): {data.get('message', '')}"
+            )
+
+        return data
+
+    async def approve_card(
+        self,
+        amount: Decimal,
+        card_number: str,
+        installments: int = 0,
+        idempotency_key: Optional[str] = None
+    ) -> Dict:
+        """Request card approval"""
+        return await self._post("/v1/payments/card", {
+            "merchant_id": self.merchant_id,
+            "amount": str(amount),
+            "card_number": card_number,
+            "installments": installments
+        }, idempotency_key)
+
+    async def approve_qr(
+        self,
+        amount: Decimal,
+        qr_code: str,
+        idempotency_key: Optional[str] = None
+    ) -> Dict:
+        """Verify and capture QR payment"""
+        return await self._post("/v1/payments/qr", {
+            "merchant_id": self.merchant_id,
+            "amount": str(amount),
+            "qr_code": qr_code
+        }, idempotency_key)
+
+    async def cancel(
+        self,
+        transaction_id: str,
+        amount: Decimal,
+        reason: str = "",
+        idempotency_key: Optional[str] = None
+    ) -> Dict:
+        """Cancel (refund) an approved transaction"""
+        return await self._post(f"/v1/payments/{transaction_id}/cancel", {
+            "merchant_id": self.merchant_id,
+            "amount": str(amount),
+            "reason": reason
+        }, idempotency_key)
+
+    async def download_settlement(
+        self,
+        start: datetime,
+        end: datetime,
+        destination: Path
+    ) -> Path:
+        """Stream the gateway settlement file for [start, end) to disk"""
+        client = self._get_client()
+        temp_path = destination.with_suffix(destination.suffix + ".part")
+
+        async with self._semaphore:
+            try:
+                async with client.stream(
+                    "GET",
+                    "/v1/settlements",
+                    params={"start": start.isoformat(), "end": end.isoformat()}
+                ) as response:
+                    if not response.is_success:
+                        raise PaymentGatewayError(
+                            f"Settlement download failed ({response.status_code})"
+                        )
+                    # File I/O blocks; only the network reads stay on the event loop
+                    f = await asyncio.to_thread(open, temp_path, "wb")
+                    try:
+                        async for chunk in response.aiter_bytes():
+                            await asyncio.to_thread(f.write, chunk)
+                    finally:
+                        await asyncio.to_thread(f.close)
+            except httpx.TransportError as e:
+                raise PaymentGatewayError(f"Gateway unreachable: {e}") from e
+
+        await asyncio.to_thread(temp_path.replace, destination)
+        return destination
+
+    async def close(self):
+        """Close pooled connections"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("Payment gateway client closed")
+        self._client = None
+
+
+# Global gateway client instance
+payment_gateway = PaymentGatewayClient()
+register_dependency(payment_gateway.dependency)
@@ -0,0 +1,245 @@
+"""Local stub payment gateway
+
+Mimics the payment gateway API used by ``PaymentGatewayClient`` so card and
+QR flows can be developed and load-tested offline. Latency, jitter, gateway
+failures (HTTP 503) and card declines are simulated, ``Idempotency-Key``
+headers are honoured like a real gateway would, and approved transactions
+can be downloaded as a settlement file for reconciliation.
+
+Usage:
+    python -m app.integrations.stub_gateway --port 8090 --latency-ms 80 --failure-rate 0.02
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Header
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from app.services.settlement import format_detail_record
+
+
+class CardApprovalRequest(BaseModel):
+    merchant_id: str
+    amount: Decimal
+    card_number: str
+    installments: int = 0
+
+
+class QRApprovalRequest(BaseModel):
+    merchant_id: str
+    amount: Decimal
+    qr_code: str
+
+
+class CancelRequest(BaseModel):
+    merchant_id: str
+    amount: Decimal
+    reason: str = ""
+
+
+def create_stub_gateway(
+    latency_ms: float = 50.0,
+    jitter_ms: float = 20.0,
+    failure_rate: float = 0.0,
+    decline_rate: float = 0.0,
+    seed: Optional[int] = None
+) -> FastAPI:
+    """Create stub gateway application"""
+    app = FastAPI(title="Stub Payment Gateway")
+    rng = random.Random(seed)
+
+    # Approved transactions, kept for settlement/reconciliation
+    app.state.transactions = {}
+    app.state.idempotent_responses = {}
+    app.state.request_count = 0
+
+    async def simulate_network() -> Optional[JSONResponse]:
+        app.state.request_count += 1
+        delay = max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000
+        if delay:
+            await asyncio.sleep(delay)
+        if failure_rate and rng.random() < failure_rate:
+            return JSONResponse(
+                status_code=503,
+                content={"code": "UNAVAILABLE", "message": "Simulated gateway failure"}
+            )
+        return None
+
+    def decline(code: str, message: str) -> JSONResponse:
+        return JSONResponse(
+            status_code=402,
+            content={"approved": False, "code": code, "message": message}
+        )
+
+    def remember(idempotency_key: Optional[str], response: Dict) -> Dict:
+        if idempotency_key:
+            app.state.idempotent_responses[idempotency_key] = response
+        return response
+
+    def approve(
+        prefix: str,
+        method: str,
+        amount: Decimal,
+        terminal_id: Optional[str],
+        extra: Dict
+    ) -> Dict:
+        transaction_id = f"{prefix}_{uuid.uuid4().hex[:12].upper()}"
+        record = {
+            "approved": True,
+            "transaction_id": transaction_id,
+            "method": method,
+            "amount": str(amount),
+            "terminal_id": terminal_id or "",
+            "approved_at": datetime.utcnow().isoformat(),
+            "status": "approved",
+            **extra
+        }
+        app.state.transactions[transaction_id] = record
+        return record
+
+    @app.post("/v1/payments/card")
+    async def approve_card(
+        request: CardApprovalRequest,
+        authorization: Optional[str] = Header(None),
+        idempotency_key: Optional[str] = Header(None),
+        x_terminal_id: Optional[str] = Header(None)
+    ):
+        if not authorization:
+            return JSONResponse(status_code=401, content={"message": "Missing API key"})
+        failure = await simulate_network()
+        if failure:
+            return failure
+        if idempotency_key in app.state.idempotent_responses:
+            return app.state.idempotent_responses[idempotency_key]
+        if request.card_number.endswith("0000"):
+            return decline("INSUFFICIENT_FUNDS", "Insufficient funds")
+        if decline_rate and rng.random() < decline_rate:
+            return decline("DECLINED", "Simulated decline")
+        return remember(idempotency_key, approve(
+            "CARD", "card", request.amount, x_terminal_id, {"card_last4": request.card_number[-4:]}
+        ))
+
+    @app.post("/v1/payments/qr")
+    async def approve_qr(
+        request: QRApprovalRequest,
+        authorization: Optional[str] = Header(None),
+        idempotency_key: Optional[str] = Header(None),
+        x_terminal_id: Optional[str] = Header(None)
+    ):
+        if not authorization:
+            return JSONResponse(status_code=401, content={"message": "Missing API key"})
+        failure = await simulate_network()
+        if failure:
+            return failure
+        if idempotency_key in app.state.idempotent_responses:
+            return app.state.idempotent_responses[idempotency_key]
+        if not request.qr_code:
+            return decline("INVALID_QR", "Invalid QR code")
+        return remember(idempotency_key, approve("QR", "qr", request.amount, x_terminal_id, {}))
+
+    @app.post("/v1/payments/{transaction_id}/cancel")
+    async def cancel_payment(
+        transaction_id: str,
+        request: CancelRequest,
+        authorization: Optional[str] = Header(None),
+        idempotency_key: Optional[str] = Header(None),
+        x_terminal_id: Optional[str] = Header(None)
+    ):
+        if not authorization:
+            return JSONResponse(status_code=401, content={"message": "Missing API key"})
+        failure = await simulate_network()
+        if failure:
+            return failure
+        if idempotency_key in app.state.idempotent_responses:
+            return app.state.idempotent_responses[idempotency_key]
+        original = app.state.transactions.get(transaction_id)
+        if not original:
+            return JSONResponse(
+                status_code=404,
+                content={"approved": False, "code": "NOT_FOUND", "message": "Unknown transaction"}
+            )
+        if original["status"] == "cancelled":
+            return decline("ALREADY_CANCELLED", "Transaction already cancelled")
+        original["status"] = "cancelled"
+        return remember(idempotency_key, approve("CNCL", original["method"], -request.amount, x_terminal_id, {
+            "original_transaction_id": transaction_id
+        }))
+
+    @app.get("/v1/settlements")
+    async def settlement_file(
+        start: datetime,
+        end: datetime,
+        authorization: Optional[str] = Header(None)
+    ):
+        if not authorization:
+            return JSONResponse(status_code=401, content={"message": "Missing API key"})
+
+        records = sorted(
+            (
+                record for record in app.state.transactions.values()
+                if start <= datetime.fromisoformat(record["approved_at"]) < end
+            ),
+            key=lambda record: record["transaction_id"]
+        )
+
+        def generate():
+            for record in records:
+                yield format_detail_record(
+                    record["transaction_id"],
+                    record["method"],
+                    record["terminal_id"],
+                    Decimal(record["amount"]),
+                    datetime.fromisoformat(record["approved_at"])
+                )
+
+        return StreamingResponse(generate(), media_type="text/plain")
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "requests": app.state.request_count}
+
+    return app
+
+
+# Default instance configured from environment (for uvicorn app.integrations.stub_gateway:app)
+app = create_stub_gateway(
+    latency_ms=float(os.getenv("STUB_GATEWAY_LATENCY_MS", "50")),
+    jitter_ms=float(os.getenv("STUB_GATEWAY_JITTER_MS", "20")),
+    failure_rate=float(os.getenv("STUB_GATEWAY_FAILURE_RATE", "0")),
+    decline_rate=float(os.getenv("STUB_GATEWAY_DECLINE_RATE", "0"))
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run local stub payment gateway")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--decline-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_stub_gateway(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            failure_rate=args.failure_rate,
+            decline_rate=args.decline_rate,
+            seed=args.seed
+        ),
+        host=args.host,
+        port=args.port,
+        log_level="warning"
+    )
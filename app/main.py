@@ -1,6 +1,7 @@
 """Main FastAPI application entry point"""
 
 import sys
+import math
 import asyncio
 import logging
 from contextlib import asynccontextmanager
@@ -11,7 +12,21 @@ from fastapi.responses import JSONResponse
 
 from app.core.config import get_settings
 from app.core.database import init_db
-from app.core.scheduler import scheduler
+from app.core.scheduler import scheduler, deadline_dispatcher, EXECUTOR_ASYNCIO
+from app.core.resilience import deadline_scope, dependency_status, STATE_CLOSED
+from app.integrations.payment_gateway import payment_gateway
+from app.integrations.emr_client import emr_client
+from app.services.outbox import outbox_dispatcher, TOPIC_EMR_NOTIFY
+from app.services.emr_push import emr_pusher, emr_push_dispatcher
+from app.services.patient_search import patient_search_index
+from app.services.slot_index import slot_index
+from app.services.queue_load import queue_load
+from app.services.wait_time import wait_time_estimator
+from app.services.settlement import settle_previous_day
+from app.services.backup import run_daily_backup
+from app.services.wal_archive import archive_wal, wal_archiver
+from app.services.retention import run_cleanup
+from app.services.emr_sync import sync_emr
 from app.utils.logger import setup_logging
 from app.api import api_router, web_router
 
@@ -34,7 +49,32 @@ async def lifespan(app: FastAPI):
     init_db()
     logger.info("Database initialized")
     
+    # Build patient search index off the event loop
+    await asyncio.to_thread(patient_search_index.load)
+    slot_index.load()
+    wait_time_estimator.load()
+    queue_load.refresh()
+    
     # Start scheduler
+    if settings.scheduler_leader_election:
+        scheduler.enable_leader_election(lease_seconds=settings.scheduler_lease_seconds)
+    scheduler.add_outbox_job(settings.outbox_dispatch_interval_seconds, outbox_dispatcher.drain)
+    scheduler.add_settlement_job(settings.settlement_hour, settings.settlement_minute, settle_previous_day)
+    scheduler.add_queue_load_job(settings.queue_load_refresh_seconds, queue_load.refresh)
+    scheduler.add_wait_stats_job(settings.wait_stats_persist_seconds, wait_time_estimator.persist)
+    scheduler.add_slot_index_job(settings.slot_index_refresh_seconds, slot_index.load)
+    scheduler.add_patient_search_job(settings.patient_change_poll_seconds, patient_search_index.refresh)
+    scheduler.add_deadline_job(settings.deadline_dispatch_interval_seconds, deadline_dispatcher.dispatch)
+    if settings.backup_enabled:
+        scheduler.add_backup_job(settings.backup_hour, settings.backup_minute, run_daily_backup)
+    scheduler.add_cleanup_job(settings.cleanup_interval_hours, run_cleanup)
+    if settings.emr_push_enabled:
+        emr_push_dispatcher.register(TOPIC_EMR_NOTIFY, emr_pusher.push)
+        scheduler.add_emr_push_job(settings.emr_push_interval_seconds, emr_push_dispatcher.drain)
+    if settings.enable_emr_sync:
+        scheduler.add_emr_sync_job(settings.emr_sync_interval_minutes, sync_emr, executor=EXECUTOR_ASYNCIO)
+    if settings.wal_archive_enabled:
+        scheduler.add_wal_archive_job(settings.wal_archive_interval_seconds, archive_wal)
     scheduler.start()
     logger.info("Scheduler started")
     
@@ -54,7 +94,14 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down Healthcare Kiosk Application...")
+    if settings.wal_archive_enabled and (scheduler.leader is None or scheduler.leader.is_leader):
+        # Ship the tail before the last connection checkpoints and removes the WAL
+        await asyncio.to_thread(wal_archiver.archive)
+        wal_archiver.close()
     scheduler.shutdown()
+    wait_time_estimator.persist()
+    await payment_gateway.close()
+    await emr_client.close()
     logger.info("Application shutdown complete")
 
 
@@ -76,6 +123,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def request_deadline(request: Request, call_next):
+    """Give external calls made for this request a shared deadline"""
+    seconds = settings.request_deadline_seconds
+    try:
+        # Callers with a tighter budget (e.g. the kiosk UI) can pass their own
+        requested = float(request.headers.get("X-Request-Timeout", seconds))
+    except ValueError:
+        requested = seconds
+    # nan would disable the deadline and zero or less would fail every call
+    if math.isfinite(requested):
+        seconds = min(seconds, max(requested, settings.request_deadline_min_seconds))
+    with deadline_scope(seconds):
+        return await call_next(request)
+
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -98,10 +162,13 @@ async def api_root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
+    dependencies = dependency_status()
+    degraded = any(status["state"] != STATE_CLOSED for status in dependencies.values())
     return {
-        "status": "healthy",
+        "status": "degraded" if degraded else "healthy",
         "database": "connected",
-        "scheduler": "running" if scheduler.scheduler.running else "stopped"
+        "scheduler": "running" if scheduler.scheduler.running else "stopped",
+        "dependencies": dependencies
     }
 
 
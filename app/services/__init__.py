@@ -3,9 +3,15 @@
 from .reception import ReceptionService
 from .payment import PaymentService
 from .certificate import CertificateService
+from .booking import BookingService
+from .backup import BackupService
+from .bulk_import import BulkImporter
 
 __all__ = [
     "ReceptionService",
     "PaymentService", 
-    "CertificateService"
+    "CertificateService",
+    "BookingService",
+    "BackupService",
+    "BulkImporter"
 ]
\ No newline at end of file
@@ -0,0 +1,125 @@
+"""Admin full-text search over patients and certificates
+
+Results are ranked by FTS5 ``bm25`` and paginated with a keyset cursor
+``"<score>:<id>"`` taken from the last row of the previous page, so pages
+stay stable while rows change and no page re-reads the rows before it.
+The rank is not indexed, though: bm25 is computed for every match and
+sorted on each request, so a page costs O(matches) whatever its depth.
+
+Rows changed since the last search are indexed by ``refresh`` (blocking
+database work; the endpoint runs it in a worker thread).
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.models import CertificateType
+from app.core.fulltext import build_match_query, is_fulltext_supported, refresh_fulltext
+
+logger = logging.getLogger(__name__)
+
+
+def encode_cursor(score: float, row_id: int) -> str:
+    return f"{score!r}:{row_id}"
+
+
+def decode_cursor(cursor: Optional[str]) -> Tuple[Optional[float], Optional[int]]:
+    if not cursor:
+        return None, None
+    try:
+        score, row_id = cursor.rsplit(":", 1)
+        return float(score), int(row_id)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+class AdminSearchService:
+    """Ranked full-text search for admin staff"""
+
+    def __init__(self, session: Session):
+        self.session = session
+        if not is_fulltext_supported(session.get_bind()):
+            raise ValueError("Full-text search requires SQLite FTS5")
+
+    def refresh(self) -> int:
+        """Index rows changed since the last search, by any writer"""
+        with self.session.get_bind().begin() as conn:
+            return refresh_fulltext(conn)
+
+    def _page(self, inner_sql: str, params: Dict, cursor: Optional[str], limit: int) -> Dict:
+        after_score, after_id = decode_cursor(cursor)
+        keyset = ""
+        if after_score is not None:
+            keyset = "WHERE score > :after_score OR (score = :after_score AND id > :after_id)"
+            params.update(after_score=after_score, after_id=after_id)
+
+        rows = self.session.execute(
+            text(f"SELECT * FROM ({inner_sql}) {keyset} ORDER BY score, id LIMIT :limit"),
+            {**params, "limit": limit + 1}
+        ).mappings().all()
+
+        items = [dict(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor(items[-1]["score"], items[-1]["id"])
+        return {"items": items, "next_cursor": next_cursor}
+
+    def search_certificates(
+        self,
+        query: str,
+        certificate_type: Optional[CertificateType] = None,
+        issued_from: Optional[datetime] = None,
+        issued_to: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = 20
+    ) -> Dict:
+        """Search certificate content and doctor name"""
+        match = build_match_query(query)
+        if not match:
+            raise ValueError("Search query is empty")
+
+        filters: List[str] = []
+        params: Dict = {"match": match}
+        if certificate_type:
+            # Enum columns store the member name
+            filters.append("c.type = :type")
+            params["type"] = certificate_type.name
+        if issued_from:
+            filters.append("c.issued_at >= :issued_from")
+            params["issued_from"] = issued_from
+        if issued_to:
+            filters.append("c.issued_at < :issued_to")
+            params["issued_to"] = issued_to
+
+        inner_sql = (
+            "SELECT c.id AS id, c.patient_id AS patient_id, p.name AS patient_name, "
+            "c.type AS type, c.doctor_name AS doctor_name, c.issued_at AS issued_at, "
+            "substr(c.content, 1, 200) AS excerpt, bm25(certificates_fts) AS score "
+            "FROM certificates_fts "
+            "JOIN certificates c ON c.id = certificates_fts.rowid "
+            "JOIN patients p ON p.id = c.patient_id "
+            "WHERE certificates_fts MATCH :match"
+            + "".join(f" AND {condition}" for condition in filters)
+        )
+        result = self._page(inner_sql, params, cursor, limit)
+        for item in result["items"]:
+            item["type"] = CertificateType[item["type"]].value
+        return result
+
+    def search_patients(self, query: str, cursor: Optional[str] = None, limit: int = 20) -> Dict:
+        """Search patient name and phone"""
+        match = build_match_query(query)
+        if not match:
+            raise ValueError("Search query is empty")
+
+        inner_sql = (
+            "SELECT p.id AS id, p.name AS name, p.birthdate AS birthdate, p.phone AS phone, "
+            "bm25(patients_fts) AS score "
+            "FROM patients_fts JOIN patients p ON p.id = patients_fts.rowid "
+            "WHERE patients_fts MATCH :match"
+        )
+        return self._page(inner_sql, {"match": match}, cursor, limit)
@@ -0,0 +1,278 @@
+"""Online SQLite backup with compression, checksums and retention
+
+The live database is streamed through gzip into ``backup_path``. Each
+archive gets a ``.sha256`` file in ``sha256sum`` format, and archives older
+than ``backup_retention_days`` are pruned (the newest one is always kept).
+
+The copy never takes the database write lock:
+
+* WAL mode - the database is checked and serialized inside one read
+  snapshot and the image goes straight into the gzip writer, so no
+  uncompressed copy is written to disk. Writers keep committing to the
+  WAL while it runs; the image is held in memory until compressed.
+* Rollback-journal mode - the SQLite online backup API copies
+  ``backup_pages_per_step`` pages per step into a temporary file, with a
+  pause between steps so writers can take the lock, and the file is then
+  compressed. SQLite restarts the copy whenever another connection
+  writes, so after ``backup_max_restarts`` restarts the copy is finished
+  in one pass, holding a shared lock for that pass only.
+
+Usage:
+    python -m app.services.backup [backup|list|verify <archive>|restore <archive> <target>]
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional
+
+from sqlalchemy.engine import make_url
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+ARCHIVE_PATTERN = re.compile(r"^kiosk_(\d{8}_\d{6})\.db\.gz$")
+CHUNK_SIZE = 1024 * 1024
+
+
+def sqlite_file_path(database_url: Optional[str] = None) -> Path:
+    """Database file behind a sqlite:/// URL"""
+    url = make_url(database_url or os.getenv("DATABASE_URL", "sqlite:///./kiosk.db"))
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        raise ValueError(f"Online backup needs a file-based SQLite database, got {url.render_as_string()}")
+    return Path(url.database)
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _check(connection: sqlite3.Connection):
+    result = connection.execute("PRAGMA quick_check").fetchone()[0]
+    if result != "ok":
+        raise RuntimeError(f"Backup copy failed integrity check: {result}")
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+class BackupService:
+    """Create, verify, prune and restore compressed database backups"""
+
+    def __init__(
+        self,
+        database_path: Optional[Path] = None,
+        backup_path: Optional[Path] = None,
+        retention_days: Optional[int] = None
+    ):
+        self.database_path = Path(database_path) if database_path else sqlite_file_path()
+        self.backup_path = Path(backup_path or settings.backup_path)
+        self.retention_days = retention_days if retention_days is not None else settings.backup_retention_days
+        self.pages_per_step = settings.backup_pages_per_step
+        self.step_sleep = settings.backup_step_sleep_ms / 1000
+        self.max_restarts = settings.backup_max_restarts
+
+    def _copy_online(self, output: BinaryIO, spill_path: Path) -> Dict:
+        """Write a consistent copy of the live database to ``output``"""
+        started = time.monotonic()
+        restarts = 0
+        last_remaining = None
+        single_pass = False
+
+        def progress(status, remaining, total):
+            nonlocal restarts, last_remaining
+            if last_remaining is not None and remaining > last_remaining:
+                restarts += 1
+            last_remaining = remaining
+            if restarts > self.max_restarts:
+                raise _TooManyRestarts()
+
+        source = sqlite3.connect(self.database_path, timeout=30, isolation_level=None)
+        try:
+            journal_mode = source.execute("PRAGMA journal_mode").fetchone()[0].lower()
+            if journal_mode == "wal":
+                # A reader in WAL mode never blocks writers; check and copy one snapshot
+                source.execute("BEGIN")
+                try:
+                    _check(source)
+                    image = source.serialize()
+                finally:
+                    source.execute("COMMIT")
+                copied_at = time.monotonic()
+                view = memoryview(image)
+                for offset in range(0, len(view), CHUNK_SIZE):
+                    output.write(view[offset:offset + CHUNK_SIZE])
+                database_bytes = len(image)
+            else:
+                target = sqlite3.connect(spill_path)
+                try:
+                    try:
+                        source.backup(target, pages=self.pages_per_step, progress=progress, sleep=self.step_sleep)
+                    except _TooManyRestarts:
+                        single_pass = True
+                        source.backup(target)
+                    _check(target)
+                finally:
+                    target.close()
+                copied_at = time.monotonic()
+                with open(spill_path, "rb") as spill:
+                    shutil.copyfileobj(spill, output, CHUNK_SIZE)
+                database_bytes = spill_path.stat().st_size
+        finally:
+            source.close()
+
+        if restarts:
+            logger.warning(f"Backup restarted {restarts} times because of concurrent writes")
+        return {
+            "journal_mode": journal_mode,
+            "restarts": restarts,
+            "single_pass_fallback": single_pass,
+            "database_bytes": database_bytes,
+            "copy_seconds": round(copied_at - started, 3)
+        }
+
+    def create_backup(self) -> Dict:
+        """Back up, compress, checksum and prune; returns a summary"""
+        started = time.monotonic()
+        self.backup_path.mkdir(parents=True, exist_ok=True)
+        name = f"kiosk_{datetime.now():%Y%m%d_%H%M%S}.db.gz"
+        archive = self.backup_path / name
+        spill_path = self.backup_path / f".{name}.db.partial"
+        partial = self.backup_path / f".{name}.partial"
+
+        try:
+            with open(partial, "wb") as raw:
+                with gzip.GzipFile(filename=self.database_path.name, mode="wb",
+                                   compresslevel=settings.backup_compress_level, fileobj=raw) as compressed:
+                    copy = self._copy_online(compressed, spill_path)
+            checksum = file_sha256(partial)
+            os.replace(partial, archive)
+            (self.backup_path / f"{name}.sha256").write_text(f"{checksum}  {name}\n")
+        finally:
+            spill_path.unlink(missing_ok=True)
+            partial.unlink(missing_ok=True)
+
+        pruned = self.prune()
+        summary = {
+            "archive": str(archive),
+            "sha256": checksum,
+            "archive_bytes": archive.stat().st_size,
+            "total_seconds": round(time.monotonic() - started, 3),
+            "pruned": pruned,
+            **copy
+        }
+        logger.info(f"Backup written to {archive} ({summary['archive_bytes']} bytes, {summary['total_seconds']}s)")
+        return summary
+
+    def list_backups(self) -> List[Dict]:
+        """Archives, newest first"""
+        if not self.backup_path.exists():
+            return []
+        backups = []
+        for path in self.backup_path.iterdir():
+            match = ARCHIVE_PATTERN.match(path.name)
+            if match:
+                backups.append({
+                    "archive": str(path),
+                    "created_at": datetime.strptime(match.group(1), "%Y%m%d_%H%M%S"),
+                    "bytes": path.stat().st_size
+                })
+        return sorted(backups, key=lambda backup: backup["created_at"], reverse=True)
+
+    def prune(self) -> List[str]:
+        """Delete archives past the retention period, keeping the newest"""
+        cutoff = datetime.now() - timedelta(days=self.retention_days)
+        pruned = []
+        for backup in self.list_backups()[1:]:
+            if backup["created_at"] < cutoff:
+                archive = Path(backup["archive"])
+                archive.unlink()
+                Path(f"{archive}.sha256").unlink(missing_ok=True)
+                pruned.append(archive.name)
+        if pruned:
+            logger.info(f"Pruned {len(pruned)} backups older than {self.retention_days} days")
+        return pruned
+
+    @staticmethod
+    def verify(archive: Path) -> str:
+        """Check an archive against its .sha256 file"""
+        archive = Path(archive)
+        checksum_file = Path(f"{archive}.sha256")
+        if not checksum_file.exists():
+            raise ValueError(f"Checksum file missing for {archive.name}")
+        expected = checksum_file.read_text().split()[0]
+        actual = file_sha256(archive)
+        if actual != expected:
+            raise ValueError(f"Checksum mismatch for {archive.name}")
+        return actual
+
+    @classmethod
+    def restore(cls, archive: Path, target: Path) -> Dict:
+        """Verify and decompress an archive into ``target`` (application stopped)"""
+        started = time.monotonic()
+        cls.verify(archive)
+        target = Path(target)
+        partial = target.with_name(f".{target.name}.restore")
+        try:
+            with gzip.open(archive, "rb") as source, open(partial, "wb") as output:
+                shutil.copyfileobj(source, output, CHUNK_SIZE)
+            connection = sqlite3.connect(partial)
+            try:
+                result = connection.execute("PRAGMA quick_check").fetchone()[0]
+            finally:
+                connection.close()
+            if result != "ok":
+                raise ValueError(f"Restored database failed integrity check: {result}")
+            # Stale WAL/journal files would be replayed onto the restored database
+            for suffix in ("-wal", "-shm", "-journal"):
+                Path(f"{target}{suffix}").unlink(missing_ok=True)
+            os.replace(partial, target)
+        finally:
+            partial.unlink(missing_ok=True)
+
+        summary = {"target": str(target), "bytes": target.stat().st_size,
+                   "seconds": round(time.monotonic() - started, 3)}
+        logger.info(f"Restored {archive} to {target} in {summary['seconds']}s")
+        return summary
+
+
+def run_daily_backup() -> Optional[Dict]:
+    """Scheduler entry point (runs in the process pool)"""
+    try:
+        service = BackupService()
+    except ValueError as e:
+        logger.info(f"Skipping backup: {e}")
+        return None
+    return service.create_backup()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else "backup"
+
+    if command == "backup":
+        print(BackupService().create_backup())
+    elif command == "list":
+        for backup in BackupService().list_backups():
+            print(f"{backup['created_at']:%Y-%m-%d %H:%M:%S}  {backup['bytes']:>12}  {backup['archive']}")
+    elif command == "verify" and len(sys.argv) == 3:
+        print(f"OK {BackupService.verify(Path(sys.argv[2]))}")
+    elif command == "restore" and len(sys.argv) == 4:
+        print(BackupService.restore(Path(sys.argv[2]), Path(sys.argv[3])))
+    else:
+        print("Usage: python -m app.services.backup [backup|list|verify <archive>|restore <archive> <target>]")
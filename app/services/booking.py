@@ -0,0 +1,157 @@
+"""Self-service appointment booking against doctor schedules"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlmodel import Session, select, update
+
+from app.core.models import (
+    Appointment, AppointmentSlot, Department, DoctorSchedule, DoctorScheduleCreate
+)
+from app.services.patient_cache import patient_cache
+from app.services.slot_index import FreeSlot, slot_index
+from app.services.outbox import enqueue_event, TOPIC_EMR_NOTIFY
+
+logger = logging.getLogger(__name__)
+
+
+class BookingService:
+    """Handle schedules, slot search and booking"""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def create_schedule(self, data: DoctorScheduleCreate) -> DoctorSchedule:
+        """Create a schedule and its slots"""
+        if data.end_time <= data.start_time:
+            raise ValueError("Schedule must end after it starts")
+
+        schedule = DoctorSchedule(**data.dict())
+        self.session.add(schedule)
+        self.session.flush()
+
+        step = timedelta(minutes=data.slot_minutes)
+        rows = []
+        start = data.start_time
+        while start + step <= data.end_time:
+            rows.append({
+                "schedule_id": schedule.id,
+                "department": data.department.name,
+                "doctor_name": data.doctor_name,
+                "start_time": start,
+                "end_time": start + step,
+                "capacity": data.capacity,
+                "booked": 0
+            })
+            start += step
+        if not rows:
+            self.session.rollback()
+            raise ValueError("Schedule is shorter than one slot")
+        self.session.execute(AppointmentSlot.__table__.insert(), rows)
+        self.session.commit()
+
+        slots = self.session.exec(
+            select(AppointmentSlot).where(AppointmentSlot.schedule_id == schedule.id)
+        ).all()
+        for slot in slots:
+            slot_index.put(slot)
+
+        logger.info(f"Created schedule {schedule.id} for {data.doctor_name} with {len(slots)} slots")
+        return schedule
+
+    def available_slots(
+        self,
+        department: Department,
+        after: Optional[datetime] = None,
+        doctor_name: Optional[str] = None,
+        limit: int = 5
+    ) -> List[FreeSlot]:
+        """Next free slots from the in-memory index"""
+        if not slot_index.is_loaded:
+            return self._query_free_slots(department, after, doctor_name, limit)
+        return slot_index.next_available(department, after, doctor_name, limit)
+
+    def _query_free_slots(
+        self,
+        department: Department,
+        after: Optional[datetime],
+        doctor_name: Optional[str],
+        limit: int
+    ) -> List[FreeSlot]:
+        """Same search on the slot table, while the index is not loaded"""
+        now = datetime.now()
+        query = select(AppointmentSlot).where(
+            AppointmentSlot.department == department,
+            AppointmentSlot.start_time >= max(after or now, now),
+            AppointmentSlot.booked < AppointmentSlot.capacity
+        )
+        if doctor_name:
+            query = query.where(AppointmentSlot.doctor_name == doctor_name)
+        rows = self.session.exec(
+            query.order_by(AppointmentSlot.start_time, AppointmentSlot.id).limit(limit)
+        ).all()
+        return [
+            FreeSlot(
+                row.id, row.department, row.doctor_name, row.start_time, row.end_time,
+                row.capacity - row.booked
+            )
+            for row in rows
+        ]
+
+    def book_slot(self, slot_id: int, patient_id: int, symptoms: Optional[str] = None) -> Appointment:
+        """Book one place in a slot (claimed atomically on the slot counter)"""
+        patient = patient_cache.get(self.session, patient_id)
+        if not patient:
+            raise ValueError(f"Patient with ID {patient_id} not found")
+
+        result = self.session.exec(
+            update(AppointmentSlot)
+            .where(
+                AppointmentSlot.id == slot_id,
+                AppointmentSlot.booked < AppointmentSlot.capacity,
+                AppointmentSlot.start_time > datetime.now()
+            )
+            .values(booked=AppointmentSlot.booked + 1)
+        )
+        if result.rowcount != 1:
+            self.session.rollback()
+            slot = self.session.get(AppointmentSlot, slot_id)
+            if not slot:
+                raise ValueError(f"Slot {slot_id} not found")
+            slot_index.put(slot)
+            raise ValueError(f"Slot {slot_id} is no longer available")
+
+        slot = self.session.get(AppointmentSlot, slot_id)
+        self.session.refresh(slot)
+        appointment = Appointment(
+            patient_id=patient_id,
+            department=slot.department,
+            doctor_name=slot.doctor_name,
+            appointment_time=slot.start_time,
+            symptoms=symptoms,
+            slot_id=slot.id
+        )
+        self.session.add(appointment)
+        self.session.flush()
+        enqueue_event(self.session, TOPIC_EMR_NOTIFY, {
+            "event": "appointment.booked",
+            "appointment_id": appointment.id,
+            "patient_id": patient_id,
+            "department": slot.department.value,
+            "doctor_name": slot.doctor_name,
+            "appointment_time": slot.start_time
+        }, "appointment", appointment.id)
+        self.session.commit()
+        slot_index.put(slot)
+
+        logger.info(f"Booked slot {slot_id} for patient {patient.name} (appointment {appointment.id})")
+        return appointment
+
+    def release_slot(self, slot_id: int):
+        """Give back one place after a cancellation (caller commits)"""
+        self.session.exec(
+            update(AppointmentSlot)
+            .where(AppointmentSlot.id == slot_id, AppointmentSlot.booked > 0)
+            .values(booked=AppointmentSlot.booked - 1)
+        )
@@ -0,0 +1,355 @@
+"""Bulk import of patients and appointments
+
+Streams NDJSON (FHIR Bulk Data ``Patient``/``Appointment`` resources, or
+flat objects) or CSV line by line, validates each batch with
+``PatientCreate``/``AppointmentCreate`` and writes it with one executemany
+``INSERT``. Many batches share one transaction (``import_commit_rows``),
+so a 100k-row load costs a handful of commits instead of one per row.
+
+Source ids are stored as ``emr_id`` and inserts skip ids that already
+exist, so re-running an import is harmless and the later EMR delta sync
+updates the same rows. Appointments refer to patients by source id
+(``Patient/<id>`` in FHIR); the patient must be in the same file, earlier,
+or already in the database. Rows that fail validation are counted and the
+first ``MAX_REPORTED_ERRORS`` are returned with their line numbers.
+
+Usage:
+    python -m app.services.bulk_import Patient.ndjson Appointment.ndjson
+    python -m app.services.bulk_import patients.csv --resource patients
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from app.core.config import get_settings
+from app.core.models import Appointment, AppointmentCreate, AppointmentStatus, Patient, PatientCreate
+from app.services.patient_search import patient_search_index
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+RESOURCE_PATIENTS = "patients"
+RESOURCE_APPOINTMENTS = "appointments"
+FORMAT_NDJSON = "ndjson"
+FORMAT_CSV = "csv"
+MAX_REPORTED_ERRORS = 100
+
+FHIR_APPOINTMENT_STATUS = {
+    "proposed": AppointmentStatus.SCHEDULED,
+    "pending": AppointmentStatus.SCHEDULED,
+    "booked": AppointmentStatus.SCHEDULED,
+    "arrived": AppointmentStatus.CHECKED_IN,
+    "checked-in": AppointmentStatus.CHECKED_IN,
+    "fulfilled": AppointmentStatus.COMPLETED,
+    "cancelled": AppointmentStatus.CANCELLED,
+    "noshow": AppointmentStatus.CANCELLED
+}
+
+
+def detect_format(path: Path) -> str:
+    suffixes = [suffix.lower() for suffix in path.suffixes if suffix.lower() != ".gz"]
+    if suffixes and suffixes[-1] in (".ndjson", ".jsonl", ".json"):
+        return FORMAT_NDJSON
+    if suffixes and suffixes[-1] == ".csv":
+        return FORMAT_CSV
+    raise ValueError(f"Cannot tell the format of {path.name}; use ndjson or csv")
+
+
+def _fhir_patient(resource: Dict) -> Dict:
+    name = (resource.get("name") or [{}])[0]
+    telecom = {
+        entry.get("system"): entry.get("value")
+        for entry in reversed(resource.get("telecom") or [])
+    }
+    return {
+        "id": resource.get("id"),
+        # Korean names are written family + given without a space
+        "name": name.get("text") or (name.get("family", "") + "".join(name.get("given", []))),
+        "birthdate": resource.get("birthDate"),
+        "phone": telecom.get("phone"),
+        "email": telecom.get("email")
+    }
+
+
+def _fhir_appointment(resource: Dict) -> Dict:
+    row = {
+        "id": resource.get("id"),
+        "appointment_time": resource.get("start"),
+        "symptoms": resource.get("description"),
+        "status": resource.get("status")
+    }
+    for participant in resource.get("participant") or []:
+        actor = participant.get("actor") or {}
+        kind, _, reference = (actor.get("reference") or "").partition("/")
+        if kind == "Patient":
+            row["patient_id"] = reference
+        elif kind == "Practitioner":
+            row["doctor_name"] = actor.get("display")
+    for concept in (resource.get("serviceType") or []) + (resource.get("specialty") or []):
+        codings = concept.get("coding") or [{}]
+        if codings[0].get("code"):
+            row["department"] = codings[0]["code"]
+            break
+    return row
+
+
+def _blank_to_none(row: Dict) -> Dict:
+    return {key: (value if value != "" else None) for key, value in row.items()}
+
+
+class BulkImporter:
+    """Validate and insert patient/appointment files in large batches"""
+
+    def __init__(
+        self,
+        engine: Optional[Engine] = None,
+        batch_size: Optional[int] = None,
+        commit_rows: Optional[int] = None
+    ):
+        self._engine = engine
+        self.batch_size = batch_size or settings.import_batch_size
+        self.commit_rows = commit_rows or settings.import_commit_rows
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            from app.core.database import engine
+            self._engine = engine
+        return self._engine
+
+    def import_file(self, path, fmt: Optional[str] = None, resource: Optional[str] = None) -> Dict:
+        path = Path(path)
+        opener = gzip.open if path.suffix.lower() == ".gz" else open
+        with opener(path, "rt", encoding="utf-8-sig", newline="") as stream:
+            return self.import_stream(stream, fmt or detect_format(path), resource)
+
+    def _records(self, stream: TextIO, fmt: str, resource: Optional[str]) -> Iterator[Tuple[int, str, Dict]]:
+        """Yield (line number, resource, flat record); unparseable lines carry an error"""
+        if fmt == FORMAT_CSV:
+            if resource not in (RESOURCE_PATIENTS, RESOURCE_APPOINTMENTS):
+                raise ValueError("CSV imports need resource=patients or resource=appointments")
+            for line, row in enumerate(csv.DictReader(stream), start=2):
+                yield line, resource, _blank_to_none(row)
+            return
+        if fmt != FORMAT_NDJSON:
+            raise ValueError(f"Unsupported import format: {fmt}")
+
+        for line, text in enumerate(stream, start=1):
+            if not text.strip():
+                continue
+            try:
+                record = json.loads(text)
+            except ValueError as e:
+                yield line, None, {"error": f"invalid JSON: {e}"}
+                continue
+            resource_type = record.get("resourceType") if isinstance(record, dict) else None
+            if resource_type == "Patient":
+                yield line, RESOURCE_PATIENTS, _fhir_patient(record)
+            elif resource_type == "Appointment":
+                yield line, RESOURCE_APPOINTMENTS, _fhir_appointment(record)
+            elif resource_type is None and resource:
+                yield line, resource, record
+            else:
+                yield line, None, {"error": f"unsupported resource {resource_type!r}"}
+
+    def import_stream(self, stream: TextIO, fmt: str, resource: Optional[str] = None) -> Dict:
+        """Import one file-like object; returns counts, rejected rows and timing"""
+        started = time.monotonic()
+        summary = {
+            RESOURCE_PATIENTS: 0, RESOURCE_APPOINTMENTS: 0,
+            "skipped": 0, "rejected": 0, "errors": []
+        }
+        pending: Dict[str, List[Tuple[int, Dict]]] = {RESOURCE_PATIENTS: [], RESOURCE_APPOINTMENTS: []}
+        patient_ids: Dict[str, int] = {}
+        uncommitted = 0
+
+        def reject(line: int, error: str):
+            summary["rejected"] += 1
+            if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                summary["errors"].append({"line": line, "error": error})
+
+        with Session(self.engine) as session:
+            def flush(kind: str):
+                nonlocal uncommitted
+                batch, pending[kind] = pending[kind], []
+                if not batch:
+                    return
+                if kind == RESOURCE_APPOINTMENTS:
+                    # Appointments may refer to patients still waiting in their own batch
+                    flush(RESOURCE_PATIENTS)
+                    inserted, skipped = self._insert_appointments(session, batch, patient_ids, reject)
+                else:
+                    inserted, skipped = self._insert_patients(session, batch, patient_ids, reject)
+                summary[kind] += inserted
+                summary["skipped"] += skipped
+                uncommitted += len(batch)
+                if uncommitted >= self.commit_rows:
+                    session.commit()
+                    uncommitted = 0
+
+            for line, kind, record in self._records(stream, fmt, resource):
+                if kind is None:
+                    reject(line, record["error"])
+                    continue
+                pending[kind].append((line, record))
+                if len(pending[kind]) >= self.batch_size:
+                    flush(kind)
+            flush(RESOURCE_APPOINTMENTS)
+            flush(RESOURCE_PATIENTS)
+            session.commit()
+
+        # Core inserts bypass the ORM events that keep the search index current
+        if summary[RESOURCE_PATIENTS] and patient_search_index._loaded:
+            patient_search_index.load()
+
+        summary["errors"].sort(key=lambda error: error["line"])
+        summary["seconds"] = round(time.monotonic() - started, 3)
+        total = summary[RESOURCE_PATIENTS] + summary[RESOURCE_APPOINTMENTS]
+        summary["rows_per_minute"] = int(total / summary["seconds"] * 60) if summary["seconds"] else total
+        logger.info(
+            f"Bulk import: {summary[RESOURCE_PATIENTS]} patients, {summary[RESOURCE_APPOINTMENTS]} appointments, "
+            f"{summary['skipped']} skipped, {summary['rejected']} rejected in {summary['seconds']}s"
+        )
+        return summary
+
+    def _existing_ids(self, session: Session, model, emr_ids: Iterable[str]) -> Dict[str, int]:
+        emr_ids = list(emr_ids)
+        found: Dict[str, int] = {}
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(emr_ids), 10000):
+            found.update(session.exec(
+                select(model.emr_id, model.id).where(model.emr_id.in_(emr_ids[start:start + 10000]))
+            ).all())
+        return found
+
+    def _insert_patients(self, session: Session, batch, patient_ids: Dict[str, int], reject) -> Tuple[int, int]:
+        now = datetime.utcnow()
+        rows, seen = [], set()
+        for line, record in batch:
+            emr_id = record.get("id")
+            try:
+                patient = PatientCreate(
+                    name=record.get("name"),
+                    birthdate=_birthdate(record.get("birthdate")),
+                    phone=record.get("phone"),
+                    email=record.get("email"),
+                    card_uid=record.get("card_uid")
+                )
+            except ValidationError as e:
+                reject(line, _describe(e))
+                continue
+            if emr_id is not None:
+                emr_id = str(emr_id)
+                if emr_id in seen:
+                    reject(line, f"duplicate patient id {emr_id}")
+                    continue
+                seen.add(emr_id)
+            rows.append({
+                "name": patient.name, "birthdate": patient.birthdate, "phone": patient.phone,
+                "email": patient.email, "card_uid": patient.card_uid,
+                "emr_id": emr_id, "created_at": now, "updated_at": now
+            })
+
+        existing = self._existing_ids(session, Patient, seen)
+        patient_ids.update(existing)
+        new_rows = [row for row in rows if row["emr_id"] not in existing]
+        if new_rows:
+            session.execute(Patient.__table__.insert(), new_rows)
+            patient_ids.update(self._existing_ids(session, Patient, seen - existing.keys()))
+        return len(new_rows), len(rows) - len(new_rows)
+
+    def _insert_appointments(self, session: Session, batch, patient_ids: Dict[str, int], reject) -> Tuple[int, int]:
+        now = datetime.utcnow()
+        references = {str(record.get("patient_id")) for _, record in batch if record.get("patient_id") is not None}
+        patient_ids.update(self._existing_ids(session, Patient, references - patient_ids.keys()))
+
+        rows, seen = [], set()
+        for line, record in batch:
+            reference = record.get("patient_id")
+            if reference is None or str(reference) not in patient_ids:
+                reject(line, f"unknown patient {reference}")
+                continue
+            try:
+                appointment = AppointmentCreate(
+                    patient_id=patient_ids[str(reference)],
+                    department=str(record.get("department") or "").lower(),
+                    doctor_name=record.get("doctor_name"),
+                    appointment_time=record.get("appointment_time"),
+                    symptoms=record.get("symptoms")
+                )
+                status = _status(record.get("status"))
+            except (ValidationError, ValueError) as e:
+                reject(line, _describe(e))
+                continue
+            emr_id = record.get("id")
+            if emr_id is not None:
+                emr_id = str(emr_id)
+                if emr_id in seen:
+                    reject(line, f"duplicate appointment id {emr_id}")
+                    continue
+                seen.add(emr_id)
+            rows.append({
+                "patient_id": appointment.patient_id, "department": appointment.department,
+                "doctor_name": appointment.doctor_name, "appointment_time": appointment.appointment_time,
+                "symptoms": appointment.symptoms, "status": status, "emr_id": emr_id, "created_at": now
+            })
+
+        existing = self._existing_ids(session, Appointment, seen)
+        new_rows = [row for row in rows if row["emr_id"] not in existing]
+        if new_rows:
+            session.execute(Appointment.__table__.insert(), new_rows)
+        return len(new_rows), len(rows) - len(new_rows)
+
+
+def _birthdate(value):
+    # FHIR birthDate and most CSV exports carry a bare date
+    if isinstance(value, str) and len(value) == 10:
+        return f"{value}T00:00:00"
+    return value
+
+
+def _status(value: Optional[str]) -> AppointmentStatus:
+    if not value:
+        return AppointmentStatus.SCHEDULED
+    value = value.lower()
+    if value in FHIR_APPOINTMENT_STATUS:
+        return FHIR_APPOINTMENT_STATUS[value]
+    return AppointmentStatus(value)
+
+
+def _describe(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()
+        )
+    return str(error)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Bulk import patients and appointments")
+    parser.add_argument("files", nargs="+", help="NDJSON or CSV files (optionally .gz), imported in order")
+    parser.add_argument("--format", choices=[FORMAT_NDJSON, FORMAT_CSV], default=None)
+    parser.add_argument("--resource", choices=[RESOURCE_PATIENTS, RESOURCE_APPOINTMENTS], default=None)
+    args = parser.parse_args()
+
+    # Same setup as the application: tables, full-text index and its triggers
+    from app.core.database import init_db
+    init_db()
+    importer = BulkImporter()
+    for file in args.files:
+        result = importer.import_file(file, args.format, args.resource)
+        for error in result.pop("errors"):
+            print(f"{file}:{error['line']}: {error['error']}")
+        print(f"{file}: {result}")
@@ -0,0 +1,114 @@
+"""Priority call-next queue per department
+
+Waiting appointments are ordered by ``(tier, check-in time - class boost,
+queue number)``: emergencies form their own tier, and the other classes get
+a head start of ``PRIORITY_BOOST_MINUTES``. Because every waiting patient
+ages at the same rate, a walk-in who has waited long enough is called
+before a later priority patient.
+
+The order is read from the database on every call, so check-ins and calls
+made by other workers are always seen. Within one class the key follows
+check-in time, so the next patient is the best of each class's earliest
+waiting appointment: one ``LIMIT 1`` seek per class on
+``ix_appointments_call_queue`` (department, status, priority, waiting
+since, queue number), with no sort. Rows without a priority (checked in
+before priorities existed, or imported) are a class of their own for the
+query and rank as walk-ins. The caller claims the appointment with a
+conditional UPDATE and asks again if another worker was faster.
+"""
+
+import logging
+from datetime import date, datetime
+from typing import Optional, Tuple
+
+from sqlmodel import Session, select
+
+from app.core.models import Appointment, AppointmentStatus, Department, QueuePriority, waiting_since
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PRIORITY_BOOST_MINUTES = {
+    QueuePriority.PRIORITY: 30,
+    QueuePriority.RESERVED: 15,
+    QueuePriority.WALK_IN: 0,
+}
+
+
+def assign_priority(
+    department: Department,
+    birthdate: Optional[datetime],
+    reserved: bool,
+    needs_assistance: bool = False
+) -> QueuePriority:
+    """Queue class for a check-in"""
+    if department == Department.EMERGENCY:
+        return QueuePriority.EMERGENCY
+    if needs_assistance:
+        return QueuePriority.PRIORITY
+    if birthdate:
+        today = date.today()
+        age = today.year - birthdate.year - ((today.month, today.day) < (birthdate.month, birthdate.day))
+        if age >= settings.elderly_age:
+            return QueuePriority.PRIORITY
+    return QueuePriority.RESERVED if reserved else QueuePriority.WALK_IN
+
+
+def queue_key(
+    priority: Optional[QueuePriority],
+    checked_in_at: datetime,
+    queue_number: Optional[int]
+) -> Tuple[int, float, int]:
+    priority = priority or QueuePriority.WALK_IN
+    if priority == QueuePriority.EMERGENCY:
+        return 0, checked_in_at.timestamp(), queue_number or 0
+    boost = PRIORITY_BOOST_MINUTES[priority] * 60
+    return 1, checked_in_at.timestamp() - boost, queue_number or 0
+
+
+class CallQueue:
+    """Next waiting appointment of a department, read from the database"""
+
+    def _class_head(self, session: Session, department: Department, priority: Optional[QueuePriority]):
+        """Earliest waiting appointment of one priority class (None: no priority)"""
+        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        # Check-in times are UTC and appointment times local: seek from the
+        # earlier of both midnights, then filter on the appointment day
+        seek_from = min(today_start, today_start + (datetime.utcnow() - datetime.now()))
+        since = waiting_since()
+        in_class = Appointment.priority.is_(None) if priority is None else Appointment.priority == priority
+        return session.exec(
+            select(
+                Appointment.id,
+                Appointment.checked_in_at,
+                Appointment.appointment_time,
+                Appointment.queue_number
+            )
+            .where(
+                Appointment.department == department,
+                Appointment.status == AppointmentStatus.CHECKED_IN,
+                in_class,
+                since >= seek_from,
+                Appointment.appointment_time >= today_start
+            )
+            .order_by(since, Appointment.queue_number)
+            .limit(1)
+        ).first()
+
+    def next_waiting(self, session: Session, department: Department) -> Optional[int]:
+        """Id of the appointment to call next (not claimed yet)"""
+        best: Optional[Tuple[Tuple[int, float, int], int]] = None
+        for priority in (*QueuePriority, None):
+            head = self._class_head(session, department, priority)
+            if head is None:
+                continue
+            appointment_id, checked_in_at, appointment_time, queue_number = head
+            key = queue_key(priority, checked_in_at or appointment_time, queue_number)
+            if best is None or key < best[0]:
+                best = (key, appointment_id)
+        return best[1] if best else None
+
+
+# Global call queue instance
+call_queue = CallQueue()
@@ -19,7 +19,9 @@ from app.core.models import (
     Payment, PaymentMethod
 )
 from app.core.config import CERTIFICATE_TEMPLATES, get_settings
+from app.services.outbox import enqueue_event, TOPIC_EMR_NOTIFY
 from app.services.payment import PaymentService
+from app.services.patient_cache import patient_cache
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -46,21 +48,21 @@ class CertificateService:
         except Exception as e:
             logger.error(f"Failed to register Korean font: {e}")
     
-    def issue_certificate(
+    async def issue_certificate(
         self,
         certificate_data: CertificateCreate,
         payment_info: Optional[Dict] = None
     ) -> Certificate:
         """Issue new certificate"""
         # Verify patient
-        patient = self.session.get(Patient, certificate_data.patient_id)
+        patient = patient_cache.get(self.session, certificate_data.patient_id)
         if not patient:
             raise ValueError(f"Patient with ID {certificate_data.patient_id} not found")
         
         # Process payment if required
         if payment_info:
             payment_service = PaymentService(self.session)
-            payment = payment_service.process_payment(
+            payment = await payment_service.process_payment(
                 patient_id=certificate_data.patient_id,
                 amount=self._get_certificate_fee(certificate_data.type),
                 method=PaymentMethod(payment_info["method"]),
@@ -71,6 +73,15 @@ class CertificateService:
         # Create certificate record
         certificate = Certificate(**certificate_data.dict())
         self.session.add(certificate)
+        self.session.flush()
+        enqueue_event(self.session, TOPIC_EMR_NOTIFY, {
+            "event": "certificate.issued",
+            "certificate_id": certificate.id,
+            "patient_id": certificate.patient_id,
+            "type": certificate.type.value,
+            "doctor_name": certificate.doctor_name,
+            "issued_at": certificate.issued_at
+        }, "certificate", certificate.id)
         self.session.commit()
         self.session.refresh(certificate)
         
@@ -225,7 +236,7 @@ class CertificateService:
         if not certificate:
             raise ValueError(f"Certificate {certificate_id} not found")
         
-        patient = self.session.get(Patient, certificate.patient_id)
+        patient = patient_cache.get(self.session, certificate.patient_id)
         if not patient:
             raise ValueError(f"Patient not found for certificate {certificate_id}")
         
@@ -0,0 +1,127 @@
+"""Batched push of kiosk events to the hospital EMR
+
+Check-ins, bookings, payments and issued certificates are written to the
+``emr.notify`` outbox topic in the same transaction as the row they
+describe, so no kiosk request waits on the EMR. A dedicated
+``OutboxDispatcher`` owns that topic and runs as its own scheduler job:
+a slow or unreachable EMR then cannot delay queue displays or ticket
+printing on the main outbox. Each run drains pending events in batches of
+``emr_push_batch_size``, one EMR request per batch, at least every
+``emr_push_interval_seconds``.
+
+Delivery is at-least-once, so every event carries a stable ``key`` (event
+name and row id) the EMR uses to discard redeliveries. The EMR answers per
+key: accepted and duplicate events are done, rejected ones fail without
+retries, and anything else is retried with the outbox backoff.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from app.core.config import get_settings
+from app.core.models import Appointment, Patient
+from app.integrations.emr_client import EmrClient, EmrError, emr_client
+from app.services.outbox import OutboxDispatcher, RejectedEvent
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Row id identifying each event type, most specific first
+KEY_FIELDS = ("certificate_id", "payment_id", "appointment_id")
+
+
+def event_key(payload: Dict) -> str:
+    for field in KEY_FIELDS:
+        if payload.get(field) is not None:
+            return f"{payload['event']}:{payload[field]}"
+    raise ValueError(f"EMR event without row id: {payload.get('event')}")
+
+
+class EmrPusher:
+    """Outbox handler sending ``emr.notify`` batches to the EMR"""
+
+    def __init__(self, engine: Optional[Engine] = None, client: Optional[EmrClient] = None):
+        self._engine = engine
+        self.client = client or emr_client
+        self.stats = {
+            "batches": 0, "accepted": 0, "duplicates": 0, "rejected": 0, "errors": 0,
+            "last_batch_seconds": None, "last_success_at": None, "last_error": None
+        }
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            from app.core.database import engine
+            self._engine = engine
+        return self._engine
+
+    def _prepare(self, payloads: List[Dict]) -> List[Dict]:
+        """Add event keys and the EMR's own patient/appointment ids"""
+        patient_ids = {p["patient_id"] for p in payloads if p.get("patient_id")}
+        appointment_ids = {p["appointment_id"] for p in payloads if p.get("appointment_id")}
+        with Session(self.engine) as session:
+            patients = dict(session.exec(
+                select(Patient.id, Patient.emr_id).where(Patient.id.in_(patient_ids))
+            ).all()) if patient_ids else {}
+            appointments = dict(session.exec(
+                select(Appointment.id, Appointment.emr_id).where(Appointment.id.in_(appointment_ids))
+            ).all()) if appointment_ids else {}
+
+        return [
+            {
+                **payload,
+                "key": event_key(payload),
+                "terminal_id": settings.kiosk_terminal_id,
+                "patient_emr_id": patients.get(payload.get("patient_id")),
+                "appointment_emr_id": appointments.get(payload.get("appointment_id"))
+            }
+            for payload in payloads
+        ]
+
+    async def push(self, payloads: List[Dict]) -> List[Optional[Exception]]:
+        """Send one batch; returns the delivery outcome of each payload"""
+        events = await asyncio.to_thread(self._prepare, payloads)
+        started = time.monotonic()
+        try:
+            results = await self.client.push_events(events)
+        except EmrError as e:
+            self.stats["errors"] += 1
+            self.stats["last_error"] = str(e)
+            raise
+
+        by_key = {result.get("key"): result for result in results}
+        outcomes: List[Optional[Exception]] = []
+        for event in events:
+            result = by_key.get(event["key"]) or {}
+            status = result.get("status")
+            if status == "accepted":
+                self.stats["accepted"] += 1
+                outcomes.append(None)
+            elif status == "duplicate":
+                self.stats["duplicates"] += 1
+                outcomes.append(None)
+            elif status == "rejected":
+                self.stats["rejected"] += 1
+                logger.warning(f"EMR rejected event {event['key']}: {result.get('error')}")
+                outcomes.append(RejectedEvent(result.get("error") or "Rejected by EMR"))
+            else:
+                outcomes.append(EmrError(f"No EMR result for {event['key']}"))
+
+        self.stats["batches"] += 1
+        self.stats["last_batch_seconds"] = round(time.monotonic() - started, 3)
+        self.stats["last_success_at"] = datetime.utcnow().isoformat()
+        return outcomes
+
+    def snapshot(self) -> Dict:
+        return dict(self.stats)
+
+
+# Global EMR push instances; main registers the handler when emr_push_enabled
+emr_pusher = EmrPusher()
+emr_push_dispatcher = OutboxDispatcher(batch_size=settings.emr_push_batch_size)
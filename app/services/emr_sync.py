@@ -0,0 +1,363 @@
+"""Incremental EMR delta sync
+
+Each cycle pulls patients, then appointments, changed since the stored
+watermark (``sync_watermarks``, EMR clock). Page 1 fixes the window's
+upper bound (``as_of``); the remaining pages are fetched concurrently,
+a window of ``max_concurrency`` pages at a time, and upserted as they arrive,
+keyed on ``emr_id``, in one multi-row ``INSERT ... ON CONFLICT DO UPDATE``
+per page. The watermark moves to ``as_of`` only after every page has been
+stored. A failed cycle is simply repeated from the old watermark, because
+the upserts are idempotent.
+
+Appointments whose patient is not stored yet have it fetched by id, a
+``max_concurrency`` chunk at a time. If a lookup fails, the appointments
+watermark stays where it was so the next cycle retries them; only a patient
+the EMR answers 404 for is skipped for good.
+
+Kiosk-side progress wins over the EMR: an appointment that is already
+checked in, in progress or completed keeps its local status. A patient
+registered at the kiosk (no ``emr_id``) is linked to the EMR record with
+the same name, birthdate and phone instead of being inserted twice.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import case
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select, update
+
+from app.core.config import get_settings
+from app.core.models import Appointment, AppointmentStatus, Patient, SyncWatermark, phone_digits
+from app.integrations.emr_client import EmrClient, EmrError, emr_client
+from app.services.patient_cache import normalize_phone, patient_cache
+from app.services.patient_search import patient_search_index
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+RESOURCE_PATIENTS = "patients"
+RESOURCE_APPOINTMENTS = "appointments"
+
+
+def _upsert(session: Session, model, rows: List[Dict], update_set) -> Dict[str, int]:
+    """Insert or update rows by emr_id; returns emr_id -> local id"""
+    table = model.__table__
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    statement = insert(table).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.emr_id],
+        set_=update_set(table, statement.excluded)
+    ).returning(table.c.id, table.c.emr_id)
+    return {emr_id: local_id for local_id, emr_id in session.execute(statement)}
+
+
+def _link_local_patients(session: Session, rows: List[Dict]) -> int:
+    """Give unlinked local patients the emr_id of their EMR record
+
+    A patient registered at the kiosk has no emr_id yet. An EMR record with
+    the same name, birthdate and phone is the same person, so the row is
+    linked and the upsert then updates it instead of inserting a duplicate.
+    A match that is not one-to-one is left alone. Returns rows linked.
+    """
+    known = set(session.exec(
+        select(Patient.emr_id).where(Patient.emr_id.in_([row["emr_id"] for row in rows]))
+    ).all())
+    new_rows = [row for row in rows if row["emr_id"] not in known]
+    if not new_rows:
+        return 0
+
+    def key(name: str, birthdate: datetime, phone: str) -> Tuple[str, date, str]:
+        return name, birthdate.date(), normalize_phone(phone)
+
+    candidates: Dict[Tuple[str, date, str], List[int]] = {}
+    for local_id, name, birthdate, phone in session.exec(
+        select(Patient.id, Patient.name, Patient.birthdate, Patient.phone).where(
+            Patient.emr_id.is_(None),
+            phone_digits(Patient.phone).in_({normalize_phone(row["phone"]) for row in new_rows})
+        )
+    ).all():
+        candidates.setdefault(key(name, birthdate, phone), []).append(local_id)
+
+    by_key: Dict[Tuple[str, date, str], List[Dict]] = {}
+    for row in new_rows:
+        by_key.setdefault(key(row["name"], row["birthdate"], row["phone"]), []).append(row)
+
+    linked = 0
+    for match_key, matched_rows in by_key.items():
+        local_ids = candidates.get(match_key, [])
+        if len(local_ids) != 1 or len(matched_rows) != 1:
+            if local_ids:
+                logger.warning(
+                    f"Not linking EMR patients {[row['emr_id'] for row in matched_rows]}: "
+                    f"{len(local_ids)} local patients match"
+                )
+            continue
+        session.exec(
+            update(Patient)
+            .where(Patient.id == local_ids[0], Patient.emr_id.is_(None))
+            .values(emr_id=matched_rows[0]["emr_id"])
+        )
+        linked += 1
+    if linked:
+        logger.info(f"Linked {linked} kiosk-registered patients to EMR records")
+    return linked
+
+
+def _patient_updates(table, excluded) -> Dict:
+    return {
+        "name": excluded.name,
+        "birthdate": excluded.birthdate,
+        "phone": excluded.phone,
+        "email": excluded.email,
+        "updated_at": excluded.updated_at
+    }
+
+
+def _appointment_updates(table, excluded) -> Dict:
+    return {
+        "department": excluded.department,
+        "doctor_name": excluded.doctor_name,
+        "appointment_time": excluded.appointment_time,
+        "status": case(
+            (table.c.status == AppointmentStatus.SCHEDULED.name, excluded.status),
+            else_=table.c.status
+        )
+    }
+
+
+class EmrSyncService:
+    """Pull EMR changes into the local database"""
+
+    def __init__(
+        self,
+        engine: Optional[Engine] = None,
+        client: Optional[EmrClient] = None,
+        page_size: Optional[int] = None,
+        batch_size: int = 500
+    ):
+        self._engine = engine
+        self.client = client or emr_client
+        self.page_size = page_size or settings.emr_sync_page_size
+        # SQLite allows 32766 bound parameters per statement
+        self.batch_size = batch_size
+        self._lock: Optional[asyncio.Lock] = None
+        self.last_result: Optional[Dict] = None
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            from app.core.database import engine
+            self._engine = engine
+        return self._engine
+
+    def watermarks(self) -> Dict[str, Optional[datetime]]:
+        with Session(self.engine) as session:
+            rows = session.exec(select(SyncWatermark)).all()
+        return {row.resource: row.watermark for row in rows}
+
+    async def sync(self) -> Dict:
+        """Run one delta cycle for every resource"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            started = time.monotonic()
+            watermarks = await asyncio.to_thread(self.watermarks)
+            result = {
+                RESOURCE_PATIENTS: await self._pull(
+                    RESOURCE_PATIENTS, watermarks.get(RESOURCE_PATIENTS), self._store_patient_page
+                ),
+                RESOURCE_APPOINTMENTS: await self._pull(
+                    RESOURCE_APPOINTMENTS, watermarks.get(RESOURCE_APPOINTMENTS), self._store_appointment_page
+                )
+            }
+            result["seconds"] = round(time.monotonic() - started, 3)
+            self.last_result = {**result, "finished_at": datetime.utcnow().isoformat()}
+            logger.info(f"EMR sync finished: {result}")
+            return result
+
+    async def _pull(self, resource: str, since: Optional[datetime], store) -> Dict:
+        """Fetch every page of one change feed and store it page by page"""
+        first = await self.client.fetch_changes(resource, since, page=1, page_size=self.page_size)
+        as_of = datetime.fromisoformat(first["as_of"])
+        pages = max(1, math.ceil(first["total"] / self.page_size))
+
+        stored, unresolved = await store(first["items"])
+        # A sliding window keeps pages in flight (and in memory) within the client's limits
+        window = max(1, self.client.max_concurrency)
+        fetches: Set[asyncio.Future] = set()
+        next_page = 2
+        try:
+            while next_page <= pages or fetches:
+                while next_page <= pages and len(fetches) < window:
+                    fetches.add(asyncio.ensure_future(
+                        self.client.fetch_changes(resource, since, as_of, page=next_page, page_size=self.page_size)
+                    ))
+                    next_page += 1
+                done, fetches = await asyncio.wait(fetches, return_when=asyncio.FIRST_COMPLETED)
+                for fetch in done:
+                    page_stored, page_unresolved = await store(fetch.result()["items"])
+                    stored += page_stored
+                    unresolved += page_unresolved
+        except BaseException:
+            for fetch in fetches:
+                fetch.cancel()
+            raise
+
+        if unresolved:
+            # The next cycle pulls the same window again and retries them
+            logger.warning(f"EMR {resource} watermark kept: {unresolved} records wait for their patient")
+            watermark = since
+        else:
+            await asyncio.to_thread(self._save_watermark, resource, as_of, first["total"])
+            watermark = as_of
+        return {
+            "changed": first["total"],
+            "stored": stored,
+            "unresolved": unresolved,
+            "pages": pages,
+            "watermark": watermark.isoformat() if watermark else None
+        }
+
+    def _save_watermark(self, resource: str, watermark: datetime, count: int):
+        with Session(self.engine) as session:
+            row = session.get(SyncWatermark, resource) or SyncWatermark(resource=resource, watermark=watermark)
+            row.watermark = watermark
+            row.last_count = count
+            row.updated_at = datetime.utcnow()
+            session.add(row)
+            session.commit()
+
+    def _batches(self, items: List[Dict]) -> Iterable[List[Dict]]:
+        for start in range(0, len(items), self.batch_size):
+            yield items[start:start + self.batch_size]
+
+    @staticmethod
+    def _patient_row(item: Dict, now: datetime) -> Dict:
+        return {
+            "emr_id": item["id"],
+            "name": item["name"],
+            "birthdate": datetime.fromisoformat(item["birthdate"]),
+            "phone": item["phone"],
+            "email": item.get("email"),
+            "created_at": now,
+            "updated_at": now
+        }
+
+    async def _store_patient_page(self, items: List[Dict]) -> Tuple[int, int]:
+        """Store one page; returns stored and unresolved counts"""
+        return await asyncio.to_thread(self._store_patients, items), 0
+
+    async def _store_appointment_page(self, items: List[Dict]) -> Tuple[int, int]:
+        stored, orphans = await asyncio.to_thread(self._store_appointments, items)
+        if not orphans:
+            return stored, 0
+
+        # Appointments for patients the feed has not delivered yet. Lookups go
+        # out in chunks the client semaphore admits at once, so they never pile
+        # up against the emr bulkhead.
+        emr_ids = sorted({item["patient_id"] for item in orphans})
+        patients: List[Dict] = []
+        missing: Set[str] = set()
+        chunk_size = max(1, self.client.max_concurrency)
+        for start in range(0, len(emr_ids), chunk_size):
+            chunk = emr_ids[start:start + chunk_size]
+            results = await asyncio.gather(
+                *(self.client.fetch_one(RESOURCE_PATIENTS, emr_id) for emr_id in chunk),
+                return_exceptions=True
+            )
+            for emr_id, result in zip(chunk, results):
+                if isinstance(result, dict):
+                    patients.append(result)
+                elif isinstance(result, EmrError) and result.status_code == 404:
+                    missing.add(emr_id)
+                elif isinstance(result, Exception):
+                    logger.warning(f"EMR patient {emr_id} lookup failed: {result}")
+                else:
+                    raise result
+
+        if patients:
+            await asyncio.to_thread(self._store_patients, patients)
+        retried, orphans = await asyncio.to_thread(self._store_appointments, orphans)
+        unresolved = 0
+        for item in orphans:
+            if item["patient_id"] in missing:
+                logger.warning(f"EMR appointment {item['id']} skipped: patient {item['patient_id']} unknown to the EMR")
+            else:
+                unresolved += 1
+        return stored + retried, unresolved
+
+    def _store_patients(self, items: List[Dict]) -> int:
+        if not items:
+            return 0
+        now = datetime.utcnow()
+        rows = [self._patient_row(item, now) for item in items]
+        with Session(self.engine) as session:
+            ids: Dict[str, int] = {}
+            for batch in self._batches(rows):
+                _link_local_patients(session, batch)
+                ids.update(_upsert(session, Patient, batch, _patient_updates))
+            session.commit()
+
+        # Core statements bypass the ORM events that keep these in step
+        for row in rows:
+            local_id = ids[row["emr_id"]]
+            patient_cache.invalidate(local_id)
+            if patient_search_index._loaded:
+                patient_search_index.add(local_id, row["name"], row["phone"], row["birthdate"])
+        return len(rows)
+
+    def _store_appointments(self, items: List[Dict]) -> Tuple[int, List[Dict]]:
+        """Upsert appointments; returns the count and those whose patient is unknown"""
+        if not items:
+            return 0, []
+        now = datetime.utcnow()
+        with Session(self.engine) as session:
+            patient_ids = dict(session.exec(
+                select(Patient.emr_id, Patient.id).where(
+                    Patient.emr_id.in_({item["patient_id"] for item in items})
+                )
+            ).all())
+
+            rows, orphans = [], []
+            for item in items:
+                if item["patient_id"] not in patient_ids:
+                    orphans.append(item)
+                    continue
+                rows.append({
+                    "emr_id": item["id"],
+                    "patient_id": patient_ids[item["patient_id"]],
+                    "department": item["department"],
+                    "doctor_name": item.get("doctor_name"),
+                    "appointment_time": datetime.fromisoformat(item["appointment_time"]),
+                    "status": item.get("status", AppointmentStatus.SCHEDULED.name),
+                    "created_at": now
+                })
+            for batch in self._batches(rows):
+                _upsert(session, Appointment, batch, _appointment_updates)
+            session.commit()
+        return len(rows), orphans
+
+    def status(self) -> Dict:
+        return {
+            "watermarks": {
+                resource: watermark.isoformat() for resource, watermark in self.watermarks().items()
+            },
+            "last_result": self.last_result
+        }
+
+
+# Global EMR sync instance
+emr_sync = EmrSyncService()
+
+
+async def sync_emr() -> Dict:
+    """Scheduler entry point (persisted jobs reference functions by import path)"""
+    return await emr_sync.sync()
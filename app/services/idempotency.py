@@ -0,0 +1,217 @@
+"""Idempotency key handling for payment requests
+
+A client sends the same ``Idempotency-Key`` header on every retry of one
+logical request. The first request reserves the key (committed on its own so
+other workers see it), the payment is written together with the completed
+key, and any retry returns the original ``Payment`` by primary key instead of
+charging again. Completed keys are also kept in a process-local LRU so hot
+retries skip the key table entirely.
+
+A reservation only holds a short lease (``idempotency_lease_seconds``); the
+full TTL starts once the key is completed. A key left in progress by a
+worker that died mid-request is re-claimed by the next retry after the
+lease runs out instead of answering 409 until the TTL expires.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, delete, update
+
+from app.core.models import IdempotencyRecord
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_COMPLETED = "completed"
+
+
+class IdempotencyError(Exception):
+    """Base class for idempotency key errors"""
+
+
+class IdempotencyConflictError(IdempotencyError):
+    """Request with the same key is still being processed"""
+
+
+class IdempotencyKeyReuseError(IdempotencyError):
+    """Key was already used for a different request"""
+
+
+def request_fingerprint(*parts) -> str:
+    """Stable hash of the request parameters bound to a key"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IdempotencyCache:
+    """Process-local LRU of completed keys: key -> (scope, request_hash, payment_id, expires_at)"""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[str, str, int, datetime]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[str, str, int, datetime]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[3] <= datetime.utcnow():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, scope: str, request_hash: str, payment_id: int, expires_at: datetime):
+        with self._lock:
+            self._entries[key] = (scope, request_hash, payment_id, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class IdempotencyService:
+    """Reserve, complete and replay idempotency keys"""
+
+    def __init__(self, session: Session, cache: Optional[IdempotencyCache] = None):
+        self.session = session
+        self.cache = cache or idempotency_cache
+        self.ttl = timedelta(hours=settings.idempotency_ttl_hours)
+        self.lease = timedelta(seconds=settings.idempotency_lease_seconds)
+
+    def begin(self, key: str, scope: str, request_hash: str) -> Optional[int]:
+        """Reserve key for a new request.
+
+        Returns the stored payment id when the key was already completed,
+        or None when the caller should process the request.
+        """
+        cached = self.cache.get(key)
+        if cached:
+            return self._check_match(key, scope, request_hash, cached[0], cached[1], cached[2])
+
+        record = self.session.get(IdempotencyRecord, key)
+        if record and record.expires_at <= datetime.utcnow():
+            if record.status == STATUS_IN_PROGRESS:
+                logger.warning(f"Idempotency key {key} lease expired, re-claiming")
+            if self._reclaim(key, scope, request_hash):
+                return None
+            # Another worker re-claimed or purged the key first
+            record = self.session.get(IdempotencyRecord, key)
+
+        if record is None:
+            now = datetime.utcnow()
+            self.session.add(IdempotencyRecord(
+                key=key,
+                scope=scope,
+                request_hash=request_hash,
+                status=STATUS_IN_PROGRESS,
+                created_at=now,
+                expires_at=now + self.lease
+            ))
+            try:
+                self.session.commit()
+                return None
+            except IntegrityError:
+                # Another worker reserved the key between our read and insert
+                self.session.rollback()
+                record = self.session.get(IdempotencyRecord, key)
+                if record is None:
+                    raise IdempotencyConflictError(f"Idempotency key {key} is being processed")
+
+        if record.status != STATUS_COMPLETED:
+            self._check_match(key, scope, request_hash, record.scope, record.request_hash, None)
+            raise IdempotencyConflictError(f"Idempotency key {key} is being processed")
+
+        self.cache.put(key, record.scope, record.request_hash, record.payment_id, record.expires_at)
+        return self._check_match(
+            key, scope, request_hash, record.scope, record.request_hash, record.payment_id
+        )
+
+    def _reclaim(self, key: str, scope: str, request_hash: str) -> bool:
+        """Take over an expired key (stale lease or past TTL); False if another worker won"""
+        now = datetime.utcnow()
+        result = self.session.exec(
+            update(IdempotencyRecord)
+            .where(IdempotencyRecord.key == key, IdempotencyRecord.expires_at <= now)
+            .values(
+                scope=scope,
+                request_hash=request_hash,
+                status=STATUS_IN_PROGRESS,
+                payment_id=None,
+                created_at=now,
+                expires_at=now + self.lease
+            )
+        )
+        self.session.commit()
+        return result.rowcount == 1
+
+    def _check_match(
+        self,
+        key: str,
+        scope: str,
+        request_hash: str,
+        stored_scope: str,
+        stored_hash: str,
+        payment_id: Optional[int]
+    ) -> Optional[int]:
+        if stored_scope != scope or stored_hash != request_hash:
+            raise IdempotencyKeyReuseError(
+                f"Idempotency key {key} was already used for a different request"
+            )
+        if payment_id is not None:
+            logger.info(f"Replaying {scope} result for idempotency key {key}")
+        return payment_id
+
+    def complete(self, key: str, payment_id: int):
+        """Mark key as completed; committed by the caller together with the payment"""
+        record = self.session.get(IdempotencyRecord, key)
+        if record is None:
+            return
+        record.status = STATUS_COMPLETED
+        record.payment_id = payment_id
+        record.expires_at = datetime.utcnow() + self.ttl
+        self.session.add(record)
+
+    def remember(self, key: str):
+        """Populate the local cache after the completing transaction commits"""
+        record = self.session.get(IdempotencyRecord, key)
+        if record and record.status == STATUS_COMPLETED:
+            self.cache.put(key, record.scope, record.request_hash, record.payment_id, record.expires_at)
+
+    def release(self, key: str):
+        """Drop reservation after a failed request so the client can retry"""
+        self.session.rollback()
+        record = self.session.get(IdempotencyRecord, key)
+        if record and record.status == STATUS_IN_PROGRESS:
+            self.session.delete(record)
+            self.session.commit()
+        self.cache.discard(key)
+
+    def purge_expired(self) -> int:
+        """Delete expired keys"""
+        result = self.session.exec(
+            delete(IdempotencyRecord).where(IdempotencyRecord.expires_at <= datetime.utcnow())
+        )
+        self.session.commit()
+        return result.rowcount or 0
+
+
+# Global cache of completed keys
+idempotency_cache = IdempotencyCache(max_size=settings.idempotency_cache_size)
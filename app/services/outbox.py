@@ -0,0 +1,283 @@
+"""Transactional outbox for side effects
+
+Services call ``enqueue_event`` with the same session that writes the
+``Payment``/``Appointment`` row, so the side effect is recorded in the same
+commit. ``OutboxDispatcher`` drains pending events in batches from a
+scheduler job and hands them to per-topic handlers. Events are marked
+dispatched only after their handler returns, giving at-least-once delivery;
+failures are retried with exponential backoff until ``outbox_max_attempts``.
+
+A handler may instead return one outcome per payload (``None`` when
+delivered, an exception otherwise) to settle events individually;
+``RejectedEvent`` marks an event the receiver will never accept, so it
+fails without further retries.
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import random
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select, update, func
+
+from app.core.models import OutboxEvent
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Topics
+TOPIC_RECEIPT_LOG = "receipt.log"
+TOPIC_EMR_NOTIFY = "emr.notify"
+TOPIC_QUEUE_PUSH = "queue.push"
+TOPIC_PRINTER_JOB = "printer.print"
+
+STATUS_PENDING = "pending"
+STATUS_DISPATCHED = "dispatched"
+STATUS_FAILED = "failed"
+
+# How long a claimed batch is hidden from other dispatchers
+CLAIM_LEASE_SECONDS = 60
+
+
+class RejectedEvent(Exception):
+    """Receiver refused the event; retrying cannot help"""
+
+
+def enqueue_event(
+    session: Session,
+    topic: str,
+    payload: Dict[str, Any],
+    aggregate_type: Optional[str] = None,
+    aggregate_id: Optional[int] = None
+) -> OutboxEvent:
+    """Add event to the caller's transaction (committed by the caller)"""
+    event = OutboxEvent(
+        topic=topic,
+        aggregate_type=aggregate_type,
+        aggregate_id=aggregate_id,
+        payload=json.dumps(payload, ensure_ascii=False, default=str)
+    )
+    session.add(event)
+    return event
+
+
+class OutboxDispatcher:
+    """Drain outbox events to registered topic handlers"""
+
+    def __init__(self, engine: Optional[Engine] = None, batch_size: Optional[int] = None):
+        self._engine = engine
+        self.batch_size = batch_size or settings.outbox_batch_size
+        self._handlers: Dict[str, Callable] = {}
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            from app.core.database import engine
+            self._engine = engine
+        return self._engine
+
+    def register(self, topic: str, handler: Callable):
+        """Register handler receiving a list of decoded payload dicts for one topic
+
+        The handler may return a list with one outcome per payload: ``None``
+        for delivered, an exception for an event to retry or fail.
+        """
+        self._handlers[topic] = handler
+        logger.info(f"Outbox handler registered for {topic}")
+
+    def handler(self, topic: str):
+        """Decorator form of ``register``"""
+        def decorator(func: Callable) -> Callable:
+            self.register(topic, func)
+            return func
+        return decorator
+
+    def _backoff(self, attempts: int) -> timedelta:
+        delay = min(settings.outbox_max_backoff_seconds, 2 ** attempts)
+        return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    def _claim_batch(self, session: Session, limit: int) -> List[OutboxEvent]:
+        """Claim up to ``limit`` due events for handled topics"""
+        if not self._handlers:
+            return []
+
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        due_ids = (
+            select(OutboxEvent.id)
+            .where(
+                OutboxEvent.status == STATUS_PENDING,
+                OutboxEvent.next_attempt_at <= now,
+                OutboxEvent.topic.in_(list(self._handlers))
+            )
+            .order_by(OutboxEvent.id)
+            .limit(limit)
+        )
+        # Single UPDATE so two dispatchers never claim the same event
+        session.exec(
+            update(OutboxEvent)
+            .where(
+                OutboxEvent.id.in_(due_ids.scalar_subquery()),
+                OutboxEvent.status == STATUS_PENDING,
+                OutboxEvent.next_attempt_at <= now
+            )
+            .values(
+                claim_token=token,
+                next_attempt_at=now + timedelta(seconds=CLAIM_LEASE_SECONDS)
+            )
+        )
+        session.commit()
+
+        return session.exec(
+            select(OutboxEvent)
+            .where(OutboxEvent.claim_token == token)
+            .order_by(OutboxEvent.id)
+        ).all()
+
+    async def dispatch_batch(self, limit: Optional[int] = None) -> Dict[str, int]:
+        """Claim one batch and deliver it; returns delivery counts"""
+        limit = limit or self.batch_size
+        result = {"dispatched": 0, "retried": 0, "failed": 0}
+
+        with Session(self.engine) as session:
+            events = self._claim_batch(session, limit)
+            if not events:
+                return result
+
+            by_topic: Dict[str, List[OutboxEvent]] = defaultdict(list)
+            for event in events:
+                by_topic[event.topic].append(event)
+
+            for topic, topic_events in by_topic.items():
+                handler = self._handlers[topic]
+                payloads = [json.loads(event.payload) for event in topic_events]
+                now = datetime.utcnow()
+                try:
+                    outcome = handler(payloads)
+                    if inspect.isawaitable(outcome):
+                        outcome = await outcome
+                except Exception as e:
+                    logger.warning(f"Outbox handler for {topic} failed: {e}")
+                    outcomes = [e] * len(topic_events)
+                else:
+                    outcomes = outcome if isinstance(outcome, list) else [None] * len(topic_events)
+
+                for event, error in zip(topic_events, outcomes):
+                    event.claim_token = None
+                    if error is None:
+                        event.status = STATUS_DISPATCHED
+                        event.dispatched_at = now
+                        result["dispatched"] += 1
+                    else:
+                        event.attempts += 1
+                        event.last_error = str(error)[:500]
+                        if isinstance(error, RejectedEvent) or event.attempts >= settings.outbox_max_attempts:
+                            event.status = STATUS_FAILED
+                            result["failed"] += 1
+                        else:
+                            event.next_attempt_at = now + self._backoff(event.attempts)
+                            result["retried"] += 1
+                    session.add(event)
+
+            session.commit()
+
+        return result
+
+    async def drain(self, max_batches: int = 10) -> Dict[str, int]:
+        """Dispatch batches until the outbox is empty, a batch is not fully delivered or ``max_batches`` reached"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        totals = {"dispatched": 0, "retried": 0, "failed": 0}
+        if self._lock.locked():
+            return totals
+
+        async with self._lock:
+            for _ in range(max_batches):
+                batch = await self.dispatch_batch()
+                for key, value in batch.items():
+                    totals[key] += value
+                # Stop early on a short batch, or when the receiver is failing
+                if batch["dispatched"] < self.batch_size:
+                    break
+        return totals
+
+    def get_stats(self) -> Dict:
+        """Count events by topic and status"""
+        with Session(self.engine) as session:
+            rows = session.exec(
+                select(OutboxEvent.topic, OutboxEvent.status, func.count(OutboxEvent.id))
+                .group_by(OutboxEvent.topic, OutboxEvent.status)
+            ).all()
+
+        stats: Dict[str, Dict[str, int]] = defaultdict(dict)
+        for topic, status, count in rows:
+            stats[topic][status] = count
+        return {
+            "handlers": sorted(self._handlers),
+            "topics": dict(stats)
+        }
+
+
+# Global dispatcher instance
+outbox_dispatcher = OutboxDispatcher()
+
+
+@outbox_dispatcher.handler(TOPIC_RECEIPT_LOG)
+def log_receipts(payloads: List[Dict]):
+    """Write receipts to the dedicated receipt log"""
+    receipt_logger = logging.getLogger("kiosk.receipts")
+    for payload in payloads:
+        receipt_logger.info(json.dumps(payload, ensure_ascii=False))
+
+
+@outbox_dispatcher.handler(TOPIC_QUEUE_PUSH)
+async def push_queue_updates(payloads: List[Dict]):
+    """Broadcast queue changes to connected displays (latest per department)"""
+    from app.api.endpoints.websocket import send_queue_update
+
+    latest: Dict[str, Dict] = {}
+    for payload in payloads:
+        latest[payload["department"]] = payload
+    for department, payload in latest.items():
+        await send_queue_update(department, payload)
+
+
+@outbox_dispatcher.handler(TOPIC_PRINTER_JOB)
+async def print_documents(payloads: List[Dict]):
+    """Render receipts and queue tickets of one batch and print them as a single job"""
+    from app.core.models import Appointment
+    from app.hardware.escpos import ticket_renderer
+    from app.hardware.printer import printer
+    from app.services.payment import PaymentService
+    from app.services.reception import ReceptionService
+
+    parts = []
+    with Session(outbox_dispatcher.engine) as session:
+        for payload in payloads:
+            locale = payload.get("locale")
+            if payload["kind"] == "receipt":
+                receipt = PaymentService(session).generate_receipt(payload["payment_id"])
+                parts.append(ticket_renderer.render_receipt(receipt, locale))
+            elif payload["kind"] in ("queue_ticket", "queue_tickets"):
+                appointment_ids = payload.get("appointment_ids") or [payload["appointment_id"]]
+                for appointment_id in appointment_ids:
+                    appointment = session.get(Appointment, appointment_id)
+                    if appointment is None:
+                        continue
+                    ticket = ReceptionService(session).build_queue_ticket(appointment)
+                    parts.append(ticket_renderer.render_queue_ticket({
+                        **ticket.dict(),
+                        "date": datetime.now().strftime("%Y-%m-%d %H:%M")
+                    }, locale))
+
+    if parts:
+        await asyncio.to_thread(printer.print_job, b"".join(parts))
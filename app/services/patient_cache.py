@@ -0,0 +1,207 @@
+"""Read-through patient cache
+
+Patients are cached as immutable snapshots keyed by id, with secondary
+indexes on normalized phone number and card UID. Entries are LRU-bounded and
+expire after ``patient_cache_ttl_seconds``; any insert/update/delete of a
+``Patient`` row invalidates the entry through mapper events, so a flow that
+searches a patient and then creates an appointment, pays and prints a
+receipt hits the database once.
+
+Mapper events only see this worker's writes. Before a lookup, at most every
+``patient_change_poll_seconds``, the cache also drops the patients listed
+in the ``patient_changes`` log since its last read, so writes by other
+workers and processes are picked up within that interval.
+
+Phone lookups that miss compare digits only on both sides; the
+``ix_patients_phone_digits`` expression index serves the database side.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from app.core.change_log import changes_since, latest_change_id
+from app.core.models import Patient, phone_digits
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def normalize_phone(phone: str) -> str:
+    """Digits only, so 010-1234-5678 and 01012345678 share a key"""
+    return _NON_DIGITS.sub("", phone or "")
+
+
+@dataclass(frozen=True)
+class CachedPatient:
+    """Detached, read-only view of a patient row"""
+    id: int
+    name: str
+    birthdate: datetime
+    phone: str
+    email: Optional[str]
+    card_uid: Optional[str]
+
+    @classmethod
+    def from_model(cls, patient: Patient) -> "CachedPatient":
+        return cls(
+            id=patient.id,
+            name=patient.name,
+            birthdate=patient.birthdate,
+            phone=patient.phone,
+            email=patient.email,
+            card_uid=patient.card_uid
+        )
+
+
+class PatientCache:
+    """LRU + TTL patient cache with phone and card UID secondary keys"""
+
+    def __init__(self, max_size: int = 5000, ttl_seconds: float = 300, poll_seconds: float = 2):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.poll_seconds = poll_seconds
+        self._change_id: Optional[int] = None
+        self._next_poll = 0.0
+        self._by_id: "OrderedDict[int, Tuple[CachedPatient, float]]" = OrderedDict()
+        self._by_phone: Dict[str, int] = {}
+        self._by_card: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def _poll_changes(self, session: Session):
+        """Drop patients other workers changed since the last poll"""
+        now = time.monotonic()
+        if now < self._next_poll:
+            return
+        self._next_poll = now + self.poll_seconds
+        if self._change_id is None:
+            # Nothing cached yet can predate the log position
+            self._change_id = latest_change_id(session)
+            return
+        patient_ids, self._change_id = changes_since(session, self._change_id)
+        with self._lock:
+            if patient_ids is None:
+                self.clear()
+                return
+            for patient_id in patient_ids:
+                self._remove(patient_id)
+
+    def _lookup(self, patient_id: Optional[int]) -> Optional[CachedPatient]:
+        if patient_id is None:
+            return None
+        with self._lock:
+            entry = self._by_id.get(patient_id)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                self._remove(patient_id)
+                return None
+            self._by_id.move_to_end(patient_id)
+            self.hits += 1
+            return entry[0]
+
+    def _remove(self, patient_id: int):
+        entry = self._by_id.pop(patient_id, None)
+        if entry is None:
+            return
+        patient = entry[0]
+        phone_key = normalize_phone(patient.phone)
+        if self._by_phone.get(phone_key) == patient_id:
+            del self._by_phone[phone_key]
+        if patient.card_uid and self._by_card.get(patient.card_uid) == patient_id:
+            del self._by_card[patient.card_uid]
+
+    def put(self, patient: Patient) -> CachedPatient:
+        """Store snapshot of a loaded patient"""
+        snapshot = CachedPatient.from_model(patient)
+        with self._lock:
+            self._remove(snapshot.id)
+            self._by_id[snapshot.id] = (snapshot, time.monotonic() + self.ttl_seconds)
+            self._by_phone[normalize_phone(snapshot.phone)] = snapshot.id
+            if snapshot.card_uid:
+                self._by_card[snapshot.card_uid] = snapshot.id
+            while len(self._by_id) > self.max_size:
+                self._remove(next(iter(self._by_id)))
+        return snapshot
+
+    def get(self, session: Session, patient_id: int) -> Optional[CachedPatient]:
+        """Get patient by id, loading from the database on miss"""
+        self._poll_changes(session)
+        cached = self._lookup(patient_id)
+        if cached:
+            return cached
+        self.misses += 1
+        patient = session.get(Patient, patient_id)
+        return self.put(patient) if patient else None
+
+    def find_by_phone(self, session: Session, phone: str) -> Optional[CachedPatient]:
+        """Get patient by phone number, in any format"""
+        self._poll_changes(session)
+        digits = normalize_phone(phone)
+        if not digits:
+            return None
+        cached = self._lookup(self._by_phone.get(digits))
+        if cached:
+            return cached
+        self.misses += 1
+        patient = session.exec(select(Patient).where(phone_digits(Patient.phone) == digits)).first()
+        return self.put(patient) if patient else None
+
+    def find_by_card_uid(self, session: Session, card_uid: str) -> Optional[CachedPatient]:
+        """Get patient by card UID"""
+        self._poll_changes(session)
+        cached = self._lookup(self._by_card.get(card_uid))
+        if cached:
+            return cached
+        self.misses += 1
+        patient = session.exec(select(Patient).where(Patient.card_uid == card_uid)).first()
+        return self.put(patient) if patient else None
+
+    def invalidate(self, patient_id: Optional[int]):
+        """Drop patient from the cache"""
+        if patient_id is None:
+            return
+        with self._lock:
+            self._remove(patient_id)
+
+    def clear(self):
+        with self._lock:
+            self._by_id.clear()
+            self._by_phone.clear()
+            self._by_card.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "size": len(self._by_id),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+# Global patient cache instance
+patient_cache = PatientCache(
+    max_size=settings.patient_cache_size,
+    ttl_seconds=settings.patient_cache_ttl_seconds,
+    poll_seconds=settings.patient_change_poll_seconds
+)
+
+
+def _invalidate_patient(mapper, connection, target: Patient):
+    patient_cache.invalidate(target.id)
+
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(Patient, _event_name, _invalidate_patient)
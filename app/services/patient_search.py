@@ -0,0 +1,308 @@
+"""In-memory patient search index
+
+Supports name prefix ("김민"), initial-consonant queries ("ㄱㅁㅅ" for 김민수),
+mixed queries ("김ㅁ"), phone last-4 digits and birthdate filters.
+
+Names and their chosung strings are kept in sorted lists so prefix queries
+are two ``bisect`` calls; phone last-4 and birthdate are hash buckets, and
+the most selective key drives each query. The index is loaded in id order
+from the ``patients`` table and kept in sync by applying ORM writes to
+``Patient`` when their transaction commits.
+
+Other workers' writes arrive through ``refresh``, which the scheduler runs
+every ``patient_change_poll_seconds``: it re-reads the patients listed in
+the ``patient_changes`` log since the last refresh and indexes rows above
+the last loaded id. When the entries it had not read yet were pruned, the
+index is rebuilt from the table.
+"""
+
+import logging
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from heapq import merge
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session as OrmSession, object_session
+from sqlmodel import Session, select
+
+from app.core.change_log import changes_since, latest_change_id
+from app.core.models import Patient
+
+logger = logging.getLogger(__name__)
+
+CHOSUNG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+HANGUL_START = 0xAC00
+HANGUL_END = 0xD7A3
+JUNGSUNG_JONGSUNG = 21 * 28
+
+# Sorts after every character that can appear in a key
+KEY_SENTINEL = "\U0010ffff"
+
+LOAD_CHUNK_SIZE = 5000
+
+
+def normalize_name(name: str) -> str:
+    return "".join((name or "").split()).lower()
+
+
+def to_chosung(text: str) -> str:
+    """Replace each Hangul syllable by its initial consonant"""
+    return "".join(
+        CHOSUNG[(ord(char) - HANGUL_START) // JUNGSUNG_JONGSUNG]
+        if HANGUL_START <= ord(char) <= HANGUL_END else char
+        for char in text
+    )
+
+
+def matches_query(name: str, query: str) -> bool:
+    """Positional match where query jamo match initials and syllables match exactly"""
+    if len(name) < len(query):
+        return False
+    for name_char, query_char in zip(name, query):
+        if query_char in CHOSUNG:
+            if to_chosung(name_char) != query_char:
+                return False
+        elif name_char != query_char:
+            return False
+    return True
+
+
+class PatientSearchIndex:
+    """Prefix, chosung, phone last-4 and birthdate index over patients"""
+
+    def __init__(self, engine: Optional[Engine] = None):
+        self._engine = engine
+        # id -> (normalized name, chosung, phone last-4, birthdate)
+        self._records: Dict[int, Tuple[str, str, str, Optional[date]]] = {}
+        self._names: List[Tuple[str, int]] = []
+        self._chosung: List[Tuple[str, int]] = []
+        self._by_phone: Dict[str, Set[int]] = defaultdict(set)
+        self._by_birthdate: Dict[date, Set[int]] = defaultdict(set)
+        self._last_id = 0
+        self._change_id: Optional[int] = None
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            from app.core.database import engine
+            self._engine = engine
+        return self._engine
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _record(self, name: str, phone: str, birthdate) -> Tuple[str, str, str, Optional[date]]:
+        name = normalize_name(name)
+        digits = "".join(c for c in phone or "" if c.isdigit())
+        birth_day = birthdate.date() if isinstance(birthdate, datetime) else birthdate
+        return name, to_chosung(name), digits[-4:], birth_day
+
+    def _index_buckets(self, patient_id: int, record: Tuple[str, str, str, Optional[date]]):
+        self._records[patient_id] = record
+        self._by_phone[record[2]].add(patient_id)
+        if record[3]:
+            self._by_birthdate[record[3]].add(patient_id)
+
+    def add(self, patient_id: int, name: str, phone: str, birthdate: Optional[datetime]):
+        """Insert or replace one patient"""
+        record = self._record(name, phone, birthdate)
+        with self._lock:
+            self.remove(patient_id)
+            self._index_buckets(patient_id, record)
+            insort(self._names, (record[0], patient_id))
+            insort(self._chosung, (record[1], patient_id))
+
+    def remove(self, patient_id: int):
+        with self._lock:
+            record = self._records.pop(patient_id, None)
+            if record is None:
+                return
+            name, chosung, last4, birth_day = record
+            for entries, key in ((self._names, name), (self._chosung, chosung)):
+                position = bisect_left(entries, (key, patient_id))
+                if position < len(entries) and entries[position] == (key, patient_id):
+                    del entries[position]
+            self._by_phone[last4].discard(patient_id)
+            if birth_day:
+                self._by_birthdate[birth_day].discard(patient_id)
+
+    def load(self, session: Optional[Session] = None) -> int:
+        """Index patients with id above the last loaded id; returns rows added"""
+        own_session = session is None
+        session = session or Session(self.engine)
+        records: Dict[int, Tuple[str, str, str, Optional[date]]] = {}
+        try:
+            if self._change_id is None:
+                # Changes logged from here on are re-read by refresh()
+                self._change_id = latest_change_id(session)
+            while True:
+                rows = session.exec(
+                    select(Patient.id, Patient.name, Patient.phone, Patient.birthdate)
+                    .where(Patient.id > self._last_id)
+                    .order_by(Patient.id)
+                    .limit(LOAD_CHUNK_SIZE)
+                ).all()
+                for patient_id, name, phone, birthdate in rows:
+                    records[patient_id] = self._record(name, phone, birthdate)
+                if rows:
+                    self._last_id = max(self._last_id, rows[-1][0])
+                if len(rows) < LOAD_CHUNK_SIZE:
+                    break
+        finally:
+            if own_session:
+                session.close()
+
+        # Sort once and merge instead of inserting row by row
+        with self._lock:
+            # Rows already indexed by a committed write are at least as fresh
+            records = {
+                patient_id: record for patient_id, record in records.items()
+                if patient_id not in self._records
+            }
+            names = sorted((record[0], patient_id) for patient_id, record in records.items())
+            chosung = sorted((record[1], patient_id) for patient_id, record in records.items())
+            self._names = list(merge(self._names, names))
+            self._chosung = list(merge(self._chosung, chosung))
+            for patient_id, record in records.items():
+                self._index_buckets(patient_id, record)
+            self._loaded = True
+
+        if records:
+            logger.info(f"Patient search index loaded {len(records)} patients ({len(self)} total)")
+        return len(records)
+
+    def refresh(self) -> int:
+        """Apply patient writes made by other workers; returns rows re-read"""
+        if not self._loaded:
+            return 0
+        with Session(self.engine) as session:
+            patient_ids, self._change_id = changes_since(session, self._change_id or 0)
+            if patient_ids is None:
+                return self._rebuild(session)
+
+            for start in range(0, len(patient_ids), LOAD_CHUNK_SIZE):
+                chunk = patient_ids[start:start + LOAD_CHUNK_SIZE]
+                rows = session.exec(
+                    select(Patient.id, Patient.name, Patient.phone, Patient.birthdate)
+                    .where(Patient.id.in_(chunk))
+                ).all()
+                for patient_id, name, phone, birthdate in rows:
+                    self.add(patient_id, name, phone, birthdate)
+                for patient_id in set(chunk) - {row[0] for row in rows}:
+                    self.remove(patient_id)
+            # Inserts are logged too; this covers databases without the log
+            self.load(session)
+        return len(patient_ids)
+
+    def _rebuild(self, session: Session) -> int:
+        """Replace the whole index with a fresh load of the table"""
+        fresh = PatientSearchIndex(self._engine)
+        fresh._change_id = self._change_id
+        fresh.load(session)
+        with self._lock:
+            self._records = fresh._records
+            self._names = fresh._names
+            self._chosung = fresh._chosung
+            self._by_phone = fresh._by_phone
+            self._by_birthdate = fresh._by_birthdate
+            self._last_id = fresh._last_id
+        logger.info(f"Patient search index rebuilt after missing change log entries ({len(self)} patients)")
+        return len(self)
+
+    def _prefix_range(self, entries: List[Tuple[str, int]], prefix: str) -> Iterable[int]:
+        start = bisect_left(entries, (prefix,))
+        end = bisect_left(entries, (prefix + KEY_SENTINEL,))
+        return (entries[i][1] for i in range(start, end))
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        phone_last4: Optional[str] = None,
+        birthdate: Optional[date] = None,
+        limit: int = 20
+    ) -> List[int]:
+        """Return matching patient ids ordered by name"""
+        if not self._loaded:
+            self.load()
+
+        query = normalize_name(query or "")
+        with self._lock:
+            # Start from the most selective hash bucket when one is given
+            candidates: Optional[Set[int]] = None
+            if phone_last4:
+                candidates = set(self._by_phone.get(phone_last4[-4:], ()))
+            if birthdate:
+                bucket = self._by_birthdate.get(birthdate, set())
+                candidates = set(bucket) if candidates is None else candidates & bucket
+
+            if candidates is not None:
+                matched = [
+                    patient_id for patient_id in candidates
+                    if not query or matches_query(self._records[patient_id][0], query)
+                ]
+                matched.sort(key=lambda patient_id: (self._records[patient_id][0], patient_id))
+                return matched[:limit]
+
+            if not query:
+                return []
+
+            if not any(char in CHOSUNG for char in query):
+                ids = self._prefix_range(self._names, query)
+            else:
+                ids = (
+                    patient_id for patient_id in self._prefix_range(self._chosung, to_chosung(query))
+                    if matches_query(self._records[patient_id][0], query)
+                )
+            results = []
+            for patient_id in ids:
+                results.append(patient_id)
+                if len(results) >= limit:
+                    break
+            return results
+
+
+# Global search index instance
+patient_search_index = PatientSearchIndex()
+
+
+def _track_patient_write(mapper, connection, target: Patient):
+    session = object_session(target)
+    if session is not None:
+        # Capture values now; attributes are expired once the commit completes
+        session.info.setdefault("patient_search_changes", {})[target.id] = (
+            target.name, target.phone, target.birthdate
+        )
+
+
+def _track_patient_delete(mapper, connection, target: Patient):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("patient_search_changes", {})[target.id] = None
+
+
+def _apply_patient_changes(session: OrmSession):
+    changes = session.info.pop("patient_search_changes", None)
+    if not changes or not patient_search_index._loaded:
+        return
+    for patient_id, values in changes.items():
+        if values is None:
+            patient_search_index.remove(patient_id)
+        else:
+            patient_search_index.add(patient_id, *values)
+
+
+def _discard_patient_changes(session: OrmSession):
+    session.info.pop("patient_search_changes", None)
+
+
+event.listen(Patient, "after_insert", _track_patient_write)
+event.listen(Patient, "after_update", _track_patient_write)
+event.listen(Patient, "after_delete", _track_patient_delete)
+event.listen(OrmSession, "after_commit", _apply_patient_changes)
+event.listen(OrmSession, "after_rollback", _discard_patient_changes)
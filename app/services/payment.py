@@ -11,6 +11,12 @@ from app.core.models import (
     Appointment, AppointmentStatus
 )
 from app.core.config import get_settings
+from app.integrations.payment_gateway import payment_gateway, PaymentDeclinedError
+from app.services.idempotency import IdempotencyService, request_fingerprint
+from app.services.patient_cache import patient_cache
+from app.services.outbox import (
+    enqueue_event, TOPIC_RECEIPT_LOG, TOPIC_EMR_NOTIFY, TOPIC_PRINTER_JOB
+)
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -22,25 +28,38 @@ class PaymentService:
     def __init__(self, session: Session):
         self.session = session
     
-    def process_payment(
+    async def process_payment(
         self,
         patient_id: int,
         amount: Decimal,
         method: PaymentMethod,
-        transaction_data: Optional[Dict] = None
+        transaction_data: Optional[Dict] = None,
+        idempotency_key: Optional[str] = None
     ) -> Payment:
         """Process payment transaction"""
         # Verify patient
-        patient = self.session.get(Patient, patient_id)
+        patient = patient_cache.get(self.session, patient_id)
         if not patient:
             raise ValueError(f"Patient with ID {patient_id} not found")
         
+        # Replay original result for a retried request
+        idempotency = IdempotencyService(self.session)
+        if idempotency_key:
+            replayed_id = idempotency.begin(
+                idempotency_key,
+                "payment.process",
+                request_fingerprint(patient_id, str(amount), method.value, transaction_data)
+            )
+            if replayed_id is not None:
+                return self.session.get(Payment, replayed_id)
+        
         # Create payment record
         payment = Payment(
             patient_id=patient_id,
             amount=amount,
             method=method,
-            transaction_id=transaction_data.get("transaction_id") if transaction_data else None
+            transaction_id=transaction_data.get("transaction_id") if transaction_data else None,
+            terminal_id=settings.kiosk_terminal_id
         )
         
         # Process based on payment method
@@ -48,22 +67,31 @@ class PaymentService:
             if method == PaymentMethod.CASH:
                 payment = self._process_cash_payment(payment, transaction_data)
             elif method == PaymentMethod.CARD:
-                payment = self._process_card_payment(payment, transaction_data)
+                payment = await self._process_card_payment(payment, transaction_data, idempotency_key)
             elif method == PaymentMethod.QR:
-                payment = self._process_qr_payment(payment, transaction_data)
+                payment = await self._process_qr_payment(payment, transaction_data, idempotency_key)
             else:
                 raise ValueError(f"Unsupported payment method: {method}")
             
-            # Save payment record
+            # Save payment record together with the completed idempotency key
+            # and its side effects
             self.session.add(payment)
+            self.session.flush()
+            if idempotency_key:
+                idempotency.complete(idempotency_key, payment.id)
+            self._enqueue_payment_events(payment, "payment.completed")
             self.session.commit()
             self.session.refresh(payment)
+            if idempotency_key:
+                idempotency.remember(idempotency_key)
             
             logger.info(f"Payment {payment.id} processed successfully for patient {patient.name}")
             return payment
             
         except Exception as e:
             logger.error(f"Payment processing failed: {e}")
+            if idempotency_key:
+                idempotency.release(idempotency_key)
             raise
     
     def _process_cash_payment(
@@ -84,43 +112,90 @@ class PaymentService:
         
         return payment
     
-    def _process_card_payment(
+    async def _process_card_payment(
         self,
         payment: Payment,
-        transaction_data: Optional[Dict]
+        transaction_data: Optional[Dict],
+        idempotency_key: Optional[str] = None
     ) -> Payment:
         """Process card payment"""
-        # In real system, this would call payment gateway API
         if not transaction_data or "card_number" not in transaction_data:
             raise ValueError("Card information required")
         
-        # Mock payment gateway call
         card_last4 = transaction_data["card_number"][-4:]
-        payment.transaction_id = f"CARD_{uuid.uuid4().hex[:8]}_{card_last4}"
+        if settings.enable_payment_gateway:
+            try:
+                result = await payment_gateway.approve_card(
+                    payment.amount,
+                    transaction_data["card_number"],
+                    installments=transaction_data.get("installments", 0),
+                    idempotency_key=idempotency_key
+                )
+            except PaymentDeclinedError as e:
+                raise ValueError(f"Card declined: {e.message}") from e
+            payment.transaction_id = result["transaction_id"]
+        else:
+            # Offline mode: approve locally without gateway
+            payment.transaction_id = f"CARD_{uuid.uuid4().hex[:8]}_{card_last4}"
+        
         payment.approved_at = datetime.utcnow()
         payment.receipt_number = self._generate_receipt_number()
         
         logger.info(f"Card payment approved: {payment.transaction_id}")
         return payment
     
-    def _process_qr_payment(
+    async def _process_qr_payment(
         self,
         payment: Payment,
-        transaction_data: Optional[Dict]
+        transaction_data: Optional[Dict],
+        idempotency_key: Optional[str] = None
     ) -> Payment:
         """Process QR code payment"""
-        # In real system, this would verify QR payment with provider
         if not transaction_data or "qr_code" not in transaction_data:
             raise ValueError("QR code required")
         
-        # Mock QR payment verification
-        payment.transaction_id = f"QR_{uuid.uuid4().hex[:8]}"
+        if settings.enable_payment_gateway:
+            try:
+                result = await payment_gateway.approve_qr(
+                    payment.amount,
+                    transaction_data["qr_code"],
+                    idempotency_key=idempotency_key
+                )
+            except PaymentDeclinedError as e:
+                raise ValueError(f"QR payment declined: {e.message}") from e
+            payment.transaction_id = result["transaction_id"]
+        else:
+            # Offline mode: verify locally without gateway
+            payment.transaction_id = f"QR_{uuid.uuid4().hex[:8]}"
+        
         payment.approved_at = datetime.utcnow()
         payment.receipt_number = self._generate_receipt_number()
         
         logger.info(f"QR payment verified: {payment.transaction_id}")
         return payment
     
+    def _enqueue_payment_events(self, payment: Payment, event: str):
+        """Record receipt, EMR and printer side effects in the current transaction"""
+        summary = {
+            "event": event,
+            "payment_id": payment.id,
+            "patient_id": payment.patient_id,
+            "amount": str(payment.amount),
+            "method": payment.method.value,
+            "transaction_id": payment.transaction_id,
+            "receipt_number": payment.receipt_number,
+            "approved_at": payment.approved_at
+        }
+        enqueue_event(self.session, TOPIC_RECEIPT_LOG, summary, "payment", payment.id)
+        enqueue_event(self.session, TOPIC_EMR_NOTIFY, summary, "payment", payment.id)
+        enqueue_event(
+            self.session,
+            TOPIC_PRINTER_JOB,
+            {"kind": "receipt", "payment_id": payment.id},
+            "payment",
+            payment.id
+        )
+    
     def _generate_receipt_number(self) -> str:
         """Generate unique receipt number"""
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
@@ -196,10 +271,11 @@ class PaymentService:
         
         return payments
     
-    def refund_payment(
+    async def refund_payment(
         self,
         payment_id: int,
-        reason: str
+        reason: str,
+        idempotency_key: Optional[str] = None
     ) -> Payment:
         """Process payment refund"""
         payment = self.session.get(Payment, payment_id)
@@ -209,18 +285,66 @@ class PaymentService:
         if not payment.approved_at:
             raise ValueError("Cannot refund unapproved payment")
         
+        idempotency = IdempotencyService(self.session)
+        if idempotency_key:
+            replayed_id = idempotency.begin(
+                idempotency_key,
+                "payment.refund",
+                request_fingerprint(payment_id)
+            )
+            if replayed_id is not None:
+                return self.session.get(Payment, replayed_id)
+        
+        refund_transaction_id = f"REFUND_{payment.transaction_id}"
+        if settings.enable_payment_gateway and payment.method != PaymentMethod.CASH:
+            try:
+                result = await payment_gateway.cancel(
+                    payment.transaction_id,
+                    payment.amount,
+                    reason=reason,
+                    idempotency_key=idempotency_key
+                )
+            except PaymentDeclinedError as e:
+                if idempotency_key:
+                    idempotency.release(idempotency_key)
+                raise ValueError(f"Refund rejected: {e.message}") from e
+            except Exception:
+                if idempotency_key:
+                    idempotency.release(idempotency_key)
+                raise
+            refund_transaction_id = result["transaction_id"]
+        
         # Create refund record (negative amount)
         refund = Payment(
             patient_id=payment.patient_id,
             amount=-payment.amount,
             method=payment.method,
-            transaction_id=f"REFUND_{payment.transaction_id}",
+            transaction_id=refund_transaction_id,
+            terminal_id=settings.kiosk_terminal_id,
             approved_at=datetime.utcnow(),
             receipt_number=self._generate_receipt_number()
         )
         
-        self.session.add(refund)
-        self.session.commit()
+        try:
+            self.session.add(refund)
+            self.session.flush()
+            if idempotency_key:
+                idempotency.complete(idempotency_key, refund.id)
+            self._enqueue_payment_events(refund, "payment.refunded")
+            self.session.commit()
+        except Exception:
+            # The gateway already cancelled: free the key so the client's
+            # retry replays the cancel (deduplicated by the gateway on the
+            # same key) and records the refund
+            logger.error(
+                f"Refund {refund_transaction_id} for payment {payment_id} was cancelled "
+                f"at the gateway but could not be recorded"
+            )
+            if idempotency_key:
+                idempotency.release(idempotency_key)
+            raise
+        if idempotency_key:
+            idempotency.remember(idempotency_key)
         
         logger.info(f"Refund processed for payment {payment_id}: {reason}")
         return refund
@@ -231,7 +355,7 @@ class PaymentService:
         if not payment:
             raise ValueError(f"Payment {payment_id} not found")
         
-        patient = self.session.get(Patient, payment.patient_id)
+        patient = patient_cache.get(self.session, payment.patient_id)
         
         receipt = {
             "receipt_number": payment.receipt_number,
@@ -0,0 +1,102 @@
+"""Cached live queue load per department
+
+Waiting counts are refreshed by one grouped query from a scheduler job and
+adjusted locally on every check-in and call, so recommendations can weigh
+queue length without touching the database. Service time per patient comes
+from the online wait-time estimator.
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select, func
+
+from app.core.models import Appointment, AppointmentStatus, Department
+from app.core.config import get_settings
+from app.services.wait_time import wait_time_estimator
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class QueueLoadMonitor:
+    """Waiting count and service rate per department"""
+
+    def __init__(self, engine: Optional[Engine] = None):
+        self._engine = engine
+        self._waiting: Dict[Department, int] = {}
+        self._lock = threading.Lock()
+        self.refreshed_at: Optional[datetime] = None
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            from app.core.database import engine
+            self._engine = engine
+        return self._engine
+
+    def refresh(self) -> Dict[str, int]:
+        """Reload today's waiting counts"""
+        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        with Session(self.engine) as session:
+            rows = session.exec(
+                select(Appointment.department, func.count(Appointment.id))
+                .where(
+                    Appointment.status == AppointmentStatus.CHECKED_IN,
+                    Appointment.appointment_time >= today_start
+                )
+                .group_by(Appointment.department)
+            ).all()
+
+        with self._lock:
+            self._waiting = {Department(department): count for department, count in rows}
+            self.refreshed_at = datetime.utcnow()
+        return {department.value: count for department, count in self._waiting.items()}
+
+    def record_check_in(self, department: Department):
+        """Count a check-in until the next refresh"""
+        with self._lock:
+            self._waiting[department] = self._waiting.get(department, 0) + 1
+
+    def record_started(self, department: Department):
+        """Remove a called patient until the next refresh"""
+        with self._lock:
+            self._waiting[department] = max(0, self._waiting.get(department, 0) - 1)
+
+    def waiting(self, department: Department) -> int:
+        return self._waiting.get(department, 0)
+
+    def expected_wait(self, department: Department) -> float:
+        """Minutes until a patient joining now is called"""
+        return self.waiting(department) * wait_time_estimator.service_minutes(department)
+
+    def choose(self, ranked: Sequence[Tuple[Department, float]]) -> Department:
+        """Pick the shortest expected wait among near-top symptom scores
+
+        Emergency is never traded for a shorter queue: if it is among the
+        candidates it wins regardless of load.
+        """
+        top_score = ranked[0][1]
+        threshold = top_score * (1 - settings.recommendation_score_tolerance)
+        candidates = [(department, score) for department, score in ranked if score >= threshold]
+        if any(department == Department.EMERGENCY for department, _ in candidates):
+            return Department.EMERGENCY
+        # min() keeps the higher-ranked department when waits are equal
+        return min(candidates, key=lambda candidate: self.expected_wait(candidate[0]))[0]
+
+    def snapshot(self) -> List[Dict]:
+        return [
+            {
+                "department": department.value,
+                "waiting": self.waiting(department),
+                "expected_wait_minutes": self.expected_wait(department)
+            }
+            for department in Department
+        ]
+
+
+# Global queue load monitor instance
+queue_load = QueueLoadMonitor()
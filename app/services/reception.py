@@ -2,13 +2,24 @@
 
 import logging
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict
-from sqlmodel import Session, select, func
+from typing import List, Optional, Dict, Union
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select, func, update
 from app.core.models import (
     Patient, Appointment, AppointmentCreate, AppointmentStatus,
-    Department, QueueTicket
+    Department, QueueTicket, BatchCheckInEntry, AppointmentSlot
+)
+from app.core.config import DEPARTMENT_LOCATIONS
+from app.services.patient_cache import patient_cache
+from app.services.symptom_engine import symptom_engine
+from app.services.queue_load import queue_load
+from app.services.wait_time import wait_time_estimator
+from app.services.call_queue import call_queue, assign_priority
+from app.services.booking import BookingService
+from app.services.slot_index import slot_index
+from app.services.outbox import (
+    enqueue_event, TOPIC_EMR_NOTIFY, TOPIC_QUEUE_PUSH, TOPIC_PRINTER_JOB
 )
-from app.core.config import DEPARTMENT_LOCATIONS, SYMPTOM_DEPARTMENT_MAP
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +33,7 @@ class ReceptionService:
     def create_appointment(self, appointment_data: AppointmentCreate) -> Appointment:
         """Create new appointment"""
         # Verify patient exists
-        patient = self.session.get(Patient, appointment_data.patient_id)
+        patient = patient_cache.get(self.session, appointment_data.patient_id)
         if not patient:
             raise ValueError(f"Patient with ID {appointment_data.patient_id} not found")
         
@@ -35,7 +46,12 @@ class ReceptionService:
         logger.info(f"Created appointment {appointment.id} for patient {patient.name}")
         return appointment
     
-    def check_in_appointment(self, patient_id: int, appointment_id: int) -> QueueTicket:
+    def check_in_appointment(
+        self,
+        patient_id: int,
+        appointment_id: int,
+        needs_assistance: bool = False
+    ) -> QueueTicket:
         """Check in for existing appointment"""
         # Get appointment
         appointment = self.session.get(Appointment, appointment_id)
@@ -48,23 +64,38 @@ class ReceptionService:
         if appointment.status != AppointmentStatus.SCHEDULED:
             raise ValueError(f"Appointment is already {appointment.status}")
         
-        # Update status and assign queue number
-        appointment.status = AppointmentStatus.CHECKED_IN
-        appointment.queue_number = self._get_next_queue_number(appointment.department)
+        patient = patient_cache.get(self.session, patient_id)
+        priority = assign_priority(
+            appointment.department,
+            patient.birthdate if patient else None,
+            reserved=True,
+            needs_assistance=needs_assistance
+        )
         
-        self.session.add(appointment)
+        # Number allocated inside the UPDATE, which only claims a still scheduled row
+        result = self.session.exec(
+            update(Appointment)
+            .where(
+                Appointment.id == appointment_id,
+                Appointment.status == AppointmentStatus.SCHEDULED
+            )
+            .values(
+                status=AppointmentStatus.CHECKED_IN,
+                queue_number=self._next_queue_number_expr(appointment.department),
+                checked_in_at=datetime.utcnow(),
+                priority=priority
+            )
+        )
+        if result.rowcount != 1:
+            self.session.rollback()
+            raise ValueError("Appointment is already checked in")
+        self.session.refresh(appointment)
+        
+        self._enqueue_check_in_events(appointment)
         self.session.commit()
+        self._record_transition(appointment)
         
-        # Create queue ticket
-        queue_status = self.get_queue_status(appointment.department)
-        
-        ticket = QueueTicket(
-            queue_number=appointment.queue_number,
-            department=appointment.department.value,
-            estimated_wait_time=queue_status["wait_time"],
-            current_number=queue_status["current"],
-            location=DEPARTMENT_LOCATIONS.get(appointment.department.value, "Unknown")
-        )
+        ticket = self.build_queue_ticket(appointment)
         
         logger.info(f"Checked in appointment {appointment_id}, queue number: {appointment.queue_number}")
         return ticket
@@ -73,11 +104,12 @@ class ReceptionService:
         self,
         patient_id: int,
         symptoms: List[str],
-        department: Optional[Department] = None
+        department: Optional[Department] = None,
+        needs_assistance: bool = False
     ) -> Appointment:
-        """Create walk-in appointment"""
+        """Create and check in a walk-in appointment in one transaction"""
         # Verify patient
-        patient = self.session.get(Patient, patient_id)
+        patient = patient_cache.get(self.session, patient_id)
         if not patient:
             raise ValueError(f"Patient with ID {patient_id} not found")
         
@@ -85,44 +117,250 @@ class ReceptionService:
         if not department:
             department = self.recommend_department(symptoms)
         
-        # Create appointment
-        appointment_data = AppointmentCreate(
+        appointment = Appointment(
             patient_id=patient_id,
             department=department,
             appointment_time=datetime.now(),
-            symptoms=", ".join(symptoms)
+            symptoms=", ".join(symptoms),
+            status=AppointmentStatus.CHECKED_IN,
+            checked_in_at=datetime.utcnow(),
+            priority=assign_priority(
+                department,
+                patient.birthdate,
+                reserved=False,
+                needs_assistance=needs_assistance
+            )
         )
+        # Allocated inside the INSERT so concurrent kiosks cannot draw the same number
+        appointment.queue_number = self._next_queue_number_expr(department)
+        
+        try:
+            self.session.add(appointment)
+            self.session.flush()
+            self._enqueue_check_in_events(appointment)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        self._record_transition(appointment)
         
-        appointment = self.create_appointment(appointment_data)
+        logger.info(f"Created walk-in appointment {appointment.id} for patient {patient.name}")
+        return appointment
+    
+    def check_in_batch(self, entries: List[BatchCheckInEntry]) -> List[QueueTicket]:
+        """Check in several patients in one transaction (tickets in entry order)"""
+        appointment_ids = [entry.appointment_id for entry in entries if entry.appointment_id]
+        if len(appointment_ids) != len(set(appointment_ids)):
+            raise ValueError("Appointment listed more than once")
+        existing = {}
+        if appointment_ids:
+            existing = {
+                appointment.id: appointment
+                for appointment in self.session.exec(
+                    select(Appointment).where(Appointment.id.in_(appointment_ids))
+                ).all()
+            }
+        
+        now = datetime.utcnow()
+        appointments: List[Appointment] = []
+        try:
+            for entry in entries:
+                patient = patient_cache.get(self.session, entry.patient_id)
+                if not patient:
+                    raise ValueError(f"Patient with ID {entry.patient_id} not found")
+                
+                if entry.appointment_id:
+                    appointment = existing.get(entry.appointment_id)
+                    if not appointment:
+                        raise ValueError(f"Appointment {entry.appointment_id} not found")
+                    if appointment.patient_id != entry.patient_id:
+                        raise ValueError("Appointment does not belong to this patient")
+                    if appointment.status != AppointmentStatus.SCHEDULED:
+                        raise ValueError(f"Appointment is already {appointment.status}")
+                else:
+                    appointment = Appointment(
+                        patient_id=entry.patient_id,
+                        department=entry.department or self.recommend_department(entry.symptoms),
+                        appointment_time=datetime.now(),
+                        symptoms=", ".join(entry.symptoms)
+                    )
+                
+                appointment.status = AppointmentStatus.CHECKED_IN
+                appointment.checked_in_at = now
+                appointment.priority = assign_priority(
+                    appointment.department,
+                    patient.birthdate,
+                    reserved=entry.appointment_id is not None,
+                    needs_assistance=entry.needs_assistance
+                )
+                appointments.append(appointment)
+            
+            # Each number is allocated inside its row's INSERT or UPDATE; rows are
+            # written in entry order, so a department's numbers are consecutive
+            for appointment in appointments:
+                appointment.queue_number = self._next_queue_number_expr(appointment.department)
+                self.session.add(appointment)
+                self.session.flush()
+            
+            for appointment in appointments:
+                self._enqueue_check_in_events(appointment, print_ticket=False)
+            enqueue_event(
+                self.session,
+                TOPIC_PRINTER_JOB,
+                {"kind": "queue_tickets", "appointment_ids": [a.id for a in appointments]},
+                "appointment",
+                appointments[0].id
+            )
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        
+        # Reload the expired rows in one query
+        self.session.exec(
+            select(Appointment).where(Appointment.id.in_([a.id for a in appointments]))
+        ).all()
+        for appointment in appointments:
+            self._record_transition(appointment)
+        
+        statuses = {
+            department: self.get_queue_status(department)
+            for department in {a.department for a in appointments}
+        }
+        tickets = []
+        for appointment in appointments:
+            department = appointment.department
+            # Later members of the batch are not ahead of this one
+            behind = sum(
+                1 for other in appointments
+                if other.department == department and other.queue_number > appointment.queue_number
+            )
+            waiting = statuses[department]["waiting"] - behind
+            tickets.append(QueueTicket(
+                queue_number=appointment.queue_number,
+                department=department.value,
+                estimated_wait_time=wait_time_estimator.estimate(department, waiting),
+                estimated_wait_p90=wait_time_estimator.estimate(department, waiting, percentile=90),
+                current_number=statuses[department]["current"],
+                location=DEPARTMENT_LOCATIONS.get(department.value, "Unknown")
+            ))
+        
+        logger.info(f"Batch check-in of {len(appointments)} appointments: {[a.id for a in appointments]}")
+        return tickets
+    
+    def build_queue_ticket(self, appointment: Appointment) -> QueueTicket:
+        """Create queue ticket for checked-in appointment"""
+        queue_status = self.get_queue_status(appointment.department)
         
-        # Auto check-in for walk-ins
-        appointment.status = AppointmentStatus.CHECKED_IN
-        appointment.queue_number = self._get_next_queue_number(department)
+        return QueueTicket(
+            queue_number=appointment.queue_number,
+            department=appointment.department.value,
+            estimated_wait_time=queue_status["wait_time"],
+            estimated_wait_p90=queue_status["wait_time_p90"],
+            current_number=queue_status["current"],
+            location=DEPARTMENT_LOCATIONS.get(appointment.department.value, "Unknown")
+        )
+    
+    def call_next(self, department: Department) -> Optional[Appointment]:
+        """Move the highest-priority waiting appointment to IN_PROGRESS"""
+        while True:
+            appointment_id = call_queue.next_waiting(self.session, department)
+            if appointment_id is None:
+                return None
+            
+            # Claim only if still waiting (cancelled or called elsewhere otherwise)
+            result = self.session.exec(
+                update(Appointment)
+                .where(
+                    Appointment.id == appointment_id,
+                    Appointment.status == AppointmentStatus.CHECKED_IN
+                )
+                .values(status=AppointmentStatus.IN_PROGRESS, started_at=datetime.utcnow())
+            )
+            if result.rowcount != 1:
+                self.session.rollback()
+                continue
+            
+            appointment = self.session.get(Appointment, appointment_id)
+            self.session.refresh(appointment)
+            enqueue_event(self.session, TOPIC_QUEUE_PUSH, {
+                "event": "appointment.called",
+                "appointment_id": appointment.id,
+                "department": department.value,
+                "queue_number": appointment.queue_number,
+                "current": appointment.queue_number
+            }, "appointment", appointment.id)
+            self.session.commit()
+            self._record_transition(appointment)
+            
+            logger.info(f"Called appointment {appointment.id} ({appointment.priority}) in {department.value}")
+            return appointment
+    
+    def complete_appointment(self, appointment_id: int) -> Appointment:
+        """Finish the consultation of a called appointment"""
+        appointment = self.session.get(Appointment, appointment_id)
+        if not appointment:
+            raise ValueError(f"Appointment {appointment_id} not found")
         
-        self.session.add(appointment)
+        # Completes only once, and only after the patient was called
+        result = self.session.exec(
+            update(Appointment)
+            .where(
+                Appointment.id == appointment_id,
+                Appointment.status == AppointmentStatus.IN_PROGRESS
+            )
+            .values(status=AppointmentStatus.COMPLETED, completed_at=datetime.utcnow())
+        )
+        if result.rowcount != 1:
+            self.session.rollback()
+            raise ValueError(f"Appointment {appointment_id} is not in progress")
         self.session.commit()
+        self.session.refresh(appointment)
+        self._record_transition(appointment)
         
-        logger.info(f"Created walk-in appointment {appointment.id} for patient {patient.name}")
+        logger.info(f"Completed appointment {appointment_id} in {appointment.department.value}")
         return appointment
     
-    def recommend_department(self, symptoms: List[str]) -> Department:
-        """Recommend department based on symptoms"""
-        department_scores = {}
-        
-        for symptom in symptoms:
-            if symptom in SYMPTOM_DEPARTMENT_MAP:
-                for dept in SYMPTOM_DEPARTMENT_MAP[symptom]:
-                    if dept not in department_scores:
-                        department_scores[dept] = 0
-                    department_scores[dept] += 1
-        
-        if department_scores:
-            # Return department with highest score
-            recommended = max(department_scores, key=department_scores.get)
-            return Department(recommended)
-        else:
-            # Default to internal medicine
-            return Department.INTERNAL_MEDICINE
+    def _record_transition(self, appointment: Appointment):
+        """Feed a committed status change to the queue statistics"""
+        department = appointment.department
+        if appointment.status == AppointmentStatus.CHECKED_IN:
+            queue_load.record_check_in(department)
+        elif appointment.status == AppointmentStatus.IN_PROGRESS:
+            queue_load.record_started(department)
+        elif appointment.status == AppointmentStatus.COMPLETED and appointment.started_at:
+            wait_time_estimator.record_service(department, appointment.started_at, appointment.completed_at)
+    
+    def _enqueue_check_in_events(self, appointment: Appointment, print_ticket: bool = True):
+        """Record queue, EMR and ticket printing side effects in the current transaction"""
+        payload = {
+            "event": "appointment.checked_in",
+            "appointment_id": appointment.id,
+            "patient_id": appointment.patient_id,
+            "department": appointment.department.value,
+            "queue_number": appointment.queue_number,
+            "checked_in_at": datetime.utcnow()
+        }
+        enqueue_event(self.session, TOPIC_QUEUE_PUSH, payload, "appointment", appointment.id)
+        enqueue_event(self.session, TOPIC_EMR_NOTIFY, payload, "appointment", appointment.id)
+        if not print_ticket:
+            return
+        enqueue_event(
+            self.session,
+            TOPIC_PRINTER_JOB,
+            {"kind": "queue_ticket", "appointment_id": appointment.id},
+            "appointment",
+            appointment.id
+        )
+    
+    def recommend_department(self, symptoms: Union[str, List[str]]) -> Department:
+        """Recommend department based on symptoms (codes, keys or free text)"""
+        ranked = symptom_engine.score(symptoms)
+        if ranked:
+            # Near-equal candidates go to the shorter queue
+            return queue_load.choose(ranked)
+        # Default to internal medicine
+        return Department.INTERNAL_MEDICINE
     
     def get_queue_status(self, department: Department) -> Dict:
         """Get current queue status for department"""
@@ -147,27 +385,30 @@ class ReceptionService:
         current_appointment = self.session.exec(current_query).first()
         current_number = current_appointment.queue_number if current_appointment else 0
         
-        # Estimate wait time (15 minutes per patient)
-        estimated_wait = waiting_count * 15
-        
+        # Estimate wait time from online service-time statistics
         return {
             "current": current_number,
             "waiting": waiting_count,
-            "wait_time": estimated_wait
+            "wait_time": wait_time_estimator.estimate(department, waiting_count),
+            "wait_time_p90": wait_time_estimator.estimate(department, waiting_count, percentile=90)
         }
     
-    def _get_next_queue_number(self, department: Department) -> int:
-        """Get next queue number for department"""
+    def _next_queue_number_expr(self, department: Department):
+        """Next queue number as a scalar subquery for use in an INSERT or UPDATE
+
+        Evaluated by the write itself, so SQLite runs it under the write lock.
+        """
         today_start = datetime.now().replace(hour=0, minute=0, second=0)
-        
-        # Get max queue number for today
-        max_query = select(func.max(Appointment.queue_number)).where(
-            Appointment.department == department,
-            Appointment.appointment_time >= today_start
+        # Aliased so an UPDATE of appointments does not correlate it to the updated row
+        numbered = aliased(Appointment)
+        return (
+            select(func.coalesce(func.max(numbered.queue_number), 0) + 1)
+            .where(
+                numbered.department == department,
+                numbered.appointment_time >= today_start
+            )
+            .scalar_subquery()
         )
-        
-        max_number = self.session.exec(max_query).one()
-        return (max_number or 0) + 1
     
     def get_patient_appointments(
         self,
@@ -201,7 +442,12 @@ class ReceptionService:
         
         appointment.status = AppointmentStatus.CANCELLED
         self.session.add(appointment)
+        slot_id = appointment.slot_id
+        if slot_id:
+            BookingService(self.session).release_slot(slot_id)
         self.session.commit()
+        if slot_id:
+            slot_index.put(self.session.get(AppointmentSlot, slot_id))
         
         logger.info(f"Cancelled appointment {appointment_id}")
         return True
@@ -216,10 +462,19 @@ class ReceptionService:
         if not appointment:
             raise ValueError(f"Appointment {appointment_id} not found")
         
+        previous_status = appointment.status
         appointment.status = status
+        if status == AppointmentStatus.CHECKED_IN and not appointment.checked_in_at:
+            appointment.checked_in_at = datetime.utcnow()
+        elif status == AppointmentStatus.IN_PROGRESS:
+            appointment.started_at = datetime.utcnow()
+        elif status == AppointmentStatus.COMPLETED:
+            appointment.completed_at = datetime.utcnow()
         self.session.add(appointment)
         self.session.commit()
         self.session.refresh(appointment)
+        if status != previous_status:
+            self._record_transition(appointment)
         
         logger.info(f"Updated appointment {appointment_id} status to {status}")
         return appointment
\ No newline at end of file
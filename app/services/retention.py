@@ -0,0 +1,239 @@
+"""Chunked data retention and cleanup
+
+Old rows are removed in bounded transactions instead of one large DELETE.
+Each chunk is addressed by a primary-key range (or the ``expires_at`` index
+for idempotency keys), committed on its own, and followed by a short pause
+so request handlers can take the write lock between chunks. Append-only
+tables (device logs, outbox events, the patient change log) are walked in id order, and the walk
+stops at the first chunk that reaches rows inside the retention period.
+
+After purging, SQLite databases created with ``auto_vacuum=INCREMENTAL``
+hand free pages back to the filesystem in small ``incremental_vacuum``
+steps. Older database files report ``auto_vacuum=NONE`` and need a single
+offline ``python -m app.services.retention convert``.
+
+Kiosk sessions are kept in memory and expire through their own timeout
+jobs, so there is nothing persisted to purge for them.
+
+Usage:
+    python -m app.services.retention [run|convert]
+"""
+
+import gzip
+import json
+import logging
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+from sqlalchemy import and_, text
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, delete, select, update
+
+from app.core.config import get_settings
+from app.core.models import Certificate, DeviceLog, IdempotencyRecord, OutboxEvent, PatientChange
+from app.services.outbox import STATUS_DISPATCHED, STATUS_FAILED
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class RetentionService:
+    """Purge expired data in small transactions"""
+
+    def __init__(
+        self,
+        engine: Optional[Engine] = None,
+        chunk_size: Optional[int] = None,
+        pause_seconds: Optional[float] = None
+    ):
+        self._engine = engine
+        self.chunk_size = chunk_size or settings.retention_chunk_size
+        self.pause_seconds = (
+            pause_seconds if pause_seconds is not None else settings.retention_chunk_pause_ms / 1000
+        )
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            from app.core.database import engine
+            self._engine = engine
+        return self._engine
+
+    def _purge_by_id(self, model, timestamp, cutoff: datetime, *conditions, archive: Optional[Path] = None) -> int:
+        """Delete old rows of an append-only table chunk by chunk in id order"""
+        deleted = 0
+        last_id = 0
+        while True:
+            with Session(self.engine) as session:
+                chunk = session.exec(
+                    select(model.id, timestamp).where(model.id > last_id).order_by(model.id).limit(self.chunk_size)
+                ).all()
+                if not chunk:
+                    break
+                high_id, high_timestamp = chunk[-1]
+                in_range = and_(model.id > last_id, model.id <= high_id, timestamp < cutoff, *conditions)
+                if archive:
+                    self._archive_rows(session, model, in_range, archive)
+                deleted += session.exec(delete(model).where(in_range)).rowcount or 0
+                session.commit()
+            last_id = high_id
+            if high_timestamp >= cutoff:
+                # Ids grow with time: the rest of the table is inside the retention period
+                break
+            time.sleep(self.pause_seconds)
+        return deleted
+
+    def _archive_rows(self, session: Session, model, condition, archive: Path):
+        rows = session.execute(select(model.__table__).where(condition)).mappings().all()
+        if not rows:
+            return
+        archive.parent.mkdir(parents=True, exist_ok=True)
+        # Appending a gzip member per chunk keeps the file readable as one stream
+        with gzip.open(archive, "at", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(dict(row), default=str, ensure_ascii=False) + "\n")
+
+    def purge_device_logs(self, days: Optional[int] = None, archive: Optional[bool] = None) -> int:
+        days = days if days is not None else settings.device_log_retention_days
+        archive = archive if archive is not None else settings.device_log_archive
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        archive_path = (
+            Path(settings.backup_path) / "archive" / f"device_logs_{datetime.now():%Y%m%d}.ndjson.gz"
+            if archive else None
+        )
+        return self._purge_by_id(DeviceLog, DeviceLog.created_at, cutoff, archive=archive_path)
+
+    def purge_outbox_events(self, days: Optional[int] = None) -> int:
+        """Delete delivered or permanently failed events"""
+        days = days if days is not None else settings.outbox_retention_days
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        return self._purge_by_id(
+            OutboxEvent, OutboxEvent.created_at, cutoff,
+            OutboxEvent.status.in_([STATUS_DISPATCHED, STATUS_FAILED])
+        )
+
+    def purge_patient_changes(self, days: Optional[int] = None) -> int:
+        """Delete change log entries every worker has long since read"""
+        days = days if days is not None else settings.patient_change_retention_days
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        return self._purge_by_id(PatientChange, PatientChange.changed_at, cutoff)
+
+    def purge_idempotency_keys(self) -> int:
+        """Delete expired keys through the expires_at index"""
+        deleted = 0
+        now = datetime.utcnow()
+        while True:
+            with Session(self.engine) as session:
+                keys = session.exec(
+                    select(IdempotencyRecord.key)
+                    .where(IdempotencyRecord.expires_at <= now)
+                    .order_by(IdempotencyRecord.expires_at)
+                    .limit(self.chunk_size)
+                ).all()
+                if not keys:
+                    break
+                deleted += session.exec(
+                    delete(IdempotencyRecord).where(
+                        IdempotencyRecord.key.in_(keys), IdempotencyRecord.expires_at <= now
+                    )
+                ).rowcount or 0
+                session.commit()
+            if len(keys) < self.chunk_size:
+                break
+            time.sleep(self.pause_seconds)
+        return deleted
+
+    def expire_certificate_files(self, days: Optional[int] = None) -> int:
+        """Remove generated PDFs; they are rebuilt on the next download"""
+        days = days if days is not None else settings.certificate_file_retention_days
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        expired = 0
+        last_id = 0
+        while True:
+            with Session(self.engine) as session:
+                rows = session.exec(
+                    select(Certificate.id, Certificate.file_path)
+                    .where(Certificate.id > last_id, Certificate.issued_at < cutoff, Certificate.file_path.is_not(None))
+                    .order_by(Certificate.id)
+                    .limit(self.chunk_size)
+                ).all()
+                if not rows:
+                    break
+                for _, file_path in rows:
+                    Path(file_path).unlink(missing_ok=True)
+                session.exec(
+                    update(Certificate)
+                    .where(Certificate.id.in_([certificate_id for certificate_id, _ in rows]))
+                    .values(file_path=None)
+                )
+                session.commit()
+            expired += len(rows)
+            last_id = rows[-1][0]
+            time.sleep(self.pause_seconds)
+        return expired
+
+    def incremental_vacuum(self) -> int:
+        """Release free pages in small steps; returns pages released"""
+        if self.engine.dialect.name != "sqlite":
+            return 0
+        released = 0
+        connection = self.engine.raw_connection()
+        try:
+            sqlite_connection = connection.driver_connection
+            if sqlite_connection.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                logger.info("auto_vacuum is not INCREMENTAL; skipping vacuum (run 'convert' once)")
+                return 0
+            while True:
+                free_pages = sqlite_connection.execute("PRAGMA freelist_count").fetchone()[0]
+                if not free_pages:
+                    break
+                step = min(free_pages, settings.vacuum_pages_per_step)
+                # execute() frees a single page per call; a script runs the pragma to completion
+                sqlite_connection.executescript(f"PRAGMA incremental_vacuum({step});")
+                released += step
+                time.sleep(self.pause_seconds)
+        finally:
+            connection.close()
+        return released
+
+    def run(self, device_log_days: Optional[int] = None) -> Dict:
+        """Run every retention task"""
+        started = time.monotonic()
+        summary = {
+            "device_logs": self.purge_device_logs(device_log_days),
+            "outbox_events": self.purge_outbox_events(),
+            "idempotency_keys": self.purge_idempotency_keys(),
+            "patient_changes": self.purge_patient_changes(),
+            "certificate_files": self.expire_certificate_files()
+        }
+        summary["vacuumed_pages"] = self.incremental_vacuum()
+        summary["seconds"] = round(time.monotonic() - started, 3)
+        logger.info(f"Retention cleanup finished: {summary}")
+        return summary
+
+    def convert_to_incremental_vacuum(self):
+        """Switch an existing SQLite file to auto_vacuum=INCREMENTAL (full VACUUM, run offline)"""
+        with self.engine.connect() as connection:
+            connection.execute(text("PRAGMA auto_vacuum=INCREMENTAL"))
+            connection.execute(text("VACUUM"))
+
+
+def run_cleanup() -> Dict:
+    """Scheduler entry point"""
+    return RetentionService().run()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else "run"
+
+    if command == "run":
+        print(RetentionService().run())
+    elif command == "convert":
+        RetentionService().convert_to_incremental_vacuum()
+        print("auto_vacuum set to INCREMENTAL")
+    else:
+        print("Usage: python -m app.services.retention [run|convert]")
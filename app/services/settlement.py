@@ -0,0 +1,275 @@
+"""End-of-day settlement and reconciliation
+
+The day's payments (including negative refund rows) are streamed from the
+database in ``settlement_chunk_size`` chunks ordered by transaction id, so
+memory use does not depend on daily volume. Each row is written as a
+fixed-width detail record while per (method, terminal) totals are
+accumulated; the totals follow as summary records. Reconciliation merges
+the local file with the gateway settlement file (same record layout, same
+ordering) in a single streaming pass.
+
+Record layout (one record per line):
+    H  date(8) terminal(12) generated_at(14)
+    D  transaction_id(40) method(6) terminal(12) amount(15) approved_at(14)
+    S  method(6) terminal(12) count(8) gross(15) refunds(15) net(15)
+    T  count(10) net(15)
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlmodel import Session, select
+
+from app.core.models import Payment, PaymentMethod
+from app.core.config import get_settings
+from app.core.scheduler import TIMEZONE
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+TXID_WIDTH = 40
+METHOD_WIDTH = 6
+TERMINAL_WIDTH = 12
+AMOUNT_WIDTH = 15
+TIMESTAMP_FORMAT = "%Y%m%d%H%M%S"
+# Business days follow the scheduler that triggers the settlement, not the host clock
+SETTLEMENT_TIMEZONE = ZoneInfo(TIMEZONE)
+
+# Methods settled by the payment gateway (cash never reaches it)
+GATEWAY_METHODS = {PaymentMethod.CARD.value, PaymentMethod.QR.value}
+
+
+def format_amount(amount: Decimal) -> str:
+    return f"{Decimal(amount):.2f}".rjust(AMOUNT_WIDTH)
+
+
+def format_detail_record(
+    transaction_id: str,
+    method: str,
+    terminal_id: str,
+    amount: Decimal,
+    approved_at: Optional[datetime]
+) -> str:
+    """Build one fixed-width detail line"""
+    return (
+        "D"
+        + (transaction_id or "")[:TXID_WIDTH].ljust(TXID_WIDTH)
+        + method[:METHOD_WIDTH].ljust(METHOD_WIDTH)
+        + (terminal_id or "")[:TERMINAL_WIDTH].ljust(TERMINAL_WIDTH)
+        + format_amount(amount)
+        + (approved_at.strftime(TIMESTAMP_FORMAT) if approved_at else " " * 14)
+        + "\n"
+    )
+
+
+def parse_detail_record(line: str) -> Tuple[str, str, str, Decimal]:
+    """Return (transaction_id, method, terminal_id, amount) of a detail line"""
+    position = 1
+    transaction_id = line[position:position + TXID_WIDTH].rstrip()
+    position += TXID_WIDTH
+    method = line[position:position + METHOD_WIDTH].rstrip()
+    position += METHOD_WIDTH
+    terminal_id = line[position:position + TERMINAL_WIDTH].rstrip()
+    position += TERMINAL_WIDTH
+    amount = Decimal(line[position:position + AMOUNT_WIDTH].strip())
+    return transaction_id, method, terminal_id, amount
+
+
+def iter_detail_records(path: Path, methods=None) -> Iterator[Tuple[str, str, str, Decimal]]:
+    """Stream detail records from a settlement file"""
+    with open(path, "r", encoding="ascii") as f:
+        for line in f:
+            if not line.startswith("D"):
+                continue
+            record = parse_detail_record(line)
+            if methods is None or record[1] in methods:
+                yield record
+
+
+def settlement_window(day: date) -> Tuple[datetime, datetime]:
+    """Calendar day in the scheduler time zone as a naive UTC range (payments store utcnow)"""
+    start = datetime.combine(day, time.min, tzinfo=SETTLEMENT_TIMEZONE)
+    end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=SETTLEMENT_TIMEZONE)
+    return (
+        start.astimezone(timezone.utc).replace(tzinfo=None),
+        end.astimezone(timezone.utc).replace(tzinfo=None)
+    )
+
+
+def previous_day() -> date:
+    """Yesterday in the scheduler time zone"""
+    return datetime.now(SETTLEMENT_TIMEZONE).date() - timedelta(days=1)
+
+
+class SettlementService:
+    """Write settlement files and reconcile them with the gateway"""
+
+    def __init__(self, session: Session, output_dir: Optional[Path] = None):
+        self.session = session
+        self.output_dir = Path(output_dir or settings.settlement_path)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+    def _stream_payments(self, start: datetime, end: datetime):
+        """Yield approved payments of the window in chunks (server-side cursor)"""
+        statement = (
+            select(
+                Payment.transaction_id,
+                Payment.method,
+                Payment.terminal_id,
+                Payment.amount,
+                Payment.approved_at
+            )
+            .where(
+                Payment.approved_at >= start,
+                Payment.approved_at < end
+            )
+            .order_by(Payment.transaction_id, Payment.id)
+            .execution_options(stream_results=True, yield_per=settings.settlement_chunk_size)
+        )
+        for partition in self.session.exec(statement).partitions():
+            yield from partition
+
+    def write_settlement_file(self, day: date, path: Optional[Path] = None) -> Dict:
+        """Write the fixed-width settlement file for ``day``"""
+        path = Path(path or self.output_dir / f"settlement_{day:%Y%m%d}_{settings.kiosk_terminal_id}.txt")
+        start, end = settlement_window(day)
+        temp_path = path.with_suffix(path.suffix + ".part")
+
+        # (method, terminal) -> [count, gross, refunds]
+        totals: Dict[Tuple[str, str], list] = defaultdict(lambda: [0, Decimal("0"), Decimal("0")])
+        count = 0
+        net = Decimal("0")
+
+        with open(temp_path, "w", encoding="ascii", newline="\n") as f:
+            f.write(
+                "H" + day.strftime("%Y%m%d")
+                + settings.kiosk_terminal_id[:TERMINAL_WIDTH].ljust(TERMINAL_WIDTH)
+                + datetime.utcnow().strftime(TIMESTAMP_FORMAT) + "\n"
+            )
+            for transaction_id, method, terminal_id, amount, approved_at in self._stream_payments(start, end):
+                method_value = method.value if isinstance(method, PaymentMethod) else str(method)
+                terminal_id = terminal_id or settings.kiosk_terminal_id
+                amount = Decimal(amount)
+                f.write(format_detail_record(transaction_id, method_value, terminal_id, amount, approved_at))
+
+                bucket = totals[(method_value, terminal_id)]
+                bucket[0] += 1
+                if amount >= 0:
+                    bucket[1] += amount
+                else:
+                    bucket[2] += -amount
+                count += 1
+                net += amount
+
+            for (method_value, terminal_id), (bucket_count, gross, refunds) in sorted(totals.items()):
+                f.write(
+                    "S"
+                    + method_value.ljust(METHOD_WIDTH)
+                    + terminal_id[:TERMINAL_WIDTH].ljust(TERMINAL_WIDTH)
+                    + str(bucket_count).rjust(8)
+                    + format_amount(gross)
+                    + format_amount(refunds)
+                    + format_amount(gross - refunds) + "\n"
+                )
+            f.write("T" + str(count).rjust(10) + format_amount(net) + "\n")
+
+        temp_path.replace(path)
+        logger.info(f"Settlement file written for {day}: {count} records, net {net} ({path})")
+
+        return {
+            "date": day.isoformat(),
+            "file": str(path),
+            "count": count,
+            "net": str(net),
+            "totals": [
+                {
+                    "method": method_value,
+                    "terminal_id": terminal_id,
+                    "count": bucket_count,
+                    "gross": str(gross),
+                    "refunds": str(refunds),
+                    "net": str(gross - refunds)
+                }
+                for (method_value, terminal_id), (bucket_count, gross, refunds) in sorted(totals.items())
+            ]
+        }
+
+    @staticmethod
+    def diff_settlement_files(local_path: Path, gateway_path: Path, report_path: Path) -> Dict:
+        """Merge-join both files by transaction id and write discrepancies"""
+        local_records = iter_detail_records(local_path, GATEWAY_METHODS)
+        gateway_records = iter_detail_records(gateway_path)
+        counts = {"matched": 0, "missing_in_gateway": 0, "missing_locally": 0, "amount_mismatch": 0}
+
+        local = next(local_records, None)
+        remote = next(gateway_records, None)
+        with open(report_path, "w", encoding="ascii", newline="\n") as report:
+            while local is not None or remote is not None:
+                if remote is None or (local is not None and local[0] < remote[0]):
+                    report.write(f"MISSING_IN_GATEWAY {local[0]} {local[3]}\n")
+                    counts["missing_in_gateway"] += 1
+                    local = next(local_records, None)
+                elif local is None or remote[0] < local[0]:
+                    report.write(f"MISSING_LOCALLY {remote[0]} {remote[3]}\n")
+                    counts["missing_locally"] += 1
+                    remote = next(gateway_records, None)
+                else:
+                    if local[3] != remote[3]:
+                        report.write(f"AMOUNT_MISMATCH {local[0]} local={local[3]} gateway={remote[3]}\n")
+                        counts["amount_mismatch"] += 1
+                    else:
+                        counts["matched"] += 1
+                    local = next(local_records, None)
+                    remote = next(gateway_records, None)
+
+        counts["report"] = str(report_path)
+        return counts
+
+    async def reconcile(self, day: date) -> Dict:
+        """Write settlement file and diff it against the gateway settlement"""
+        from app.integrations.payment_gateway import payment_gateway
+
+        # Streaming the day's payments to disk blocks; keep it off the event loop
+        summary = await asyncio.to_thread(self.write_settlement_file, day)
+        if not settings.enable_payment_gateway:
+            summary["reconciliation"] = None
+            return summary
+
+        start, end = settlement_window(day)
+        local_path = Path(summary["file"])
+        gateway_path = self.output_dir / f"gateway_{day:%Y%m%d}_{settings.kiosk_terminal_id}.txt"
+        await payment_gateway.download_settlement(start, end, gateway_path)
+
+        summary["reconciliation"] = await asyncio.to_thread(
+            self.diff_settlement_files,
+            local_path,
+            gateway_path,
+            self.output_dir / f"reconciliation_{day:%Y%m%d}_{settings.kiosk_terminal_id}.txt"
+        )
+        discrepancies = sum(
+            summary["reconciliation"][key]
+            for key in ("missing_in_gateway", "missing_locally", "amount_mismatch")
+        )
+        if discrepancies:
+            logger.warning(f"Settlement for {day} has {discrepancies} discrepancies")
+        return summary
+
+
+async def run_daily_settlement(day: Optional[date] = None) -> Dict:
+    """Scheduler entry point: settle the previous day"""
+    from app.core.database import engine
+
+    day = day or previous_day()
+    with Session(engine) as session:
+        return await SettlementService(session).reconcile(day)
+
+
+def settle_previous_day(day: Optional[date] = None) -> Dict:
+    """Process-pool entry point: run the settlement on its own event loop"""
+    return asyncio.run(run_daily_settlement(day))
@@ -0,0 +1,156 @@
+"""In-memory index of free appointment slots
+
+Per department, free slots are kept in a list sorted by start time, so
+"next N available slots after t" is one bisect plus a short scan and never
+counts appointments. A slot leaves the index when its booking counter
+reaches capacity and returns when a booking is cancelled. Booking itself
+is decided by a conditional UPDATE on the slot row; the index only chooses
+what to offer, so a stale entry costs one failed claim and is corrected
+from the row.
+
+Local bookings update the index at once. Schedules, bookings and
+cancellations made by other workers arrive with the periodic reload
+(``slot_index_refresh_seconds``). Until the first load, ``BookingService``
+queries the slot table instead.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from app.core.models import AppointmentSlot, Department
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FreeSlot:
+    id: int
+    department: Department
+    doctor_name: str
+    start_time: datetime
+    end_time: datetime
+    remaining: int
+
+
+class SlotIndex:
+    """Sorted free slots per department"""
+
+    def __init__(self, engine: Optional[Engine] = None):
+        self._engine = engine
+        self._slots: Dict[int, FreeSlot] = {}
+        self._starts: Dict[Department, List[Tuple[datetime, int]]] = {}
+        self._lock = threading.Lock()
+        self.loaded_at: Optional[float] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            from app.core.database import engine
+            self._engine = engine
+        return self._engine
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def load(self):
+        """Rebuild from upcoming slots with free capacity"""
+        with Session(self.engine) as session:
+            rows = session.exec(
+                select(AppointmentSlot).where(
+                    AppointmentSlot.start_time >= datetime.now(),
+                    AppointmentSlot.booked < AppointmentSlot.capacity
+                )
+            ).all()
+
+        slots: Dict[int, FreeSlot] = {}
+        starts: Dict[Department, List[Tuple[datetime, int]]] = {}
+        for row in rows:
+            slots[row.id] = FreeSlot(
+                row.id, row.department, row.doctor_name, row.start_time, row.end_time,
+                row.capacity - row.booked
+            )
+            starts.setdefault(row.department, []).append((row.start_time, row.id))
+        for entries in starts.values():
+            entries.sort()
+
+        with self._lock:
+            self._slots = slots
+            self._starts = starts
+            self.loaded_at = time.monotonic()
+        logger.debug(f"Slot index loaded with {len(slots)} free slots")
+
+    def put(self, slot: AppointmentSlot):
+        """Apply the current counter of a slot row"""
+        remaining = slot.capacity - slot.booked
+        with self._lock:
+            current = self._slots.get(slot.id)
+            if remaining <= 0:
+                if current:
+                    self._remove(current)
+                return
+            if current:
+                current.remaining = remaining
+                return
+            self._slots[slot.id] = FreeSlot(
+                slot.id, slot.department, slot.doctor_name, slot.start_time, slot.end_time, remaining
+            )
+            insort(self._starts.setdefault(slot.department, []), (slot.start_time, slot.id))
+
+    def _remove(self, free_slot: FreeSlot):
+        del self._slots[free_slot.id]
+        entries = self._starts[free_slot.department]
+        position = bisect_left(entries, (free_slot.start_time, free_slot.id))
+        if position < len(entries) and entries[position][1] == free_slot.id:
+            del entries[position]
+
+    def next_available(
+        self,
+        department: Department,
+        after: Optional[datetime] = None,
+        doctor_name: Optional[str] = None,
+        limit: int = 5
+    ) -> List[FreeSlot]:
+        """Earliest free slots starting at or after ``after``"""
+        now = datetime.now()
+        after = max(after or now, now)
+        with self._lock:
+            entries = self._starts.get(department)
+            if not entries:
+                return []
+            # Drop slots that have started since the last search
+            expired = bisect_left(entries, (now, 0))
+            for _, slot_id in entries[:expired]:
+                del self._slots[slot_id]
+            del entries[:expired]
+
+            found = []
+            for _, slot_id in entries[bisect_left(entries, (after, 0)):]:
+                free_slot = self._slots[slot_id]
+                if doctor_name and free_slot.doctor_name != doctor_name:
+                    continue
+                found.append(free_slot)
+                if len(found) >= limit:
+                    break
+            return found
+
+    def clear(self):
+        with self._lock:
+            self._slots.clear()
+            self._starts.clear()
+            self.loaded_at = None
+
+
+# Global slot index instance
+slot_index = SlotIndex()
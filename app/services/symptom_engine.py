@@ -0,0 +1,157 @@
+"""Symptom to department scoring engine
+
+Built once at import: every symptom key, UI code and synonym in
+``SYMPTOM_SYNONYMS`` is compiled into one Aho-Corasick automaton, and the
+symptom x department weights into sparse rows. Scoring a free-text input
+("머리가 아파요", "fever and cough", ["fever", "cough"]) is a single pass
+of the automaton followed by adding the matched rows into one score vector.
+"""
+
+import re
+from collections import deque
+from typing import Dict, Iterator, List, Sequence, Tuple, Union
+
+from app.core.models import Department
+from app.core.config import SYMPTOM_DEPARTMENT_MAP, SYMPTOM_SYNONYMS, SYMPTOM_CODES
+
+_HANGUL_SPACE = re.compile(r"(?<=[가-힣])\s+(?=[가-힣])")
+_SEPARATORS = re.compile(r"[\s\-_]+")
+
+# Latin patterns shorter than this must match whole words ("ho" is not "phone")
+MIN_SUBWORD_LENGTH = 4
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, unify separators and drop spacing inside Korean phrases"""
+    text = _SEPARATORS.sub(" ", text.lower())
+    return _HANGUL_SPACE.sub("", text).strip()
+
+
+class AhoCorasick:
+    """Multi-pattern matcher; each pattern carries a value"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, int]]] = [[]]  # (pattern length, value)
+
+    def add(self, pattern: str, value: int):
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append((len(pattern), value))
+
+    def build(self):
+        """Compute failure links breadth-first"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                if self._fail[child] == child:
+                    self._fail[child] = 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """Yield (start, end, value) for every pattern occurrence"""
+        node = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, value in output[node]:
+                yield position + 1 - length, position + 1, value
+
+
+class SymptomScoringEngine:
+    """Rank departments for free-text or coded symptoms"""
+
+    def __init__(
+        self,
+        symptom_map: Dict[str, List[str]],
+        synonyms: Dict[str, List[str]],
+        codes: Dict[str, str]
+    ):
+        self.symptoms: List[str] = list(symptom_map)
+        self.departments: List[Department] = list(Department)
+        department_index = {department.value: i for i, department in enumerate(self.departments)}
+
+        # Sparse weight rows: symptom -> [(department index, weight)]
+        self._rows: List[List[Tuple[int, float]]] = [
+            [(department_index[department], 1.0) for department in symptom_map[symptom]]
+            for symptom in self.symptoms
+        ]
+
+        self._matcher = AhoCorasick()
+        self._word_only: set = set()
+        for index, symptom in enumerate(self.symptoms):
+            phrases = [symptom, *synonyms.get(symptom, [])]
+            if symptom in codes:
+                phrases.append(codes[symptom])
+            for phrase in phrases:
+                pattern = normalize_text(phrase)
+                if not pattern:
+                    continue
+                self._matcher.add(pattern, index)
+                if pattern.isascii() and len(pattern) < MIN_SUBWORD_LENGTH:
+                    self._word_only.add((pattern, index))
+        self._matcher.build()
+
+    def _prepare(self, symptoms: Union[str, Sequence[str]]) -> str:
+        if isinstance(symptoms, str):
+            return normalize_text(symptoms)
+        # A separator no pattern contains keeps list items from matching across
+        return " | ".join(normalize_text(symptom) for symptom in symptoms)
+
+    def _match_indexes(self, text: str) -> List[int]:
+        """Symptom indexes in order of appearance (leftmost-longest, non-overlapping)"""
+        matches = []
+        for start, end, index in self._matcher.iter_matches(text):
+            if (text[start:end], index) in self._word_only:
+                before = text[start - 1] if start else " "
+                after = text[end] if end < len(text) else " "
+                if before.isalnum() or after.isalnum():
+                    continue
+            matches.append((start, -(end - start), index))
+
+        found: List[int] = []
+        covered_until = 0
+        for start, negative_length, index in sorted(matches):
+            if start < covered_until:
+                continue
+            covered_until = start - negative_length
+            if index not in found:
+                found.append(index)
+        return found
+
+    def match(self, symptoms: Union[str, Sequence[str]]) -> List[str]:
+        """Symptom keys found in the input"""
+        return [self.symptoms[index] for index in self._match_indexes(self._prepare(symptoms))]
+
+    def score(self, symptoms: Union[str, Sequence[str]]) -> List[Tuple[Department, float]]:
+        """Departments with positive score, best first (ties keep first-seen order)"""
+        scores = [0.0] * len(self.departments)
+        first_seen: Dict[int, int] = {}
+        for index in self._match_indexes(self._prepare(symptoms)):
+            for department_index, weight in self._rows[index]:
+                scores[department_index] += weight
+                first_seen.setdefault(department_index, len(first_seen))
+
+        ranked = sorted(first_seen, key=lambda i: (-scores[i], first_seen[i]))
+        return [(self.departments[i], scores[i]) for i in ranked]
+
+
+# Global engine instance
+symptom_engine = SymptomScoringEngine(SYMPTOM_DEPARTMENT_MAP, SYMPTOM_SYNONYMS, SYMPTOM_CODES)
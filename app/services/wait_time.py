@@ -0,0 +1,228 @@
+"""Online wait-time estimator
+
+Per department, service time (IN_PROGRESS -> COMPLETED) is tracked as an
+exponentially weighted mean and variance, updated in O(1) per transition.
+The wait for ``n`` patients ahead is approximated as a normal sum of ``n``
+service times, which gives median and 90th percentile ETAs without reading
+historical appointments. Arrival rates are not tracked: the patients
+ahead are already counted, so arrivals would not change the estimate.
+State is saved to ``queue_statistics`` by a scheduler job and restored at
+startup.
+
+Every worker runs that job. A save replays the samples this worker recorded
+since its last save onto the stored row (guarded by ``updated_at``, retried
+on conflict) instead of overwriting it, then reloads the merged rows so each
+worker also sees the other workers' samples.
+"""
+
+import logging
+import math
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select, update
+
+from app.core.models import Department, QueueStatistics
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Standard normal quantiles
+Z_SCORES = {50: 0.0, 90: 1.2816}
+
+# Service samples outside this range (minutes) are treated as bookkeeping errors
+MIN_SERVICE_MINUTES = 0.5
+MAX_SERVICE_MINUTES = 240
+# Coefficient of variation assumed until enough samples exist
+DEFAULT_SERVICE_CV = 0.5
+MIN_SAMPLES = 5
+# Attempts to merge into a row another worker saved concurrently
+PERSIST_ATTEMPTS = 5
+
+
+@dataclass
+class DepartmentStats:
+    service_mean: float
+    service_variance: float = 0.0
+    service_samples: int = 0
+
+    def add_service(self, minutes: float, alpha: float):
+        if self.service_samples == 0:
+            self.service_mean = minutes
+            self.service_variance = 0.0
+        else:
+            diff = minutes - self.service_mean
+            increment = alpha * diff
+            self.service_mean += increment
+            self.service_variance = (1 - alpha) * (self.service_variance + diff * increment)
+        self.service_samples += 1
+
+    @classmethod
+    def from_row(cls, row: QueueStatistics) -> "DepartmentStats":
+        return cls(
+            service_mean=row.service_mean_minutes,
+            service_variance=row.service_variance,
+            service_samples=row.service_samples
+        )
+
+
+@dataclass
+class PendingSamples:
+    """Samples recorded by this worker since its last save"""
+    services: List[float] = field(default_factory=list)
+
+    def replay(self, stats: DepartmentStats, alpha: float):
+        for minutes in self.services:
+            stats.add_service(minutes, alpha)
+
+
+class _PersistConflict(Exception):
+    """A row changed between reading and writing it"""
+
+
+class WaitTimeEstimator:
+    """EWMA service-time statistics per department"""
+
+    def __init__(self, engine: Optional[Engine] = None, alpha: Optional[float] = None):
+        self._engine = engine
+        self.alpha = alpha or settings.wait_estimator_alpha
+        self._stats: Dict[Department, DepartmentStats] = {}
+        self._pending: Dict[Department, PendingSamples] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            from app.core.database import engine
+            self._engine = engine
+        return self._engine
+
+    def _get(self, department: Department) -> DepartmentStats:
+        stats = self._stats.get(department)
+        if stats is None:
+            stats = self._stats[department] = DepartmentStats(settings.default_service_minutes)
+        return stats
+
+    def record_service(self, department: Department, started_at: datetime, completed_at: datetime):
+        """Update service-time statistics for a completed consultation"""
+        minutes = (completed_at - started_at).total_seconds() / 60
+        if not MIN_SERVICE_MINUTES <= minutes <= MAX_SERVICE_MINUTES:
+            return
+        with self._lock:
+            self._get(department).add_service(minutes, self.alpha)
+            self._pending.setdefault(department, PendingSamples()).services.append(minutes)
+
+    def service_minutes(self, department: Department) -> float:
+        stats = self._stats.get(department)
+        return stats.service_mean if stats else settings.default_service_minutes
+
+    def estimate(self, department: Department, patients_ahead: int, percentile: int = 50) -> int:
+        """Minutes until called with ``patients_ahead`` in front (normal approximation)"""
+        if patients_ahead <= 0:
+            return 0
+        stats = self._stats.get(department)
+        mean = stats.service_mean if stats else settings.default_service_minutes
+        if stats and stats.service_samples >= MIN_SAMPLES:
+            std = math.sqrt(stats.service_variance)
+        else:
+            std = mean * DEFAULT_SERVICE_CV
+        minutes = patients_ahead * mean + Z_SCORES[percentile] * math.sqrt(patients_ahead) * std
+        return max(0, round(minutes))
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                department.value: {
+                    "service_mean_minutes": round(stats.service_mean, 2),
+                    "service_std_minutes": round(math.sqrt(stats.service_variance), 2),
+                    "service_samples": stats.service_samples
+                }
+                for department, stats in self._stats.items()
+            }
+
+    def load(self):
+        """Restore persisted statistics, keeping samples not saved yet"""
+        with Session(self.engine) as session:
+            rows = session.exec(select(QueueStatistics)).all()
+        with self._lock:
+            for row in rows:
+                stats = DepartmentStats.from_row(row)
+                pending = self._pending.get(row.department)
+                if pending:
+                    pending.replay(stats, self.alpha)
+                self._stats[row.department] = stats
+        if rows:
+            logger.info(f"Loaded wait-time statistics for {len(rows)} departments")
+
+    def persist(self) -> bool:
+        """Merge samples recorded since the last save into the stored statistics
+
+        Returns whether anything was saved; the merged statistics of all
+        workers are reloaded either way.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        saved = False
+        if pending:
+            try:
+                for _ in range(PERSIST_ATTEMPTS):
+                    try:
+                        self._merge(pending)
+                        saved = True
+                        break
+                    except _PersistConflict:
+                        continue
+                else:
+                    raise _PersistConflict("queue statistics kept changing")
+            except Exception:
+                # Keep the samples for the next save
+                with self._lock:
+                    for department, samples in pending.items():
+                        current = self._pending.setdefault(department, PendingSamples())
+                        current.services[:0] = samples.services
+                raise
+        self.load()
+        return saved
+
+    def _merge(self, pending: Dict[Department, PendingSamples]):
+        with Session(self.engine) as session:
+            try:
+                for department, samples in pending.items():
+                    row = session.get(QueueStatistics, department)
+                    stats = DepartmentStats.from_row(row) if row else DepartmentStats(settings.default_service_minutes)
+                    samples.replay(stats, self.alpha)
+                    values = {
+                        "service_mean_minutes": stats.service_mean,
+                        "service_variance": stats.service_variance,
+                        "service_samples": stats.service_samples,
+                        "updated_at": datetime.utcnow()
+                    }
+                    if row is None:
+                        session.add(QueueStatistics(department=department, **values))
+                        session.flush()
+                        continue
+                    result = session.exec(
+                        update(QueueStatistics)
+                        .where(
+                            QueueStatistics.department == department,
+                            QueueStatistics.updated_at == row.updated_at
+                        )
+                        .values(**values)
+                        .execution_options(synchronize_session=False)
+                    )
+                    if result.rowcount != 1:
+                        raise _PersistConflict(department.value)
+                session.commit()
+            except IntegrityError as e:
+                # Another worker inserted the row first
+                raise _PersistConflict(str(e)) from e
+
+
+# Global estimator instance
+wait_time_estimator = WaitTimeEstimator()
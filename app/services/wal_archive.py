@@ -0,0 +1,494 @@
+"""Continuous WAL archiving for point-in-time recovery
+
+With WAL archiving enabled, the application connections run with
+``wal_autocheckpoint=0`` and this archiver is the only thing that
+checkpoints. Every ``wal_archive_interval_seconds`` it:
+
+1. Takes the write lock (``BEGIN IMMEDIATE``), so the WAL is stable.
+2. Reads the WAL from the end of the last archived frame and copies the
+   committed frames into a numbered, gzip-compressed segment under
+   ``backup_path/wal/<chain>/``.
+3. Runs a PASSIVE checkpoint, which only backfills frames that were just
+   archived.
+4. Releases the lock.
+
+The next writer then restarts the WAL. Restarts are detected from the
+checkpoint sequence and salt in the WAL header.
+
+A chain is anchored on a base backup taken by the archiver (see
+``BackupService``) and holds every WAL generation from the one that was
+active during the base copy. Replaying whole generations onto the base is
+safe because each frame is a full page image applied in commit order. A
+new chain (and base) is started every ``wal_archive_base_interval_hours``,
+and also whenever continuity cannot be proven, e.g. when the WAL was
+deleted by a clean shutdown or checkpointed by something else. The base is
+copied without the write lock: the cycle notes the WAL generation, releases
+the lock for the copy and then archives that generation from its first
+frame. Nothing else checkpoints, so the generation outlives the copy.
+
+When cycles keep failing for ``wal_archive_max_failure_seconds`` (e.g. the
+backup volume is full), the archiver checkpoints without archiving so the
+WAL stops growing, and starts a new chain once archiving works again.
+
+Usage:
+    python -m app.services.wal_archive [archive|status|restore <target> [<until ISO time>]]
+"""
+
+import gzip
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.core.config import get_settings
+from app.services.backup import BackupService, sqlite_file_path
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+WAL_HEADER_SIZE = 32
+FRAME_HEADER_SIZE = 24
+SEGMENT_PATTERN = re.compile(
+    r"^(?P<seq>\d{10})_(?P<created>\d{8}_\d{6})_(?P<generation>[0-9a-f]{24})"
+    r"_(?P<start>\d{12})_(?P<end>\d{12})\.wal\.gz$"
+)
+
+
+@dataclass
+class ArchiveState:
+    chain: str
+    generation: str  # checkpoint sequence + salts from the WAL header
+    offset: int  # end of the last archived frame
+    sequence: int
+    complete: bool  # last checkpoint backfilled every frame of the generation
+
+
+@dataclass
+class Segment:
+    path: Path
+    sequence: int
+    created_at: datetime
+    generation: str
+    start: int
+    end: int
+
+
+def parse_wal_header(header: bytes) -> Dict:
+    magic, version, page_size, checkpoint_seq, salt1, salt2 = struct.unpack(">IIIIII", header[:24])
+    if magic not in (0x377F0682, 0x377F0683):
+        raise ValueError("Not a SQLite WAL file")
+    return {
+        "page_size": page_size,
+        "checkpoint_seq": checkpoint_seq,
+        "salt1": salt1,
+        "salt2": salt2,
+        "generation": f"{checkpoint_seq:08x}{salt1:08x}{salt2:08x}"
+    }
+
+
+def is_successor(previous: str, current: str) -> bool:
+    """WAL restarts increment both the checkpoint sequence and salt-1"""
+    return (
+        int(current[:8], 16) == int(previous[:8], 16) + 1
+        and int(current[8:16], 16) == (int(previous[8:16], 16) + 1) & 0xFFFFFFFF
+    )
+
+
+def committed_end(wal: bytes, offset: int, header: Dict) -> int:
+    """End of the last commit frame at or after ``offset`` belonging to this generation"""
+    frame_size = FRAME_HEADER_SIZE + header["page_size"]
+    end = offset
+    position = offset
+    while position + frame_size <= len(wal):
+        _, db_size, salt1, salt2 = struct.unpack(">IIII", wal[position:position + 16])
+        if (salt1, salt2) != (header["salt1"], header["salt2"]):
+            break  # stale frame from an earlier generation
+        position += frame_size
+        if db_size:
+            end = position
+    return end
+
+
+class _BaseBackupNeeded(Exception):
+    """Raised under the write lock; the base is copied after releasing it"""
+
+    def __init__(self, generation: str, sequence: int):
+        super().__init__(generation)
+        self.generation = generation
+        self.sequence = sequence
+
+
+class WalArchiver:
+    """Ship WAL frames to ``backup_path`` and replay them on restore"""
+
+    def __init__(
+        self,
+        database_path: Optional[Path] = None,
+        backup_path: Optional[Path] = None,
+        base_interval_hours: Optional[int] = None
+    ):
+        self._database_path = Path(database_path) if database_path else None
+        self.backup_path = Path(backup_path or settings.backup_path)
+        self.archive_path = self.backup_path / "wal"
+        self.base_interval = timedelta(
+            hours=base_interval_hours if base_interval_hours is not None
+            else settings.wal_archive_base_interval_hours
+        )
+        self._lock = threading.Lock()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._checkpointer: Optional[sqlite3.Connection] = None
+        self._failing_since: Optional[float] = None
+        # Frames were checkpointed without being archived
+        self._chain_broken = False
+
+    @property
+    def database_path(self) -> Path:
+        if self._database_path is None:
+            self._database_path = sqlite_file_path()
+        return self._database_path
+
+    @property
+    def wal_path(self) -> Path:
+        return Path(f"{self.database_path}-wal")
+
+    @property
+    def state_path(self) -> Path:
+        return self.archive_path / "state.json"
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.database_path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        connection.execute("PRAGMA wal_autocheckpoint=0")
+        return connection
+
+    def _connections(self):
+        # Kept open so the archiver is never the last connection; closing the
+        # last connection checkpoints and deletes the WAL
+        if self._writer is None:
+            self._writer = self._connect()
+            mode = self._writer.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+            if mode.lower() != "wal":
+                raise ValueError(f"WAL archiving needs journal_mode=WAL, database is in {mode}")
+            self._checkpointer = self._connect()
+        return self._writer, self._checkpointer
+
+    def close(self):
+        with self._lock:
+            for connection in (self._writer, self._checkpointer):
+                if connection is not None:
+                    connection.close()
+            self._writer = self._checkpointer = None
+
+    def load_state(self) -> Optional[ArchiveState]:
+        if not self.state_path.exists():
+            return None
+        return ArchiveState(**json.loads(self.state_path.read_text()))
+
+    def _save_state(self, state: ArchiveState):
+        partial = self.state_path.with_suffix(".partial")
+        partial.write_text(json.dumps(asdict(state)))
+        os.replace(partial, self.state_path)
+
+    def _start_chain(self, sequence: int) -> str:
+        """Take a base backup and open a chain anchored on it"""
+        archive = Path(BackupService(self.database_path, self.backup_path).create_backup()["archive"])
+        chain = archive.name[:-len(".db.gz")]
+        (self.archive_path / chain).mkdir(parents=True, exist_ok=True)
+        logger.info(f"Started WAL chain {chain} at segment {sequence + 1}")
+        self.prune_chains(keep=chain)
+        return chain
+
+    def _chain_created_at(self, chain: str) -> datetime:
+        return datetime.strptime(chain[len("kiosk_"):], "%Y%m%d_%H%M%S")
+
+    def archive(self) -> Dict:
+        """Archive newly committed frames and checkpoint them (one cycle)"""
+        with self._lock:
+            try:
+                result = self._archive_cycle()
+            except Exception:
+                self._archiving_failed()
+                raise
+            self._failing_since = None
+            return result
+
+    def _archive_cycle(self) -> Dict:
+        writer, checkpointer = self._connections()
+        self.archive_path.mkdir(parents=True, exist_ok=True)
+        try:
+            return self._locked(writer, checkpointer)
+        except _BaseBackupNeeded as e:
+            needed = e
+
+        # Writers keep committing to this generation while the base is copied
+        chain = self._start_chain(needed.sequence)
+        self._save_state(ArchiveState(
+            chain=chain, generation=needed.generation, offset=0, sequence=needed.sequence, complete=False
+        ))
+        self._chain_broken = False
+        try:
+            return self._locked(writer, checkpointer)
+        except _BaseBackupNeeded:
+            logger.warning(f"WAL generation {needed.generation} ended during the base copy; retrying next cycle")
+            return {"archived_bytes": 0}
+
+    def _locked(self, writer: sqlite3.Connection, checkpointer: sqlite3.Connection) -> Dict:
+        writer.execute("BEGIN IMMEDIATE")
+        try:
+            return self._archive_locked(checkpointer)
+        finally:
+            writer.execute("COMMIT")
+
+    def _archiving_failed(self):
+        """Checkpoint without archiving once cycles have failed for too long"""
+        now = time.monotonic()
+        if self._failing_since is None:
+            self._failing_since = now
+        failing_for = now - self._failing_since
+        if failing_for < settings.wal_archive_max_failure_seconds:
+            return
+        logger.error(
+            f"WAL archiving has failed for {failing_for:.0f}s; checkpointing unarchived frames, "
+            f"a new chain starts once archiving recovers"
+        )
+        self._chain_broken = True
+        try:
+            self.state_path.unlink(missing_ok=True)
+            _, checkpointer = self._connections()
+            checkpointer.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        except Exception as e:
+            logger.error(f"Fallback WAL checkpoint failed: {e}")
+
+    def _archive_locked(self, checkpointer: sqlite3.Connection) -> Dict:
+        if not self.wal_path.exists():
+            return {"archived_bytes": 0}
+        with open(self.wal_path, "rb") as wal:
+            raw_header = wal.read(WAL_HEADER_SIZE)
+            if len(raw_header) < WAL_HEADER_SIZE:
+                return {"archived_bytes": 0}
+            header = parse_wal_header(raw_header)
+            generation = header["generation"]
+            state = None if self._chain_broken else self.load_state()
+
+            offset = 0
+            if state and state.generation == generation:
+                offset = state.offset
+            elif state and state.complete and is_successor(state.generation, generation):
+                offset = 0
+            elif state:
+                logger.warning(
+                    f"WAL generation {generation} does not follow {state.generation}; "
+                    f"frames may be missing, starting a new chain"
+                )
+                state = None
+
+            sequence = state.sequence if state else self._last_sequence()
+            if state is None or datetime.now() - self._chain_created_at(state.chain) >= self.base_interval:
+                # The base will be copied during this generation, so replay it from the start
+                raise _BaseBackupNeeded(generation, sequence)
+            chain = state.chain
+
+            # Only the frames appended since the last cycle are read
+            wal.seek(offset)
+            data = wal.read()
+
+        start = max(offset, WAL_HEADER_SIZE)
+        end = offset + committed_end(data, start - offset, header)
+        archived = 0
+        if end > start or offset == 0:
+            sequence += 1
+            segment = self._write_segment(chain, sequence, generation, offset, data[:end - offset])
+            archived = end - offset
+            logger.debug(f"Archived {archived} WAL bytes to {segment.name}")
+
+        # Only frames archived above can be backfilled: writers are locked out
+        busy, log_frames, checkpointed = checkpointer.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        state = ArchiveState(
+            chain=chain,
+            generation=generation,
+            offset=end,
+            sequence=sequence,
+            complete=(busy == 0 and log_frames == checkpointed)
+        )
+        self._save_state(state)
+        return {"archived_bytes": archived, **asdict(state)}
+
+    def _write_segment(self, chain: str, sequence: int, generation: str, start: int, data: bytes) -> Path:
+        name = (
+            f"{sequence:010d}_{datetime.now():%Y%m%d_%H%M%S}_{generation}"
+            f"_{start:012d}_{start + len(data):012d}.wal.gz"
+        )
+        path = self.archive_path / chain / name
+        partial = path.with_name(f".{name}.partial")
+        with open(partial, "wb") as raw:
+            with gzip.GzipFile(filename=name[:-3], mode="wb",
+                               compresslevel=settings.backup_compress_level, fileobj=raw) as compressed:
+                compressed.write(data)
+            raw.flush()
+            # Durable before the checkpoint lets SQLite recycle these frames
+            os.fsync(raw.fileno())
+        os.replace(partial, path)
+        return path
+
+    def _last_sequence(self) -> int:
+        segments = [segment for chain in self.chains() for segment in self.segments(chain)]
+        return max((segment.sequence for segment in segments), default=0)
+
+    def chains(self) -> List[str]:
+        """Chain names (base archive stems), oldest first"""
+        if not self.archive_path.exists():
+            return []
+        return sorted(path.name for path in self.archive_path.iterdir() if path.is_dir())
+
+    def segments(self, chain: str) -> List[Segment]:
+        segments = []
+        for path in (self.archive_path / chain).iterdir():
+            match = SEGMENT_PATTERN.match(path.name)
+            if match:
+                segments.append(Segment(
+                    path=path,
+                    sequence=int(match.group("seq")),
+                    created_at=datetime.strptime(match.group("created"), "%Y%m%d_%H%M%S"),
+                    generation=match.group("generation"),
+                    start=int(match.group("start")),
+                    end=int(match.group("end"))
+                ))
+        return sorted(segments, key=lambda segment: segment.sequence)
+
+    def prune_chains(self, keep: Optional[str] = None) -> List[str]:
+        """Delete chains whose base backup has been pruned"""
+        pruned = []
+        for chain in self.chains():
+            if chain != keep and not (self.backup_path / f"{chain}.db.gz").exists():
+                shutil.rmtree(self.archive_path / chain)
+                pruned.append(chain)
+        if pruned:
+            logger.info(f"Pruned WAL chains {', '.join(pruned)}")
+        return pruned
+
+    def status(self) -> Dict:
+        state = self.load_state()
+        chains = self.chains()
+        return {
+            "state": asdict(state) if state else None,
+            "chains": {chain: len(self.segments(chain)) for chain in chains}
+        }
+
+    def restore(self, target: Path, until: Optional[datetime] = None, chain: Optional[str] = None) -> Dict:
+        """Restore the base of a chain and replay its segments (application stopped)"""
+        candidates = [name for name in self.chains() if (self.backup_path / f"{name}.db.gz").exists()]
+        if until:
+            candidates = [name for name in candidates if self._chain_created_at(name) <= until]
+        if chain:
+            candidates = [name for name in candidates if name == chain]
+        if not candidates:
+            raise ValueError("No WAL chain with a base backup to restore from")
+        chain = candidates[-1]
+
+        segments = [
+            segment for segment in self.segments(chain)
+            if until is None or segment.created_at <= until
+        ]
+        target = Path(target)
+        BackupService.restore(self.backup_path / f"{chain}.db.gz", target)
+
+        generations: List[List[Segment]] = []
+        for segment in segments:
+            if generations and generations[-1][0].generation == segment.generation:
+                if segment.start != generations[-1][-1].end:
+                    raise ValueError(f"Segment {segment.path.name} does not continue the previous segment")
+                generations[-1].append(segment)
+            elif segment.start == 0:
+                generations.append([segment])
+            else:
+                raise ValueError(f"Segment {segment.path.name} starts mid-generation")
+
+        frames = 0
+        for generation in generations:
+            frames += self._replay(target, generation)
+
+        connection = sqlite3.connect(target)
+        try:
+            result = connection.execute("PRAGMA quick_check").fetchone()[0]
+        finally:
+            connection.close()
+        if result != "ok":
+            raise ValueError(f"Restored database failed integrity check: {result}")
+
+        summary = {
+            "target": str(target),
+            "chain": chain,
+            "segments": len(segments),
+            "frames": frames,
+            "recovered_to": segments[-1].created_at.isoformat() if segments else chain
+        }
+        logger.info(f"Replayed {len(segments)} WAL segments onto {chain}")
+        return summary
+
+    @staticmethod
+    def _replay(target: Path, segments: List[Segment]) -> int:
+        """Checkpoint one WAL generation into ``target``"""
+        connection = sqlite3.connect(target)
+        try:
+            # A -wal file is ignored unless the database header is in WAL mode
+            connection.execute("PRAGMA journal_mode=WAL")
+        finally:
+            connection.close()
+
+        wal_path = Path(f"{target}-wal")
+        with open(wal_path, "wb") as wal:
+            for segment in segments:
+                with gzip.open(segment.path, "rb") as data:
+                    shutil.copyfileobj(data, wal)
+        Path(f"{target}-shm").unlink(missing_ok=True)
+
+        header = parse_wal_header(wal_path.read_bytes()[:WAL_HEADER_SIZE])
+        expected = (segments[-1].end - WAL_HEADER_SIZE) // (FRAME_HEADER_SIZE + header["page_size"])
+
+        connection = sqlite3.connect(target, isolation_level=None)
+        try:
+            # SQLite only reads frames whose salts and running checksums are valid
+            busy, log_frames, checkpointed = connection.execute("PRAGMA wal_checkpoint(FULL)").fetchone()
+        finally:
+            connection.close()
+        if busy or log_frames != expected or checkpointed != expected:
+            raise ValueError(
+                f"WAL generation {segments[0].generation} replayed {checkpointed} of {expected} frames"
+            )
+        return expected
+
+
+# Global WAL archiver instance
+wal_archiver = WalArchiver()
+
+
+def archive_wal() -> Dict:
+    """Scheduler entry point (persisted jobs reference functions by import path)"""
+    return wal_archiver.archive()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+
+    if command == "archive":
+        print(wal_archiver.archive())
+        wal_archiver.close()
+    elif command == "status":
+        print(wal_archiver.status())
+    elif command == "restore" and len(sys.argv) in (3, 4):
+        until = datetime.fromisoformat(sys.argv[3]) if len(sys.argv) == 4 else None
+        print(wal_archiver.restore(Path(sys.argv[2]), until))
+    else:
+        print("Usage: python -m app.services.wal_archive [archive|status|restore <target> [<until ISO time>]]")
@@ -0,0 +1,102 @@
+"""Online backup impact and restore time
+
+Builds a SQLite database of the requested size, then takes a backup
+while a writer thread keeps inserting rows, and reports writer commit
+latency during the backup, backup duration, compression ratio and the
+time to verify and restore the archive.
+
+Usage:
+    python -m benchmarks.backup_restore --rows 500000 --wal
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from app.services.backup import BackupService
+
+
+def build(path: Path, rows: int, wal: bool):
+    connection = sqlite3.connect(path)
+    if wal:
+        connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(
+        "CREATE TABLE appointments (id INTEGER PRIMARY KEY, patient_id INTEGER, department TEXT, "
+        "symptoms TEXT, created_at TEXT)"
+    )
+    batch = [(i % 5000, "INTERNAL_MEDICINE", "두통과 발열이 있습니다 " * 4, "2026-01-01 09:00:00")
+             for i in range(10_000)]
+    for _ in range(rows // len(batch)):
+        connection.executemany(
+            "INSERT INTO appointments (patient_id, department, symptoms, created_at) VALUES (?, ?, ?, ?)",
+            batch
+        )
+    connection.commit()
+    connection.close()
+
+
+def writer(path: Path, stop: threading.Event, timings: list):
+    connection = sqlite3.connect(path, timeout=30)
+    while not stop.is_set():
+        start = time.perf_counter()
+        connection.execute(
+            "INSERT INTO appointments (patient_id, department, symptoms, created_at) "
+            "VALUES (1, 'PEDIATRICS', 'walk-in', datetime('now'))"
+        )
+        connection.commit()
+        timings.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.005)
+    connection.close()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--wal", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        workdir = Path(workdir)
+        database = workdir / "kiosk.db"
+        build(database, args.rows, args.wal)
+        print(f"database {os.path.getsize(database) / 1e6:.1f} MB, journal mode {'wal' if args.wal else 'delete'}")
+
+        service = BackupService(database, workdir / "backups")
+        stop, timings = threading.Event(), []
+        thread = threading.Thread(target=writer, args=(database, stop, timings))
+        thread.start()
+        time.sleep(0.5)
+        baseline = len(timings)
+        summary = service.create_backup()
+        stop.set()
+        thread.join()
+
+        during = timings[baseline:]
+        print(
+            f"backup      copy {summary['copy_seconds']:.2f}s  total {summary['total_seconds']:.2f}s  "
+            f"restarts {summary['restarts']}  "
+            f"archive {summary['archive_bytes'] / 1e6:.1f} MB "
+            f"({summary['archive_bytes'] / summary['database_bytes']:.0%})"
+        )
+        print(
+            f"writer      {len(during)} commits during backup  "
+            f"p50 {statistics.median(during) if during else 0:.2f}ms  "
+            f"p99 {percentile(during, 0.99):.2f}ms  max {max(during, default=0):.2f}ms"
+        )
+
+        restored = service.restore(Path(summary["archive"]), workdir / "restored.db")
+        print(f"restore     {restored['seconds']:.2f}s for {restored['bytes'] / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Bulk import throughput on SQLite
+
+Writes a FHIR Bulk Data style NDJSON file with the requested number of
+patients (one appointment each) and imports it into a fresh SQLite file,
+reporting rows per minute. Pass --per-row to compare with one transaction
+per row, as repeated ``POST /api/reception/patient`` calls would do.
+
+Usage:
+    python -m benchmarks.bulk_import --patients 50000
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.core.models import Patient
+from app.services.bulk_import import BulkImporter
+
+SURNAMES = "김이박최정강조윤장임"
+DEPARTMENTS = ["INTERNAL_MEDICINE", "PEDIATRICS", "DERMATOLOGY", "ORTHOPEDICS"]
+
+
+def write_ndjson(path: Path, patients: int):
+    rng = random.Random(1)
+    with open(path, "w", encoding="utf-8") as f:
+        for n in range(patients):
+            f.write(json.dumps({
+                "resourceType": "Patient",
+                "id": f"p{n}",
+                "name": [{"family": rng.choice(SURNAMES), "given": [f"환자{n}"]}],
+                "birthDate": f"{rng.randint(1940, 2020)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "telecom": [{"system": "phone", "value": f"010-{rng.randint(0, 9999):04d}-{n % 10000:04d}"}]
+            }, ensure_ascii=False) + "\n")
+        for n in range(patients):
+            f.write(json.dumps({
+                "resourceType": "Appointment",
+                "id": f"a{n}",
+                "status": "booked",
+                "start": f"2030-01-{rng.randint(1, 28):02d}T{rng.randint(9, 17):02d}:00:00",
+                "serviceType": [{"coding": [{"code": rng.choice(DEPARTMENTS)}]}],
+                "participant": [{"actor": {"reference": f"Patient/p{n}"}}]
+            }) + "\n")
+
+
+def per_row(engine, rows: int) -> float:
+    start = time.perf_counter()
+    for n in range(rows):
+        with Session(engine) as session:
+            session.add(Patient(name=f"환자{n}", birthdate=datetime(1980, 1, 1), phone=f"010-0000-{n:04d}"))
+            session.commit()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=50_000)
+    parser.add_argument("--per-row", type=int, default=0, help="also insert this many patients one by one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        source = Path(workdir) / "export.ndjson"
+        write_ndjson(source, args.patients)
+        engine = create_engine(f"sqlite:///{Path(workdir) / 'kiosk.db'}")
+        SQLModel.metadata.create_all(engine)
+
+        result = BulkImporter(engine).import_file(source)
+        rows = result["patients"] + result["appointments"]
+        print(
+            f"bulk     {rows} rows in {result['seconds']:.2f}s  "
+            f"{result['rows_per_minute']:,} rows/min  rejected {result['rejected']}"
+        )
+        if args.per_row:
+            seconds = per_row(engine, args.per_row)
+            print(f"per-row  {args.per_row} rows in {seconds:.2f}s  {int(args.per_row / seconds * 60):,} rows/min")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Load test card approvals against the local stub gateway
+
+Compares the shared pooled client with opening a fresh connection per
+transaction.
+
+Usage:
+    python -m benchmarks.gateway_load --requests 2000 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import socket
+import threading
+import time
+from decimal import Decimal
+
+import httpx
+import uvicorn
+
+from app.integrations.payment_gateway import PaymentGatewayClient
+from app.integrations.stub_gateway import create_stub_gateway
+
+
+def start_stub(latency_ms: float, failure_rate: float) -> str:
+    """Run stub gateway in a background thread and return its base URL"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    config = uvicorn.Config(
+        create_stub_gateway(latency_ms=latency_ms, jitter_ms=latency_ms / 4, failure_rate=failure_rate),
+        host="127.0.0.1",
+        port=port,
+        log_level="error"
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+async def run_pooled(base_url: str, requests: int, concurrency: int) -> dict:
+    client = PaymentGatewayClient(
+        base_url=base_url,
+        api_key="bench",
+        merchant_id="BENCH",
+        max_connections=concurrency,
+        max_concurrency=concurrency
+    )
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        try:
+            await client.approve_card(Decimal("15000"), f"4111111111{i:06d}"[-16:])
+        except Exception:
+            errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i + 1) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    await client.close()
+    return {"elapsed": elapsed, "errors": errors}
+
+
+async def run_unpooled(base_url: str, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            async with httpx.AsyncClient(base_url=base_url, headers={"Authorization": "Bearer bench"}) as client:
+                response = await client.post("/v1/payments/card", json={
+                    "merchant_id": "BENCH",
+                    "amount": "15000",
+                    "card_number": f"4111111111{i:06d}"[-16:]
+                })
+                if response.status_code != 200:
+                    errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i + 1) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {"elapsed": elapsed, "errors": errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    base_url = start_stub(args.latency_ms, args.failure_rate)
+
+    for name, runner in (("pooled", run_pooled), ("per-request", run_unpooled)):
+        result = asyncio.run(runner(base_url, args.requests, args.concurrency))
+        rate = args.requests / result["elapsed"]
+        print(
+            f"{name:12s} {args.requests} approvals in {result['elapsed']:.2f}s "
+            f"({rate:.0f}/s, errors={result['errors']})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Query latency of the in-memory patient search index
+
+Fills the index with synthetic Korean names and measures typical kiosk
+queries (chosung, name prefix, phone last-4, birthdate).
+
+Usage:
+    python -m benchmarks.patient_search --patients 500000
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.core.models import Patient
+from app.services.patient_search import PatientSearchIndex
+
+SURNAMES = "김이박최정강조윤장임한오서신권황안송류전"
+SYLLABLES = "민서지현수영준우진하은도윤예성연호유경아"
+
+
+def build(patients: int, seed: int) -> PatientSearchIndex:
+    rng = random.Random(seed)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    rows = [
+        {
+            "id": patient_id,
+            "name": rng.choice(SURNAMES) + rng.choice(SYLLABLES) + rng.choice(SYLLABLES),
+            "phone": f"010-{rng.randrange(10000):04d}-{rng.randrange(10000):04d}",
+            "birthdate": datetime(1930, 1, 1) + timedelta(days=rng.randrange(365 * 80)),
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        }
+        for patient_id in range(1, patients + 1)
+    ]
+    with Session(engine) as session:
+        session.execute(Patient.__table__.insert(), rows)
+        session.commit()
+
+    index = PatientSearchIndex(engine)
+    start = time.perf_counter()
+    index.load()
+    print(f"loaded {len(index)} patients in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    for patient_id in range(patients + 1, patients + 1001):
+        index.add(patient_id, "신규환자", "010-0000-0000", date(1990, 1, 1))
+    print(f"incremental add {(time.perf_counter() - start):.3f}ms per patient (1000 adds)")
+    return index
+
+
+def measure(label: str, func, repeat: int = 2000):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    timings.sort()
+    print(
+        f"{label:<28} p50 {statistics.median(timings):7.1f}us  "
+        f"p99 {timings[int(len(timings) * 0.99)]:7.1f}us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=500_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    index = build(args.patients, args.seed)
+    measure("chosung 'ㄱㅁㅅ'", lambda: index.search("ㄱㅁㅅ"))
+    measure("mixed '김ㅁ'", lambda: index.search("김ㅁ"))
+    measure("name prefix '김민'", lambda: index.search("김민"))
+    measure("phone last-4", lambda: index.search(phone_last4="5678"))
+    measure("chosung + phone last-4", lambda: index.search("ㄱ", phone_last4="5678"))
+    measure("birthdate", lambda: index.search(birthdate=date(1950, 1, 1)))
+
+
+if __name__ == "__main__":
+    main()
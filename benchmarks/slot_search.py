@@ -0,0 +1,92 @@
+"""Latency of next-available slot search
+
+Creates schedules for several doctors per department over a number of
+days, loads the free-slot index and times "next 5 slots" lookups for a
+department, a single doctor and a later start time.
+
+Usage:
+    python -m benchmarks.slot_search --days 14 --doctors 10 --slot-minutes 5
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.core.models import AppointmentSlot, Department, DoctorSchedule
+from app.services.slot_index import SlotIndex
+
+
+def build(days: int, doctors: int, slot_minutes: int, seed: int) -> SlotIndex:
+    rng = random.Random(seed)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    first_day = (datetime.now() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    step = timedelta(minutes=slot_minutes)
+
+    schedules, rows = [], []
+    schedule_id = 0
+    for department in Department:
+        for doctor in range(doctors):
+            for day in range(days):
+                schedule_id += 1
+                start = first_day + timedelta(days=day, hours=9)
+                end = start + timedelta(hours=8)
+                schedules.append({
+                    "id": schedule_id, "department": department.name, "doctor_name": f"doctor-{doctor}",
+                    "start_time": start, "end_time": end, "slot_minutes": slot_minutes, "capacity": 1,
+                    "created_at": datetime.utcnow()
+                })
+                while start < end:
+                    rows.append({
+                        "schedule_id": schedule_id, "department": department.name,
+                        "doctor_name": f"doctor-{doctor}", "start_time": start, "end_time": start + step,
+                        "capacity": 1, "booked": int(rng.random() < 0.7)
+                    })
+                    start += step
+    with Session(engine) as session:
+        session.execute(DoctorSchedule.__table__.insert(), schedules)
+        session.execute(AppointmentSlot.__table__.insert(), rows)
+        session.commit()
+
+    index = SlotIndex(engine)
+    start = time.perf_counter()
+    index.load()
+    print(f"{len(rows)} slots, {len(index)} free, index loaded in {time.perf_counter() - start:.2f}s")
+    return index
+
+
+def measure(label: str, func, repeat: int = 5000):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    timings.sort()
+    print(
+        f"{label:<28} p50 {statistics.median(timings):7.1f}us  "
+        f"p99 {timings[int(len(timings) * 0.99)]:7.1f}us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--doctors", type=int, default=10)
+    parser.add_argument("--slot-minutes", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    index = build(args.days, args.doctors, args.slot_minutes, args.seed)
+    later = datetime.now() + timedelta(days=args.days // 2)
+    measure("department next 5", lambda: index.next_available(Department.PEDIATRICS))
+    measure("doctor next 5", lambda: index.next_available(Department.PEDIATRICS, doctor_name="doctor-7"))
+    measure("department after +N/2 days", lambda: index.next_available(Department.PEDIATRICS, after=later))
+
+
+if __name__ == "__main__":
+    main()
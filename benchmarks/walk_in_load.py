@@ -0,0 +1,136 @@
+"""Walk-in throughput against a file-based SQLite database
+
+Runs walk-ins from concurrent kiosk clients (one thread and session each)
+through the single-transaction pipeline and through the previous
+two-commit flow (insert, commit, read MAX, update, commit), and reports
+walk-ins per second and duplicate queue numbers.
+
+Usage:
+    python -m benchmarks.walk_in_load --walk-ins 2000 --clients 8
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, func, select
+
+from app.core.models import Appointment, AppointmentCreate, AppointmentStatus, Department, Patient
+from app.services.call_queue import assign_priority
+from app.services.patient_cache import patient_cache
+from app.services.reception import ReceptionService
+
+DEPARTMENTS = [Department.INTERNAL_MEDICINE, Department.PEDIATRICS, Department.ORTHOPEDICS]
+
+
+def make_engine(path: str, wal: bool):
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False, "timeout": 30}
+    )
+    if wal:
+        @event.listens_for(engine, "connect")
+        def set_wal(dbapi_connection, connection_record):
+            dbapi_connection.execute("PRAGMA journal_mode=WAL")
+            dbapi_connection.execute("PRAGMA synchronous=NORMAL")
+
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.execute(Patient.__table__.insert(), [
+            {
+                "id": patient_id,
+                "name": f"환자{patient_id}",
+                "birthdate": datetime(1980, 1, 1),
+                "phone": f"010-0000-{patient_id:04d}",
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow()
+            }
+            for patient_id in range(1, 1001)
+        ])
+        session.commit()
+    return engine
+
+
+def walk_in(session: Session, patient_id: int, department: Department):
+    ReceptionService(session).create_walk_in_appointment(patient_id, ["fever"], department)
+
+
+def legacy_walk_in(session: Session, patient_id: int, department: Department):
+    """Previous flow: commit the appointment, then number and commit again"""
+    service = ReceptionService(session)
+    patient = patient_cache.get(session, patient_id)
+    appointment = service.create_appointment(AppointmentCreate(
+        patient_id=patient_id,
+        department=department,
+        appointment_time=datetime.now(),
+        symptoms="fever"
+    ))
+    appointment.status = AppointmentStatus.CHECKED_IN
+    appointment.queue_number = (session.exec(
+        select(func.max(Appointment.queue_number)).where(Appointment.department == department)
+    ).one() or 0) + 1
+    appointment.checked_in_at = datetime.utcnow()
+    appointment.priority = assign_priority(department, patient.birthdate, reserved=False)
+    session.add(appointment)
+    service._enqueue_check_in_events(appointment)
+    session.commit()
+    service._record_transition(appointment)
+
+
+def run(label: str, func, walk_ins: int, clients: int, wal: bool):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = make_engine(os.path.join(directory, "bench.db"), wal)
+        errors = []
+        counter = iter(range(walk_ins))
+        lock = threading.Lock()
+
+        def client():
+            with Session(engine) as session:
+                while True:
+                    with lock:
+                        i = next(counter, None)
+                    if i is None:
+                        return
+                    try:
+                        func(session, i % 1000 + 1, DEPARTMENTS[i % len(DEPARTMENTS)])
+                    except Exception as e:
+                        session.rollback()
+                        errors.append(type(e).__name__)
+
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        with Session(engine) as session:
+            numbers = session.exec(select(Appointment.department, Appointment.queue_number)).all()
+        duplicates = sum(count - 1 for count in Counter(numbers).values() if count > 1)
+        engine.dispose()
+
+    print(
+        f"{label:<22} {len(numbers) / elapsed:8.1f} walk-ins/s  "
+        f"{len(numbers)} created  {duplicates} duplicate numbers  {len(errors)} errors"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--walk-ins", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--wal", action="store_true", help="use WAL journal mode")
+    args = parser.parse_args()
+
+    run("single transaction", walk_in, args.walk_ins, args.clients, args.wal)
+    run("two commits (legacy)", legacy_walk_in, args.walk_ins, args.clients, args.wal)
+
+
+if __name__ == "__main__":
+    main()
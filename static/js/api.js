@@ -16,12 +16,12 @@ class ApiClient {
         const timeoutId = setTimeout(() => controller.abort(), this.timeout);
         
         const defaultOptions = {
+            signal: controller.signal,
+            ...options,
             headers: {
                 'Content-Type': 'application/json',
                 ...options.headers
-            },
-            signal: controller.signal,
-            ...options
+            }
         };
         
         try {
@@ -58,13 +58,43 @@ class ApiClient {
     }
     
     // POST 요청
-    async post(url, data = {}) {
+    async post(url, data = {}, headers = {}) {
         return this.request(url, {
             method: 'POST',
-            body: JSON.stringify(data)
+            body: JSON.stringify(data),
+            headers: headers
         });
     }
     
+    // 멱등성 키 생성 (같은 요청의 재시도/오프라인 재전송에 동일 키 사용)
+    createIdempotencyKey() {
+        if (window.crypto && window.crypto.randomUUID) {
+            return window.crypto.randomUUID();
+        }
+        return `${Date.now().toString(16)}-${Math.random().toString(16).slice(2)}`;
+    }
+    
+    // 멱등성 키를 붙인 POST 요청 (재시도해도 중복 처리되지 않음)
+    async postIdempotent(url, data = {}, idempotencyKey = null) {
+        const options = {
+            method: 'POST',
+            body: JSON.stringify(data),
+            headers: {
+                'Idempotency-Key': idempotencyKey || this.createIdempotencyKey()
+            }
+        };
+        
+        try {
+            return await this.requestWithRetry(url, options);
+        } catch (error) {
+            if (error.message.includes('Failed to fetch')) {
+                // 같은 키로 오프라인 큐에 저장하여 재전송 시에도 중복 결제 방지
+                await this.queueOfflineRequest(url, options);
+            }
+            throw error;
+        }
+    }
+    
     // PUT 요청
     async put(url, data = {}) {
         return this.request(url, {
@@ -94,8 +124,10 @@ class ApiClient {
     
     shouldRetry(error) {
         // 네트워크 오류나 서버 오류인 경우 재시도
+        // 409: 같은 멱등성 키의 요청이 아직 처리 중
         return error.message.includes('Failed to fetch') ||
                error.message.includes('HTTP 5') ||
+               error.message.includes('HTTP 409') ||
                error.message.includes('시간이 초과');
     }
     
@@ -202,13 +234,18 @@ class ApiClient {
     }
     
     // 결제 관련 API
-    async processPayment(patientId, amount, method, transactionData = null) {
-        return this.post('/payment/process', {
+    async processPayment(patientId, amount, method, transactionData = null, idempotencyKey = null) {
+        return this.postIdempotent('/payment/process', {
             patient_id: patientId,
             amount: amount,
             method: method,
             transaction_data: transactionData
-        });
+        }, idempotencyKey);
+    }
+    
+    async refundPayment(paymentId, reason, idempotencyKey = null) {
+        const params = new URLSearchParams({ reason: reason }).toString();
+        return this.postIdempotent(`/payment/refund/${paymentId}?${params}`, {}, idempotencyKey);
     }
     
     async getPendingPayments(patientId) {
@@ -0,0 +1,119 @@
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.services.backup import BackupService, run_daily_backup, sqlite_file_path
+
+
+def make_database(path: Path, rows: int = 500, wal: bool = False):
+    connection = sqlite3.connect(path)
+    if wal:
+        connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("CREATE TABLE patients (id INTEGER PRIMARY KEY, name TEXT)")
+    connection.executemany(
+        "INSERT INTO patients (name) VALUES (?)", [(f"환자{i}",) for i in range(rows)]
+    )
+    connection.commit()
+    connection.close()
+
+
+def count_rows(path: Path) -> int:
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute("SELECT COUNT(*) FROM patients").fetchone()[0]
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize("wal", [False, True])
+def test_backup_restores_to_identical_data(tmp_path, wal):
+    database = tmp_path / "kiosk.db"
+    make_database(database, wal=wal)
+    service = BackupService(database, tmp_path / "backups")
+
+    summary = service.create_backup()
+    archive = Path(summary["archive"])
+    assert archive.exists()
+    assert Path(f"{archive}.sha256").read_text().startswith(summary["sha256"])
+    assert summary["journal_mode"] == ("wal" if wal else "delete")
+    assert [p.name for p in (tmp_path / "backups").iterdir() if p.name.startswith(".")] == []
+
+    restored = tmp_path / "restored.db"
+    BackupService.restore(archive, restored)
+    assert count_rows(restored) == 500
+
+
+def test_wal_backup_streams_without_a_temporary_copy(tmp_path, monkeypatch):
+    database = tmp_path / "kiosk.db"
+    make_database(database, wal=True)
+    service = BackupService(database, tmp_path / "backups")
+    spilled = []
+    copy_online = service._copy_online
+
+    def copy(output, spill_path):
+        result = copy_online(output, spill_path)
+        spilled.append(spill_path.exists())
+        return result
+
+    monkeypatch.setattr(service, "_copy_online", copy)
+    # A writer mid-transaction neither blocks the copy nor shows up in it
+    writer = sqlite3.connect(database)
+    writer.execute("BEGIN IMMEDIATE")
+    writer.execute("INSERT INTO patients (name) VALUES ('uncommitted')")
+    try:
+        summary = service.create_backup()
+    finally:
+        writer.rollback()
+        writer.close()
+
+    assert spilled == [False]
+    restored = tmp_path / "restored.db"
+    BackupService.restore(Path(summary["archive"]), restored)
+    assert count_rows(restored) == 500
+
+
+def test_corrupted_archive_is_not_restored(tmp_path):
+    database = tmp_path / "kiosk.db"
+    make_database(database)
+    archive = Path(BackupService(database, tmp_path / "backups").create_backup()["archive"])
+    with open(archive, "r+b") as f:
+        f.seek(20)
+        f.write(b"\x00\x00\x00\x00")
+
+    target = tmp_path / "restored.db"
+    with pytest.raises(ValueError):
+        BackupService.restore(archive, target)
+    assert not target.exists()
+
+
+def test_retention_keeps_recent_and_newest(tmp_path):
+    backups = tmp_path / "backups"
+    backups.mkdir()
+    for days_ago in (1, 40, 50):
+        name = f"kiosk_{datetime.now() - timedelta(days=days_ago):%Y%m%d_%H%M%S}.db.gz"
+        (backups / name).write_bytes(b"")
+        (backups / f"{name}.sha256").write_text("")
+
+    service = BackupService(tmp_path / "kiosk.db", backups, retention_days=30)
+    assert len(service.prune()) == 2
+    assert len(service.list_backups()) == 1
+    assert len(list(backups.iterdir())) == 2
+
+    # An old archive that is the only one left is never pruned
+    service.retention_days = 0
+    assert service.prune() == []
+
+
+def test_memory_database_is_skipped():
+    with pytest.raises(ValueError):
+        sqlite_file_path("sqlite:///:memory:")
+    assert sqlite_file_path("sqlite:///./data/kiosk.db") == Path("./data/kiosk.db")
+    if os.environ["DATABASE_URL"] == "sqlite:///:memory:":
+        assert run_daily_backup() is None
@@ -0,0 +1,122 @@
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.models import (
+    Appointment, AppointmentStatus, BatchCheckInEntry, Department, OutboxEvent, Patient
+)
+from app.services.outbox import TOPIC_PRINTER_JOB
+from app.services.reception import ReceptionService
+
+
+@pytest.fixture
+def session():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for patient_id, name in ((1, "김엄마"), (2, "김첫째"), (3, "김둘째")):
+            session.add(Patient(id=patient_id, name=name, birthdate=datetime(2015, 1, 1), phone=f"010-0000-000{patient_id}"))
+        session.add(Appointment(
+            id=10, patient_id=1, department=Department.INTERNAL_MEDICINE,
+            appointment_time=datetime.now(), queue_number=None
+        ))
+        session.add(Appointment(
+            id=11, patient_id=9, department=Department.PEDIATRICS, appointment_time=datetime.now(),
+            status=AppointmentStatus.CHECKED_IN, queue_number=4
+        ))
+        session.commit()
+        yield session
+
+
+def test_batch_allocates_consecutive_numbers_and_one_print_job(session):
+    tickets = ReceptionService(session).check_in_batch([
+        BatchCheckInEntry(patient_id=1, appointment_id=10),
+        BatchCheckInEntry(patient_id=2, symptoms=["fever"], department=Department.PEDIATRICS),
+        BatchCheckInEntry(patient_id=3, symptoms=["cough"], department=Department.PEDIATRICS),
+    ])
+
+    assert [(t.department, t.queue_number) for t in tickets] == [
+        ("internal_medicine", 1), ("pediatrics", 5), ("pediatrics", 6)
+    ]
+    # The second child waits for one more patient than the first
+    assert tickets[2].estimated_wait_time > tickets[1].estimated_wait_time
+
+    print_jobs = session.exec(select(OutboxEvent).where(OutboxEvent.topic == TOPIC_PRINTER_JOB)).all()
+    assert len(print_jobs) == 1
+    assert len(json.loads(print_jobs[0].payload)["appointment_ids"]) == 3
+    assert session.get(Appointment, 10).status == AppointmentStatus.CHECKED_IN
+
+
+def test_invalid_entry_rolls_back_whole_batch(session):
+    with pytest.raises(ValueError):
+        ReceptionService(session).check_in_batch([
+            BatchCheckInEntry(patient_id=2, symptoms=["fever"], department=Department.PEDIATRICS),
+            BatchCheckInEntry(patient_id=3, appointment_id=10),
+        ])
+
+    assert session.get(Appointment, 10).status == AppointmentStatus.SCHEDULED
+    assert session.exec(select(Appointment).where(Appointment.patient_id == 2)).all() == []
+    assert session.exec(select(OutboxEvent)).all() == []
+
+
+def test_concurrent_check_ins_get_distinct_numbers(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'kiosk.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30}
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for patient_id in range(1, 9):
+            session.add(Patient(id=patient_id, name=f"환자{patient_id}", birthdate=datetime(1990, 1, 1), phone="010"))
+            for n in range(5):
+                session.add(Appointment(
+                    id=patient_id * 10 + n, patient_id=patient_id,
+                    department=Department.PEDIATRICS, appointment_time=datetime.now()
+                ))
+        session.commit()
+
+    # Widen the gap between statements so interleavings actually happen
+    event.listen(engine, "after_cursor_execute", lambda *args: time.sleep(0.002))
+
+    def client(patient_id):
+        appointment_ids = [patient_id * 10 + n for n in range(5)]
+        with Session(engine) as session:
+            service = ReceptionService(session)
+            if patient_id % 2:
+                for appointment_id in appointment_ids:
+                    service.check_in_appointment(patient_id, appointment_id)
+            else:
+                # Walk-ins only: no pending update takes the write lock early
+                service.check_in_batch([
+                    BatchCheckInEntry(patient_id=patient_id, symptoms=["fever"], department=Department.PEDIATRICS)
+                    for _ in appointment_ids
+                ])
+
+    threads = [threading.Thread(target=client, args=(patient_id,)) for patient_id in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with Session(engine) as session:
+        numbers = session.exec(
+            select(Appointment.queue_number).where(Appointment.queue_number.is_not(None))
+        ).all()
+    assert sorted(numbers) == list(range(1, 41))
+    engine.dispose()
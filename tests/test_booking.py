@@ -0,0 +1,141 @@
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.models import (
+    AppointmentSlot, AppointmentStatus, Department, DoctorScheduleCreate, Patient
+)
+from app.services.booking import BookingService
+from app.services.reception import ReceptionService
+from app.services.slot_index import SlotIndex, slot_index
+
+TOMORROW_9AM = (datetime.now() + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for patient_id in (1, 2):
+            session.add(Patient(
+                id=patient_id, name=f"환자{patient_id}",
+                birthdate=datetime(1990, 1, 1), phone=f"010-0000-000{patient_id}"
+            ))
+        session.commit()
+    slot_index.__init__(engine)
+    slot_index.load()
+    yield engine
+    slot_index.__init__()
+
+
+def create_schedule(session, doctor_name="김의사", capacity=1, hours=1):
+    return BookingService(session).create_schedule(DoctorScheduleCreate(
+        department=Department.INTERNAL_MEDICINE,
+        doctor_name=doctor_name,
+        start_time=TOMORROW_9AM,
+        end_time=TOMORROW_9AM + timedelta(hours=hours),
+        slot_minutes=10,
+        capacity=capacity
+    ))
+
+
+def test_schedule_slots_are_offered_in_time_order(engine):
+    with Session(engine) as session:
+        create_schedule(session, "김의사")
+        create_schedule(session, "이의사")
+        service = BookingService(session)
+
+        slots = service.available_slots(Department.INTERNAL_MEDICINE)
+        assert len(slots) == 5
+        assert [slot.start_time for slot in slots] == sorted(slot.start_time for slot in slots)
+        assert slots[0].start_time == TOMORROW_9AM
+
+        later = service.available_slots(
+            Department.INTERNAL_MEDICINE, after=TOMORROW_9AM + timedelta(minutes=30), doctor_name="이의사"
+        )
+        assert later[0].start_time == TOMORROW_9AM + timedelta(minutes=30)
+        assert {slot.doctor_name for slot in later} == {"이의사"}
+        assert service.available_slots(Department.PEDIATRICS) == []
+
+
+def test_full_slot_is_rejected_and_released_on_cancel(engine):
+    with Session(engine) as session:
+        create_schedule(session)
+        service = BookingService(session)
+        first_slot = service.available_slots(Department.INTERNAL_MEDICINE)[0]
+
+        appointment = service.book_slot(first_slot.id, 1, "두통")
+        assert appointment.appointment_time == TOMORROW_9AM
+        assert appointment.status == AppointmentStatus.SCHEDULED
+        assert service.available_slots(Department.INTERNAL_MEDICINE)[0].id != first_slot.id
+
+        with pytest.raises(ValueError):
+            service.book_slot(first_slot.id, 2)
+
+        ReceptionService(session).cancel_appointment(appointment.id)
+        assert session.get(AppointmentSlot, first_slot.id).booked == 0
+        assert service.available_slots(Department.INTERNAL_MEDICINE)[0].id == first_slot.id
+
+
+def test_stale_index_entry_is_corrected_by_failed_claim(engine):
+    with Session(engine) as session:
+        create_schedule(session, capacity=2)
+        slot_id = BookingService(session).available_slots(Department.INTERNAL_MEDICINE)[0].id
+        # Another worker fills the slot behind this index's back
+        session.get(AppointmentSlot, slot_id).booked = 2
+        session.commit()
+
+        with pytest.raises(ValueError):
+            BookingService(session).book_slot(slot_id, 1)
+        assert slot_id not in [s.id for s in slot_index.next_available(Department.INTERNAL_MEDICINE)]
+
+
+def test_search_does_not_query_database(engine):
+    with Session(engine) as session:
+        create_schedule(session, hours=10)
+    index = SlotIndex(engine)
+    index.load()
+    assert len(index) == 60
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert len(index.next_available(Department.INTERNAL_MEDICINE, limit=5)) == 5
+    assert statements == []
+
+
+def test_reload_picks_up_other_workers_changes(engine):
+    other_worker = SlotIndex(engine)
+    other_worker.load()
+    with Session(engine) as session:
+        create_schedule(session)
+        slot_id = BookingService(session).available_slots(Department.INTERNAL_MEDICINE)[0].id
+        BookingService(session).book_slot(slot_id, 1)
+
+    # Neither the schedule nor the booking went through this index
+    assert other_worker.next_available(Department.INTERNAL_MEDICINE) == []
+    other_worker.load()
+    offered = [slot.id for slot in other_worker.next_available(Department.INTERNAL_MEDICINE)]
+    assert len(offered) == 5 and slot_id not in offered
+
+
+def test_cold_index_falls_back_to_database(engine):
+    with Session(engine) as session:
+        create_schedule(session, doctor_name="이의사")
+        slot_index.clear()
+        slots = BookingService(session).available_slots(Department.INTERNAL_MEDICINE, doctor_name="이의사", limit=3)
+    assert [slot.start_time for slot in slots] == [TOMORROW_9AM + timedelta(minutes=10 * n) for n in range(3)]
+    assert len(slot_index) == 0
@@ -0,0 +1,168 @@
+import io
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, func, select
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.models import Appointment, AppointmentStatus, Department, Patient
+from app.services.bulk_import import BulkImporter
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def count(engine, model) -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.count()).select_from(model)).one()
+
+
+def fhir_patient(n: int) -> str:
+    return json.dumps({
+        "resourceType": "Patient",
+        "id": f"p{n}",
+        "name": [{"family": "김", "given": [f"환자{n}"]}],
+        "birthDate": "1985-03-02",
+        "telecom": [{"system": "phone", "value": f"010-0000-{n:04d}"}]
+    })
+
+
+def fhir_appointment(n: int, patient: int, status: str = "booked") -> str:
+    return json.dumps({
+        "resourceType": "Appointment",
+        "id": f"a{n}",
+        "status": status,
+        "start": "2030-01-02T09:30:00",
+        "serviceType": [{"coding": [{"code": "PEDIATRICS"}]}],
+        "participant": [
+            {"actor": {"reference": f"Patient/p{patient}"}},
+            {"actor": {"reference": "Practitioner/d1", "display": "이의사"}}
+        ]
+    })
+
+
+def test_fhir_ndjson_import_in_batches(engine):
+    lines = [fhir_patient(n) for n in range(25)]
+    lines += [fhir_appointment(n, patient=n) for n in range(25)]
+    lines += [
+        fhir_appointment(99, patient=404),
+        json.dumps({"resourceType": "Patient", "id": "bad", "birthDate": "1985-03-02"}),
+        json.dumps({"resourceType": "Observation", "id": "o1"}),
+        "{not json"
+    ]
+    inserts = []
+    event.listen(
+        engine, "before_cursor_execute",
+        lambda conn, cursor, statement, params, context, executemany:
+            inserts.append(executemany) if statement.startswith("INSERT") else None
+    )
+
+    result = BulkImporter(engine, batch_size=10, commit_rows=20).import_stream(io.StringIO("\n".join(lines)), "ndjson")
+
+    assert result["patients"] == 25
+    assert result["appointments"] == 25
+    assert result["rejected"] == 4
+    assert [error["line"] for error in result["errors"]] == [51, 52, 53, 54]
+    # One executemany per batch of ten
+    assert inserts == [True] * 6
+
+    with Session(engine) as session:
+        appointment = session.exec(select(Appointment).where(Appointment.emr_id == "a7")).one()
+        patient = session.get(Patient, appointment.patient_id)
+    assert patient.emr_id == "p7"
+    assert patient.name == "김환자7"
+    assert appointment.department == Department.PEDIATRICS
+    assert appointment.doctor_name == "이의사"
+    assert appointment.status == AppointmentStatus.SCHEDULED
+
+
+def test_reimport_skips_existing_ids(engine):
+    lines = [fhir_patient(n) for n in range(5)] + [fhir_appointment(n, patient=n) for n in range(5)]
+    importer = BulkImporter(engine)
+    importer.import_stream(io.StringIO("\n".join(lines)), "ndjson")
+
+    result = importer.import_stream(io.StringIO("\n".join(lines + [fhir_patient(5)])), "ndjson")
+
+    assert result["patients"] == 1
+    assert result["appointments"] == 0
+    assert result["skipped"] == 10
+    assert count(engine, Patient) == 6
+    assert count(engine, Appointment) == 5
+
+
+def test_csv_import_links_existing_patients(engine, tmp_path):
+    patients = tmp_path / "patients.csv"
+    patients.write_text(
+        "id,name,birthdate,phone,email\n"
+        "H1,홍길동,1970-01-01,010-1234-0001,\n"
+        "H2,김철수,1990-12-31,010-1234-0002,kim@example.com\n"
+        "H3,이영희,not-a-date,010-1234-0003,\n",
+        encoding="utf-8"
+    )
+    appointments = tmp_path / "appointments.csv"
+    appointments.write_text(
+        "id,patient_id,department,doctor_name,appointment_time,symptoms\n"
+        "R1,H1,internal_medicine,박의사,2030-02-01T10:00:00,기침\n"
+        "R2,H2,DERMATOLOGY,,2030-02-01T10:10:00,\n"
+        "R3,H3,surgery,,2030-02-01T10:20:00,\n",
+        encoding="utf-8"
+    )
+    importer = BulkImporter(engine)
+
+    first = importer.import_file(patients, resource="patients")
+    second = importer.import_file(appointments, resource="appointments")
+
+    assert (first["patients"], first["rejected"]) == (2, 1)
+    assert first["errors"][0]["line"] == 4
+    assert (second["appointments"], second["rejected"]) == (2, 1)
+    with Session(engine) as session:
+        departments = session.exec(select(Appointment.department).order_by(Appointment.emr_id)).all()
+    assert departments == [Department.INTERNAL_MEDICINE, Department.DERMATOLOGY]
+
+
+def test_csv_requires_resource(engine):
+    with pytest.raises(ValueError):
+        BulkImporter(engine).import_stream(io.StringIO("id,name\n"), "csv")
+
+
+def test_cli_imports_into_initialized_database(tmp_path):
+    root = Path(__file__).resolve().parents[1]
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'kiosk.db'}"}
+    subprocess.run(
+        [sys.executable, "-c", "from app.core.database import init_db; init_db()"],
+        cwd=root, env=env, check=True
+    )
+    source = tmp_path / "patients.ndjson"
+    source.write_text("\n".join(fhir_patient(n) for n in range(3)), encoding="utf-8")
+
+    # A separate process, as an operator would run it
+    result = subprocess.run(
+        [sys.executable, "-m", "app.services.bulk_import", str(source)],
+        cwd=root, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert "'patients': 3" in result.stdout
+
+    from app.services.admin_search import AdminSearchService
+    engine = create_engine(env["DATABASE_URL"])
+    with Session(engine) as session:
+        service = AdminSearchService(session)
+        service.refresh()
+        found = service.search_patients("환자1")["items"]
+    assert [patient["name"] for patient in found] == ["김환자1"]
@@ -0,0 +1,119 @@
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.models import Appointment, AppointmentStatus, Department, QueuePriority
+from app.services.call_queue import CallQueue, assign_priority
+from app.services.reception import ReceptionService
+
+
+@pytest.fixture
+def session():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def add_waiting(session, queue_number, priority, minutes_ago, department=Department.INTERNAL_MEDICINE):
+    appointment = Appointment(
+        patient_id=1,
+        department=department,
+        appointment_time=datetime.now(),
+        status=AppointmentStatus.CHECKED_IN,
+        queue_number=queue_number,
+        priority=priority,
+        checked_in_at=datetime.utcnow() - timedelta(minutes=minutes_ago)
+    )
+    session.add(appointment)
+    session.commit()
+    return appointment
+
+
+def test_assign_priority():
+    young = datetime.now() - timedelta(days=365 * 30)
+    old = datetime.now() - timedelta(days=365 * 70)
+    assert assign_priority(Department.EMERGENCY, young, reserved=False) == QueuePriority.EMERGENCY
+    assert assign_priority(Department.SURGERY, old, reserved=False) == QueuePriority.PRIORITY
+    assert assign_priority(Department.SURGERY, young, reserved=False, needs_assistance=True) == QueuePriority.PRIORITY
+    assert assign_priority(Department.SURGERY, young, reserved=True) == QueuePriority.RESERVED
+    assert assign_priority(Department.SURGERY, young, reserved=False) == QueuePriority.WALK_IN
+
+
+def test_priority_order_with_aging(session):
+    add_waiting(session, 1, QueuePriority.WALK_IN, minutes_ago=40)   # aged past priority
+    add_waiting(session, 2, QueuePriority.WALK_IN, minutes_ago=5)
+    add_waiting(session, 3, QueuePriority.PRIORITY, minutes_ago=2)
+    add_waiting(session, 4, QueuePriority.RESERVED, minutes_ago=3)
+
+    service = ReceptionService(session)
+    order = []
+    while (appointment := service.call_next(Department.INTERNAL_MEDICINE)) is not None:
+        order.append(appointment.queue_number)
+    assert order == [1, 3, 4, 2]
+
+
+def test_call_next_claims_atomically_and_skips_cancelled(session):
+    first = add_waiting(session, 1, QueuePriority.WALK_IN, minutes_ago=10)
+    add_waiting(session, 2, QueuePriority.WALK_IN, minutes_ago=5)
+    add_waiting(session, 3, QueuePriority.EMERGENCY, minutes_ago=0, department=Department.SURGERY)
+
+    service = ReceptionService(session)
+    first.status = AppointmentStatus.CANCELLED
+    session.add(first)
+    session.commit()
+
+    called = service.call_next(Department.INTERNAL_MEDICINE)
+    assert called.queue_number == 2
+    assert called.status == AppointmentStatus.IN_PROGRESS
+    assert called.started_at is not None
+    assert service.call_next(Department.INTERNAL_MEDICINE) is None
+    assert service.call_next(Department.SURGERY).queue_number == 3
+
+
+def test_check_ins_by_other_workers_are_seen(session):
+    add_waiting(session, 1, QueuePriority.WALK_IN, minutes_ago=10)
+    queue = CallQueue()
+    first = queue.next_waiting(session, Department.INTERNAL_MEDICINE)
+
+    # An emergency checked in on another worker since the last call
+    emergency = add_waiting(session, 2, QueuePriority.EMERGENCY, minutes_ago=0)
+    assert queue.next_waiting(session, Department.INTERNAL_MEDICINE) == emergency.id
+    assert first != emergency.id
+
+
+def test_class_heads_are_index_seeks(session):
+    add_waiting(session, 1, QueuePriority.WALK_IN, minutes_ago=10)
+    add_waiting(session, 2, None, minutes_ago=5)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        assert CallQueue().next_waiting(session, Department.INTERNAL_MEDICINE) is not None
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert len(statements) == len(QueuePriority) + 1
+    for statement, parameters in statements:
+        plan = " ".join(
+            row[3] for row in session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        )
+        assert "SEARCH appointments USING INDEX ix_appointments_call_queue" in plan
+        assert "TEMP B-TREE" not in plan
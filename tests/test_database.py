@@ -0,0 +1,87 @@
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import inspect
+from sqlmodel import Session, SQLModel, create_engine, select
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.database import ADDED_COLUMNS, upgrade_schema
+from app.core.models import Appointment, AppointmentStatus, Department, Patient, QueuePriority
+
+# Tables as created by the first release
+LEGACY_SCHEMA = [
+    """CREATE TABLE patients (
+        id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, birthdate DATETIME NOT NULL,
+        phone VARCHAR NOT NULL, email VARCHAR, card_uid VARCHAR,
+        created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL
+    )""",
+    """CREATE TABLE appointments (
+        id INTEGER PRIMARY KEY, patient_id INTEGER NOT NULL REFERENCES patients (id),
+        department VARCHAR(17) NOT NULL, doctor_name VARCHAR, appointment_time DATETIME NOT NULL,
+        status VARCHAR(11) NOT NULL, queue_number INTEGER, symptoms VARCHAR, created_at DATETIME NOT NULL
+    )""",
+    """CREATE TABLE payments (
+        id INTEGER PRIMARY KEY, patient_id INTEGER NOT NULL REFERENCES patients (id),
+        amount NUMERIC NOT NULL, method VARCHAR(8) NOT NULL, transaction_id VARCHAR,
+        approved_at DATETIME, receipt_number VARCHAR, created_at DATETIME NOT NULL
+    )""",
+    "INSERT INTO patients VALUES (1, '김민수', '1950-01-01', '010-1234-5678', NULL, NULL, "
+    "CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)",
+    "INSERT INTO appointments VALUES (1, 1, 'INTERNAL_MEDICINE', NULL, '2024-03-05 09:00:00', 'SCHEDULED', "
+    "NULL, NULL, CURRENT_TIMESTAMP)",
+]
+
+
+def make_legacy_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.exec_driver_sql(statement)
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def columns(engine, table):
+    return {column["name"] for column in inspect(engine).get_columns(table)}
+
+
+def test_upgrade_adds_columns_to_existing_tables(tmp_path):
+    engine = make_legacy_database(tmp_path)
+
+    added = upgrade_schema(engine)
+
+    assert added == [
+        "appointments.checked_in_at", "appointments.started_at", "appointments.completed_at",
+        "appointments.priority", "appointments.slot_id", "patients.emr_id", "appointments.emr_id",
+        "payments.terminal_id"
+    ]
+    assert upgrade_schema(engine) == []
+    assert "terminal_id" in columns(engine, "payments")
+    indexes = {index["name"] for index in inspect(engine).get_indexes("appointments")}
+    assert "ix_appointments_emr_id" in indexes
+
+    with Session(engine) as session:
+        appointment = session.get(Appointment, 1)
+        assert appointment.priority is None and appointment.started_at is None
+        appointment.status = AppointmentStatus.CHECKED_IN
+        appointment.priority = QueuePriority.RESERVED
+        appointment.checked_in_at = datetime(2024, 3, 5, 8, 55)
+        session.add(appointment)
+        session.add(Appointment(
+            patient_id=1, department=Department.INTERNAL_MEDICINE,
+            appointment_time=datetime(2024, 3, 5, 9, 10), emr_id="A1"
+        ))
+        session.commit()
+
+        assert session.exec(select(Appointment.id).where(Appointment.emr_id == "A1")).one() == 2
+        assert session.get(Patient, 1).emr_id is None
+
+
+def test_added_columns_exist_in_the_models():
+    for table_name, column_name in ADDED_COLUMNS:
+        column = SQLModel.metadata.tables[table_name].c[column_name]
+        assert column.nullable or column.server_default is not None
@@ -0,0 +1,113 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select, func
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.models import Deadline
+from app.core.scheduler import DeadlineDispatcher
+
+
+def run_async(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def count_rows(engine):
+    with Session(engine) as session:
+        return session.exec(select(func.count(Deadline.id))).one()
+
+
+def test_due_deadlines_fire_in_batches_per_kind(engine):
+    dispatcher = DeadlineDispatcher(engine, batch_size=3)
+    calls = []
+
+    @dispatcher.handler("reminder")
+    def remind(payloads):
+        calls.append(("reminder", [p["appointment_id"] for p in payloads]))
+
+    @dispatcher.handler("hold_expiry")
+    async def expire(payloads):
+        calls.append(("hold_expiry", len(payloads)))
+
+    past = datetime.utcnow() - timedelta(seconds=1)
+    dispatcher.schedule_many([("reminder", past + timedelta(milliseconds=i), {"appointment_id": i}) for i in range(5)])
+    dispatcher.schedule("hold_expiry", past - timedelta(seconds=1), {"slot_id": 1})
+    dispatcher.schedule("reminder", datetime.utcnow() + timedelta(hours=1), {"appointment_id": 99})
+
+    assert run_async(dispatcher.dispatch()) == 6
+    # Earliest first, at most three per batch
+    assert calls[0] == ("hold_expiry", 1)
+    assert [appointment for kind, ids in calls if kind == "reminder" for appointment in ids] == [0, 1, 2, 3, 4]
+    assert all(len(ids) <= 3 for kind, ids in calls if kind == "reminder")
+    assert dispatcher.snapshot()["pending"] == 1
+    assert count_rows(engine) == 1
+
+
+def test_deadlines_are_shared_by_workers(engine):
+    worker_a, worker_b = DeadlineDispatcher(engine), DeadlineDispatcher(engine)
+    due_at = datetime.utcnow() + timedelta(minutes=5)
+    keep, drop = worker_a.schedule_many([("reminder", due_at, {"n": 1}), ("reminder", due_at, {"n": 2})])
+    assert worker_b.cancel(drop)
+    assert not worker_a.cancel(drop)
+    assert worker_b.snapshot() == {"pending": 1, "next_due_at": due_at}
+
+
+def test_each_due_deadline_fires_on_one_worker(tmp_path):
+    # A database file, so each worker thread gets its own connection
+    engine = create_engine(f"sqlite:///{tmp_path / 'kiosk.db'}", connect_args={"timeout": 30})
+    SQLModel.metadata.create_all(engine)
+    calls = []
+    workers = [DeadlineDispatcher(engine, batch_size=2) for _ in range(2)]
+    for worker in workers:
+        worker.handler("reminder")(lambda payloads: calls.extend(p["n"] for p in payloads))
+    past = datetime.utcnow() - timedelta(seconds=1)
+    workers[0].schedule_many([("reminder", past, {"n": n}) for n in range(5)])
+    assert run_async(workers[1].dispatch()) == 5
+
+    workers[1].schedule_many([("reminder", past, {"n": n}) for n in range(5, 10)])
+
+    async def run():
+        return await asyncio.gather(*(worker.dispatch() for worker in workers))
+
+    assert sum(run_async(run())) == 5
+    assert sorted(calls) == list(range(10))
+    assert count_rows(engine) == 0
+
+
+def test_failed_handler_is_retried_later(engine):
+    dispatcher = DeadlineDispatcher(engine, retry_seconds=30)
+
+    @dispatcher.handler("reminder")
+    def fail(payloads):
+        raise RuntimeError("SMS gateway down")
+
+    dispatcher.schedule("reminder", datetime.utcnow() - timedelta(seconds=1), {"n": 1})
+    dispatcher.schedule("unknown", datetime.utcnow() - timedelta(seconds=1))
+
+    assert run_async(dispatcher.dispatch()) == 0
+    assert dispatcher.snapshot()["pending"] == 2
+    with Session(engine) as session:
+        due_times = session.exec(select(Deadline.due_at)).all()
+    assert all(due_at > datetime.utcnow() + timedelta(seconds=20) for due_at in due_times)
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select, update
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.models import OutboxEvent, Patient
+from app.integrations.emr_client import EmrClient
+from app.integrations.mock_emr import create_mock_emr
+from app.services.emr_push import EmrPusher
+from app.services.outbox import OutboxDispatcher, TOPIC_EMR_NOTIFY, enqueue_event
+
+
+def run_async(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def make_dispatcher(engine, mock, batch_size=200):
+    client = EmrClient(
+        base_url="http://mock-emr",
+        api_key="test-key",
+        transport=httpx.ASGITransport(app=mock)
+    )
+    pusher = EmrPusher(engine, client)
+    dispatcher = OutboxDispatcher(engine, batch_size=batch_size)
+    dispatcher.register(TOPIC_EMR_NOTIFY, pusher.push)
+    return dispatcher, pusher
+
+
+def add_check_ins(engine, count, start=0, event="appointment.checked_in"):
+    with Session(engine) as session:
+        for n in range(start, start + count):
+            enqueue_event(session, TOPIC_EMR_NOTIFY, {
+                "event": event, "appointment_id": n, "patient_id": 1, "queue_number": n
+            }, "appointment", n)
+        session.commit()
+
+
+def statuses(engine):
+    with Session(engine) as session:
+        return sorted(session.exec(select(OutboxEvent.status)).all())
+
+
+def test_events_pushed_in_batches(engine):
+    mock = create_mock_emr(latency_ms=20)
+    emr = mock.state.emr
+    with Session(engine) as session:
+        session.add(Patient(name="홍길동", birthdate=datetime(1980, 1, 1), phone="010-1234-5678", emr_id="P1"))
+        session.commit()
+    add_check_ins(engine, 1000)
+    dispatcher, pusher = make_dispatcher(engine, mock)
+
+    started = time.monotonic()
+    result = run_async(dispatcher.drain())
+    elapsed = time.monotonic() - started
+
+    assert result["dispatched"] == 1000
+    assert emr.event_batches == 5
+    assert len(emr.events) == 1000
+    assert emr.events["appointment.checked_in:7"]["patient_emr_id"] == "P1"
+    # One request per event would spend 20 s in latency alone
+    assert elapsed < 5
+    assert pusher.stats["accepted"] == 1000
+
+
+def test_rejected_events_fail_and_redeliveries_are_duplicates(engine):
+    mock = create_mock_emr()
+    emr = mock.state.emr
+    add_check_ins(engine, 3)
+    add_check_ins(engine, 1, start=3, event="appointment.unknown")
+    emr.events["appointment.checked_in:0"] = {"event": "appointment.checked_in"}
+    dispatcher, pusher = make_dispatcher(engine, mock)
+
+    result = run_async(dispatcher.dispatch_batch())
+
+    assert result == {"dispatched": 3, "retried": 0, "failed": 1}
+    assert pusher.stats["duplicates"] == 1
+    assert statuses(engine) == ["dispatched", "dispatched", "dispatched", "failed"]
+
+
+def test_unreachable_emr_retries_with_backoff(engine):
+    mock = create_mock_emr(failure_rate=1.0)
+    add_check_ins(engine, 10)
+    dispatcher, pusher = make_dispatcher(engine, mock, batch_size=4)
+
+    assert run_async(dispatcher.drain())["retried"] == 4
+    assert statuses(engine) == ["pending"] * 10
+    with Session(engine) as session:
+        waiting = session.exec(select(OutboxEvent).where(OutboxEvent.attempts == 1)).all()
+    assert len(waiting) == 4
+    assert all(event.next_attempt_at > datetime.utcnow() for event in waiting)
+
+    mock.state.emr.failure_rate = 0.0
+    with Session(engine) as session:
+        session.exec(update(OutboxEvent).values(next_attempt_at=datetime.utcnow() - timedelta(seconds=1)))
+        session.commit()
+    assert run_async(dispatcher.drain())["dispatched"] == 10
+    assert pusher.stats["errors"] == 1
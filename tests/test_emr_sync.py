@@ -0,0 +1,224 @@
+import asyncio
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, func, select
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.models import Appointment, AppointmentStatus, Patient, SyncWatermark
+from app.integrations.emr_client import EmrClient, EmrError
+from app.integrations.mock_emr import create_mock_emr
+from app.services.emr_sync import EmrSyncService
+
+
+def run_async(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def make_sync(engine, mock, page_size=100):
+    client = EmrClient(
+        base_url="http://mock-emr",
+        api_key="test-key",
+        max_concurrency=3,
+        transport=httpx.ASGITransport(app=mock)
+    )
+    return EmrSyncService(engine, client, page_size=page_size)
+
+
+def sync_once(service):
+    async def run():
+        try:
+            return await service.sync()
+        finally:
+            await service.client.close()
+    return run_async(run())
+
+
+def count(engine, model) -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.count()).select_from(model)).one()
+
+
+def test_initial_sync_loads_every_page(engine):
+    mock = create_mock_emr(patients=450, appointments_per_patient=2, seed=3)
+    result = sync_once(make_sync(engine, mock))
+
+    assert result["patients"]["pages"] == 5
+    assert result["appointments"]["stored"] == 900
+    assert count(engine, Patient) == 450
+    assert count(engine, Appointment) == 900
+    with Session(engine) as session:
+        assert session.get(SyncWatermark, "patients").last_count == 450
+
+
+def test_second_cycle_transfers_only_deltas(engine):
+    mock = create_mock_emr(patients=300, seed=3)
+    emr = mock.state.emr
+    sync_once(make_sync(engine, mock))
+
+    with Session(engine) as session:
+        checked_in = session.exec(select(Appointment).where(Appointment.emr_id == "A000000100")).one()
+        checked_in.status = AppointmentStatus.CHECKED_IN
+        session.add(checked_in)
+        session.commit()
+
+    emr.upsert("patients", {"id": "P0000007", "phone": "010-9999-0007"})
+    emr.upsert("appointments", {"id": "A000000100", "doctor_name": "변경의사", "status": "CANCELLED"})
+    emr.upsert("appointments", {
+        "id": "A999999900", "patient_id": "P0000008", "department": "PEDIATRICS",
+        "doctor_name": "신규의사", "appointment_time": "2030-01-02T10:00:00", "status": "SCHEDULED"
+    })
+    served = emr.items_served
+
+    result = sync_once(make_sync(engine, mock))
+    assert emr.items_served - served == 3
+    assert result["patients"]["changed"] == 1
+    assert result["appointments"]["changed"] == 2
+    assert count(engine, Patient) == 300
+    assert count(engine, Appointment) == 301
+
+    with Session(engine) as session:
+        assert session.exec(select(Patient.phone).where(Patient.emr_id == "P0000007")).one() == "010-9999-0007"
+        appointment = session.exec(select(Appointment).where(Appointment.emr_id == "A000000100")).one()
+        # Schedule changes apply, but the kiosk check-in is kept
+        assert appointment.doctor_name == "변경의사"
+        assert appointment.status == AppointmentStatus.CHECKED_IN
+
+    assert sync_once(make_sync(engine, mock))["appointments"]["changed"] == 0
+
+
+def test_appointment_for_unsynced_patient_fetches_patient(engine):
+    mock = create_mock_emr(patients=0)
+    emr = mock.state.emr
+    emr.upsert("appointments", {
+        "id": "A1", "patient_id": "P1", "department": "SURGERY", "doctor_name": "외과의사",
+        "appointment_time": "2030-01-02T10:00:00", "status": "SCHEDULED"
+    })
+    # Patient added directly on the EMR side without appearing in this cycle's feed window
+    emr.records["patients"]["P1"] = {
+        "id": "P1", "name": "홍길동", "birthdate": "1980-05-05", "phone": "010-1234-5678",
+        "updated_at": "2000-01-01T00:00:00"
+    }
+
+    result = sync_once(make_sync(engine, mock))
+    assert result["appointments"]["stored"] == 1
+    with Session(engine) as session:
+        appointment = session.exec(select(Appointment)).one()
+        assert session.get(Patient, appointment.patient_id).emr_id == "P1"
+
+
+def test_kiosk_registered_patient_is_linked_not_duplicated(engine):
+    with Session(engine) as session:
+        session.add(Patient(id=1, name="홍길동", birthdate=datetime(1980, 5, 5), phone="01012345678"))
+        # Same name and phone, different person
+        session.add(Patient(id=2, name="홍길동", birthdate=datetime(1990, 1, 1), phone="010-1234-5678"))
+        session.commit()
+    mock = create_mock_emr(patients=0)
+    mock.state.emr.upsert("patients", {
+        "id": "P1", "name": "홍길동", "birthdate": "1980-05-05", "phone": "010-1234-5678"
+    })
+
+    sync_once(make_sync(engine, mock))
+    assert count(engine, Patient) == 2
+    with Session(engine) as session:
+        assert session.get(Patient, 1).emr_id == "P1"
+        assert session.get(Patient, 1).phone == "010-1234-5678"
+        assert session.get(Patient, 2).emr_id is None
+
+
+def test_failed_page_keeps_watermark(engine):
+    mock = create_mock_emr(patients=250, seed=1, failure_rate=0.3)
+    service = make_sync(engine, mock)
+    with pytest.raises(EmrError):
+        for _ in range(20):
+            sync_once(service)
+    with Session(engine) as session:
+        assert session.get(SyncWatermark, "appointments") is None
+
+    # The repeated cycle starts from the old watermark; upserts make it idempotent
+    mock.state.emr.failure_rate = 0.0
+    sync_once(service)
+    assert count(engine, Patient) == 250
+    assert count(engine, Appointment) == 250
+
+
+def add_orphans(emr, count, start=0):
+    """Appointments whose patients exist on the EMR but are outside the feed window"""
+    for n in range(start, start + count):
+        emr.upsert("appointments", {
+            "id": f"A{n}", "patient_id": f"P{n}", "department": "SURGERY", "doctor_name": "외과의사",
+            "appointment_time": "2030-01-02T10:00:00", "status": "SCHEDULED"
+        })
+        emr.records["patients"][f"P{n}"] = {
+            "id": f"P{n}", "name": "홍길동", "birthdate": "1980-05-05", "phone": "010-1234-5678",
+            "updated_at": "2000-01-01T00:00:00"
+        }
+
+
+def test_many_orphans_stay_within_bulkhead(engine):
+    mock = create_mock_emr(patients=0, latency_ms=5)
+    service = make_sync(engine, mock)
+    sync_once(service)
+    add_orphans(mock.state.emr, 60)
+
+    result = sync_once(service)
+    assert result["appointments"]["stored"] == 60
+    assert result["appointments"]["unresolved"] == 0
+    assert service.client.dependency.counters["rejected"] == 0
+    assert count(engine, Patient) == 60
+
+
+def test_failed_patient_lookup_keeps_watermark(engine, monkeypatch):
+    mock = create_mock_emr(patients=0)
+    emr = mock.state.emr
+    service = make_sync(engine, mock)
+    sync_once(service)
+    before = service.watermarks()["appointments"]
+    add_orphans(emr, 3)
+    # P404 does not exist on the EMR at all
+    emr.upsert("appointments", {
+        "id": "A404", "patient_id": "P404", "department": "SURGERY",
+        "appointment_time": "2030-01-02T10:00:00", "status": "SCHEDULED"
+    })
+    fetch_one = service.client.fetch_one
+
+    async def flaky_fetch_one(resource, emr_id):
+        if emr_id == "P1":
+            raise EmrError("EMR error 503 on /v1/patients/P1", 503)
+        return await fetch_one(resource, emr_id)
+
+    monkeypatch.setattr(service.client, "fetch_one", flaky_fetch_one)
+    result = sync_once(service)
+    assert result["appointments"]["stored"] == 2
+    assert result["appointments"]["unresolved"] == 1
+    assert service.watermarks()["appointments"] == before
+    # The 404 is an answer from a healthy EMR and does not count against it
+    assert service.client.dependency.breaker.failures == 0
+
+    monkeypatch.setattr(service.client, "fetch_one", fetch_one)
+    result = sync_once(service)
+    assert result["appointments"]["unresolved"] == 0
+    assert count(engine, Appointment) == 3
+    assert service.watermarks()["appointments"] > before
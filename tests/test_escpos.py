@@ -0,0 +1,91 @@
+import os
+import sys
+import unicodedata
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.hardware.escpos import TicketRenderer, fit, FEED_AND_CUT, INIT
+
+
+RECEIPT = {
+    "receipt_number": "RCP-20250605101010-ABCD",
+    "date": "2025-06-05 10:10:10",
+    "patient_name": "김민수",
+    "amount": 15000.0,
+    "method": "card",
+    "transaction_id": "CARD_1234ABCD_1111",
+    "hospital_name": "Healthcare Kiosk",
+    "items": [{"description": "진료비 - 내과", "amount": 15000}]
+}
+
+
+def test_fit_pads_and_never_splits_multibyte_characters():
+    assert fit("AB", 4, "cp949") == b"AB  "
+    assert fit("12", 4, "cp949", ">") == b"  12"
+    # Each Hangul syllable is two bytes in CP949
+    assert fit("김민수", 5, "cp949") == "김민".encode("cp949") + b" "
+    assert len(fit("a very long value", 6, "cp437")) == 6
+
+
+def test_receipt_contains_header_fields_and_footer():
+    renderer = TicketRenderer(line_width=42, logo_path="", hospital_name="보건소")
+    data = renderer.render_receipt(RECEIPT, "ko")
+
+    assert data.startswith(INIT)
+    assert data.endswith(FEED_AND_CUT)
+    assert "영수증".encode("cp949") in data
+    assert "김민수".encode("cp949") in data
+    assert b"15,000" in data
+    assert "카드".encode("cp949") in data
+
+
+def test_templates_compiled_once_per_locale_with_fixed_length():
+    renderer = TicketRenderer(line_width=42, logo_path="")
+    first = renderer.compile("queue_ticket", "en")
+    assert renderer.compile("queue_ticket", "en") is first
+    assert renderer.compile("queue_ticket", "ko") is not first
+
+    short = first.render({"queue_number": 1, "department": "Surgery"})
+    long = first.render({"queue_number": 123, "department": "Internal Medicine and more"})
+    assert len(short) == len(long) == len(first.data)
+
+
+def test_queue_ticket_localized():
+    renderer = TicketRenderer(line_width=32, logo_path="")
+    data = renderer.render_queue_ticket({
+        "queue_number": 17,
+        "department": "pediatrics",
+        "estimated_wait_time": 30,
+        "current_number": 12,
+        "location": "1F 101",
+        "date": "2025-06-05 10:10"
+    }, "en")
+
+    assert b"Queue Ticket" in data
+    assert b"Pediatrics" in data
+    assert b"17" in data
+
+
+def test_vietnamese_ticket_spells_tone_marks_in_cp1258():
+    # Precomposed letters like "ế" are not in CP1258: base letter plus combining mark
+    assert fit("Phiếu", 8, "cp1258") == b"Phi\xea\xecu  "
+    # Truncation keeps a tone mark with its letter
+    assert fit("số", 2, "cp1258") == b"s "
+
+    renderer = TicketRenderer(line_width=32, logo_path="")
+    data = renderer.render_queue_ticket({
+        "queue_number": 17,
+        "department": "pediatrics",
+        "estimated_wait_time": 30,
+        "location": "1F 101",
+        "date": "2025-06-05 10:10"
+    }, "vi")
+    receipt = renderer.render_receipt(RECEIPT, "vi")
+
+    assert b"?" not in data
+    text = unicodedata.normalize("NFC", data.decode("cp1258"))
+    assert "Phiếu số thứ tự" in text
+    assert "Khoa: Nhi khoa" in text
+    assert "Cảm ơn" in unicodedata.normalize("NFC", receipt.decode("cp1258"))
@@ -0,0 +1,127 @@
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.fulltext import bigrams, build_match_query, init_fulltext
+from app.core.models import Certificate, CertificateType, Patient
+from app.services.admin_search import AdminSearchService
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        # Existing rows are backfilled when the index is created
+        session.add(Patient(id=1, name="김민수", birthdate=datetime(1950, 1, 1), phone="010-1234-5678"))
+        session.commit()
+    init_fulltext(engine)
+    return engine
+
+
+def add_certificate(session, certificate_id, certificate_type, content, issued_at):
+    session.add(Certificate(
+        id=certificate_id,
+        patient_id=1,
+        type=certificate_type,
+        content=content,
+        doctor_name="이의사",
+        issued_at=issued_at
+    ))
+
+
+def test_bigram_expansion():
+    assert bigrams("예방접종 완료") == "예방 방접 접종 완료"
+    assert build_match_query("독감 예방접종") == '"독감" AND "예방 방접 접종"'
+    assert build_match_query("김") == '"김"*'
+
+
+def test_certificate_search_filters_and_paginates(engine):
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        for i in range(1, 6):
+            add_certificate(session, i, CertificateType.VACCINATION, f"독감 예방접종 {i}차 완료", now - timedelta(days=i))
+        add_certificate(session, 6, CertificateType.DIAGNOSIS, "독감 진단", now)
+        add_certificate(session, 7, CertificateType.VACCINATION, "독감 예방접종", now - timedelta(days=60))
+        add_certificate(session, 8, CertificateType.VACCINATION, "파상풍 예방접종", now)
+        session.commit()
+
+        service = AdminSearchService(session)
+        assert service.refresh() == 8
+        seen = []
+        cursor = None
+        while True:
+            page = service.search_certificates(
+                "독감",
+                certificate_type=CertificateType.VACCINATION,
+                issued_from=now - timedelta(days=30),
+                cursor=cursor,
+                limit=2
+            )
+            seen.extend(item["id"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        assert sorted(seen) == [1, 2, 3, 4, 5]
+        assert len(seen) == len(set(seen))
+        assert service.search_certificates("예방접종 2차")["items"][0]["type"] == "vaccination"
+
+
+def test_triggers_follow_updates_and_deletes(engine):
+    with Session(engine) as session:
+        assert [p["id"] for p in AdminSearchService(session).search_patients("민수")["items"]] == [1]
+
+        patient = session.get(Patient, 1)
+        patient.name = "박서연"
+        session.add(patient)
+        add_certificate(session, 1, CertificateType.DIAGNOSIS, "감기", datetime.utcnow())
+        session.commit()
+        session.execute(text("DELETE FROM certificates WHERE id = 1"))
+        session.commit()
+
+        service = AdminSearchService(session)
+        service.refresh()
+        assert service.search_patients("민수")["items"] == []
+        assert [p["id"] for p in service.search_patients("서연")["items"]] == [1]
+        assert [p["id"] for p in service.search_patients("5678")["items"]] == [1]
+        assert service.search_certificates("감기")["items"] == []
+
+
+def test_writes_without_application_functions_are_indexed(tmp_path):
+    path = tmp_path / "kiosk.db"
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    init_fulltext(engine)
+
+    # Another process (sqlite3 shell, import script) writing to the database
+    other = sqlite3.connect(path)
+    other.execute(
+        "INSERT INTO patients (id, name, birthdate, phone, created_at, updated_at) "
+        "VALUES (2, '최지우', '1990-01-01 00:00:00', '010-2222-3333', "
+        "'2026-01-01 00:00:00', '2026-01-01 00:00:00')"
+    )
+    other.execute("UPDATE patients SET name = '최지훈' WHERE id = 2")
+    other.commit()
+    other.close()
+
+    with Session(engine) as session:
+        service = AdminSearchService(session)
+        service.refresh()
+        assert [p["id"] for p in service.search_patients("지훈")["items"]] == [2]
+        assert service.search_patients("지우")["items"] == []
+        assert session.execute(text("SELECT count(*) FROM fts_pending")).scalar() == 0
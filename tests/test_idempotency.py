@@ -0,0 +1,138 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.models import Patient, Payment, PaymentMethod, IdempotencyRecord
+from app.services.idempotency import (
+    IdempotencyCache, IdempotencyService, IdempotencyConflictError, IdempotencyKeyReuseError
+)
+from app.services.payment import PaymentService
+from app.services import idempotency as idempotency_module
+
+
+def run_async(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+@pytest.fixture
+def session():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    idempotency_module.idempotency_cache.clear()
+    with Session(engine) as session:
+        session.add(Patient(id=1, name="김민수", birthdate=datetime(1950, 1, 1), phone="010-1234-5678"))
+        session.commit()
+        yield session
+
+
+def test_retry_with_same_key_returns_original_payment(session):
+    service = PaymentService(session)
+    data = {"card_number": "4111111111111111"}
+
+    first = run_async(service.process_payment(1, Decimal("15000"), PaymentMethod.CARD, data, "key-1"))
+    # Simulate a different worker: local cache is empty, DB row must answer
+    idempotency_module.idempotency_cache.clear()
+    second = run_async(service.process_payment(1, Decimal("15000"), PaymentMethod.CARD, data, "key-1"))
+
+    assert second.id == first.id
+    assert len(session.exec(select(Payment)).all()) == 1
+
+
+def test_key_reuse_with_different_request_is_rejected(session):
+    service = PaymentService(session)
+    run_async(service.process_payment(1, Decimal("15000"), PaymentMethod.CASH, None, "key-2"))
+
+    with pytest.raises(IdempotencyKeyReuseError):
+        run_async(service.process_payment(1, Decimal("20000"), PaymentMethod.CASH, None, "key-2"))
+
+
+def test_failed_request_releases_key(session):
+    service = PaymentService(session)
+
+    with pytest.raises(ValueError):
+        run_async(service.process_payment(1, Decimal("15000"), PaymentMethod.CARD, {}, "key-3"))
+    assert session.get(IdempotencyRecord, "key-3") is None
+
+    payment = run_async(service.process_payment(
+        1, Decimal("15000"), PaymentMethod.CARD, {"card_number": "4111111111111111"}, "key-3"
+    ))
+    assert payment.id is not None
+
+
+def test_in_progress_key_conflicts(session):
+    store = IdempotencyService(session, cache=IdempotencyCache())
+    assert store.begin("key-4", "payment.process", "abc") is None
+
+    with pytest.raises(IdempotencyConflictError):
+        store.begin("key-4", "payment.process", "abc")
+
+
+def test_expired_key_is_treated_as_new(session):
+    session.add(IdempotencyRecord(
+        key="key-5",
+        scope="payment.process",
+        request_hash="abc",
+        status="completed",
+        payment_id=None,
+        expires_at=datetime.utcnow() - timedelta(seconds=1)
+    ))
+    session.commit()
+
+    store = IdempotencyService(session, cache=IdempotencyCache())
+    assert store.begin("key-5", "payment.process", "other") is None
+
+
+def test_stale_in_progress_key_is_reclaimed_after_lease(session):
+    store = IdempotencyService(session, cache=IdempotencyCache())
+    assert store.begin("key-6", "payment.process", "abc") is None
+    record = session.get(IdempotencyRecord, "key-6")
+    # Reservation holds a short lease, not the full TTL
+    assert record.expires_at <= datetime.utcnow() + store.lease
+
+    # Worker died mid-request: the lease runs out
+    record.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    session.add(record)
+    session.commit()
+
+    assert store.begin("key-6", "payment.process", "abc") is None
+    assert session.get(IdempotencyRecord, "key-6").expires_at > datetime.utcnow()
+    with pytest.raises(IdempotencyConflictError):
+        store.begin("key-6", "payment.process", "abc")
+
+
+def test_refund_releases_key_when_recording_fails(session, monkeypatch):
+    service = PaymentService(session)
+    payment = run_async(service.process_payment(
+        1, Decimal("15000"), PaymentMethod.CARD, {"card_number": "4111111111111111"}, "key-7"
+    ))
+
+    def fail(*args):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(service, "_enqueue_payment_events", fail)
+    with pytest.raises(RuntimeError):
+        run_async(service.refund_payment(payment.id, "test", "key-8"))
+    assert session.get(IdempotencyRecord, "key-8") is None
+
+    monkeypatch.undo()
+    refund = run_async(service.refund_payment(payment.id, "test", "key-8"))
+    assert refund.amount == -payment.amount
+    assert session.get(IdempotencyRecord, "key-8").status == "completed"
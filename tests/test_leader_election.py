@@ -0,0 +1,89 @@
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.models import SchedulerLease
+from app.core.scheduler import KioskScheduler, LeaderElection, PERSISTENT_JOBSTORE
+
+
+def sync_emr():
+    return "synced"
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def expire_lease(engine):
+    with Session(engine) as session:
+        lease = session.get(SchedulerLease, "kiosk-scheduler")
+        lease.expires_at = datetime.utcnow() - timedelta(seconds=1)
+        session.add(lease)
+        session.commit()
+
+
+def test_only_one_worker_holds_the_lease(engine):
+    first = LeaderElection(engine, worker_id="worker-1")
+    second = LeaderElection(engine, worker_id="worker-2")
+
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    assert first.try_acquire()  # renewal
+
+    expire_lease(engine)
+    assert second.try_acquire()
+    assert not first.try_acquire()
+
+    second.release()
+    assert first.try_acquire()
+
+
+def test_singleton_job_runs_on_leader_and_fails_over(engine):
+    workers = []
+    for worker_id in ("worker-1", "worker-2"):
+        worker = KioskScheduler()
+        worker.enable_leader_election(engine, lease_seconds=30, worker_id=worker_id)
+        worker.add_emr_sync_job(5, sync_emr)
+        worker.start()
+        workers.append(worker)
+    leader, standby = workers
+
+    try:
+        assert leader.scheduler.get_job("emr_sync", jobstore=PERSISTENT_JOBSTORE) is not None
+        assert standby.scheduler.get_job("emr_sync") is None
+        next_run = leader.scheduler.get_job("emr_sync").next_run_time
+
+        # Leader stops renewing; the standby takes over the persisted job
+        expire_lease(engine)
+        standby._check_leadership()
+        job = standby.scheduler.get_job("emr_sync", jobstore=PERSISTENT_JOBSTORE)
+        assert job is not None
+        assert job.next_run_time == next_run
+
+        leader._check_leadership()
+        assert leader.scheduler.get_job("emr_sync") is None
+    finally:
+        for worker in workers:
+            worker.shutdown()
+
+
+def test_singleton_job_must_be_importable(engine):
+    worker = KioskScheduler()
+    worker.enable_leader_election(engine, worker_id="worker-1")
+    with pytest.raises(ValueError):
+        worker.add_cleanup_job(24, lambda: None)
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.models import OutboxEvent
+from app.services.outbox import OutboxDispatcher, enqueue_event, settings
+
+
+def run_async(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def add_events(engine, topic, count):
+    with Session(engine) as session:
+        for i in range(count):
+            enqueue_event(session, topic, {"n": i})
+        session.commit()
+
+
+def test_events_delivered_in_batches(engine):
+    dispatcher = OutboxDispatcher(engine)
+    received = []
+
+    async def handler(payloads):
+        received.append([p["n"] for p in payloads])
+
+    dispatcher.register("test.topic", handler)
+    add_events(engine, "test.topic", 5)
+    add_events(engine, "unhandled.topic", 2)
+
+    result = run_async(dispatcher.dispatch_batch(limit=3))
+    assert result["dispatched"] == 3
+    result = run_async(dispatcher.dispatch_batch(limit=3))
+    assert result["dispatched"] == 2
+    assert received == [[0, 1, 2], [3, 4]]
+
+    with Session(engine) as session:
+        pending = session.exec(select(OutboxEvent).where(OutboxEvent.status == "pending")).all()
+    # Events for topics without handler stay pending for later consumers
+    assert {e.topic for e in pending} == {"unhandled.topic"}
+
+
+def test_failed_handler_is_retried_with_backoff(engine):
+    dispatcher = OutboxDispatcher(engine)
+    calls = {"count": 0}
+
+    def flaky(payloads):
+        calls["count"] += 1
+        if calls["count"] == 1:
+            raise RuntimeError("downstream offline")
+
+    dispatcher.register("test.topic", flaky)
+    add_events(engine, "test.topic", 1)
+
+    assert run_async(dispatcher.dispatch_batch())["retried"] == 1
+    # Not due yet because of backoff
+    assert run_async(dispatcher.dispatch_batch())["dispatched"] == 0
+
+    with Session(engine) as session:
+        event = session.exec(select(OutboxEvent)).one()
+        assert event.attempts == 1
+        assert event.last_error == "downstream offline"
+        event.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        session.add(event)
+        session.commit()
+
+    assert run_async(dispatcher.dispatch_batch())["dispatched"] == 1
+
+
+def test_event_marked_failed_after_max_attempts(engine, monkeypatch):
+    monkeypatch.setattr(settings, "outbox_max_attempts", 1)
+    dispatcher = OutboxDispatcher(engine)
+
+    def broken(payloads):
+        raise RuntimeError("boom")
+
+    dispatcher.register("test.topic", broken)
+    add_events(engine, "test.topic", 2)
+
+    assert run_async(dispatcher.dispatch_batch())["failed"] == 2
+    stats = dispatcher.get_stats()
+    assert stats["topics"]["test.topic"] == {"failed": 2}
+
+
+def test_claimed_events_are_not_claimed_twice(engine):
+    dispatcher = OutboxDispatcher(engine)
+    dispatcher.register("test.topic", lambda payloads: None)
+    add_events(engine, "test.topic", 4)
+
+    with Session(engine) as session:
+        first = {e.id for e in dispatcher._claim_batch(session, 3)}
+        second = {e.id for e in dispatcher._claim_batch(session, 3)}
+    assert len(first) == 3
+    assert len(second) == 1
+    assert not first & second
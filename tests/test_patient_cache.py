@@ -0,0 +1,107 @@
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.models import Patient
+from app.core.change_log import init_change_log
+from app.services.patient_cache import PatientCache, patient_cache
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Patient(
+            id=1, name="김민수", birthdate=datetime(1950, 1, 1),
+            phone="010-1234-5678", card_uid="CARD-1"
+        ))
+        session.commit()
+    return engine
+
+
+def count_selects(engine):
+    """Patient queries (the change log poll is counted separately)"""
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args:
+                     None if "patient_changes" in statement else statements.append(statement))
+    return statements
+
+
+def test_secondary_keys_hit_without_database(engine):
+    cache = PatientCache(max_size=10, ttl_seconds=60)
+    statements = count_selects(engine)
+    with Session(engine) as session:
+        assert cache.find_by_phone(session, "010-1234-5678").id == 1
+        assert cache.find_by_phone(session, "01012345678").id == 1
+        assert cache.find_by_card_uid(session, "CARD-1").name == "김민수"
+        assert cache.get(session, 1).phone == "010-1234-5678"
+    assert len(statements) == 1
+    assert cache.stats()["hits"] == 3
+
+
+def test_lru_and_ttl_eviction(engine):
+    cache = PatientCache(max_size=1, ttl_seconds=0)
+    with Session(engine) as session:
+        cache.get(session, 1)
+        assert cache.get(session, 1) is not None
+    assert cache.hits == 0
+    assert cache.misses == 2
+
+
+def test_patient_update_invalidates_global_cache(engine):
+    patient_cache.clear()
+    with Session(engine) as session:
+        assert patient_cache.get(session, 1).name == "김민수"
+        patient = session.get(Patient, 1)
+        patient.name = "김민지"
+        session.add(patient)
+        session.commit()
+        assert patient_cache.stats()["size"] == 0
+        assert patient_cache.find_by_phone(session, "010-1234-5678").name == "김민지"
+    patient_cache.clear()
+
+
+def test_phone_lookup_matches_any_format(engine):
+    cache = PatientCache(max_size=10, ttl_seconds=60)
+    with Session(engine) as session:
+        assert cache.find_by_phone(session, "010 1234 5678").id == 1
+        cache.clear()
+        assert cache.find_by_phone(session, "01012345678").id == 1
+        assert cache.find_by_phone(session, "---") is None
+
+
+def test_writes_by_other_workers_invalidate_after_poll(engine):
+    init_change_log(engine)
+    cache = PatientCache(max_size=10, ttl_seconds=60, poll_seconds=0)
+    with Session(engine) as session:
+        assert cache.get(session, 1).name == "김민수"
+        # Another process renames the patient; no mapper event reaches this cache
+        session.execute(text("UPDATE patients SET name = '김민지' WHERE id = 1"))
+        session.commit()
+        assert cache.get(session, 1).name == "김민지"
+
+        # Entries pruned before this cache read them: start over
+        session.add(Patient(id=2, name="이영희", birthdate=datetime(1970, 1, 1), phone="010-2222-3333"))
+        session.commit()
+        assert cache.get(session, 2).name == "이영희"
+        session.execute(text("UPDATE patients SET name = '이영수' WHERE id = 2"))
+        session.execute(text("UPDATE patients SET name = '김민호' WHERE id = 1"))
+        session.execute(text("DELETE FROM patient_changes WHERE id < (SELECT max(id) FROM patient_changes)"))
+        session.commit()
+        assert cache.get(session, 1).name == "김민호"
+        assert cache.get(session, 2).name == "이영수"
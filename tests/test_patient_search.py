@@ -0,0 +1,107 @@
+import os
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.change_log import init_change_log
+from app.core.models import Patient
+from app.services.patient_search import PatientSearchIndex, patient_search_index, to_chosung
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Patient(id=1, name="김민수", birthdate=datetime(1950, 1, 1), phone="010-1234-5678"))
+        session.add(Patient(id=2, name="김민지", birthdate=datetime(1962, 3, 4), phone="010-2222-5678"))
+        session.add(Patient(id=3, name="고명선", birthdate=datetime(1950, 1, 1), phone="010-9999-0000"))
+        session.commit()
+    return engine
+
+
+def test_to_chosung():
+    assert to_chosung("김민수") == "ㄱㅁㅅ"
+    assert to_chosung("Kim 김") == "Kim ㄱ"
+
+
+def test_chosung_prefix_and_mixed_queries(engine):
+    index = PatientSearchIndex(engine)
+    assert index.load() == 3
+
+    assert index.search("ㄱㅁㅅ") == [1, 3]
+    assert index.search("김민") == [1, 2]
+    assert index.search("김ㅁㅈ") == [2]
+    assert index.search("ㄱㅁ", phone_last4="5678") == [1, 2]
+    assert index.search(birthdate=date(1950, 1, 1)) == [3, 1]
+    assert index.search("ㄱ", phone_last4="5678", birthdate=date(1962, 3, 4)) == [2]
+    assert index.search("박") == []
+
+
+def test_index_follows_committed_writes_only(engine):
+    patient_search_index._engine = engine
+    patient_search_index.load()
+    try:
+        with Session(engine) as session:
+            session.add(Patient(id=4, name="박서연", birthdate=datetime(1980, 5, 5), phone="010-3333-4444"))
+            session.commit()
+            assert patient_search_index.search("ㅂㅅㅇ") == [4]
+
+            patient = session.get(Patient, 1)
+            patient.name = "이민수"
+            session.add(patient)
+            session.commit()
+            assert patient_search_index.search("ㅇㅁㅅ") == [1]
+            assert patient_search_index.search("김민") == [2]
+
+            session.add(Patient(id=5, name="최수빈", birthdate=datetime(1990, 1, 1), phone="010-5555-6666"))
+            session.flush()
+            session.rollback()
+            assert patient_search_index.search("최") == []
+    finally:
+        patient_search_index.__init__()
+
+
+def test_refresh_applies_other_workers_writes(engine):
+    init_change_log(engine)
+    index = PatientSearchIndex(engine)
+    index.load()
+
+    # Written outside this index's ORM events, as another worker would
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO patients (id, name, birthdate, phone, created_at, updated_at) "
+            "VALUES (4, '박서연', '1980-05-05', '010-3333-4444', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+        ))
+        conn.execute(text("UPDATE patients SET name = '이민수' WHERE id = 1"))
+        conn.execute(text("DELETE FROM patients WHERE id = 3"))
+    assert index.search("ㅂㅅㅇ") == []
+
+    assert index.refresh() == 3
+    assert index.search("ㅂㅅㅇ") == [4]
+    assert index.search("ㅇㅁㅅ") == [1]
+    assert index.search("ㄱㅁ") == [2]
+    assert index.search(birthdate=date(1950, 1, 1)) == [1]
+    assert index.refresh() == 0
+
+    # Entries pruned before this worker read them: rebuild from the table
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE patients SET name = '정민지' WHERE id = 2"))
+        conn.execute(text("UPDATE patients SET phone = '010-3333-7777' WHERE id = 4"))
+        conn.execute(text("DELETE FROM patient_changes WHERE id < (SELECT max(id) FROM patient_changes)"))
+    index.refresh()
+    assert index.search("ㅈㅁㅈ") == [2]
+    assert index.search(phone_last4="7777") == [4]
+    assert len(index) == 3
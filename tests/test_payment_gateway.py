@@ -0,0 +1,122 @@
+import asyncio
+import os
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+import httpx
+import pytest
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.integrations.payment_gateway import (
+    PaymentGatewayClient, PaymentGatewayError, PaymentDeclinedError
+)
+from app.integrations.stub_gateway import create_stub_gateway
+
+
+def run_async(coro):
+    # Private loop so the main thread's current loop (used by APScheduler tests) is left alone
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def make_client(stub, **kwargs):
+    return PaymentGatewayClient(
+        base_url="http://stub-gateway",
+        api_key="test-key",
+        merchant_id="M001",
+        transport=httpx.ASGITransport(app=stub),
+        **kwargs
+    )
+
+
+def test_card_approval_and_cancel():
+    stub = create_stub_gateway(latency_ms=0, jitter_ms=0, seed=1)
+    client = make_client(stub)
+
+    async def run():
+        approval = await client.approve_card(Decimal("15000"), "4111111111111111")
+        cancel = await client.cancel(approval["transaction_id"], Decimal("15000"))
+        await client.close()
+        return approval, cancel
+
+    approval, cancel = run_async(run())
+    assert approval["approved"] is True
+    assert approval["card_last4"] == "1111"
+    assert cancel["original_transaction_id"] == approval["transaction_id"]
+    assert stub.state.transactions[approval["transaction_id"]]["status"] == "cancelled"
+
+
+def test_card_decline_raises():
+    stub = create_stub_gateway(latency_ms=0, jitter_ms=0)
+    client = make_client(stub)
+
+    async def run():
+        try:
+            await client.approve_card(Decimal("1000"), "4111111111110000")
+        finally:
+            await client.close()
+
+    with pytest.raises(PaymentDeclinedError) as exc:
+        run_async(run())
+    assert exc.value.code == "INSUFFICIENT_FUNDS"
+
+
+def test_gateway_failure_raises():
+    stub = create_stub_gateway(latency_ms=0, jitter_ms=0, failure_rate=1.0)
+    client = make_client(stub)
+
+    async def run():
+        try:
+            await client.approve_qr(Decimal("1000"), "QR-123")
+        finally:
+            await client.close()
+
+    with pytest.raises(PaymentGatewayError):
+        run_async(run())
+
+
+class CountingTransport(httpx.AsyncBaseTransport):
+    """Wrap transport and record peak number of in-flight requests"""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.current = 0
+        self.peak = 0
+
+    async def handle_async_request(self, request):
+        self.current += 1
+        self.peak = max(self.peak, self.current)
+        try:
+            return await self.inner.handle_async_request(request)
+        finally:
+            self.current -= 1
+
+
+def test_concurrency_is_bounded():
+    stub = create_stub_gateway(latency_ms=5, jitter_ms=0)
+    transport = CountingTransport(httpx.ASGITransport(app=stub))
+    client = PaymentGatewayClient(
+        base_url="http://stub-gateway",
+        api_key="test-key",
+        merchant_id="M001",
+        max_concurrency=3,
+        transport=transport
+    )
+
+    async def run():
+        results = await asyncio.gather(*(
+            client.approve_qr(Decimal("1000"), f"QR-{i}") for i in range(10)
+        ))
+        await client.close()
+        return results
+
+    results = run_async(run())
+    assert all(r["approved"] for r in results)
+    assert transport.peak == 3
+    assert len(stub.state.transactions) == 10
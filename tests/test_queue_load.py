@@ -0,0 +1,70 @@
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.models import Appointment, AppointmentStatus, Department, Patient
+from app.services.queue_load import QueueLoadMonitor
+from app.services.symptom_engine import symptom_engine
+
+
+def make_engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def test_ties_go_to_shorter_queue():
+    engine = make_engine()
+    with Session(engine) as session:
+        session.add(Patient(id=1, name="김민수", birthdate=datetime(1950, 1, 1), phone="010-1234-5678"))
+        for queue_number in range(1, 4):
+            session.add(Appointment(
+                patient_id=1,
+                department=Department.INTERNAL_MEDICINE,
+                appointment_time=datetime.now(),
+                status=AppointmentStatus.CHECKED_IN,
+                queue_number=queue_number
+            ))
+        session.commit()
+
+    monitor = QueueLoadMonitor(engine)
+    ranked = [(Department.INTERNAL_MEDICINE, 1.0), (Department.PEDIATRICS, 1.0)]
+    assert monitor.choose(ranked) == Department.INTERNAL_MEDICINE
+
+    assert monitor.refresh() == {"internal_medicine": 3}
+    assert monitor.choose(ranked) == Department.PEDIATRICS
+
+    # Local check-ins shift the balance before the next refresh
+    for _ in range(4):
+        monitor.record_check_in(Department.PEDIATRICS)
+    assert monitor.choose(ranked) == Department.INTERNAL_MEDICINE
+
+
+def test_clear_winner_is_not_overridden_by_load():
+    monitor = QueueLoadMonitor(make_engine())
+    for _ in range(10):
+        monitor.record_check_in(Department.INTERNAL_MEDICINE)
+    ranked = [(Department.INTERNAL_MEDICINE, 3.0), (Department.PEDIATRICS, 2.0)]
+    assert monitor.choose(ranked) == Department.INTERNAL_MEDICINE
+
+
+def test_emergency_is_never_traded_for_a_shorter_queue():
+    monitor = QueueLoadMonitor(make_engine())
+    for _ in range(10):
+        monitor.record_check_in(Department.EMERGENCY)
+    # 호흡곤란 scores emergency and internal medicine equally
+    ranked = symptom_engine.score("호흡곤란")
+    assert {department for department, _ in ranked} == {Department.EMERGENCY, Department.INTERNAL_MEDICINE}
+    assert monitor.choose(ranked) == Department.EMERGENCY
+    assert monitor.choose(list(reversed(ranked))) == Department.EMERGENCY
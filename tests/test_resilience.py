@@ -0,0 +1,217 @@
+import asyncio
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.resilience import (
+    BulkheadFullError, CircuitOpenError, DeadlineExceededError, Dependency,
+    STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, deadline_scope
+)
+from app.integrations.emr_client import EmrClient, EmrError
+from app.integrations.mock_emr import create_mock_emr
+
+
+def run_async(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class Declined(Exception):
+    pass
+
+
+def test_breaker_opens_short_circuits_and_recovers():
+    dependency = Dependency(
+        "test", timeout_seconds=1, max_concurrent=5, failure_threshold=3, reset_seconds=30,
+        is_failure=lambda error: not isinstance(error, Declined)
+    )
+    calls = {"count": 0}
+
+    async def failing():
+        calls["count"] += 1
+        raise ConnectionError("down")
+
+    async def declined():
+        raise Declined()
+
+    async def ok():
+        return "ok"
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await dependency.call(failing)
+        # A healthy upstream saying no does not count towards opening
+        with pytest.raises(Declined):
+            await dependency.call(declined)
+        for _ in range(3):
+            with pytest.raises(ConnectionError):
+                await dependency.call(failing)
+        assert dependency.breaker.state == STATE_OPEN
+        with pytest.raises(CircuitOpenError):
+            await dependency.call(failing)
+
+        dependency.breaker.opened_at -= 30
+        assert dependency.breaker.state == STATE_HALF_OPEN
+        assert await dependency.call(ok) == "ok"
+
+    run_async(run())
+    assert calls["count"] == 5
+    assert dependency.breaker.state == STATE_CLOSED
+    assert dependency.status()["short_circuited"] == 1
+
+
+def test_failed_trial_reopens_and_only_one_trial_runs():
+    dependency = Dependency("test", timeout_seconds=1, max_concurrent=5, failure_threshold=1, reset_seconds=30)
+
+    async def slow_failure():
+        await asyncio.sleep(0.05)
+        raise ConnectionError("still down")
+
+    async def run():
+        with pytest.raises(ConnectionError):
+            await dependency.call(slow_failure)
+        dependency.breaker.opened_at -= 30
+        return await asyncio.gather(
+            dependency.call(slow_failure), dependency.call(slow_failure), return_exceptions=True
+        )
+
+    trial, second = run_async(run())
+    assert isinstance(trial, ConnectionError)
+    assert isinstance(second, CircuitOpenError)
+    assert dependency.breaker.state == STATE_OPEN
+
+
+def test_bulkhead_rejects_excess_callers():
+    dependency = Dependency("test", timeout_seconds=1, max_concurrent=2)
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return True
+
+    async def run():
+        return await asyncio.gather(*(dependency.call(slow) for _ in range(3)), return_exceptions=True)
+
+    results = run_async(run())
+    assert results[:2] == [True, True]
+    assert isinstance(results[2], BulkheadFullError)
+
+
+def test_request_deadline_bounds_the_call():
+    dependency = Dependency("test", timeout_seconds=5, max_concurrent=2, failure_threshold=1)
+
+    async def hang():
+        await asyncio.sleep(5)
+
+    async def run():
+        with deadline_scope(0.05):
+            started = time.monotonic()
+            with pytest.raises(DeadlineExceededError):
+                await dependency.call(hang)
+            elapsed = time.monotonic() - started
+        with deadline_scope(-1):
+            with pytest.raises(DeadlineExceededError):
+                await dependency.call(hang)
+        return elapsed
+
+    assert run_async(run()) < 1
+    # The caller ran out of time; the upstream is not blamed
+    assert dependency.breaker.state == STATE_CLOSED
+
+
+def test_emr_appointments_fall_back_to_last_known_list():
+    mock = create_mock_emr(patients=3, appointments_per_patient=2, seed=1)
+    client = EmrClient(base_url="http://mock-emr", api_key="k", transport=httpx.ASGITransport(app=mock))
+
+    async def run():
+        fresh = await client.patient_appointments("P0000001")
+        mock.state.emr.failure_rate = 1.0
+        stale = await client.patient_appointments("P0000001")
+        with pytest.raises(EmrError):
+            await client.patient_appointments("P0000002")
+        await client.close()
+        return fresh, stale
+
+    fresh, stale = run_async(run())
+    assert len(fresh["items"]) == 2 and fresh["stale"] is False
+    assert stale["items"] == fresh["items"] and stale["stale"] is True
+
+
+def test_voice_command_unavailable_when_gemini_breaker_open():
+    from app.api.endpoints import web
+    from app.main import app
+
+    client = TestClient(app)
+    web.api_key_storage["gemini_api_key"] = "test-key"
+    web.gemini.breaker.opened_at = time.monotonic()
+    try:
+        with patch("app.api.endpoints.web.genai.GenerativeModel") as model:
+            response = client.post("/api/voice_command", json={"text": "머리가 아파요"})
+            model.return_value.generate_content_async.assert_not_called()
+        assert response.status_code == 503
+        assert response.json()["error"] == "voice assistant unavailable"
+
+        health = client.get("/health").json()
+        assert health["status"] == "degraded"
+        assert health["dependencies"]["gemini"]["state"] == STATE_OPEN
+        assert health["dependencies"]["payment_gateway"]["state"] == STATE_CLOSED
+    finally:
+        web.gemini.breaker.record_success()
+        web.api_key_storage.clear()
+
+
+def test_request_timeout_header_propagates_to_gemini_call():
+    from app.api.endpoints import web
+    from app.main import app
+
+    async def hang(text):
+        await asyncio.sleep(5)
+
+    client = TestClient(app)
+    web.api_key_storage["gemini_api_key"] = "test-key"
+    try:
+        with patch("app.api.endpoints.web.genai.GenerativeModel") as model:
+            model.return_value = MagicMock(generate_content_async=AsyncMock(side_effect=hang))
+            started = time.monotonic()
+            response = client.post(
+                "/api/voice_command", json={"text": "기침"}, headers={"X-Request-Timeout": "0.1"}
+            )
+        assert time.monotonic() - started < 2
+        assert response.status_code == 503
+        assert web.gemini.breaker.state == STATE_CLOSED
+    finally:
+        web.api_key_storage.clear()
+
+
+def test_request_timeout_header_is_bounded():
+    from app.main import app, settings
+
+    client = TestClient(app)
+    seconds = []
+
+    @contextmanager
+    def record_scope(value):
+        seconds.append(value)
+        with deadline_scope(value):
+            yield
+
+    with patch("app.main.deadline_scope", record_scope):
+        for header in ("0.5", "0", "-5", "nan", "inf", "-inf", "soon"):
+            assert client.get("/health", headers={"X-Request-Timeout": header}).status_code == 200
+
+    floor = settings.request_deadline_min_seconds
+    default = settings.request_deadline_seconds
+    assert seconds == [0.5, floor, floor, default, default, default, default]
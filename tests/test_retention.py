@@ -0,0 +1,117 @@
+import gzip
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, func, select
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.models import DeviceLog, IdempotencyRecord, OutboxEvent
+from app.services.retention import RetentionService, settings
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def add_device_logs(engine, old: int, recent: int):
+    now = datetime.utcnow()
+    rows = [
+        {"device_type": "printer", "event": "print", "level": "INFO", "created_at": now - timedelta(days=120 - i / 1000)}
+        for i in range(old)
+    ] + [
+        {"device_type": "printer", "event": "print", "level": "INFO", "created_at": now - timedelta(hours=1)}
+        for _ in range(recent)
+    ]
+    with Session(engine) as session:
+        session.execute(DeviceLog.__table__.insert(), rows)
+        session.commit()
+
+
+def count(engine, model) -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.count()).select_from(model)).one()
+
+
+def test_device_logs_purged_in_bounded_chunks(engine):
+    add_device_logs(engine, old=2500, recent=300)
+    deletes = []
+    event.listen(
+        engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: deletes.append(statement) if statement.startswith("DELETE") else None
+    )
+
+    deleted = RetentionService(engine, chunk_size=1000, pause_seconds=0).purge_device_logs(days=90, archive=False)
+
+    assert deleted == 2500
+    assert count(engine, DeviceLog) == 300
+    # Three chunks reach into the recent rows; the walk stops there
+    assert len(deletes) == 3
+    assert all("device_logs.id >" in statement for statement in deletes)
+
+
+def test_device_logs_archived_before_delete(engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "backup_path", str(tmp_path))
+    add_device_logs(engine, old=30, recent=5)
+
+    RetentionService(engine, chunk_size=10, pause_seconds=0).purge_device_logs(days=90, archive=True)
+
+    archive = next((tmp_path / "archive").glob("device_logs_*.ndjson.gz"))
+    with gzip.open(archive, "rt", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert len(rows) == 30
+    assert [row["id"] for row in rows] == list(range(1, 31))
+
+
+def test_outbox_and_idempotency_retention(engine):
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        for status, age in (("dispatched", 30), ("failed", 30), ("pending", 30), ("dispatched", 1)):
+            session.add(OutboxEvent(topic="t", payload="{}", status=status, created_at=now - timedelta(days=age)))
+        for i in range(25):
+            session.add(IdempotencyRecord(
+                key=f"key-{i}", scope="payment", request_hash="h",
+                expires_at=now + timedelta(hours=-1 if i < 20 else 1)
+            ))
+        session.commit()
+
+    service = RetentionService(engine, chunk_size=7, pause_seconds=0)
+    assert service.purge_outbox_events(days=14) == 2
+    assert service.purge_idempotency_keys() == 20
+
+    with Session(engine) as session:
+        remaining = session.exec(select(OutboxEvent.status)).all()
+    assert sorted(remaining) == ["dispatched", "pending"]
+    assert count(engine, IdempotencyRecord) == 5
+
+
+def test_incremental_vacuum_releases_free_pages(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'kiosk.db'}")
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+    SQLModel.metadata.create_all(engine)
+    add_device_logs(engine, old=3000, recent=0)
+
+    service = RetentionService(engine, chunk_size=500, pause_seconds=0)
+    service.purge_device_logs(days=90, archive=False)
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA freelist_count").scalar() > 0
+
+    assert service.incremental_vacuum() > 0
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA freelist_count").scalar() == 0
+    engine.dispose()
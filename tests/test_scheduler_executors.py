@@ -0,0 +1,114 @@
+import asyncio
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.scheduler import (
+    KioskScheduler, EXECUTOR_ASYNCIO, EXECUTOR_PROCESSES, EXECUTOR_THREADS
+)
+
+
+def record_thread(results):
+    results.append(threading.current_thread().name)
+
+
+def fail():
+    raise RuntimeError("EMR unreachable")
+
+
+def write_pid(path):
+    # Rename into place so a reader never sees a partly written file
+    partial = Path(f"{path}.partial")
+    partial.write_text(str(os.getpid()))
+    os.replace(partial, path)
+
+
+async def async_backup():
+    return "ok"
+
+
+def compress_backup():
+    return "ok"
+
+
+def run_with_scheduler(setup, until=None, timeout=0.5):
+    """Start a scheduler on a fresh loop, register jobs, let them run"""
+    kiosk_scheduler = KioskScheduler()
+
+    async def main():
+        kiosk_scheduler.start()
+        setup(kiosk_scheduler)
+        deadline = asyncio.get_running_loop().time() + timeout
+        while asyncio.get_running_loop().time() < deadline and not (until and until(kiosk_scheduler)):
+            await asyncio.sleep(0.05)
+        kiosk_scheduler.shutdown()
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(main())
+    finally:
+        loop.close()
+    return kiosk_scheduler
+
+
+def test_sync_job_runs_in_thread_pool_with_metrics():
+    results = []
+    kiosk_scheduler = run_with_scheduler(lambda s: s.scheduler.add_job(
+        record_thread, args=[results], id="sync", executor=EXECUTOR_THREADS, misfire_grace_time=None
+    ))
+
+    assert len(results) == 1
+    assert results[0] != threading.main_thread().name
+    metrics = kiosk_scheduler._metrics["sync"]
+    assert metrics.runs == 1
+    assert metrics.failures == 0
+    assert metrics.last_runtime_seconds is not None
+
+
+def test_failures_and_misfires_are_counted():
+    def setup(s):
+        s.scheduler.add_job(fail, id="failing", executor=EXECUTOR_THREADS, misfire_grace_time=None)
+        s.scheduler.add_job(
+            record_thread, "date", args=[[]], id="late",
+            run_date=datetime.now(s.scheduler.timezone) - timedelta(seconds=30),
+            misfire_grace_time=1
+        )
+
+    kiosk_scheduler = run_with_scheduler(setup)
+    assert kiosk_scheduler._metrics["failing"].failures == 1
+    assert "EMR unreachable" in kiosk_scheduler._metrics["failing"].last_error
+    assert kiosk_scheduler._metrics["late"].misfires == 1
+
+
+def test_backup_defaults_to_process_pool(tmp_path):
+    pid_file = tmp_path / "pid"
+
+    def setup(s):
+        # A busy test host can reach the job after the default 1 s grace period
+        job = s.scheduler.add_job(
+            write_pid, args=[str(pid_file)], id="backup", executor=EXECUTOR_PROCESSES, misfire_grace_time=None
+        )
+        assert job.executor == EXECUTOR_PROCESSES
+
+    def backup_done(s):
+        # The executed event, not the pid file, is the last step of a run
+        metrics = s._metrics.get("backup")
+        return metrics is not None and metrics.runs == 1
+
+    kiosk_scheduler = run_with_scheduler(setup, until=backup_done, timeout=30)
+    assert int(pid_file.read_text()) != os.getpid()
+    assert kiosk_scheduler._metrics["backup"].runs == 1
+
+    job = KioskScheduler().add_backup_job(3, 0, compress_backup)
+    assert job.executor == EXECUTOR_PROCESSES
+
+
+def test_coroutine_jobs_stay_on_event_loop():
+    kiosk_scheduler = KioskScheduler()
+    assert kiosk_scheduler.add_backup_job(3, 0, async_backup).executor == EXECUTOR_ASYNCIO
+    assert kiosk_scheduler.add_emr_sync_job(5, compress_backup).executor == EXECUTOR_THREADS
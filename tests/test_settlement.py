@@ -0,0 +1,164 @@
+import asyncio
+import os
+import sys
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.models import Patient, Payment, PaymentMethod
+from app.integrations.payment_gateway import PaymentGatewayClient
+from app.integrations.stub_gateway import create_stub_gateway
+from app.services.settlement import (
+    SettlementService, format_detail_record, iter_detail_records, settlement_window
+)
+
+
+def run_async(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+@pytest.fixture
+def session():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Patient(id=1, name="김민수", birthdate=datetime(1950, 1, 1), phone="010-1234-5678"))
+        session.commit()
+        yield session
+
+
+def add_payment(session, transaction_id, method, amount, approved_at):
+    session.add(Payment(
+        patient_id=1,
+        amount=Decimal(amount),
+        method=method,
+        transaction_id=transaction_id,
+        terminal_id="KIOSK-01",
+        approved_at=approved_at
+    ))
+
+
+def test_settlement_file_totals_include_refunds(session, tmp_path):
+    day = datetime.now().date()
+    start, _ = settlement_window(day)
+    at = start + timedelta(hours=10)
+    add_payment(session, "CARD_B", PaymentMethod.CARD, "15000", at)
+    add_payment(session, "CARD_A", PaymentMethod.CARD, "20000", at)
+    add_payment(session, "REFUND_CARD_A", PaymentMethod.CARD, "-20000", at)
+    add_payment(session, "QR_A", PaymentMethod.QR, "5000", at)
+    add_payment(session, "CASH_A", PaymentMethod.CASH, "12000", at)
+    add_payment(session, "CARD_OLD", PaymentMethod.CARD, "99000", start - timedelta(hours=1))
+    session.commit()
+
+    summary = SettlementService(session, output_dir=tmp_path).write_settlement_file(day)
+
+    assert summary["count"] == 5
+    assert Decimal(summary["net"]) == Decimal("32000")
+    card = next(t for t in summary["totals"] if t["method"] == "card")
+    assert (card["count"], card["gross"], card["refunds"], card["net"]) == (3, "35000.00", "20000.00", "15000.00")
+
+    ids = [record[0] for record in iter_detail_records(Path(summary["file"]))]
+    assert ids == sorted(ids)
+    assert "CARD_OLD" not in ids
+
+
+def test_diff_reports_missing_and_mismatched(tmp_path):
+    at = datetime(2025, 6, 5, 10)
+    local = tmp_path / "local.txt"
+    gateway = tmp_path / "gateway.txt"
+    local.write_text("".join([
+        format_detail_record("CARD_A", "card", "KIOSK-01", Decimal("1000"), at),
+        format_detail_record("CARD_B", "card", "KIOSK-01", Decimal("2000"), at),
+        format_detail_record("CASH_X", "cash", "KIOSK-01", Decimal("3000"), at),
+        format_detail_record("QR_C", "qr", "KIOSK-01", Decimal("4000"), at),
+    ]))
+    gateway.write_text("".join([
+        format_detail_record("CARD_A", "card", "KIOSK-01", Decimal("1000"), at),
+        format_detail_record("CARD_B", "card", "KIOSK-01", Decimal("2500"), at),
+        format_detail_record("CARD_Z", "card", "KIOSK-01", Decimal("9000"), at),
+    ]))
+
+    result = SettlementService.diff_settlement_files(local, gateway, tmp_path / "report.txt")
+
+    assert result["matched"] == 1
+    assert result["amount_mismatch"] == 1
+    assert result["missing_in_gateway"] == 1  # QR_C; cash is never settled by the gateway
+    assert result["missing_locally"] == 1
+    report = (tmp_path / "report.txt").read_text()
+    assert "AMOUNT_MISMATCH CARD_B" in report
+    assert "MISSING_LOCALLY CARD_Z" in report
+
+
+def test_gateway_settlement_download(tmp_path):
+    stub = create_stub_gateway(latency_ms=0, jitter_ms=0)
+    client = PaymentGatewayClient(
+        base_url="http://stub-gateway",
+        api_key="test-key",
+        merchant_id="M001",
+        transport=httpx.ASGITransport(app=stub)
+    )
+
+    async def run():
+        await client.approve_card(Decimal("15000"), "4111111111111111")
+        await client.approve_qr(Decimal("5000"), "QR-1")
+        now = datetime.utcnow()
+        path = await client.download_settlement(
+            now - timedelta(hours=1), now + timedelta(hours=1), tmp_path / "gateway.txt"
+        )
+        await client.close()
+        return path
+
+    threads = []
+
+    def recording_open(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return open(*args, **kwargs)
+
+    with patch("app.integrations.payment_gateway.open", recording_open, create=True):
+        path = run_async(run())
+    # The file is written off the event loop
+    assert threads and threads[0] is not threading.main_thread()
+    records = list(iter_detail_records(path))
+    assert len(records) == 2
+    assert sorted(r[3] for r in records) == [Decimal("5000.00"), Decimal("15000.00")]
+
+
+def test_reconcile_writes_the_file_off_the_event_loop(session, tmp_path):
+    day = datetime(2024, 3, 5).date()
+    service = SettlementService(session, output_dir=tmp_path)
+    write = service.write_settlement_file
+    threads = []
+
+    def recording_write(*args):
+        threads.append(threading.current_thread())
+        return write(*args)
+
+    service.write_settlement_file = recording_write
+    with patch("app.services.settlement.settings.enable_payment_gateway", False):
+        summary = run_async(service.reconcile(day))
+
+    assert summary["count"] == 0 and summary["reconciliation"] is None
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_settlement_day_follows_the_scheduler_time_zone():
+    # Seoul is UTC+9 all year, whatever the host clock is set to
+    assert settlement_window(date(2024, 3, 5)) == (datetime(2024, 3, 4, 15), datetime(2024, 3, 5, 15))
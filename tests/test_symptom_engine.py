@@ -0,0 +1,40 @@
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.models import Department
+from app.services.symptom_engine import AhoCorasick, symptom_engine
+
+
+def test_aho_corasick_reports_overlapping_patterns():
+    matcher = AhoCorasick()
+    for value, pattern in enumerate(["he", "she", "his", "hers"]):
+        matcher.add(pattern, value)
+    matcher.build()
+    assert sorted(matcher.iter_matches("ushers")) == [(1, 4, 1), (2, 4, 0), (2, 6, 3)]
+
+
+def test_free_text_in_all_locales():
+    assert symptom_engine.match("머리가 아파요") == ["두통"]
+    assert symptom_engine.match("머리가아프고 열이 나요") == ["두통", "발열"]
+    assert symptom_engine.match("I have a fever and a bad cough") == ["발열", "기침"]
+    assert symptom_engine.match("我头疼") == ["두통"]
+    assert symptom_engine.match("tôi bị đau bụng") == ["복통"]
+
+
+def test_codes_longest_match_and_word_boundaries():
+    assert symptom_engine.match(["fever", "joint-pain", "skin_rash"]) == ["발열", "관절통", "피부발진"]
+    # 피부발진 wins over the embedded 발진 synonym and is counted once
+    assert symptom_engine.match("피부발진") == ["피부발진"]
+    assert symptom_engine.match("my phone number") == []
+
+
+def test_ranked_scores():
+    ranked = symptom_engine.score(["발열", "기침", "두통"])
+    assert ranked[0] == (Department.INTERNAL_MEDICINE, 3.0)
+    assert dict(ranked)[Department.PEDIATRICS] == 2.0
+    assert dict(ranked)[Department.PSYCHIATRY] == 1.0
+    assert symptom_engine.score("nothing relevant") == []
@@ -0,0 +1,147 @@
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.models import Appointment, AppointmentStatus, Department, Patient
+from app.services.reception import ReceptionService
+from app.services.wait_time import WaitTimeEstimator, wait_time_estimator
+
+
+def make_engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def test_ewma_statistics_and_percentiles():
+    estimator = WaitTimeEstimator(make_engine(), alpha=0.5)
+    start = datetime(2025, 6, 5, 9)
+    for minutes in (10, 10, 10, 10, 10):
+        estimator.record_service(Department.SURGERY, start, start + timedelta(minutes=minutes))
+    # Forgotten "complete" clicks are ignored
+    estimator.record_service(Department.SURGERY, start, start + timedelta(hours=8))
+
+    assert estimator.service_minutes(Department.SURGERY) == 10
+    assert estimator.estimate(Department.SURGERY, 3) == 30
+    assert estimator.estimate(Department.SURGERY, 3, percentile=90) == 30
+
+    estimator.record_service(Department.SURGERY, start, start + timedelta(minutes=20))
+    assert estimator.service_minutes(Department.SURGERY) == 15
+    assert estimator.estimate(Department.SURGERY, 4, percentile=90) > estimator.estimate(Department.SURGERY, 4)
+    assert estimator.estimate(Department.SURGERY, 0) == 0
+
+
+def test_statistics_persist_and_reload():
+    engine = make_engine()
+    estimator = WaitTimeEstimator(engine)
+    start = datetime(2025, 6, 5, 9)
+    estimator.record_service(Department.DERMATOLOGY, start, start + timedelta(minutes=7))
+    assert estimator.persist() is True
+    assert estimator.persist() is False
+
+    restored = WaitTimeEstimator(engine)
+    restored.load()
+    assert restored.snapshot()["dermatology"] == {
+        "service_mean_minutes": 7.0,
+        "service_std_minutes": 0.0,
+        "service_samples": 1
+    }
+
+
+def test_workers_merge_instead_of_overwriting():
+    engine = make_engine()
+    first, second = WaitTimeEstimator(engine, alpha=0.5), WaitTimeEstimator(engine, alpha=0.5)
+    start = datetime(2025, 6, 5, 9)
+    first.record_service(Department.SURGERY, start, start + timedelta(minutes=10))
+    second.record_service(Department.SURGERY, start, start + timedelta(minutes=20))
+    second.record_service(Department.SURGERY, start, start + timedelta(minutes=20))
+
+    assert first.persist() is True
+    assert second.persist() is True
+    # Both workers' samples are in the stored row
+    restored = WaitTimeEstimator(engine)
+    restored.load()
+    assert restored.snapshot()["surgery"]["service_samples"] == 3
+    assert restored.service_minutes(Department.SURGERY) == 17.5
+
+    # A save with nothing new still picks up the other worker's samples
+    assert first.persist() is False
+    assert first.service_minutes(Department.SURGERY) == 17.5
+
+
+def test_status_transitions_feed_estimator():
+    engine = make_engine()
+    wait_time_estimator.__init__(engine)
+    with Session(engine) as session:
+        session.add(Patient(id=1, name="김민수", birthdate=datetime(1950, 1, 1), phone="010-1234-5678"))
+        session.commit()
+
+        service = ReceptionService(session)
+        appointment = service.create_walk_in_appointment(1, ["골절"], Department.ORTHOPEDICS)
+        assert appointment.checked_in_at is not None
+
+        appointment = service.update_appointment_status(appointment.id, AppointmentStatus.IN_PROGRESS)
+        appointment.started_at -= timedelta(minutes=12)
+        session.add(appointment)
+        session.commit()
+        appointment = service.update_appointment_status(appointment.id, AppointmentStatus.COMPLETED)
+
+    assert round(wait_time_estimator.service_minutes(Department.ORTHOPEDICS)) == 12
+    wait_time_estimator.__init__()
+
+
+def test_completing_through_the_api_moves_the_estimate():
+    from fastapi.testclient import TestClient
+    from app.core.config import get_settings
+    from app.core.database import get_session
+    from app.main import app
+
+    engine = make_engine()
+    wait_time_estimator.__init__(engine)
+
+    def test_session():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = test_session
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {get_settings().admin_password}"}
+    try:
+        with Session(engine) as session:
+            session.add(Patient(id=1, name="김민수", birthdate=datetime(1990, 1, 1), phone="010-1234-5678"))
+            session.commit()
+            service = ReceptionService(session)
+            for _ in range(3):
+                service.create_walk_in_appointment(1, ["골절"], Department.ORTHOPEDICS)
+        before = client.get("/api/reception/queue-status/orthopedics").json()["estimated_wait_time"]
+
+        called = client.post("/api/admin/queue/orthopedics/call-next", headers=headers).json()
+        with Session(engine) as session:
+            appointment = session.get(Appointment, called["id"])
+            appointment.started_at -= timedelta(minutes=40)
+            session.add(appointment)
+            session.commit()
+        response = client.post(f"/api/admin/appointments/{called['id']}/complete", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["status"] == AppointmentStatus.COMPLETED.value
+        # Completing twice is refused
+        assert client.post(f"/api/admin/appointments/{called['id']}/complete", headers=headers).status_code == 409
+
+        statistics = client.get("/api/admin/queue/statistics", headers=headers).json()
+        assert round(statistics["service"]["orthopedics"]["service_mean_minutes"]) == 40
+        after = client.get("/api/reception/queue-status/orthopedics").json()["estimated_wait_time"]
+        assert after > before
+    finally:
+        app.dependency_overrides.clear()
+        wait_time_estimator.__init__()
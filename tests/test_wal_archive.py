@@ -0,0 +1,168 @@
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.services.backup import BackupService
+from app.services.wal_archive import WalArchiver
+
+
+def connect_app(path: Path) -> sqlite3.Connection:
+    """Application-style connection with checkpoints left to the archiver"""
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA wal_autocheckpoint=0")
+    return connection
+
+
+def insert(connection: sqlite3.Connection, rows: int):
+    connection.executemany(
+        "INSERT INTO payments (amount) VALUES (?)", [(1000 + i,) for i in range(rows)]
+    )
+
+
+def payment_totals(path: Path) -> int:
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute("SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM payments").fetchone()
+    finally:
+        connection.close()
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "kiosk.db"
+    connection = connect_app(path)
+    connection.execute("CREATE TABLE payments (id INTEGER PRIMARY KEY, amount INTEGER)")
+    archiver = WalArchiver(path, tmp_path / "backups")
+    yield path, connection, archiver
+    archiver.close()
+    connection.close()
+
+
+def test_replay_across_wal_restarts_matches_live_database(database, tmp_path):
+    path, connection, archiver = database
+    generations = set()
+    for batch in range(4):
+        insert(connection, 200)
+        generations.add(archiver.archive()["generation"])
+        if batch == 2:
+            # A reader pinning its snapshot makes the checkpoint partial
+            reader = sqlite3.connect(path)
+            reader.execute("BEGIN")
+            reader.execute("SELECT COUNT(*) FROM payments").fetchone()
+            insert(connection, 5)
+            assert archiver.archive()["complete"] is False
+            reader.close()
+    insert(connection, 3)
+    archiver.archive()
+
+    assert len(generations) == 4
+    assert len(archiver.chains()) == 1
+
+    restored = tmp_path / "restored.db"
+    summary = archiver.restore(restored)
+    assert summary["segments"] == len(archiver.segments(summary["chain"]))
+    assert payment_totals(restored) == payment_totals(path)
+
+
+def test_lost_wal_starts_new_chain(database, tmp_path):
+    path, connection, archiver = database
+    insert(connection, 50)
+    archiver.archive()
+    first_chain = archiver.load_state().chain
+
+    # Closing every connection checkpoints and deletes the WAL; frames
+    # written since the last cycle never reach the archive
+    insert(connection, 50)
+    connection.close()
+    archiver.close()
+    time.sleep(1.1)  # chains are named after their base backup, to the second
+
+    connection = connect_app(path)
+    insert(connection, 10)
+    archiver.archive()
+    assert archiver.load_state().chain != first_chain
+
+    restored = tmp_path / "restored.db"
+    archiver.restore(restored)
+    assert payment_totals(restored) == payment_totals(path)
+    connection.close()
+
+
+def test_gap_in_segments_is_rejected(database, tmp_path):
+    path, connection, archiver = database
+    insert(connection, 20)
+    archiver.archive()
+
+    # With a reader pinned the WAL is not restarted, so segments follow
+    # each other inside one generation
+    reader = sqlite3.connect(path)
+    reader.execute("BEGIN")
+    reader.execute("SELECT COUNT(*) FROM payments").fetchone()
+    for _ in range(3):
+        insert(connection, 20)
+        archiver.archive()
+    reader.close()
+
+    segments = archiver.segments(archiver.load_state().chain)
+    assert [segment.start > 0 for segment in segments[-3:]] == [False, True, True]
+    segments[-2].path.unlink()
+
+    with pytest.raises(ValueError):
+        archiver.restore(tmp_path / "restored.db")
+
+
+def test_base_backup_does_not_hold_the_write_lock(database, tmp_path):
+    path, connection, archiver = database
+    insert(connection, 50)
+    create_backup = BackupService.create_backup
+
+    def backup_with_concurrent_write(service):
+        # Fails with "database is locked" if the archiver still holds the lock
+        writer = sqlite3.connect(path, timeout=0.1, isolation_level=None)
+        try:
+            insert(writer, 10)
+        finally:
+            writer.close()
+        return create_backup(service)
+
+    with patch.object(BackupService, "create_backup", backup_with_concurrent_write):
+        archiver.archive()
+
+    restored = tmp_path / "restored.db"
+    archiver.restore(restored)
+    assert payment_totals(path)[0] == 60
+    assert payment_totals(restored) == payment_totals(path)
+
+
+def test_failing_archive_falls_back_to_checkpointing(database, tmp_path):
+    path, connection, archiver = database
+    insert(connection, 50)
+    archiver.archive()
+    first_chain = archiver.load_state().chain
+
+    insert(connection, 50)
+    with patch.object(WalArchiver, "_write_segment", side_effect=OSError("No space left on device")):
+        with pytest.raises(OSError):
+            archiver.archive()
+        assert archiver.load_state() is not None
+        with patch("app.services.wal_archive.settings.wal_archive_max_failure_seconds", 0):
+            with pytest.raises(OSError):
+                archiver.archive()
+    # The unarchived frames were checkpointed, so the chain cannot continue
+    assert archiver.load_state() is None
+
+    time.sleep(1.1)  # chains are named after their base backup, to the second
+    insert(connection, 10)
+    assert archiver.archive()["chain"] != first_chain
+    restored = tmp_path / "restored.db"
+    archiver.restore(restored)
+    assert payment_totals(restored) == payment_totals(path)
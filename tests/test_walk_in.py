@@ -0,0 +1,96 @@
+import os
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.core.models import Appointment, AppointmentStatus, Department, OutboxEvent, Patient
+from app.services.reception import ReceptionService
+
+
+def add_patients(engine, count):
+    with Session(engine) as session:
+        for patient_id in range(1, count + 1):
+            session.add(Patient(
+                id=patient_id, name=f"환자{patient_id}",
+                birthdate=datetime(1990, 1, 1), phone=f"010-0000-{patient_id:04d}"
+            ))
+        session.commit()
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    add_patients(engine, 2)
+    with Session(engine) as session:
+        session.add(Appointment(
+            patient_id=2, department=Department.ORTHOPEDICS, appointment_time=datetime.now(),
+            status=AppointmentStatus.CHECKED_IN, queue_number=7
+        ))
+        session.commit()
+    yield engine
+
+
+def test_walk_in_checks_in_with_one_commit(engine):
+    commits = []
+    with Session(engine) as session:
+        event.listen(session, "after_commit", lambda s: commits.append(s))
+        appointment = ReceptionService(session).create_walk_in_appointment(
+            1, ["knee pain"], Department.ORTHOPEDICS
+        )
+
+        assert len(commits) == 1
+        assert appointment.status == AppointmentStatus.CHECKED_IN
+        assert appointment.queue_number == 8
+        assert appointment.checked_in_at is not None
+        topics = session.exec(
+            select(OutboxEvent.topic).where(OutboxEvent.aggregate_id == appointment.id)
+        ).all()
+        assert len(topics) == 3
+
+
+def test_unknown_patient_creates_nothing(engine):
+    with Session(engine) as session:
+        with pytest.raises(ValueError):
+            ReceptionService(session).create_walk_in_appointment(99, ["fever"], Department.PEDIATRICS)
+        assert session.exec(select(Appointment).where(Appointment.patient_id == 99)).all() == []
+        assert session.exec(select(OutboxEvent)).all() == []
+
+
+def test_concurrent_walk_ins_get_distinct_numbers(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'kiosk.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30}
+    )
+    SQLModel.metadata.create_all(engine)
+    add_patients(engine, 8)
+
+    def client(patient_id):
+        with Session(engine) as session:
+            service = ReceptionService(session)
+            for _ in range(10):
+                service.create_walk_in_appointment(patient_id, ["fever"], Department.PEDIATRICS)
+
+    threads = [threading.Thread(target=client, args=(patient_id,)) for patient_id in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with Session(engine) as session:
+        numbers = session.exec(select(Appointment.queue_number)).all()
+    assert sorted(numbers) == list(range(1, 81))
+    engine.dispose()